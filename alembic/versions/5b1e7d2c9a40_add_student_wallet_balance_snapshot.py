@@ -0,0 +1,51 @@
+"""Add tbl_student_wallet_balance running balance snapshot
+
+Revision ID: 5b1e7d2c9a40
+Revises: c4cc04dcbdab
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b1e7d2c9a40'
+down_revision: Union[str, Sequence[str], None] = 'c4cc04dcbdab'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('tbl_student_wallet_balance',
+    sa.Column('student_id', sa.String(length=255), nullable=False),
+    sa.Column('balance', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('ledger_entries', sa.Integer(), nullable=False),
+    sa.Column('last_ledger_id', sa.BigInteger(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('CURRENT_TIMESTAMP'), nullable=False),
+    sa.PrimaryKeyConstraint('student_id')
+    )
+
+    # Seed the snapshot from the existing ledger
+    op.execute(
+        """
+        INSERT INTO tbl_student_wallet_balance
+            (student_id, balance, ledger_entries, last_ledger_id, updated_at)
+        SELECT
+            student_id,
+            COALESCE(SUM(CASE WHEN direction = 'credit' THEN original_amount ELSE amount END), 0),
+            COUNT(id),
+            MAX(id),
+            CURRENT_TIMESTAMP
+        FROM tbl_student_wallet_ledger
+        GROUP BY student_id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('tbl_student_wallet_balance')
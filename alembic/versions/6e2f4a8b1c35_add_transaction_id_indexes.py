@@ -0,0 +1,55 @@
+"""Add transaction id indexes on payment, wallet and wallet history
+
+Revision ID: 6e2f4a8b1c35
+Revises: 5b1e7d2c9a40
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6e2f4a8b1c35'
+down_revision: Union[str, Sequence[str], None] = '5b1e7d2c9a40'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# external_transaction_id is TEXT on these MIS tables, so MySQL needs a prefix
+# length; 64 characters covers Urubuto and bank references.
+TRANSACTION_ID_INDEXES = [
+    ('ix_payment_external_transaction_id', 'payment'),
+    ('ix_student_wallet_external_transaction_id', 'tbl_student_wallet'),
+    ('ix_wallet_history_external_transaction_id', 'tbl_student_wallet_history'),
+]
+
+
+def _indexed_tables():
+    """Tables that already have an index leading with external_transaction_id"""
+    inspector = sa.inspect(op.get_bind())
+    indexed = set()
+    for _, table in TRANSACTION_ID_INDEXES:
+        indexes = inspector.get_indexes(table) + inspector.get_unique_constraints(table)
+        if any(idx['column_names'][:1] == ['external_transaction_id'] for idx in indexes):
+            indexed.add(table)
+    return indexed
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    indexed = _indexed_tables()
+    for name, table in TRANSACTION_ID_INDEXES:
+        if table in indexed:
+            continue
+        op.create_index(name, table, ['external_transaction_id'], mysql_length=64)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    for name, table in TRANSACTION_ID_INDEXES:
+        if any(idx['name'] == name for idx in inspector.get_indexes(table)):
+            op.drop_index(name, table_name=table)
@@ -0,0 +1,46 @@
+"""Add indexed transaction_key to integration_logs
+
+Revision ID: 7a9d3c5e2f61
+Revises: 6e2f4a8b1c35
+Create Date: 2026-10-18 10:05:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a9d3c5e2f61'
+down_revision: Union[str, Sequence[str], None] = '6e2f4a8b1c35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('integration_logs', sa.Column('transaction_key', sa.String(length=255), nullable=True))
+
+    # Backfill: prefer the explicit column, fall back to the Urubuto payload
+    op.execute(
+        """
+        UPDATE integration_logs
+        SET transaction_key = COALESCE(
+            NULLIF(external_transaction_id, ''),
+            IF(JSON_VALID(response_data),
+               LEFT(JSON_UNQUOTE(JSON_EXTRACT(response_data, '$.transaction_id')), 255),
+               NULL)
+        )
+        """
+    )
+    # JSON null unquotes to the string 'null'
+    op.execute("UPDATE integration_logs SET transaction_key = NULL WHERE transaction_key = 'null'")
+
+    op.create_index(op.f('ix_integration_logs_transaction_key'), 'integration_logs', ['transaction_key'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_integration_logs_transaction_key'), table_name='integration_logs')
+    op.drop_column('integration_logs', 'transaction_key')
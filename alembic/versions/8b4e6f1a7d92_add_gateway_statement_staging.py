@@ -0,0 +1,64 @@
+"""Add gateway statement staging tables
+
+Revision ID: 8b4e6f1a7d92
+Revises: 7a9d3c5e2f61
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8b4e6f1a7d92'
+down_revision: Union[str, Sequence[str], None] = '7a9d3c5e2f61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('gateway_statement_imports',
+    sa.Column('file_name', sa.String(length=255), nullable=False),
+    sa.Column('file_hash', sa.String(length=64), nullable=False),
+    sa.Column('row_count', sa.Integer(), nullable=False),
+    sa.Column('inserted_count', sa.Integer(), nullable=False),
+    sa.Column('updated_count', sa.Integer(), nullable=False),
+    sa.Column('txn_date_from', sa.DateTime(), nullable=True),
+    sa.Column('txn_date_to', sa.DateTime(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('file_hash')
+    )
+    op.create_table('gateway_statement_transactions',
+    sa.Column('transaction_reference', sa.String(length=64), nullable=False),
+    sa.Column('payer_code', sa.String(length=50), nullable=True),
+    sa.Column('paid_amount', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('slip_no', sa.String(length=100), nullable=True),
+    sa.Column('txn_status', sa.String(length=30), nullable=True),
+    sa.Column('txn_date', sa.DateTime(), nullable=True),
+    sa.Column('import_id', sa.Integer(), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['import_id'], ['gateway_statement_imports.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('transaction_reference')
+    )
+    op.create_index(op.f('ix_gateway_statement_transactions_payer_code'), 'gateway_statement_transactions', ['payer_code'], unique=False)
+    op.create_index(op.f('ix_gateway_statement_transactions_import_id'), 'gateway_statement_transactions', ['import_id'], unique=False)
+    op.create_index('ix_gateway_statement_txn_date_status', 'gateway_statement_transactions', ['txn_date', 'txn_status'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_gateway_statement_txn_date_status', table_name='gateway_statement_transactions')
+    op.drop_index(op.f('ix_gateway_statement_transactions_import_id'), table_name='gateway_statement_transactions')
+    op.drop_index(op.f('ix_gateway_statement_transactions_payer_code'), table_name='gateway_statement_transactions')
+    op.drop_table('gateway_statement_transactions')
+    op.drop_table('gateway_statement_imports')
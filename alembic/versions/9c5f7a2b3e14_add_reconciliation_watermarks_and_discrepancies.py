@@ -0,0 +1,55 @@
+"""Add reconciliation watermarks and discrepancies
+
+Revision ID: 9c5f7a2b3e14
+Revises: 8b4e6f1a7d92
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9c5f7a2b3e14'
+down_revision: Union[str, Sequence[str], None] = '8b4e6f1a7d92'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('reconciliation_watermarks',
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('last_id', sa.BigInteger(), nullable=False),
+    sa.Column('rows_examined', sa.BigInteger(), nullable=False),
+    sa.Column('last_run_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.create_table('reconciliation_discrepancies',
+    sa.Column('reconciliation', sa.String(length=100), nullable=False),
+    sa.Column('transaction_id', sa.String(length=255), nullable=False),
+    sa.Column('kind', sa.String(length=30), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('payer_code', sa.String(length=255), nullable=True),
+    sa.Column('expected_amount', sa.Numeric(precision=14, scale=2), nullable=True),
+    sa.Column('actual_amount', sa.Numeric(precision=14, scale=2), nullable=True),
+    sa.Column('observation', sa.String(length=500), nullable=True),
+    sa.Column('payment_date_time', sa.String(length=50), nullable=True),
+    sa.Column('source_id', sa.BigInteger(), nullable=True),
+    sa.Column('resolved_at', sa.DateTime(), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('reconciliation', 'transaction_id', name='uq_reconciliation_discrepancy_txn')
+    )
+    op.create_index('ix_reconciliation_discrepancy_open', 'reconciliation_discrepancies', ['reconciliation', 'status', 'kind'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_reconciliation_discrepancy_open', table_name='reconciliation_discrepancies')
+    op.drop_table('reconciliation_discrepancies')
+    op.drop_table('reconciliation_watermarks')
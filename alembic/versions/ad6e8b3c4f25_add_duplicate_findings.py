@@ -0,0 +1,44 @@
+"""Add duplicate findings report table
+
+Revision ID: ad6e8b3c4f25
+Revises: 9c5f7a2b3e14
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ad6e8b3c4f25'
+down_revision: Union[str, Sequence[str], None] = '9c5f7a2b3e14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('duplicate_findings',
+    sa.Column('source', sa.String(length=50), nullable=False),
+    sa.Column('duplicate_key', sa.String(length=255), nullable=False),
+    sa.Column('occurrences', sa.Integer(), nullable=False),
+    sa.Column('keep_id', sa.BigInteger(), nullable=False),
+    sa.Column('duplicate_ids', sa.Text(), nullable=False),
+    sa.Column('total_amount', sa.Numeric(precision=14, scale=2), nullable=True),
+    sa.Column('first_seen_at', sa.DateTime(), nullable=True),
+    sa.Column('last_seen_at', sa.DateTime(), nullable=True),
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('source', 'duplicate_key', name='uq_duplicate_finding_key')
+    )
+    op.create_index('ix_duplicate_finding_source_occurrences', 'duplicate_findings', ['source', 'occurrences'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_duplicate_finding_source_occurrences', table_name='duplicate_findings')
+    op.drop_table('duplicate_findings')
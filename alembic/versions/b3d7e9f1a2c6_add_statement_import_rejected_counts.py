@@ -0,0 +1,30 @@
+"""Add rejected and undated line counts to gateway statement imports
+
+Revision ID: b3d7e9f1a2c6
+Revises: ad6e8b3c4f25
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3d7e9f1a2c6'
+down_revision: Union[str, Sequence[str], None] = 'ad6e8b3c4f25'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('gateway_statement_imports', sa.Column('rejected_count', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('gateway_statement_imports', sa.Column('undated_count', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('gateway_statement_imports', 'undated_count')
+    op.drop_column('gateway_statement_imports', 'rejected_count')
@@ -0,0 +1,40 @@
+"""Add index on payment.student_wallet_ref
+
+Revision ID: c5e8a1d4f7b3
+Revises: b3d7e9f1a2c6
+Create Date: 2026-10-18 15:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e8a1d4f7b3'
+down_revision: Union[str, Sequence[str], None] = 'b3d7e9f1a2c6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEX_NAME = 'ix_payment_student_wallet_ref'
+
+
+def _has_index():
+    """The MIS may already index student_wallet_ref under another name"""
+    inspector = sa.inspect(op.get_bind())
+    return any(idx['column_names'][:1] == ['student_wallet_ref'] for idx in inspector.get_indexes('payment'))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if not _has_index():
+        op.create_index(INDEX_NAME, 'payment', ['student_wallet_ref'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    if any(idx['name'] == INDEX_NAME for idx in inspector.get_indexes('payment')):
+        op.drop_index(INDEX_NAME, table_name='payment')
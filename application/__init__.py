@@ -11,6 +11,7 @@ from flask_jwt_extended import JWTManager
 from flask_session import Session
 from dotenv import load_dotenv
 from application.utils.celery_utils import make_celery
+from application.utils.structured_logging import apply_levels, parse_levels, start_file_logging
 
 load_dotenv()
 
@@ -63,6 +64,10 @@ def create_app(config_name=None):
     # Register error handlers
     register_error_handlers(app)
 
+    # Per-request DB, QuickBooks and Redis metrics (served at /metrics)
+    from application.utils.instrumentation import init_instrumentation
+    init_instrumentation(app)
+
     # Celery setup
     app.config['broker_url'] = os.getenv('broker_url')
     app.config['RESULT_BACKEND'] = os.getenv('RESULT_BACKEND')
@@ -98,36 +103,24 @@ def create_app(config_name=None):
 
 def setup_logging(app):
     """
-    Sets up a simple file logging configuration for the Flask application.
-    Logs will be written to a file named 'app.log' in the same directory
-    as the application.
-    
+    Configures structured logging for the Flask application.
+    The app logger runs at LOG_LEVEL with per-subsystem overrides from
+    LOG_LEVELS; outside debug and testing, records are written as JSON lines
+    to LOG_FILE by a background queue listener (rotated by logrotate).
+
     Args:
         app: The Flask application instance.
     """
+    apply_levels(app.config.get('LOG_LEVEL', 'INFO'), parse_levels(app.config.get('LOG_LEVELS')))
+
     # Only set up file logging if not in debug or testing mode
     if not app.debug and not app.testing:
-        # Configure the Flask logger
-        handler = logging.FileHandler('app.log')
-        
-        # Set the handler logging level to DEBUG to capture all logs
-        handler.setLevel(logging.DEBUG)
-
-        # Update formatter to include pathname, filename, and line number
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s - [in %(pathname)s:%(lineno)d]'
-        )
-        handler.setFormatter(formatter)
-        
-        # Add the file handler to the app logger
-        app.logger.addHandler(handler)
-        
-        # Set the app logger's level to DEBUG
-        app.logger.setLevel(logging.DEBUG)
+        log_file = app.config.get('LOG_FILE', 'logs/app.log')
+        start_file_logging(log_file, logger=app.logger)
 
         # Log a message to indicate successful startup
         app.logger.info('EAUR MIS-QuickBooks Integration startup')
-        app.logger.info('Logging configured successfully to app.log')
+        app.logger.info('Logging configured to %s at %s', log_file, logging.getLevelName(app.logger.level))
 
 
 def register_blueprints(app):
@@ -135,6 +128,7 @@ def register_blueprints(app):
     # API v1 blueprint
     from application.api.v1 import api_v1_bp
     from application.api.health import health_bp
+    from application.api.metrics import metrics_bp
     from application.api.v1.urubuto import urubuto_bp
     from application.api.v1.quickbooks import quickbooks_bp
     from application.api.v1.mis_data import mis_data_bp
@@ -160,6 +154,7 @@ def register_blueprints(app):
     # Register blueprints
     app.register_blueprint(api_v1_bp, url_prefix='/api/v1')   
     app.register_blueprint(health_bp, url_prefix='/health')
+    app.register_blueprint(metrics_bp)  # Serves /metrics
     app.register_blueprint(urubuto_bp, url_prefix='/api/v1/urubuto')
     app.register_blueprint(quickbooks_bp, url_prefix='/api/v1/quickbooks')
     app.register_blueprint(mis_data_bp, url_prefix='/api/v1/mis_data')
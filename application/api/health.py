@@ -7,6 +7,8 @@ from datetime import datetime
 import os
 import sys
 
+from application.utils.redis_pool import redis_health
+
 health_bp = Blueprint('health', __name__)
 
 @health_bp.route('/', methods=['GET'])
@@ -49,6 +51,12 @@ def detailed_health_check():
         health_status['checks']['databases'] = {'error': str(e)}
         health_status['status'] = 'unhealthy'
     
+    # Check Redis (broker, job progress, sync offsets)
+    redis_status = redis_health()
+    health_status['checks']['redis'] = redis_status
+    if not redis_status['ok'] and health_status['status'] == 'healthy':
+        health_status['status'] = 'degraded'
+
     # Check configuration
     try:
         config_checks = {
@@ -70,3 +78,16 @@ def detailed_health_check():
     return jsonify(health_status), status_code
 
 
+
+@health_bp.route('/query-profile', methods=['GET'])
+def query_profile():
+    """Per-endpoint/task query counts, slow queries and N+1 suspects from the query profiler"""
+    from application.utils.database import db_manager
+    if db_manager.profiler is None:
+        return jsonify({'enabled': False, 'message': 'Set QUERY_PROFILER_ENABLED=true to profile queries'})
+    return jsonify({
+        'enabled': True,
+        'slow_query_ms': db_manager.profiler.slow_threshold * 1000,
+        'n_plus_one_threshold': db_manager.profiler.repeat_threshold,
+        'endpoints': db_manager.profiler.report()
+    })
@@ -0,0 +1,14 @@
+"""
+Prometheus metrics endpoint
+"""
+
+from flask import Blueprint, Response
+
+from application.utils.instrumentation import render_metrics
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def metrics():
+    """Request, database, QuickBooks, Redis and Celery task metrics in the Prometheus text format"""
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
@@ -5,6 +5,8 @@ Handles synchronization of applicants and students from MIS to QuickBooks as cus
 
 from flask import Blueprint, request, jsonify, current_app
 from application.services.customer_sync import CustomerSyncService
+from application.services.customer_index import CustomerNameIndex
+from application.services.quickbooks import QuickBooks
 from application.models.central_models import QuickBooksConfig, QuickbooksAuditLog
 import traceback
 from datetime import datetime
@@ -1367,4 +1369,36 @@ def check_tracking_ids_existence():
             'success': False,
             'error': error_msg,
             'details': traceback.format_exc()
-        }), 500
\ No newline at end of file
+        }), 500
+@customer_sync_bp.route('/customer-index', methods=['GET', 'POST'])
+@require_auth('validation')
+@log_api_access('quickbooks_customer_index')
+def quickbooks_customer_index():
+    """
+    QuickBooks DisplayName index used to link existing customers.
+
+    GET returns its size and age; POST reloads it from QuickBooks.
+    """
+    try:
+        name_index = CustomerNameIndex()
+        if request.method == 'POST':
+            is_connected, error_response = validate_quickbooks_connection()
+            if not is_connected:
+                return error_response
+            count = name_index.load(QuickBooks())
+            return create_response(
+                success=True,
+                data=name_index.stats(),
+                message=f'Customer index reloaded with {count} names'
+            )
+
+        return create_response(success=True, data=name_index.stats(), message='Customer index status')
+    except Exception as e:
+        current_app.logger.error(f"Error with QuickBooks customer index: {e}")
+        current_app.logger.error(traceback.format_exc())
+        return create_response(
+            success=False,
+            error='Error with QuickBooks customer index',
+            details=str(e),
+            status_code=500
+        )
@@ -3,7 +3,7 @@ MIS Data API endpoints for data enrichment and lookup
 These endpoints will be implemented after database models are generated
 """
 
-from flask import Blueprint, jsonify, current_app
+from flask import Blueprint, jsonify, current_app, request
 from application.models.mis_models import (
     TblBank, TblCampus,TblRegisterProgramUg,
     TblIntake, TblSpecialization, TblProgramMode,
@@ -11,6 +11,7 @@ from application.models.mis_models import (
     TblPersonalUg, Payment, TblImvoice
 )
 from application.utils.auth_decorators import require_auth, require_gateway, log_api_access
+from application.utils.reference_cache import reference_cache
 
 
 mis_data_bp = Blueprint('mis_data', __name__)
@@ -309,4 +310,40 @@ def get_invoice(invoice_id):
             return jsonify({'message': 'Invoice not found'}), 404
     except Exception as e:
         current_app.logger.error(f"Error fetching invoice details: {e}")
-        return jsonify({'message': 'Internal server error'}), 500
\ No newline at end of file
+        return jsonify({'message': 'Internal server error'}), 500
+@mis_data_bp.route('/reference-cache', methods=['GET'])
+@require_auth('validation')
+@log_api_access('get_reference_cache')
+def get_reference_cache():
+    """Get the loaded reference tables, their row counts and versions"""
+    return jsonify({'reference_cache': reference_cache.stats()}), 200
+
+@mis_data_bp.route('/reference-cache/invalidate', methods=['POST'])
+@require_auth('validation')
+@log_api_access('invalidate_reference_cache')
+def invalidate_reference_cache():
+    """
+    Drop cached reference tables so they are reloaded on next use
+
+    Body (optional): {"table": "tbl_campus"} to drop a single table
+    """
+    try:
+        table_name = (request.get_json(silent=True) or {}).get('table')
+        model = None
+        if table_name:
+            model = next(
+                (m for m in reference_cache.tables if m.__tablename__ == table_name), None
+            )
+            if model is None:
+                return jsonify({'message': f'Unknown reference table: {table_name}'}), 400
+
+        reference_cache.invalidate(model)
+        current_app.logger.info(f"Reference cache invalidated: {table_name or 'all tables'}")
+        return jsonify({
+            'message': 'Reference cache invalidated',
+            'table': table_name or 'all',
+            'reference_cache': reference_cache.stats()
+        }), 200
+    except Exception as e:
+        current_app.logger.error(f"Error invalidating reference cache: {e}")
+        return jsonify({'message': 'Internal server error'}), 500
@@ -1,11 +1,11 @@
 import json
 from decimal import Decimal
-from flask import Blueprint, jsonify, current_app, request
+from itertools import groupby
+from flask import Blueprint, Response, jsonify, current_app, request, stream_with_context
 from application import db
 from application.models.central_models import IntegrationLog
 from application.models.mis_models import TblStudentWallet, TblStudentWalletHistory, TblPersonalUg, TblOnlineApplication, TblStudentWalletLedger, Payment
 from sqlalchemy import func
-import pandas as pd
 import os
 from datetime import datetime, timedelta
 from application.models.central_models import IntegrationLog
@@ -13,7 +13,19 @@ from sqlalchemy.exc import IntegrityError
 from datetime import date
 from application.utils.database import db_manager
 from application.services.opening_balance import OpeningBalanceSyncService
+from application.services.statement_ingest import StatementIngestService, StatementFormatError
+from application.services.statement_store import StatementStoreService
+from application.utils.bulk_query import select_in
+from application.services.wallet_import import AbsentWalletPaymentImporter
+from application.services.reconciliation_engine import (
+    IntegrationWalletReconciler, DISCREPANCY_MISSING, DISCREPANCY_AMOUNT_MISMATCH
+)
+from application.services.duplicate_detection import DuplicateDetector, DUPLICATE_SOURCES
 from application.utils.auth_decorators import require_auth, require_gateway, log_api_access
+from application.utils.jobs import (
+    background_job, report_progress, get_job, has_result, load_result, iter_result, paginate_result, JOB_HANDLERS
+)
+from application.utils.streaming import requested_stream_format, iter_results, stream_rows
 
 
 
@@ -87,67 +99,87 @@ def get_total_valid_payments():
         }), 500
 
 
-"""
 @reconciliation_bp.route("/clean-duplicate-logs", methods=["POST"])
+@require_auth('validation')
+@log_api_access('Clean duplicate integration logs')
 def clean_duplicate_integration_logs():
-    
-    #Removes duplicate IntegrationLog records based on external_transaction_id.
-    #Keeps the oldest record and deletes the rest.
-    
-
-    try:
-        # Step 1: find transaction_ids with duplicates
-        duplicates = (
-            db.session.query(
-                IntegrationLog.external_transaction_id,
-                func.count(IntegrationLog.id).label("cnt")
-            )
-            .group_by(IntegrationLog.external_transaction_id)
-            .having(func.count(IntegrationLog.id) > 1)
-            .all()
-        )
-
-        total_deleted = 0
-        for txn_id, count in duplicates:
-            # Step 2: fetch all logs for this transaction_id ordered by id (oldest first)
-            logs = (
-                db.session.query(IntegrationLog)
-                .filter_by(external_transaction_id=txn_id)
-                .order_by(IntegrationLog.id.asc())
-                .all()
-            )
-
-            # Keep the first one, delete the rest
-            for duplicate_log in logs[1:]:
-                db.session.delete(duplicate_log)
-                total_deleted += 1
-
-            current_app.logger.info(f"Cleaned {count - 1} duplicate logs for transaction {txn_id}")
+    """
+    Removes duplicate IntegrationLog records sharing a transaction_key.
+    Keeps the VALID record (the oldest among equals) and deletes the rest in
+    a single transaction.
 
-        db.session.commit()
+    Body: {"dry_run": true}  (default) only reports what would be deleted
+    """
+    payload = request.get_json(silent=True) or {}
+    dry_run = payload.get("dry_run", True) is not False
 
+    try:
+        result = DuplicateDetector().cleanup("integration_log", dry_run=dry_run)
         return jsonify({
             "status": "success",
-            "total_duplicates_removed": total_deleted,
-            "total_transactions_checked": len(duplicates)
+            "dry_run": dry_run,
+            "total_duplicates_removed": 0 if dry_run else result["rows_to_delete"],
+            "rows_to_delete": result["rows_to_delete"],
+            "total_transactions_checked": result["duplicate_keys"],
+            "deleted_ids": result["deleted_ids"]
         }), 200
 
     except Exception as e:
         current_app.logger.exception("Failed to clean duplicate integration logs")
-        db.session.rollback()
         return jsonify({
             "status": "error",
             "message": "Internal server error",
             "error": str(e)
         }), 500
 
-"""
+
+@reconciliation_bp.route("/duplicates", methods=["GET"])
+@require_auth('validation')
+@log_api_access('Get duplicates report')
+def get_duplicates_report():
+    """
+    Returns the duplicates report built by the nightly scan.
+
+    Query params:
+    - source=integration_log|wallet   limit to one source
+    - refresh=true                    rescan before reporting
+    - limit / offset                  page through the findings
+    """
+    source = request.args.get("source")
+    if source and source not in DUPLICATE_SOURCES:
+        return jsonify({
+            "status": "error",
+            "message": f"source must be one of {', '.join(DUPLICATE_SOURCES)}"
+        }), 400
+
+    detector = DuplicateDetector()
+    counts = None
+    if request.args.get("refresh", "false").lower() == "true":
+        counts = detector.refresh_report([source] if source else None)
+
+    findings = detector.report(
+        source,
+        limit=request.args.get("limit", type=int),
+        offset=request.args.get("offset", 0, type=int)
+    )
+    response = {
+        "status": "success",
+        "count": len(findings),
+        "findings": findings
+    }
+    if counts is not None:
+        response["refreshed"] = counts
+    return jsonify(response), 200
+
+
 @reconciliation_bp.route("/duplicate-wallets", methods=["GET"])
 @require_auth('validation')
 @log_api_access('Get duplicate wallets')
 def get_duplicate_external_transaction_ids():
     """
     Returns wallet records that have duplicate external_transaction_id
+
+    ``?format=ndjson|csv`` streams one flat row per wallet record instead.
     """
 
     # Step 1: find duplicated external_transaction_ids
@@ -162,7 +194,7 @@ def get_duplicate_external_transaction_ids():
     )
 
     # Step 2: fetch all records with those duplicated IDs
-    duplicate_records = (
+    duplicate_query = (
         db.session.query(TblStudentWallet)
         .filter(
             TblStudentWallet.external_transaction_id.in_(
@@ -173,9 +205,24 @@ def get_duplicate_external_transaction_ids():
             TblStudentWallet.external_transaction_id,
             TblStudentWallet.date.asc()
         )
-        .all()
     )
 
+    stream_format = requested_stream_format()
+    if stream_format:
+        rows = (
+            {
+                "external_transaction_id": record.external_transaction_id,
+                "id": record.id,
+                "payer_code": record.reg_no,
+                "amount": str(record.dept),
+                "date": record.payment_date.isoformat() if record.payment_date else None,
+            }
+            for record in iter_results(db.session, duplicate_query)
+        )
+        return stream_rows(rows, stream_format, "duplicate_wallets")
+
+    duplicate_records = duplicate_query.all()
+
     results = []
 
     for record in duplicate_records:
@@ -196,19 +243,41 @@ def get_duplicate_external_transaction_ids():
     }), 200
 
 
-@reconciliation_bp.route("/analyze-transactions", methods=["POST"])
-@require_auth('validation')
-@log_api_access('Analyze transactions')
-def analyze_transactions_file():
+def _statement_date_range(payload):
     """
-    Receives a file path and returns transaction statistics
-    grouped by payer code with transaction-level details.
+    Parse inclusive YYYY-MM-DD date_from/date_to into a half-open range.
 
-    Assumes:
-    - First row is header
-    - Only Txn Status = SUCCESSFUL or PENDING_SETTLEMENT is included
+    Raises:
+        ValueError: When a date is not YYYY-MM-DD
+    """
+    try:
+        date_from = datetime.strptime(str(payload["date_from"]), "%Y-%m-%d")
+        date_to = datetime.strptime(str(payload["date_to"]), "%Y-%m-%d") + timedelta(days=1)
+    except ValueError:
+        raise ValueError("date_from and date_to must be YYYY-MM-DD dates")
+    return date_from, date_to
+
+
+def _date_range_error(error):
+    return jsonify({
+        "status": "error",
+        "message": str(error)
+    }), 400
+
+
+@reconciliation_bp.route("/statements/import", methods=["POST"])
+@require_auth('validation')
+@log_api_access('Import gateway statement')
+def import_gateway_statement():
     """
+    Loads a gateway statement file into the staging table once.
 
+    Payload:
+    {
+        "file_path": ".../payments.csv",
+        "force": false
+    }
+    """
     data = request.get_json(silent=True)
 
     if not data or "file_path" not in data:
@@ -227,92 +296,97 @@ def analyze_transactions_file():
         }), 404
 
     try:
-        # Explicitly tell pandas first row is header
-        df = pd.read_csv(
-            file_path,
-            header=0,
-            skip_blank_lines=True
-        )
+        result = StatementStoreService().import_file(file_path, force=bool(data.get("force", False)))
+        return jsonify({
+            "status": "success",
+            "import": result
+        }), 200
+
+    except StatementFormatError as e:
+        return jsonify({
+            "status": "error",
+            "message": "Missing required columns",
+            "missing_columns": e.missing_columns
+        }), 400
 
-        # Normalize column names (important for bank files)
-        df.columns = df.columns.str.strip()
+    except Exception as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 500
 
-        required_columns = {
-            "Payer Code",
-            "Paid Amount",
-            "Txn Status",
-            "Int. Txn Ref."
-        }
 
-        missing = required_columns - set(df.columns)
+@reconciliation_bp.route("/statements/imports", methods=["GET"])
+@require_auth('validation')
+@log_api_access('List gateway statement imports')
+def list_gateway_statement_imports():
+    """Lists loaded statement files and the transaction date range of each"""
+    imports = StatementStoreService().list_imports()
+    return jsonify({
+        "status": "success",
+        "count": len(imports),
+        "imports": imports
+    }), 200
 
-        if missing:
-            return jsonify({
-                "status": "error",
-                "message": "Missing required columns",
-                "missing_columns": list(missing)
-            }), 400
 
-        # ------------------------------------
-        # Filter SUCCESSFUL transactions and PENDING_SETTLEMENT transactions
-        # ------------------------------------
-        df = df[
-            (df["Txn Status"] == "SUCCESSFUL") |
-            (df["Txn Status"] == "PENDING_SETTLEMENT")
-        ]
+@reconciliation_bp.route("/analyze-transactions", methods=["POST"])
+@require_auth('validation')
+@log_api_access('Analyze transactions')
+def analyze_transactions_file():
+    """
+    Receives a file path and returns transaction statistics
+    grouped by payer code with transaction-level details.
 
+    Assumes:
+    - First row is header
+    - Only Txn Status = SUCCESSFUL or PENDING_SETTLEMENT is included
+    """
 
-        # ------------------------------------
-        # Convert paid amount safely
-        # ------------------------------------
-        df["Paid Amount"] = (
-            df["Paid Amount"]
-            .astype(str)
-            .str.replace(",", "", regex=False)
-        )
+    data = request.get_json(silent=True)
 
-        df["Paid Amount"] = pd.to_numeric(
-            df["Paid Amount"],
-            errors="coerce"
-        ).fillna(0)
-
-        # ------------------------------------
-        # Overall summary
-        # ------------------------------------
-        total_transactions = int(len(df))
-        total_amount = float(df["Paid Amount"].sum())
-
-        # ------------------------------------
-        # Group per payer code
-        # ------------------------------------
-        per_payer_code = {}
-
-        for payer_code, group in df.groupby("Payer Code"):
-            transactions = []
-
-            for _, row in group.iterrows():
-                transactions.append({
-                    "transaction_reference": row["Int. Txn Ref."],
-                    "paid_amount": float(row["Paid Amount"]),
-                    "slip_no": row.get("Bank Slip", None)
-                })
+    if data and "file_path" not in data and "date_from" in data and "date_to" in data:
+        try:
+            date_from, date_to = _statement_date_range(data)
+        except ValueError as e:
+            return _date_range_error(e)
+        report = StatementStoreService().summarize(date_from, date_to)
+        return jsonify({
+            "status": "success",
+            "date_range": {"from": data["date_from"], "to": data["date_to"]},
+            **report
+        }), 200
 
-            per_payer_code[str(payer_code)] = {
-                "transaction_count": int(len(group)),
-                "total_paid_amount": float(group["Paid Amount"].sum()),
-                "transactions": transactions
-            }
+    if not data or "file_path" not in data:
+        return jsonify({
+            "status": "error",
+            "message": "file_path (or date_from and date_to) is required"
+        }), 400
+
+    file_path = data["file_path"]
+
+    if not os.path.exists(file_path):
+        return jsonify({
+            "status": "error",
+            "message": "File not found",
+            "file_path": file_path
+        }), 404
+
+    try:
+        report = StatementIngestService().summarize(file_path)
 
         return jsonify({
             "status": "success",
             "file_path": file_path,
-            "summary": {
-                "total_transactions": total_transactions,
-                "total_paid_amount": round(total_amount, 2)
-            },
-            "per_payer_code": per_payer_code
+            **report
         }), 200
 
+    except StatementFormatError as e:
+        return jsonify({
+            "status": "error",
+            "message": "Missing required columns",
+            "missing_columns": e.missing_columns
+        }), 400
+
     except Exception as e:
         return jsonify({
             "status": "error",
@@ -323,13 +397,16 @@ def analyze_transactions_file():
 @reconciliation_bp.route("/wallet_hist_vs_cloud_pyts", methods=["POST"])
 @require_auth('validation')
 @log_api_access('Wallet vs Cloud reconciliation')
+@background_job("wallet_hist_vs_cloud_pyts", page_key="absent.absent_in_wallet")
 def wallet_hist_vs_cloud_pyts():
     """
     Wallet ↔ Cloud reconciliation with date-range filtering.
 
+    Add ``?mode=job`` to run it in the background (see ``/jobs/<job_id>``).
+
     Payload:
     {
-        "file_path": ".../payments.json",
+        "file_path": ".../payments.json",   # optional, staged statements are used when omitted
         "date_from": "YYYY-MM-DD",
         "date_to": "YYYY-MM-DD"
     }
@@ -354,34 +431,39 @@ def wallet_hist_vs_cloud_pyts():
     try:
         payload = request.get_json()
 
-        required = ["file_path", "date_from", "date_to"]
+        required = ["date_from", "date_to"]
         if not payload or not all(k in payload for k in required):
             return jsonify({
                 "status": "error",
-                "message": "file_path, date_from and date_to are required"
+                "message": "date_from and date_to are required"
             }), 400
 
         # ---------------------------------------------------------------
         # Date handling
         # ---------------------------------------------------------------
 
-        date_from = datetime.strptime(payload["date_from"], "%Y-%m-%d")
-        date_to = datetime.strptime(payload["date_to"], "%Y-%m-%d") + timedelta(days=1)
-
-        file_path = payload["file_path"]
-
-        if not os.path.exists(file_path):
-            return jsonify({
-                "status": "error",
-                "message": f"JSON file not found: {file_path}"
-            }), 404
+        try:
+            date_from, date_to = _statement_date_range(payload)
+        except ValueError as e:
+            return _date_range_error(e)
 
         # ---------------------------------------------------------------
-        # STEP 1 — LOAD CLOUD PAYMENTS JSON
+        # STEP 1 — LOAD CLOUD PAYMENTS (staged statements, or a JSON file)
         # ---------------------------------------------------------------
 
-        with open(file_path, "r") as f:
-            cloud_json = json.load(f)
+        file_path = payload.get("file_path")
+
+        if file_path:
+            if not os.path.exists(file_path):
+                return jsonify({
+                    "status": "error",
+                    "message": f"JSON file not found: {file_path}"
+                }), 404
+
+            with open(file_path, "r") as f:
+                cloud_json = json.load(f)
+        else:
+            cloud_json = StatementStoreService().summarize(date_from, date_to)
 
         cloud_map = {}
 
@@ -453,7 +535,8 @@ def wallet_hist_vs_cloud_pyts():
 
         all_refs = set(wallet_map.keys()) | set(cloud_map.keys())
 
-        for trx_ref in all_refs:
+        for position, trx_ref in enumerate(all_refs, start=1):
+            report_progress(position, len(all_refs))
 
             wallet = wallet_map.get(trx_ref)
             cloud = cloud_map.get(trx_ref)
@@ -558,29 +641,52 @@ def import_wallet_history_from_json():
     try:
         payload = request.get_json()
 
-        if not payload or "file_path" not in payload:
-            return jsonify({
-                "status": "error",
-                "message": "file_path is required"
-            }), 400
-
-        file_path = payload["file_path"]
+        from_store = bool(payload) and "file_path" not in payload and "date_from" in payload and "date_to" in payload
 
-        if not os.path.exists(file_path):
+        if not payload or ("file_path" not in payload and not from_store):
             return jsonify({
                 "status": "error",
-                "message": f"File not found: {file_path}"
-            }), 404
+                "message": "file_path (or date_from and date_to) is required"
+            }), 400
 
         # ------------------------------------------------------------
-        # LOAD CLOUD JSON
+        # LOAD CLOUD PAYMENTS (staged statements, or a JSON file)
         # ------------------------------------------------------------
 
-        with open(file_path, "r") as f:
-            cloud_json = json.load(f)
+        if from_store:
+            try:
+                date_from, date_to = _statement_date_range(payload)
+            except ValueError as e:
+                return _date_range_error(e)
+            cloud_json = StatementStoreService().summarize(date_from, date_to)
+        else:
+            file_path = payload["file_path"]
+
+            if not os.path.exists(file_path):
+                return jsonify({
+                    "status": "error",
+                    "message": f"File not found: {file_path}"
+                }), 404
+
+            with open(file_path, "r") as f:
+                cloud_json = json.load(f)
 
         payer_blocks = cloud_json.get("per_payer_code", {})
 
+        existing_refs = {
+            row.external_transaction_id
+            for row in select_in(
+                db.session,
+                db.session.query(TblStudentWalletHistory.external_transaction_id),
+                TblStudentWalletHistory.external_transaction_id,
+                [
+                    str(trx.get("transaction_reference"))
+                    for block in payer_blocks.values()
+                    for trx in block.get("transactions", [])
+                ],
+            )
+        }
+
         inserted = []
         skipped_duplicates = []
         failed = []
@@ -614,15 +720,7 @@ def import_wallet_history_from_json():
                     # IDEMPOTENCY
                     # ------------------------------------------------
 
-                    exists = (
-                        db.session.query(TblStudentWalletHistory.id)
-                        .filter(
-                            TblStudentWalletHistory.external_transaction_id == trx_ref
-                        )
-                        .first()
-                    )
-
-                    if exists:
+                    if trx_ref in existing_refs:
                         skipped_duplicates.append({
                             "transaction_reference": trx_ref,
                             "payer_code": payer_code
@@ -649,6 +747,7 @@ def import_wallet_history_from_json():
                     )
 
                     db.session.add(wallet_entry)
+                    existing_refs.add(trx_ref)
 
                     running_balance = balance_after
 
@@ -718,6 +817,10 @@ def sync_absent_wallet_payments():
             ...
         ]
     }
+
+    Query params:
+    - mode=bulk (default)   resolve everything up front and write in one transaction
+    - mode=per_record       process one transaction at a time
     """
     payload = request.get_json()
 
@@ -727,6 +830,23 @@ def sync_absent_wallet_payments():
             "message": "Invalid payload structure"
         }), 400
 
+    if request.args.get("mode", "bulk").lower() == "bulk":
+        try:
+            results = AbsentWalletPaymentImporter().import_records(payload["absent_in_wallet"])
+        except IntegrityError as e:
+            current_app.logger.warning(f"Bulk absent wallet sync conflicted, nothing written: {str(e)}")
+            return jsonify({
+                "status": 409,
+                "message": "Concurrent wallet update detected, no rows were written; retry the request"
+            }), 409
+
+        return jsonify({
+            "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "status": 200,
+            "processed": len(results),
+            "results": results
+        }), 200
+
     results = []
 
     for record in payload["absent_in_wallet"]:
@@ -919,30 +1039,42 @@ def sync_absent_wallet_payments():
 @require_auth('validation')
 @log_api_access('Translate to JSON')
 def translate_to_json():
+    """
+    Convert an ``/analyze-transactions`` report into the
+    ``/sync-absent-wallet-payments`` payload.
 
-    data = request.get_json()
-    absent_in_wallet = []
-
-    for payer_code, info in data.get("per_payer_code", {}).items():
-        total_paid = info.get("total_paid_amount", 0)
-        transactions = info.get("transactions", [])
-
-        cloud_transactions = []
-        for tx in transactions:
-            cloud_transactions.append({
-                "paid_amount": tx.get("paid_amount"),
-                "payer_code": payer_code,
-                "slip_no": tx.get("slip_no")  # can be None
-            })
+    Accepts the report itself (``per_payer_code``), a ``file_path`` to a
+    gateway statement, or a ``date_from``/``date_to`` range of staged
+    statement lines.
+    """
+    data = request.get_json() or {}
 
-        absent_in_wallet.append({
-            "cloud_total": total_paid,
-            "transaction_reference": str(transactions[0]["transaction_reference"]) if transactions else None,
-            "cloud_transactions": cloud_transactions
-        })
+    per_payer_code = data.get("per_payer_code", {})
+    file_path = data.get("file_path")
+    if not file_path and "date_from" in data and "date_to" in data:
+        try:
+            date_from, date_to = _statement_date_range(data)
+        except ValueError as e:
+            return _date_range_error(e)
+        per_payer_code = StatementStoreService().summarize(date_from, date_to)["per_payer_code"]
+    if file_path:
+        if not os.path.exists(file_path):
+            return jsonify({
+                "status": "error",
+                "message": "File not found",
+                "file_path": file_path
+            }), 404
+        try:
+            per_payer_code = StatementIngestService().summarize(file_path)["per_payer_code"]
+        except StatementFormatError as e:
+            return jsonify({
+                "status": "error",
+                "message": "Missing required columns",
+                "missing_columns": e.missing_columns
+            }), 400
 
     result = {
-        "absent_in_wallet": absent_in_wallet
+        "absent_in_wallet": StatementIngestService.to_absent_in_wallet(per_payer_code)
     }
 
     return jsonify(result), 200
@@ -959,7 +1091,14 @@ from sqlalchemy import func
 @reconciliation_bp.route("/payments-before-cutoff", methods=["GET"])
 @require_auth('validation')
 @log_api_access('Payments before cutoff')
+@background_job("payments_before_cutoff_report", page_key="data")
 def payments_before_cutoff_report():
+    """
+    Integration log payments dated before the 13 Jan 2026 cutoff.
+
+    ``?format=ndjson|csv`` streams the ``data`` rows (without the summary);
+    ``?mode=job`` runs the full report in the background.
+    """
     CUTOFF_DATETIME = datetime(2026, 1, 13, 0, 0, 0)
 
     # Define JSON paths (adjust these if your actual keys are different!)
@@ -971,6 +1110,60 @@ def payments_before_cutoff_report():
     # Run the SQL query I suggested to check examples and adjust
     DATETIME_FORMAT = '%Y-%m-%d %H:%i:%s'   # ← CHANGE THIS BASED ON YOUR DATA
 
+    def records_query(session):
+        return (
+            session.query(
+                IntegrationLog.id,
+                func.JSON_UNQUOTE(
+                    func.JSON_EXTRACT(IntegrationLog.response_data, JSON_PATH_PAYER_CODE)
+                ).label("payer_code"),
+                func.cast(
+                    func.JSON_UNQUOTE(
+                        func.JSON_EXTRACT(IntegrationLog.response_data, JSON_PATH_AMOUNT)
+                    ),
+                    "DECIMAL(18,2)"
+                ).label("amount")
+            )
+            .filter(
+                func.STR_TO_DATE(
+                    func.JSON_UNQUOTE(
+                        func.JSON_EXTRACT(IntegrationLog.response_data, JSON_PATH_PAYMENT_DATETIME)
+                    ),
+                    DATETIME_FORMAT
+                ) < CUTOFF_DATETIME,
+                func.JSON_EXTRACT(IntegrationLog.response_data, JSON_PATH_PAYMENT_DATETIME).isnot(None),
+                func.STR_TO_DATE(
+                    func.JSON_UNQUOTE(
+                        func.JSON_EXTRACT(IntegrationLog.response_data, JSON_PATH_PAYMENT_DATETIME)
+                    ),
+                    DATETIME_FORMAT
+                ).isnot(None)
+            )
+            .order_by(
+                func.STR_TO_DATE(
+                    func.JSON_UNQUOTE(
+                        func.JSON_EXTRACT(IntegrationLog.response_data, JSON_PATH_PAYMENT_DATETIME)
+                    ),
+                    DATETIME_FORMAT
+                ).asc()
+            )
+        )
+
+    def to_row(r):
+        return {
+            "id": r.id,
+            "payer_code": r.payer_code,
+            "amount": float(r.amount)
+        }
+
+    stream_format = requested_stream_format()
+    if stream_format:
+        def rows():
+            with db_manager.get_mis_session() as session:
+                for r in iter_results(session, records_query(session)):
+                    yield to_row(r)
+        return stream_rows(rows(), stream_format, "payments_before_cutoff")
+
     with db_manager.get_mis_session() as session:
         try:
             # ---- Aggregates ----
@@ -1023,53 +1216,7 @@ def payments_before_cutoff_report():
             )
 
             # ---- Records ----
-            records = (
-                session.query(
-                    IntegrationLog.id,
-                    func.JSON_UNQUOTE(
-                        func.JSON_EXTRACT(IntegrationLog.response_data, JSON_PATH_PAYER_CODE)
-                    ).label("payer_code"),
-                    func.cast(
-                        func.JSON_UNQUOTE(
-                            func.JSON_EXTRACT(IntegrationLog.response_data, JSON_PATH_AMOUNT)
-                        ),
-                        "DECIMAL(18,2)"
-                    ).label("amount")
-                )
-                .filter(
-                    func.STR_TO_DATE(
-                        func.JSON_UNQUOTE(
-                            func.JSON_EXTRACT(IntegrationLog.response_data, JSON_PATH_PAYMENT_DATETIME)
-                        ),
-                        DATETIME_FORMAT
-                    ) < CUTOFF_DATETIME,
-                    func.JSON_EXTRACT(IntegrationLog.response_data, JSON_PATH_PAYMENT_DATETIME).isnot(None),
-                    func.STR_TO_DATE(
-                        func.JSON_UNQUOTE(
-                            func.JSON_EXTRACT(IntegrationLog.response_data, JSON_PATH_PAYMENT_DATETIME)
-                        ),
-                        DATETIME_FORMAT
-                    ).isnot(None)
-                )
-                .order_by(
-                    func.STR_TO_DATE(
-                        func.JSON_UNQUOTE(
-                            func.JSON_EXTRACT(IntegrationLog.response_data, JSON_PATH_PAYMENT_DATETIME)
-                        ),
-                        DATETIME_FORMAT
-                    ).asc()
-                )
-                .all()
-            )
-
-            data = [
-                {
-                    "id": r.id,
-                    "payer_code": r.payer_code,
-                    "amount": float(r.amount)
-                }
-                for r in records
-            ]
+            data = [to_row(r) for r in records_query(session).all()]
 
             return jsonify({
                 "timestamp": datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
@@ -1113,13 +1260,15 @@ def get_feb_04_integration_logs():
     """
     Fetch integration logs created on 4th February.
     Returns response_data as JSON, payer_code, external_transaction_id.
+
+    ``?format=ndjson|csv`` streams the records instead.
     """
 
     # Define date range for Feb 4 (00:00:00 → 23:59:59)
     start_date = datetime(2026, 2, 4, 0, 0, 0)
     end_date = start_date + timedelta(days=1)
 
-    logs = (
+    logs_query = (
         db.session.query(
             IntegrationLog.response_data,
             IntegrationLog.payer_code,
@@ -1132,21 +1281,26 @@ def get_feb_04_integration_logs():
             )
         )
         .order_by(IntegrationLog.created_at.asc())
-        .all()
     )
 
-    result = []
-    for log in logs:
+    def to_record(log):
         # Convert string to JSON/dict
         try:
             response_json = json.loads(log.response_data)
-        except json.JSONDecodeError:
+        except (TypeError, json.JSONDecodeError):
             response_json = log.response_data  # fallback if it's not valid JSON
-        result.append({
+        return {
             "response_data": response_json,
             "payer_code": log.payer_code,
             "external_transaction_id": log.external_transaction_id,
-        })
+        }
+
+    stream_format = requested_stream_format()
+    if stream_format:
+        rows = (to_record(log) for log in iter_results(db.session, logs_query))
+        return stream_rows(rows, stream_format, "integration_logs_2026-02-04")
+
+    result = [to_record(log) for log in logs_query.all()]
 
     return jsonify({
         "date": "2026-02-04",
@@ -1213,11 +1367,13 @@ from sqlalchemy.exc import SQLAlchemyError
 @reconciliation_bp.route("/delete-and-update-wallet-bulk", methods=["POST"])
 @require_auth('validation')
 @log_api_access('Delete and update wallet bulk')
+@background_job("delete_and_update_wallet_bulk", page_key="success.history_deleted")
 def delete_and_update_wallet_bulk():
     """
     Optimized bulk deletion and wallet update.
     Accepts JSON payload like /filter-before-jan-13 output.
     Reports success, failures, and total amount handled.
+    Add ``?mode=job`` to run it in the background.
     """
     payload = request.get_json()
     if not payload or "records" not in payload:
@@ -1243,24 +1399,31 @@ def delete_and_update_wallet_bulk():
         # ---------------------------
         # Bulk fetch Ledger entries
         # ---------------------------
-        ledgers = db.session.query(TblStudentWalletLedger)\
-            .filter(TblStudentWalletLedger.trans_code.in_(transaction_ids)).all()
+        ledgers = select_in(
+            db.session, db.session.query(TblStudentWalletLedger),
+            TblStudentWalletLedger.trans_code, transaction_ids
+        )
         ledger_map = {l.trans_code: l for l in ledgers}
 
         # Bulk fetch History entries
-        histories = db.session.query(TblStudentWalletHistory)\
-            .filter(TblStudentWalletHistory.external_transaction_id.in_(transaction_ids)).all()
+        histories = select_in(
+            db.session, db.session.query(TblStudentWalletHistory),
+            TblStudentWalletHistory.external_transaction_id, transaction_ids
+        )
         history_map = {h.external_transaction_id: h for h in histories}
 
         # Bulk fetch Wallet entries
-        wallets = db.session.query(TblStudentWallet)\
-            .filter(TblStudentWallet.reg_no.in_(payer_codes)).all()
+        wallets = select_in(
+            db.session, db.session.query(TblStudentWallet),
+            TblStudentWallet.reg_no, payer_codes
+        )
         wallet_map = {w.reg_no: w for w in wallets}
 
         # ---------------------------
         # Process each record
         # ---------------------------
-        for record in payload["records"]:
+        for position, record in enumerate(payload["records"], start=1):
+            report_progress(position, len(payload["records"]))
             transaction_id = record.get("transaction_id") or record.get("external_transaction_id")
             payer_code = record.get("payer_code")
             amount = float(record.get("amount", 0))
@@ -1350,10 +1513,8 @@ def wallet_reference_lookup():
     reg_nos = [w.get("reg_no") for w in payload["wallet_skipped"] if w.get("reg_no")]
 
     # Bulk fetch wallets
-    wallets = (
-        db.session.query(TblStudentWallet)
-        .filter(TblStudentWallet.reg_no.in_(reg_nos))
-        .all()
+    wallets = select_in(
+        db.session, db.session.query(TblStudentWallet), TblStudentWallet.reg_no, reg_nos
     )
     wallet_map = {w.reg_no: w for w in wallets}
 
@@ -1394,10 +1555,12 @@ from sqlalchemy import func
 @reconciliation_bp.route("/apply-wallet-deductions", methods=["POST"])
 @require_auth('validation')
 @log_api_access('Apply wallet deductions')
+@background_job("apply_wallet_deductions", page_key="success")
 def apply_wallet_deductions():
     """
     Deduct amounts from Payment.amount
     ONLY for payments recorded on 2026-02-04
+    Add ``?mode=job`` to run it in the background.
     """
 
     payload = request.get_json()
@@ -1413,7 +1576,8 @@ def apply_wallet_deductions():
     TARGET_DATE = date(2026, 2, 4)
 
     try:
-        for item in payload["records"]:
+        for position, item in enumerate(payload["records"], start=1):
+            report_progress(position, len(payload["records"]))
             reg_no = item.get("reg_no")
             wallet_ref = item.get("reference_number")
             remaining = float(item.get("amount", 0))
@@ -1524,10 +1688,12 @@ from sqlalchemy.exc import SQLAlchemyError
 @reconciliation_bp.route("/revert-wallet-deductions", methods=["POST"])
 @require_auth('validation')
 @log_api_access('Revert wallet deductions')
+@background_job("revert_wallet_deductions", page_key="reverted")
 def revert_wallet_deductions():
     """
     Revert wallet deductions by restoring payment.amount
     to its ORIGINAL 'before' value.
+    Add ``?mode=job`` to run it in the background.
     """
 
     payload = request.get_json()
@@ -1541,7 +1707,8 @@ def revert_wallet_deductions():
     total_payments = 0
 
     try:
-        for record in payload["records"]:
+        for position, record in enumerate(payload["records"], start=1):
+            report_progress(position, len(payload["records"]))
             reg_no = record.get("reg_no")
             wallet_ref = record.get("reference_number")
 
@@ -1619,7 +1786,7 @@ def revert_wallet_deductions():
 
 from flask import Blueprint, request, jsonify
 from datetime import datetime, timedelta
-from sqlalchemy import and_, not_
+from sqlalchemy import and_
 
 
 @reconciliation_bp.route("/payments/trace-unexpected-zero", methods=["POST"])
@@ -1660,14 +1827,16 @@ def trace_unexpected_zero_payments():
         )
     )
 
-    # Exclude known reference numbers
-    if provided_refs:
-        query = query.filter(
-            not_(Payment.student_wallet_ref.in_(provided_refs))
-        )
-
     results = query.order_by(Payment.recorded_date.asc()).all()
 
+    # Exclude known reference numbers. The date window bounds the scan, so an
+    # anti-join in Python avoids shipping the whole reference list as NOT IN.
+    if provided_refs:
+        results = [
+            r for r in results
+            if r.student_wallet_ref is not None and r.student_wallet_ref not in provided_refs
+        ]
+
     response = [
         {
             "reference_number": r.student_wallet_ref,
@@ -1690,18 +1859,24 @@ def trace_unexpected_zero_payments():
 @log_api_access('Fetch outstanding balance')
 def get_outstanding_balance():
     """
-    API Endpoint to fetch the 2024 invoice total, payment total,
+    API Endpoint to fetch the invoice total, payment total,
     and outstanding balance for a given student reg_no.
+    The year defaults to 2024.
     Example request: 
     payload : {
-        "reg_no": "REG12345"}
+        "reg_no": "REG12345",
+        "year": 2024}
     """
     reg_no = request.json.get("reg_no")
     if not reg_no:
         return {"error": "Missing 'reg_no' query parameter"}, 400
 
+    year = request.json.get("year")
+    if year is not None and not str(year).strip().isdigit():
+        return {"error": f"Invalid 'year': {year}"}, 400
+
     service = OpeningBalanceSyncService()
-    return service.get_outstanding_balance(reg_no)
+    return service.get_outstanding_balance(reg_no, year=year)
 
 from flask import Blueprint, jsonify
 from sqlalchemy import text
@@ -1713,7 +1888,10 @@ from sqlalchemy import text
 def wallet_payments_summary():
     """
     Fetch payments and wallet history for each student_wallet record.
-    Show totals, matched histories without duplicates, and highlight mismatches.
+    Show totals, matched histories without duplicates, the ledger balance
+    from the maintained snapshot, and highlight mismatches.
+
+    ``?format=ndjson|csv`` streams one summary per wallet as it is completed.
     """
     query = text("""
         SELECT
@@ -1724,70 +1902,84 @@ def wallet_payments_summary():
             p.recorded_date AS payment_date,
             h.id AS history_id,
             h.amount AS history_amount,
-            h.created_at AS history_created_at
+            h.created_at AS history_created_at,
+            b.balance AS ledger_balance
         FROM tbl_student_wallet w
+        LEFT JOIN tbl_student_wallet_balance b
+            ON b.student_id = w.reg_no
         LEFT JOIN payment p
             ON p.student_wallet_ref = w.reference_number
         LEFT JOIN tbl_student_wallet_history h
             ON h.reg_no = w.reg_no
-        ORDER BY w.reg_no, p.recorded_date
+        ORDER BY w.reg_no, w.reference_number, p.recorded_date
     """)
 
-    result = db.session.execute(query).fetchall()
-
-    wallets = {}
-
-    for row in result:
-        key = (row.reg_no, row.reference_number)
+    summaries = _iter_wallet_payment_summaries(iter_results(db.session, query))
 
-        if key not in wallets:
-            wallets[key] = {
-                "reg_no": row.reg_no,
-                "reference_number": row.reference_number,
-                "payments": [],
-                "payment_count": 0,
-                "payment_total": 0.0,
-                "matched_histories": [],
-                "history_match_count": 0,
-                "wallet_history_total": 0.0,
-                "mismatches": False  # new field
-            }
+    stream_format = requested_stream_format()
+    if stream_format:
+        return stream_rows(summaries, stream_format, "wallet_payments_summary")
 
-        # Add unique payments
-        if row.payment_id and row.payment_id not in [p["payment_id"] for p in wallets[key]["payments"]]:
-            amount = float(row.payment_amount) if row.payment_amount is not None else 0.0
-            wallets[key]["payments"].append({
-                "payment_id": row.payment_id,
-                "amount": amount,
-                "recorded_date": row.payment_date.isoformat() if row.payment_date else None
-            })
-            wallets[key]["payment_count"] += 1
-            wallets[key]["payment_total"] += amount
+    return jsonify({
+        "status": "success",
+        "results": list(summaries)
+    }), 200
 
-        # Add unique histories
-        if row.history_id and row.history_id not in [h["history_id"] for h in wallets[key]["matched_histories"]]:
-            amount = float(row.history_amount) if row.history_amount is not None else 0.0
-            wallets[key]["matched_histories"].append({
-                "history_id": row.history_id,
-                "amount": amount,
-                "created_at": row.history_created_at.isoformat() if row.history_created_at else None
-            })
-            wallets[key]["history_match_count"] += 1
-            wallets[key]["wallet_history_total"] += amount
 
-    # Update mismatches after processing all rows
-    for key, record in wallets.items():
-        record["mismatches"] = record["payment_total"] != record["wallet_history_total"]
+def _iter_wallet_payment_summaries(rows):
+    """
+    Fold joined wallet/payment/history rows into one summary per wallet.
 
-    filtered_results = [
-        record for record in wallets.values()
-        if record["payment_count"] > 0
-    ]
+    Rows must be ordered by wallet so each wallet's rows are contiguous;
+    summaries are yielded as soon as the next wallet starts, keeping only
+    one wallet in memory. Wallets without payments are skipped.
+    """
+    for (reg_no, reference_number, ledger_balance), wallet_rows in groupby(
+        rows, key=lambda row: (row.reg_no, row.reference_number, row.ledger_balance)
+    ):
+        record = {
+            "reg_no": reg_no,
+            "reference_number": reference_number,
+            "ledger_balance": float(ledger_balance) if ledger_balance is not None else None,
+            "payments": [],
+            "payment_count": 0,
+            "payment_total": 0.0,
+            "matched_histories": [],
+            "history_match_count": 0,
+            "wallet_history_total": 0.0,
+            "mismatches": False  # new field
+        }
+        payment_ids = set()
+        history_ids = set()
+
+        for row in wallet_rows:
+            # Add unique payments
+            if row.payment_id and row.payment_id not in payment_ids:
+                payment_ids.add(row.payment_id)
+                amount = float(row.payment_amount) if row.payment_amount is not None else 0.0
+                record["payments"].append({
+                    "payment_id": row.payment_id,
+                    "amount": amount,
+                    "recorded_date": row.payment_date.isoformat() if row.payment_date else None
+                })
+                record["payment_count"] += 1
+                record["payment_total"] += amount
+
+            # Add unique histories
+            if row.history_id and row.history_id not in history_ids:
+                history_ids.add(row.history_id)
+                amount = float(row.history_amount) if row.history_amount is not None else 0.0
+                record["matched_histories"].append({
+                    "history_id": row.history_id,
+                    "amount": amount,
+                    "created_at": row.history_created_at.isoformat() if row.history_created_at else None
+                })
+                record["history_match_count"] += 1
+                record["wallet_history_total"] += amount
 
-    return jsonify({
-        "status": "success",
-        "results": filtered_results
-    }), 200
+        if record["payment_count"] > 0:
+            record["mismatches"] = record["payment_total"] != record["wallet_history_total"]
+            yield record
 
 
 from flask import jsonify
@@ -1808,141 +2000,73 @@ from datetime import datetime
 @log_api_access('Reconcile integration vs wallet history')
 def reconcile_integration_vs_wallet_history():
     """
-    FAST reconciliation between integration_logs and tbl_student_wallet_history
+    Stored results of the incremental reconciliation between integration_logs
+    and tbl_student_wallet_history
     - status = VALID
     - payment_date_time > 2026-01-12
     - Detect missing & amount mismatches
-    """
-
-    cutoff_date = "2026-01-12 00:00:00"
-    include_details = request.args.get("details", "false").lower() == "true"
-
-    # 1️⃣ Fetch integration logs ONLY ONCE (filtered in SQL)
-    integration_rows = db.session.execute(text("""
-        SELECT
-            external_transaction_id,
-            response_data
-        FROM integration_logs
-        WHERE status = 'VALID'
-          AND response_data IS NOT NULL
-          AND JSON_EXTRACT(response_data, '$.payment_date_time') > :cutoff
-    """), {"cutoff": cutoff_date}).fetchall()
-
-    if not integration_rows:
-        return jsonify({
-            "status": "success",
-            "summary": {
-                "total_checked": 0,
-                "missing_count": 0,
-                "mismatched_count": 0
-            }
-        }), 200
-
-    # 2️⃣ Parse integration data (memory-efficient)
-    integration_map = {}
-    transaction_ids = set()
-
-    for row in integration_rows:
-        try:
-            data = json.loads(row.response_data)
-        except Exception:
-            continue
-
-        tx_id = data.get("transaction_id")
-        amount = data.get("amount")
-
-        if not tx_id or amount is None:
-            continue
-
-        integration_map[tx_id] = {
-            "amount": float(amount),
-            "payer_code": data.get("payer_code"),
-            "observation": data.get("observation"),
-            "payment_date_time": data.get("payment_date_time")
-        }
-        transaction_ids.add(tx_id)
-
-    if not transaction_ids:
-        return jsonify({
-            "status": "success",
-            "summary": {
-                "total_checked": 0,
-                "missing_count": 0,
-                "mismatched_count": 0
-            }
-        }), 200
-
-    # 3️⃣ Fetch wallet history IN BULK
-    history_rows = db.session.execute(text("""
-        SELECT
-            external_transaction_id,
-            amount
-        FROM tbl_student_wallet_history
-        WHERE external_transaction_id IN :tx_ids
-    """), {"tx_ids": tuple(transaction_ids)}).fetchall()
-
-    history_map = {
-        row.external_transaction_id: float(row.amount)
-        for row in history_rows
-        if row.external_transaction_id is not None
-    }
-
-    # 4️⃣ Reconcile (O(n))
-    missing = []
-    mismatched = []
 
-    for tx_id, integ in integration_map.items():
-        hist_amount = history_map.get(tx_id)
+    Read only: the hourly Celery task (or a POST to this URL) examines the
+    integration logs added since the previous run and re-checks the open
+    discrepancies kept in reconciliation_discrepancies.
 
-        # ❌ Missing
-        if hist_amount is None:
-            if include_details:
-                missing.append({
-                    "external_transaction_id": tx_id,
-                    "payer_code": integ["payer_code"],
-                    "amount": integ["amount"],
-                    "observation": integ["observation"],
-                    "payment_date_time": integ["payment_date_time"],
-                    "reason": "Not found in wallet history"
-                })
-            continue
+    Query params:
+    - details=true     include the open discrepancies
+    - limit / offset   page through the open discrepancies
+    """
+    include_details = request.args.get("details", "false").lower() == "true"
+    limit = request.args.get("limit", type=int)
+    offset = request.args.get("offset", 0, type=int)
 
-        # ⚠️ Mismatch
-        if hist_amount != integ["amount"]:
-            if include_details:
-                mismatched.append({
-                    "external_transaction_id": tx_id,
-                    "payer_code": integ["payer_code"],
-                    "integration_amount": integ["amount"],
-                    "wallet_history_amount": hist_amount,
-                    "observation": integ["observation"],
-                    "payment_date_time": integ["payment_date_time"],
-                    "reason": "Amount mismatch"
-                })
+    reconciler = IntegrationWalletReconciler()
 
-    # 5️⃣ Fast response (summary first)
     response = {
         "status": "success",
         "cutoff_date": "2026-01-12",
-        "summary": {
-            "total_checked": len(integration_map),
-            "missing_count": sum(
-                1 for tx in integration_map if tx not in history_map
-            ),
-            "mismatched_count": sum(
-                1 for tx, integ in integration_map.items()
-                if tx in history_map and history_map[tx] != integ["amount"]
-            )
-        }
+        "summary": reconciler.summary()
     }
 
     if include_details:
-        response["missing_transactions"] = missing
-        response["amount_mismatches"] = mismatched
+        response["missing_transactions"] = reconciler.open_discrepancies(
+            DISCREPANCY_MISSING, limit=limit, offset=offset
+        )
+        response["amount_mismatches"] = reconciler.open_discrepancies(
+            DISCREPANCY_AMOUNT_MISMATCH, limit=limit, offset=offset
+        )
 
     return jsonify(response), 200
 
 
+@reconciliation_bp.route(
+    "/reconcile-integration-vs-wallet-history",
+    methods=["POST"]
+)
+@require_auth('validation')
+@log_api_access('Refresh integration vs wallet history reconciliation')
+def refresh_integration_vs_wallet_history():
+    """
+    Queue a reconciliation run on the Celery worker.
+
+    The run shares a lock with the hourly beat task, so a refresh requested
+    while one is in progress is skipped rather than run twice. Poll the GET
+    for the updated results.
+
+    JSON body (optional):
+    - recheck_open (bool, default true)   also re-check open discrepancies
+    """
+    from application.config_files.reconciliation_task import reconcile_integration_vs_wallet_history_task
+
+    payload = request.get_json(silent=True) or {}
+    task = reconcile_integration_vs_wallet_history_task.delay(
+        recheck_open=bool(payload.get("recheck_open", True))
+    )
+    return jsonify({
+        "status": "queued",
+        "message": "Reconciliation run queued",
+        "task_id": task.id,
+    }), 202
+
+
 from flask import request, jsonify
 from sqlalchemy.exc import SQLAlchemyError
 from datetime import datetime
@@ -1973,6 +2097,17 @@ def insert_missing_wallet_history():
     total_amount_inserted = 0.0
 
     try:
+        # Safety check: do not double insert (one bulk lookup instead of a query per item)
+        existing_ids = {
+            row.external_transaction_id
+            for row in select_in(
+                db.session,
+                db.session.query(TblStudentWalletHistory.external_transaction_id),
+                TblStudentWalletHistory.external_transaction_id,
+                [item.get("external_transaction_id") for item in payload["missing_transactions"]],
+            )
+        }
+
         for item in payload["missing_transactions"]:
             tx_id = item.get("external_transaction_id")
             amount = item.get("amount")
@@ -1987,21 +2122,13 @@ def insert_missing_wallet_history():
                 })
                 continue
 
-            # Safety check: do not double insert
-            exists = (
-                db.session.query(TblStudentWalletHistory.id)
-                .filter(
-                    TblStudentWalletHistory.external_transaction_id == tx_id
-                )
-                .first()
-            )
-
-            if exists:
+            if tx_id in existing_ids:
                 skipped.append({
                     "external_transaction_id": tx_id,
                     "reason": "Already exists in wallet history"
                 })
                 continue
+            existing_ids.add(tx_id)
 
             # Parse datetime safely
             try:
@@ -2082,8 +2209,11 @@ def wallet_payment_exceeds_history():
             p.recorded_date AS payment_date,
             h.id AS history_id,
             h.amount AS history_amount,
-            h.created_at AS history_created_at
+            h.created_at AS history_created_at,
+            b.balance AS ledger_balance
         FROM tbl_student_wallet w
+        LEFT JOIN tbl_student_wallet_balance b
+            ON b.student_id = w.reg_no
         LEFT JOIN payment p
             ON p.student_wallet_ref = w.reference_number
         LEFT JOIN tbl_student_wallet_history h
@@ -2166,3 +2296,106 @@ def wallet_payment_exceeds_history():
         "count": len(results),
         "results": results
     }), 200
+
+
+@reconciliation_bp.route("/wallet-balances/verify", methods=["POST"])
+@require_auth('validation')
+@log_api_access('Verify wallet balance snapshots')
+def verify_wallet_balance_snapshots():
+    """
+    Re-derive wallet balances from the ledger and report snapshot drift.
+
+    Example payload:
+    {
+        "student_ids": ["REG123"],   # optional, all students when omitted
+        "repair": false              # overwrite drifted snapshots
+    }
+    """
+    from application.models.mis_models import TblStudentWalletBalance
+
+    payload = request.get_json(silent=True) or {}
+    report = TblStudentWalletBalance.verify(
+        student_ids=payload.get("student_ids"),
+        repair=bool(payload.get("repair", False))
+    )
+
+    return jsonify({
+        "status": "success",
+        **report
+    }), 200
+
+
+@reconciliation_bp.route("/jobs/<job_id>", methods=["GET"])
+@require_auth('validation')
+@log_api_access('Get background job status')
+def get_job_status(job_id):
+    """Status and progress of a job submitted with ``?mode=job``"""
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": f"Job {job_id} not found"}), 404
+
+    job.pop("has_result", None)
+    job["result_lists"] = json.loads(job.get("result_lists") or "[]")
+    return jsonify({"job_id": job_id, **job}), 200
+
+
+@reconciliation_bp.route("/jobs/<job_id>/result", methods=["GET"])
+@require_auth('validation')
+@log_api_access('Get background job result')
+def get_job_result(job_id):
+    """
+    One page of a finished job's result.
+
+    Query params:
+        key: dotted path of the list to page through (defaults per endpoint,
+             e.g. ``absent.absent_in_cloud`` for wallet_hist_vs_cloud_pyts)
+        page, per_page: 1-based page and page size (default 1 / 100)
+    """
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": f"Job {job_id} not found"}), 404
+    if job.get("status") not in ("completed", "failed"):
+        return jsonify({"job_id": job_id, "status": job.get("status"),
+                        "message": "Job has not finished"}), 409
+
+    if not has_result(job):
+        return jsonify({"job_id": job_id, "status": job.get("status"),
+                        "error": job.get("error")}), 200
+
+    _, default_key = JOB_HANDLERS.get(job.get("name"), (None, None))
+    key = request.args.get("key", default_key)
+    if not key:
+        return jsonify({"job_id": job_id, "status": job.get("status"), "result": load_result(job_id)}), 200
+
+    try:
+        page = paginate_result(
+            job_id, job, key,
+            page=int(request.args.get("page", 1)),
+            per_page=min(int(request.args.get("per_page", 100)), 1000)
+        )
+    except KeyError:
+        return jsonify({"status": "error", "message": f"Result has no list at '{key}'"}), 400
+    except ValueError:
+        return jsonify({"status": "error", "message": "page and per_page must be integers"}), 400
+
+    return jsonify({"job_id": job_id, "status": job.get("status"), **page}), 200
+
+
+@reconciliation_bp.route("/jobs/<job_id>/download", methods=["GET"])
+@require_auth('validation')
+@log_api_access('Download background job result')
+def download_job_result(job_id):
+    """Stream a finished job's full JSON result as a file"""
+    job = get_job(job_id)
+    if job is None:
+        return jsonify({"status": "error", "message": f"Job {job_id} not found"}), 404
+
+    if not has_result(job):
+        return jsonify({"job_id": job_id, "status": job.get("status"),
+                        "message": "No result for this job"}), 409
+
+    return Response(
+        stream_with_context(iter_result(job_id)),
+        mimetype="application/json",
+        headers={"Content-Disposition": f"attachment; filename={job_id}.json"}
+    )
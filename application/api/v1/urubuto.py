@@ -25,6 +25,7 @@ from decimal import Decimal
 urubuto_bp = Blueprint('urubuto', __name__)
 # Initialize Urubuto Pay service
 from application.services.urubuto_pay import UrubutoPay
+from application.services.transaction_registry import TransactionRegistry
 urubuto_service = UrubutoPay()
 
 
@@ -210,6 +211,7 @@ def payer_validation():
                 if not invoice_bal:
                     wallet = TblStudentWallet.get_by_reference_number(payer_code)
                     if wallet:
+                        # only logged; the gateway gets no amount for wallet references
                         invoice_bal_wallet = wallet.dept
                     else:
                         invoice_bal_wallet = 0
@@ -382,7 +384,7 @@ def payment_callback():
                     status=transaction_status,
                     external_transaction_id=transaction_id,
                     payer_code=payer_code,
-                    response_data=data,
+                    response_data=json.dumps(data),
                     started_at=started_at,
                     completed_at=datetime.now()
                 )
@@ -393,6 +395,19 @@ def payment_callback():
                     "data": {"external_transaction_id": transaction_id}
                 }), 200
 
+            # ────────────────────────────────────────────────
+            # Re-delivered transaction: one indexed probe before any work
+            # (the history UNIQUE constraint below still settles races)
+            # ────────────────────────────────────────────────
+            if TransactionRegistry.find(transaction_id, sources=["wallet_history"], session=session):
+                current_app.logger.info(f"Duplicate transaction ignored: {transaction_id}")
+                return jsonify({
+                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    "message": "Transaction already processed",
+                    "status": 200,
+                    "data": {"external_transaction_id": transaction_id}
+                }), 200
+
             # ────────────────────────────────────────────────
             # Resolve payer
             # ────────────────────────────────────────────────
@@ -410,7 +425,7 @@ def payment_callback():
             # ────────────────────────────────────────────────
             # Wallet record
             # ────────────────────────────────────────────────
-            wallet = TblStudentWallet.get_by_reg_no(reg_no)
+            wallet = TblStudentWallet.get_by_reg_no(session, reg_no)
 
             # ────────────────────────────────────────────────
             # Insert wallet history first (DB enforces idempotency)
@@ -468,8 +483,10 @@ def payment_callback():
             # Update or create wallet
             # ────────────────────────────────────────────────
             if wallet:
-                # Update balance
-                wallet.dept = balance_after
+                # Update balance (single atomic UPDATE, safe under concurrent callbacks)
+                balance_after = TblStudentWallet.increment_dept(session, wallet.id, amount)
+                history.balance_before = balance_after - amount
+                history.balance_after = balance_after
                 wallet.external_transaction_id = transaction_id
                 wallet.trans_code = transaction_id
                 wallet.payment_date = datetime.now()
@@ -514,7 +531,7 @@ def payment_callback():
                 status=transaction_status,
                 external_transaction_id=transaction_id,
                 payer_code=payer_code,
-                response_data=data,
+                response_data=json.dumps(data),
                 started_at=started_at,
                 completed_at=datetime.now()
             )
@@ -681,7 +698,7 @@ def payment_notification():
     
     try:
         # Check if transaction already exists
-        existing_transaction = TblStudentWalletHistory.get_by_transaction_id(transaction_id)
+        existing_transaction = TransactionRegistry.find(transaction_id, sources=["wallet_history"])
         
         if existing_transaction:
             current_app.logger.info(
@@ -787,8 +804,10 @@ def payment_notification():
                 
                 
                 if wallet:
-                    # Update existing wallet
-                    wallet.dept = balance_after
+                    # Update existing wallet (single atomic UPDATE, safe under concurrent callbacks)
+                    balance_after = TblStudentWallet.increment_dept(session, wallet.id, amount)
+                    history.balance_before = balance_after - amount
+                    history.balance_after = balance_after
                     wallet.external_transaction_id = transaction_id
                     wallet.trans_code = transaction_id
                     wallet.payment_date = datetime.now()
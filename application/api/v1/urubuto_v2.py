@@ -18,6 +18,7 @@ import random
 urubuto_bp = Blueprint('urubuto', __name__)
 # Initialize Urubuto Pay service
 from application.services.urubuto_pay import UrubutoPay
+from application.services.transaction_registry import TransactionRegistry
 urubuto_service = UrubutoPay()
 
 
@@ -326,13 +327,10 @@ def payment_callback():
 
     # Check if the transaction_id is not in the payment table so that we do not duplicate payments
     try:
-        payment = Payment.get_payment_details_by_external_id(transaction_id)
-        wallet_payment = None
-        if not payment:
-            wallet_payment = TblStudentWallet.get_payment_details_by_external_id(transaction_id)
-        existing_payment = payment or wallet_payment
-        current_app.logger.info(f"Existing payment check for transaction {transaction_id}: {existing_payment.to_dict() if existing_payment else 'None'}")
-        if existing_payment:
+        recorded = TransactionRegistry.find(transaction_id, sources=["payment", "wallet"])
+        existing_payment_id = recorded.get("payment") or recorded.get("wallet")
+        current_app.logger.info(f"Existing payment check for transaction {transaction_id}: {recorded or 'None'}")
+        if existing_payment_id:
             message = f"Payment already exists for transaction: {transaction_id}"
             return jsonify({
                 "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
@@ -340,7 +338,7 @@ def payment_callback():
                 "status": 200,
                 "data": {
                     "external_transaction_id": transaction_id,
-                    "internal_transaction_id": str(existing_payment.id)
+                    "internal_transaction_id": str(existing_payment_id)
                 }
             }), 200
     except Exception as e:
@@ -373,9 +371,7 @@ def payment_callback():
 
 
             # Idempotency check (CRITICAL)
-            existing_wallet = TblStudentWallet.get_by_external_transaction_id(transaction_id)
-            existing_payment = Payment.get_payment_details_by_external_id(transaction_id)
-            if existing_wallet or existing_payment:
+            if TransactionRegistry.is_duplicate(transaction_id, sources=["payment", "wallet"]):
                 current_app.logger.warning(
                     f"Duplicate transaction ignored: {transaction_id}"
                 )
@@ -700,13 +696,11 @@ def payment_notification():
             session.add(new_payment)
             session.commit()
 
-            # Update invoice balance if needed
+            # Update invoice balance if needed (single atomic UPDATE, safe under concurrent callbacks)
             try:
-                current_balance = float(invoice.balance) if invoice.balance else float(invoice.dept) if invoice.dept else 0.0
-                new_balance = max(0, current_balance - float(amount))
-                invoice.balance = str(new_balance)
+                new_balance = TblImvoice.decrement_balance(session, float(amount), invoice_id=invoice.id)
                 session.commit()
-                current_app.logger.info(f"Updated invoice {invoice.id} balance from {current_balance} to {new_balance}")
+                current_app.logger.info(f"Updated invoice {invoice.id} balance to {new_balance}")
             except (ValueError, TypeError) as e:
                 current_app.logger.warning(f"Could not update invoice balance: {e}")
 
@@ -18,6 +18,11 @@ celery.autodiscover_tasks([
     'application.config_files.sync_payments_task',
     'application.config_files.sales_receipt_deletion_tasks',
     'application.config_files.update_opening_balances_task',
+    'application.config_files.wallet_balance_task',
+    'application.config_files.reconciliation_task',
+    'application.config_files.reconciliation_job_task',
+    'application.config_files.duplicate_detection_task',
+    'application.config_files.customer_index_task',
 ])
 
 #celery.set_default()
\ No newline at end of file
@@ -64,21 +64,22 @@ class Config:
     task_track_started = True
     task_time_limit = 30 * 60  # 30 minutes per task
 
-    import redis
-
-    # Initialize Redis client (add this at the top of your file with other imports)
-    redis_client = redis.Redis(
-        host=os.getenv('REDIS_HOST', 'localhost'),
-        port=int(os.getenv('REDIS_PORT', 6379)),
-        db=int(os.getenv('REDIS_DB', 0)),
-        decode_responses=True
-    )
+    # Shared pooled Redis client
+    from application.utils.redis_pool import redis_client
 
     
     # Logging Configuration
     LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
     LOG_FILE = os.environ.get('LOG_FILE', 'logs/app.log')
-    
+    # Per-subsystem overrides, e.g. "application.services.quickbooks=DEBUG,sqlalchemy.engine=WARNING"
+    LOG_LEVELS = os.environ.get('LOG_LEVELS', 'sqlalchemy.engine=WARNING,urllib3=WARNING')
+    
+    # Query profiler (slow-query and N+1 detection, see utils/query_profiler.py)
+    QUERY_PROFILER_ENABLED = os.environ.get('QUERY_PROFILER_ENABLED', 'false')
+    SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 500))
+    N_PLUS_ONE_THRESHOLD = int(os.environ.get('N_PLUS_ONE_THRESHOLD', 10))
+    QUERY_PROFILER_EXPLAIN = os.environ.get('QUERY_PROFILER_EXPLAIN', 'true')
+
     # API Configuration
     API_RATE_LIMIT = os.environ.get('API_RATE_LIMIT', '100 per hour')
     
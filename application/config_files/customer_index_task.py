@@ -0,0 +1,26 @@
+## application/config_files/customer_index_task.py
+
+from application.config_files.celery_app import celery
+from application.models.central_models import QuickBooksConfig
+from application.services.customer_index import CustomerNameIndex
+from application.services.quickbooks import QuickBooks
+
+
+@celery.task(
+    bind=True,
+    name="application.config_files.customer_index_task.refresh_customer_index_task",
+)
+def refresh_customer_index_task(self):
+    """
+    Reload the QuickBooks DisplayName index so single-customer syncs, which
+    only read it, see customers created outside the integration.
+
+    Returns:
+        dict: Index size and age
+    """
+    name_index = CustomerNameIndex()
+    if not QuickBooksConfig.is_connected():
+        return {"skipped": "QuickBooks not connected", **name_index.stats()}
+
+    name_index.load(QuickBooks())
+    return name_index.stats()
@@ -0,0 +1,28 @@
+## application/config_files/duplicate_detection_task.py
+
+from flask import current_app
+
+from application.config_files.celery_app import celery
+from application.services.duplicate_detection import DuplicateDetector
+
+
+@celery.task(
+    bind=True,
+    name="application.config_files.duplicate_detection_task.refresh_duplicate_report_task",
+)
+def refresh_duplicate_report_task(self, sources=None):
+    """
+    Rebuild the duplicates report table.
+
+    Args:
+        sources (list[str]): Sources to scan (default: all)
+
+    Returns:
+        dict: Duplicated key count per source
+    """
+    counts = DuplicateDetector().refresh_report(sources)
+
+    if any(counts.values()):
+        current_app.logger.warning(f"Duplicate records detected: {counts}")
+
+    return counts
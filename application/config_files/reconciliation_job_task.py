@@ -0,0 +1,27 @@
+## application/config_files/reconciliation_job_task.py
+
+from flask import current_app
+
+from application.config_files.celery_app import celery
+from application.utils.jobs import execute_job
+
+
+@celery.task(
+    bind=True,
+    name="application.config_files.reconciliation_job_task.run_reconciliation_job_task",
+)
+def run_reconciliation_job_task(self, job_id, name, method="POST", payload=None, args=None):
+    """
+    Run a reconciliation endpoint submitted with ``?mode=job``.
+
+    Args:
+        job_id (str): Id returned to the caller; progress is kept in ``job:{job_id}``
+        name (str): Registered job name (see ``application.utils.jobs.background_job``)
+        method (str): HTTP method of the original request
+        payload (dict | None): Original JSON body
+        args (dict | None): Original query string, without ``mode``
+
+    Returns:
+        dict: The final job hash
+    """
+    return execute_job(current_app._get_current_object(), job_id, name, method, payload, args)
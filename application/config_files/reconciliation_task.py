@@ -0,0 +1,52 @@
+## application/config_files/reconciliation_task.py
+
+import uuid
+
+from flask import current_app
+
+from application.config_files.celery_app import celery
+from application.services.reconciliation_engine import IntegrationWalletReconciler
+from application.utils.redis_pool import redis_client, release_lock
+
+# Held while a run is in progress so the hourly beat and on-demand refreshes
+# never write the watermark and discrepancy rows concurrently
+RUN_LOCK_KEY = f"reconciliation:{IntegrationWalletReconciler.NAME}:running"
+RUN_LOCK_TTL_SECONDS = 3600
+
+
+@celery.task(
+    bind=True,
+    name="application.config_files.reconciliation_task.reconcile_integration_vs_wallet_history_task",
+)
+def reconcile_integration_vs_wallet_history_task(self, recheck_open=True):
+    """
+    Run the incremental integration-log vs wallet-history reconciliation.
+
+    Args:
+        recheck_open (bool): Also re-evaluate discrepancies left open by earlier runs
+
+    Returns:
+        dict: Run statistics and the open discrepancy summary; ``skipped``
+        when another run holds the lock
+    """
+    token = self.request.id or uuid.uuid4().hex
+    if not redis_client.set(RUN_LOCK_KEY, token, nx=True, ex=RUN_LOCK_TTL_SECONDS):
+        current_app.logger.info(f"Reconciliation {IntegrationWalletReconciler.NAME} already running, skipped")
+        return {"skipped": True, "reason": "already running"}
+
+    try:
+        reconciler = IntegrationWalletReconciler()
+        run = reconciler.run(recheck_open=recheck_open)
+        summary = reconciler.summary()
+    finally:
+        # a run that outlived the TTL must not release its successor's lock
+        if not release_lock(RUN_LOCK_KEY, token):
+            current_app.logger.warning(f"Reconciliation lock {RUN_LOCK_KEY} expired before the run finished")
+
+    if summary["missing_count"] or summary["mismatched_count"]:
+        current_app.logger.warning(
+            f"Open reconciliation discrepancies: {summary['missing_count']} missing, "
+            f"{summary['mismatched_count']} amount mismatches"
+        )
+
+    return {"run": run, "summary": summary}
@@ -2,23 +2,12 @@ from celery import shared_task, group, chord
 from datetime import datetime
 from flask import current_app
 import traceback
-import redis
-import os
 import re
 
-from application.services.sales_receipt_sync import SalesReceiptSyncService
+from application.services.qb_deletion import QuickBooksDeletionEngine, DELETED, MISSING, FAILED
 from application.models.central_models import QuickBooksConfig, QuickbooksAuditLog
-
-
-# -------------------------------------------------------------------
-# Redis client
-# -------------------------------------------------------------------
-redis_client = redis.Redis(
-    host=os.getenv("REDIS_HOST", "localhost"),
-    port=int(os.getenv("REDIS_PORT", 6379)),
-    db=int(os.getenv("REDIS_DB", 0)),
-    decode_responses=True
-)
+from application.utils.bulk_query import select_in
+from application.utils.redis_pool import redis_client, advance_offset, update_job_progress
 
 
 # -------------------------------------------------------------------
@@ -199,6 +188,10 @@ def bulk_delete_sales_receipts_task(
 def process_deletion_batch(audit_log_ids, batch_num, total_batches, job_id):
     """
     Process a single batch of sales receipt deletions from audit logs.
+
+    SyncTokens for the batch are read in bulk, deletes are sent as parallel
+    QuickBooks batch requests and audit log statuses are written in one
+    statement. Deleted ids are checkpointed, so a retried batch skips them.
     
     Args:
         audit_log_ids (list[int]): List of audit log IDs to process
@@ -219,8 +212,6 @@ def process_deletion_batch(audit_log_ids, batch_num, total_batches, job_id):
             f"({len(audit_log_ids)} audit logs)"
         )
 
-        sync_service = SalesReceiptSyncService()
-
         results = {
             "batch_num": batch_num,
             "deleted": 0,
@@ -229,142 +220,68 @@ def process_deletion_batch(audit_log_ids, batch_num, total_batches, job_id):
             "errors": [],
         }
 
-        for audit_log_id in audit_log_ids:
-            try:
-                # Fetch audit log entry
-                log = db.session.query(QuickbooksAuditLog).get(audit_log_id)
-                
-                if not log:
-                    current_app.logger.warning(
-                        f"[Job {job_id}] Audit log {audit_log_id} not found"
-                    )
-                    results["skipped"] += 1
-                    continue
-
-                # Extract QuickBooks ID
-                qb_id = extract_quickbooks_id(log.error_message)
-                
-                if not qb_id:
-                    current_app.logger.warning(
-                        f"[Job {job_id}] No QB ID found in audit_log_id={audit_log_id}"
-                    )
-                    results["skipped"] += 1
-                    continue
-
-                # --------------------------------------------------
-                # Determine SyncToken
-                # --------------------------------------------------
-                sync_token = "0"
-                
-                if log.error_message.startswith("Updated"):
-                    # Fetch current SyncToken for updated receipts
-                    current_app.logger.info(
-                        f"[Job {job_id}] Fetching SyncToken for updated receipt qb_id={qb_id}"
-                    )
-                    
-                    try:
-                        sales_receipt = sync_service.get_sales_receipt_from_quickbooks(qb_id)
-                        
-                        if not sales_receipt:
-                            current_app.logger.info(
-                                f"[Job {job_id}] Receipt qb_id={qb_id} already deleted, skipping"
-                            )
-                            results["skipped"] += 1
-                            QuickbooksAuditLog.update_log_status(
-                                audit_log_id,
-                                "SKIPPED",
-                                f"SalesReceipt ID: {qb_id} already deleted.",
-                            )
-                            db.session.commit()
-                            continue
-                        
-                        sync_token = sales_receipt['details']['SalesReceipt']['SyncToken']
-                        
-                    except Exception as e:
-                        current_app.logger.error(
-                            f"[Job {job_id}] Error fetching SyncToken for qb_id={qb_id}: {str(e)}"
-                        )
-                        results["failed"] += 1
-                        results["errors"].append({
-                            "audit_log_id": audit_log_id,
-                            "qb_id": qb_id,
-                            "error": f"SyncToken fetch failed: {str(e)}",
-                        })
-                        continue
-
-                # --------------------------------------------------
-                # Delete from QuickBooks
-                # --------------------------------------------------
-                current_app.logger.info(
-                    f"[Job {job_id}] Deleting receipt qb_id={qb_id} sync_token={sync_token}"
-                )
-                
-                result = sync_service.delete_sales_receipt_in_quickbooks(
-                    qb_id,
-                    sync_token
-                )
-                
-                if not result:
-                    current_app.logger.warning(
-                        f"[Job {job_id}] Receipt qb_id={qb_id} already deleted"
-                    )
-                    results["skipped"] += 1
-                    QuickbooksAuditLog.update_log_status(
-                        audit_log_id,
-                        "SKIPPED",
-                        f"SalesReceipt ID: {qb_id} already deleted.",
-                    )
-                    db.session.commit()
-                    continue
-                
-                if not result.get("success"):
-                    error_msg = result.get("error_message", "Unknown error")
-                    current_app.logger.error(
-                        f"[Job {job_id}] Failed deleting qb_id={qb_id}: {error_msg}"
-                    )
-                    results["failed"] += 1
-                    results["errors"].append({
-                        "audit_log_id": audit_log_id,
-                        "qb_id": qb_id,
-                        "error": error_msg,
-                    })
-                    continue
-
-                # --------------------------------------------------
-                # Success - Update audit log
-                # --------------------------------------------------
-                results["deleted"] += 1
-                QuickbooksAuditLog.update_log_status(
-                    audit_log_id,
-                    "DELETED",
-                    f"SalesReceipt ID: {qb_id} deleted successfully.",
+        # --------------------------------------------------------------
+        # Resolve QuickBooks IDs for the whole batch in one query
+        # --------------------------------------------------------------
+        logs = select_in(
+            db.session,
+            db.session.query(QuickbooksAuditLog.id, QuickbooksAuditLog.error_message),
+            QuickbooksAuditLog.id,
+            audit_log_ids,
+        )
+        log_qb_ids = {}
+        for log in logs:
+            qb_id = extract_quickbooks_id(log.error_message)
+            if qb_id:
+                log_qb_ids[log.id] = qb_id
+            else:
+                current_app.logger.warning(
+                    f"[Job {job_id}] No QB ID found in audit_log_id={log.id}"
                 )
-                db.session.commit()
+        results["skipped"] += len(audit_log_ids) - len(log_qb_ids)
 
-            except Exception as e:
+        # --------------------------------------------------------------
+        # Bulk SyncToken read + batched, parallel deletes
+        # --------------------------------------------------------------
+        try:
+            outcomes = QuickBooksDeletionEngine("SalesReceipt").delete(log_qb_ids.values())
+        except Exception as e:
+            current_app.logger.error(f"[Job {job_id}] Deletion batch {batch_num} failed: {str(e)}")
+            current_app.logger.error(traceback.format_exc())
+            outcomes = {qb_id: {"status": FAILED, "error": str(e)} for qb_id in log_qb_ids.values()}
+
+        # --------------------------------------------------------------
+        # Record outcomes on the audit logs in one statement
+        # --------------------------------------------------------------
+        updates = []
+        for audit_log_id, qb_id in log_qb_ids.items():
+            outcome = outcomes.get(qb_id, {"status": FAILED, "error": "No outcome"})
+            if outcome["status"] == DELETED:
+                results["deleted"] += 1
+                updates.append((audit_log_id, "DELETED", f"SalesReceipt ID: {qb_id} deleted successfully."))
+            elif outcome["status"] == MISSING:
+                results["skipped"] += 1
+                updates.append((audit_log_id, "SKIPPED", f"SalesReceipt ID: {qb_id} already deleted."))
+            else:
                 results["failed"] += 1
                 results["errors"].append({
                     "audit_log_id": audit_log_id,
-                    "error": str(e),
+                    "qb_id": qb_id,
+                    "error": outcome.get("error"),
                 })
-                current_app.logger.error(
-                    f"[Job {job_id}] Unhandled error for audit_log_id={audit_log_id}: {str(e)}"
-                )
-                current_app.logger.error(traceback.format_exc())
-                
-                # Rollback on error to prevent partial commits
-                try:
-                    db.session.rollback()
-                except Exception:
-                    pass
+
+        try:
+            QuickbooksAuditLog.bulk_update_status(updates)
+        except Exception as e:
+            current_app.logger.error(
+                f"[Job {job_id}] Failed recording deletion results: {str(e)}"
+            )
 
         # --------------------------------------------------------------
         # Update job counters in Redis
         # --------------------------------------------------------------
         try:
-            redis_client.hincrby(f"job:{job_id}", "deleted", results["deleted"])
-            redis_client.hincrby(f"job:{job_id}", "failed", results["failed"])
-            redis_client.hincrby(f"job:{job_id}", "skipped", results["skipped"])
+            update_job_progress(job_id, {"deleted": results["deleted"], "failed": results["failed"], "skipped": results["skipped"]})
         except Exception as e:
             current_app.logger.warning(
                 f"[Job {job_id}] Failed to update Redis counters: {str(e)}"
@@ -422,8 +339,9 @@ def aggregate_deletion_results(batch_results, job_id, current_offset):
             new_offset = None
             if current_offset is not None:
                 # Advance offset by successfully processed items (deleted + skipped)
-                new_offset = current_offset + total_deleted + total_skipped
-                redis_client.set("sales_receipt_deletion:offset", new_offset)
+                advanced, new_offset = advance_offset("sales_receipt_deletion:offset", current_offset, total_deleted + total_skipped)
+                if not advanced:
+                    current_app.logger.warning(f"Sync offset moved by another run since {current_offset}; left at {new_offset}")
 
             # ----------------------------------------------------------
             # Store error summary if there are errors
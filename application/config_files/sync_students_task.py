@@ -2,19 +2,10 @@ from celery import shared_task, group, chord
 from datetime import datetime
 from flask import current_app
 import traceback
-import redis
-import os
 
 from application.services.customer_sync import CustomerSyncService
 from application.models.central_models import QuickBooksConfig
-
-# Redis client
-redis_client = redis.Redis(
-    host=os.getenv("REDIS_HOST", "localhost"),
-    port=int(os.getenv("REDIS_PORT", 6379)),
-    db=int(os.getenv("REDIS_DB", 0)),
-    decode_responses=True
-)
+from application.utils.redis_pool import redis_client, advance_offset, update_job_progress
 
 
 def get_flask_app():
@@ -163,9 +154,7 @@ def process_students_batch(reg_nos, batch_num, total_batches, job_id):
                 })
                 current_app.logger.error(f"[Job {job_id}] {reg_no}: {str(e)}")
 
-        redis_client.hincrby(f"job:{job_id}", "synced", results["synced"])
-        redis_client.hincrby(f"job:{job_id}", "failed", results["failed"])
-        redis_client.hincrby(f"job:{job_id}", "skipped", results["skipped"])
+        update_job_progress(job_id, {"synced": results["synced"], "failed": results["failed"], "skipped": results["skipped"]})
 
         return results
 
@@ -190,8 +179,9 @@ def aggregate_student_results(batch_results, job_id, current_offset):
 
         new_offset = None
         if current_offset is not None:
-            new_offset = current_offset + total_synced + total_skipped
-            redis_client.set("student_sync:offset", new_offset)
+            advanced, new_offset = advance_offset("student_sync:offset", current_offset, total_synced + total_skipped)
+            if not advanced:
+                current_app.logger.warning(f"Sync offset moved by another run since {current_offset}; left at {new_offset}")
 
         redis_client.hset(f"job:{job_id}", mapping={
             "status": "completed",
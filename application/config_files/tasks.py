@@ -1,22 +1,13 @@
 from celery import shared_task
 from datetime import datetime
 from flask import current_app
-import os
 import traceback
 from celery import group, chord
-import redis
 
 from application.services.customer_sync import CustomerSyncService
 from application.models.central_models import QuickBooksConfig
 from application.services.quickbooks import QuickBooks
-
-# Initialize Redis client
-redis_client = redis.Redis(
-    host=os.getenv('REDIS_HOST', 'localhost'),
-    port=int(os.getenv('REDIS_PORT', 6379)),
-    db=int(os.getenv('REDIS_DB', 0)),
-    decode_responses=True
-)
+from application.utils.redis_pool import redis_client, advance_offset, update_job_progress
 
 
 def get_flask_app():
@@ -240,9 +231,7 @@ def process_applicants_batch(tracking_ids, batch_num, total_batches, job_id):
         
         # Update job tracking in Redis
         try:
-            redis_client.hincrby(f'job:{job_id}', 'synced', results['synced'])
-            redis_client.hincrby(f'job:{job_id}', 'failed', results['failed'])
-            redis_client.hincrby(f'job:{job_id}', 'skipped', results['skipped'])
+            update_job_progress(job_id, {'synced': results['synced'], 'failed': results['failed'], 'skipped': results['skipped']})
         except Exception as e:
             current_app.logger.error(f"Failed to update Redis for job {job_id}: {str(e)}")
         
@@ -294,8 +283,9 @@ def aggregate_batch_results(batch_results, job_id, current_offset):
             if current_offset is not None:
                 # Increment offset by successfully processed records (synced + skipped)
                 # Don't count failed records so they can be retried
-                new_offset = current_offset + total_synced + total_skipped
-                redis_client.set(offset_key, new_offset)
+                advanced, new_offset = advance_offset(offset_key, current_offset, total_synced + total_skipped)
+                if not advanced:
+                    current_app.logger.warning(f"Sync offset moved by another run since {current_offset}; left at {new_offset}")
                 
                 current_app.logger.info(
                     f"[Job {job_id}] Updated sync offset from {current_offset} to {new_offset}"
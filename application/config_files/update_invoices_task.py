@@ -2,22 +2,10 @@ from celery import shared_task, group, chord
 from datetime import datetime
 from flask import current_app
 import traceback
-import redis
-import os
 
 from application.services.invoice_sync import InvoiceSyncService
 from application.models.central_models import QuickBooksConfig
-
-
-# -------------------------------------------------------------------
-# Redis client
-# -------------------------------------------------------------------
-redis_client = redis.Redis(
-    host=os.getenv("REDIS_HOST", "localhost"),
-    port=int(os.getenv("REDIS_PORT", 6379)),
-    db=int(os.getenv("REDIS_DB", 0)),
-    decode_responses=True
-)
+from application.utils.redis_pool import redis_client, advance_offset, update_job_progress
 
 
 # -------------------------------------------------------------------
@@ -230,9 +218,7 @@ def process_invoices_batch(invoice_ids, batch_num, total_batches, job_id):
         # Update job counters
         # --------------------------------------------------------------
         try:
-            redis_client.hincrby(f"job:{job_id}", "synced", results["synced"])
-            redis_client.hincrby(f"job:{job_id}", "failed", results["failed"])
-            redis_client.hincrby(f"job:{job_id}", "skipped", results["skipped"])
+            update_job_progress(job_id, {"synced": results["synced"], "failed": results["failed"], "skipped": results["skipped"]})
         except Exception:
             current_app.logger.warning(
                 f"[Job {job_id}] Failed to update Redis counters"
@@ -266,8 +252,9 @@ def aggregate_invoice_results(batch_results, job_id, current_offset):
 
             new_offset = None
             if current_offset is not None:
-                new_offset = current_offset + total_synced + total_skipped
-                redis_client.set("invoice_sync:offset", new_offset)
+                advanced, new_offset = advance_offset("invoice_update:offset", current_offset, total_synced + total_skipped)
+                if not advanced:
+                    current_app.logger.warning(f"Sync offset moved by another run since {current_offset}; left at {new_offset}")
 
             redis_client.hset(
                 f"job:{job_id}",
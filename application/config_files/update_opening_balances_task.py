@@ -1,24 +1,16 @@
-from application.models.mis_models import TblPersonalUg, TblOnlineApplication, TblImvoice, Payment
+from application.models.mis_models import TblPersonalUg, TblOnlineApplication, TblImvoice
 from celery import shared_task, group, chord
 from datetime import datetime
 from flask import current_app
 import traceback
-import redis
-import os
-from sqlalchemy import extract, func
 
 from application.utils.database import db_manager
-
-
-# -------------------------------------------------------------------
-# Redis client
-# -------------------------------------------------------------------
-redis_client = redis.Redis(
-    host=os.getenv("REDIS_HOST", "localhost"),
-    port=int(os.getenv("REDIS_PORT", 6379)),
-    db=int(os.getenv("REDIS_DB", 0)),
-    decode_responses=True
+from application.services.opening_balance import (
+    OpeningBalanceSyncService,
+    OPENING_BALANCE_TABLES,
+    DEFAULT_OPENING_BALANCE_YEAR,
 )
+from application.utils.redis_pool import redis_client, advance_offset, update_job_progress
 
 
 # -------------------------------------------------------------------
@@ -37,7 +29,8 @@ def bulk_update_opening_balances_task(
     reg_nos=None,
     batch_size=100,
     reset_offset=False,
-    student_table="TblPersonalUg"
+    student_table="TblPersonalUg",
+    year=DEFAULT_OPENING_BALANCE_YEAR
 ):
     """
     Orchestrates opening balance updates using offset-based batching.
@@ -47,6 +40,7 @@ def bulk_update_opening_balances_task(
         batch_size (int): Batch size
         reset_offset (bool): Reset Redis offset before updating
         student_table (str): Which table to process ("TblPersonalUg" or "TblOnlineApplication")
+        year (int): Financial year the opening balance is carried over from
 
     Returns:
         dict
@@ -73,7 +67,8 @@ def bulk_update_opening_balances_task(
                 reg_nos = get_student_reg_nos(
                     student_table=student_table,
                     limit=batch_size,
-                    offset=current_offset
+                    offset=current_offset,
+                    year=year
                 )
             else:
                 # Manual list → offset should not advance
@@ -130,7 +125,7 @@ def bulk_update_opening_balances_task(
             # ----------------------------------------------------------
             job = group(
                 process_opening_balance_update_batch.s(
-                    batch, idx, len(batches), job_id, student_table
+                    batch, idx, len(batches), job_id, student_table, year
                 )
                 for idx, batch in enumerate(batches, 1)
             )
@@ -170,27 +165,29 @@ def bulk_update_opening_balances_task(
 # -------------------------------------------------------------------
 # HELPER: Fetch student reg_nos
 # -------------------------------------------------------------------
-def get_student_reg_nos(student_table="TblPersonalUg", limit=100, offset=0):
+def get_student_reg_nos(student_table="TblPersonalUg", limit=100, offset=0, year=DEFAULT_OPENING_BALANCE_YEAR):
     """
-    Fetch student reg_nos from TblImvoice for 2024 only
+    Fetch student reg_nos from TblImvoice for the given year only
     
     Args:
         student_table (str): Table name ("TblPersonalUg" or "TblOnlineApplication") - used for validation
         limit (int): Number of records to fetch
         offset (int): Offset for pagination
+        year (int): Invoice year to select students from
         
     Returns:
-        list[str]: List of unique reg_nos from 2024 invoices
+        list[str]: List of unique reg_nos from the year's invoices
     """
     reg_nos = []
+    period_start, period_end = OpeningBalanceSyncService.period_bounds(year)
     
     with db_manager.get_mis_session() as session:
-        # Get distinct reg_nos from TblImvoice for 2024
+        # Get distinct reg_nos from TblImvoice for the year (range keeps the date index usable)
         invoice_reg_nos = (
             session.query(TblImvoice.reg_no)
             .filter(TblImvoice.reg_no != None)
             .filter(TblImvoice.reg_no != "")
-            .filter(extract('year', TblImvoice.date) == 2024)
+            .filter(TblImvoice.date >= period_start, TblImvoice.date < period_end)
             .distinct()
             .order_by(TblImvoice.reg_no)
             .limit(limit)
@@ -228,40 +225,22 @@ def get_student_reg_nos(student_table="TblPersonalUg", limit=100, offset=0):
 # -------------------------------------------------------------------
 # HELPER: Calculate outstanding balance for a student
 # -------------------------------------------------------------------
-def calculate_outstanding_balance(session, reg_no):
+def calculate_outstanding_balance(session, reg_no, year=DEFAULT_OPENING_BALANCE_YEAR):
     """
-    Calculate outstanding balance for a student based on 2024 invoices and payments
+    Calculate outstanding balance for a student based on the year's invoices and payments
     
     Args:
         session: SQLAlchemy session
         reg_no (str): Student registration number
+        year (int): Financial year
         
     Returns:
         float: Outstanding balance
     """
-    # Total invoices for 2024
-    invoice_total = (
-        session.query(func.coalesce(func.sum(TblImvoice.dept), 0))
-        .filter(
-            TblImvoice.reg_no == reg_no,
-            extract('year', TblImvoice.invoice_date) == 2024
-        )
-        .scalar()
-    )
-
-    # Total payments for 2024
-    payment_total = (
-        session.query(func.coalesce(func.sum(Payment.amount), 0))
-        .filter(
-            Payment.reg_no == reg_no,
-            extract('year', Payment.recorded_date) == 2024
-        )
-        .scalar()
+    balances = OpeningBalanceSyncService(logger=current_app.logger).compute_outstanding_balances(
+        session, reg_nos=[reg_no], year=year
     )
-
-    outstanding_balance = float(invoice_total) - float(payment_total)
-    
-    return outstanding_balance
+    return balances[reg_no]["outstanding_balance"]
 
 
 # -------------------------------------------------------------------
@@ -269,10 +248,13 @@ def calculate_outstanding_balance(session, reg_no):
 # -------------------------------------------------------------------
 @shared_task
 def process_opening_balance_update_batch(
-    reg_nos, batch_num, total_batches, job_id, student_table
+    reg_nos, batch_num, total_batches, job_id, student_table, year=DEFAULT_OPENING_BALANCE_YEAR
 ):
     """
-    Process a single batch of opening balance updates
+    Process a single batch of opening balance updates.
+
+    Balances for the whole batch are computed with one aggregate query and
+    written back with one bulk UPDATE.
     """
     app = get_flask_app()
 
@@ -290,65 +272,39 @@ def process_opening_balance_update_batch(
             "errors": [],
         }
 
-        with db_manager.get_mis_session() as session:
-            for reg_no in reg_nos:
-                try:
-                    # Calculate outstanding balance
-                    outstanding_balance = calculate_outstanding_balance(session, reg_no)
-                    
-                    # Fetch student record
-                    if student_table == "TblPersonalUg":
-                        student = session.query(TblPersonalUg).filter_by(reg_no=reg_no).first()
-                    elif student_table == "TblOnlineApplication":
-                        student = session.query(TblOnlineApplication).filter_by(reg_no=reg_no).first()
-                    else:
-                        raise ValueError(f"Invalid student_table: {student_table}")
-                    
-                    if not student:
-                        results["skipped"] += 1
-                        current_app.logger.warning(
-                            f"[Job {job_id}] Student {reg_no} not found in {student_table}"
-                        )
-                        continue
-                    
-                    # Check if update is needed
-                    if student.opening_balance == outstanding_balance:
-                        results["skipped"] += 1
-                        current_app.logger.debug(
-                            f"[Job {job_id}] {reg_no}: No change needed (balance: {outstanding_balance})"
-                        )
-                        continue
-                    
-                    # Update opening balance
-                    old_balance = student.opening_balance
-                    student.opening_balance = outstanding_balance
-                    session.commit()
-                    
-                    results["updated"] += 1
-                    current_app.logger.info(
-                        f"[Job {job_id}] Updated {reg_no}: "
-                        f"{old_balance} → {outstanding_balance}"
-                    )
-
-                except Exception as e:
-                    results["failed"] += 1
-                    results["errors"].append({
-                        "reg_no": reg_no,
-                        "error": str(e),
-                    })
-                    current_app.logger.error(
-                        f"[Job {job_id}] Failed to update {reg_no}: {str(e)}"
-                    )
-                    # Rollback on error
-                    session.rollback()
+        service = OpeningBalanceSyncService(logger=current_app.logger)
+
+        try:
+            with db_manager.get_mis_session() as session:
+                balances = service.compute_outstanding_balances(
+                    session, reg_nos=reg_nos, year=year
+                )
+                written = service.write_opening_balances(session, balances, student_table)
+
+            results["updated"] = written["updated"]
+            # Students missing from the table are counted as skipped, as before
+            results["skipped"] = written["skipped"] + written["missing"]
+
+            current_app.logger.info(
+                f"[Job {job_id}] Batch {batch_num}: {written['updated']} updated, "
+                f"{written['skipped']} unchanged, {written['missing']} not found in {student_table}"
+            )
+
+        except Exception as e:
+            results["failed"] = len(reg_nos)
+            results["errors"].append({
+                "reg_nos": reg_nos,
+                "error": str(e),
+            })
+            current_app.logger.error(
+                f"[Job {job_id}] Failed to update batch {batch_num}: {str(e)}"
+            )
 
         # --------------------------------------------------------------
         # Update job counters in Redis
         # --------------------------------------------------------------
         try:
-            redis_client.hincrby(f"job:{job_id}", "updated", results["updated"])
-            redis_client.hincrby(f"job:{job_id}", "failed", results["failed"])
-            redis_client.hincrby(f"job:{job_id}", "skipped", results["skipped"])
+            update_job_progress(job_id, {"updated": results["updated"], "failed": results["failed"], "skipped": results["skipped"]})
         except Exception:
             current_app.logger.warning(
                 f"[Job {job_id}] Failed to update Redis counters"
@@ -384,9 +340,10 @@ def aggregate_opening_balance_update_results(
 
             new_offset = None
             if current_offset is not None:
-                new_offset = current_offset + total_updated + total_skipped
                 offset_key = f"opening_balance_update:{student_table}:offset"
-                redis_client.set(offset_key, new_offset)
+                advanced, new_offset = advance_offset(offset_key, current_offset, total_updated + total_skipped)
+                if not advanced:
+                    current_app.logger.warning(f"Sync offset moved by another run since {current_offset}; left at {new_offset}")
 
             redis_client.hset(
                 f"job:{job_id}",
@@ -484,13 +441,14 @@ def scheduled_opening_balance_update_task():
 # CONVENIENCE TASK: Update specific students
 # -------------------------------------------------------------------
 @shared_task
-def update_specific_students_opening_balance(reg_nos, student_table="TblPersonalUg"):
+def update_specific_students_opening_balance(reg_nos, student_table="TblPersonalUg", year=DEFAULT_OPENING_BALANCE_YEAR):
     """
     Update opening balance for specific students
     
     Args:
         reg_nos (list[str]): List of registration numbers
         student_table (str): Table name
+        year (int): Financial year
         
     Returns:
         dict: Results of the update
@@ -499,5 +457,66 @@ def update_specific_students_opening_balance(reg_nos, student_table="TblPersonal
         reg_nos=reg_nos,
         batch_size=100,
         reset_offset=False,
-        student_table=student_table
-    )
\ No newline at end of file
+        student_table=student_table,
+        year=year
+    )
+
+
+# -------------------------------------------------------------------
+# SET-BASED TASK: Recompute every student in one aggregate pass
+# -------------------------------------------------------------------
+@shared_task
+def recompute_all_opening_balances_task(
+    student_table="TblPersonalUg",
+    year=DEFAULT_OPENING_BALANCE_YEAR,
+    start=None,
+    end=None,
+    chunk_size=1000
+):
+    """
+    Recompute opening balances for every student with invoices or payments in
+    the period using a single GROUP BY pass, then write them back in bulk.
+
+    Unlike bulk_update_opening_balances_task this does not page through
+    reg_nos with a Redis offset; the whole table is handled in one run.
+
+    Args:
+        student_table (str): "TblPersonalUg" or "TblOnlineApplication"
+        year (int): Financial year
+        start (str|None): Optional ISO start date overriding the year
+        end (str|None): Optional ISO cutoff date overriding the year
+        chunk_size (int): Rows per UPDATE transaction
+
+    Returns:
+        dict
+    """
+    app = get_flask_app()
+
+    with app.app_context():
+        if student_table not in OPENING_BALANCE_TABLES:
+            return {"success": False, "error": f"Invalid student_table: {student_table}"}
+
+        start_time = datetime.now()
+        try:
+            totals = OpeningBalanceSyncService(logger=current_app.logger).bulk_update_opening_balances(
+                reg_nos=None,
+                student_table=student_table,
+                year=year,
+                start=start,
+                end=end,
+                chunk_size=chunk_size
+            )
+            duration = (datetime.now() - start_time).total_seconds()
+            return {
+                "success": True,
+                "student_table": student_table,
+                "year": year,
+                **totals,
+                "duration_seconds": duration,
+            }
+        except Exception as e:
+            current_app.logger.error(
+                f"Set-based opening balance recompute failed for {student_table}: {str(e)}"
+            )
+            current_app.logger.error(traceback.format_exc())
+            return {"success": False, "error": str(e)}
\ No newline at end of file
@@ -0,0 +1,42 @@
+## application/config_files/wallet_balance_task.py
+
+from datetime import datetime
+
+from flask import current_app
+
+from application.config_files.celery_app import celery
+from application.models.mis_models import TblStudentWalletBalance
+
+
+@celery.task(
+    bind=True,
+    name="application.config_files.wallet_balance_task.verify_wallet_balances_task",
+)
+def verify_wallet_balances_task(self, student_ids=None, repair=False):
+    """
+    Re-derive wallet balances from the ledger and report snapshot drift.
+
+    Args:
+        student_ids (list[str] | None): Restrict the check to these students
+        repair (bool): Overwrite drifted snapshots with the ledger value
+
+    Returns:
+        dict: Verification report
+    """
+    started_at = datetime.now()
+    report = TblStudentWalletBalance.verify(student_ids=student_ids, repair=repair)
+    report["duration_seconds"] = (datetime.now() - started_at).total_seconds()
+
+    if report["drifted"]:
+        current_app.logger.warning(
+            f"Wallet balance drift detected for {report['drifted']} of {report['checked']} students "
+            f"(repaired: {report['repaired']})"
+        )
+        for item in report["drift"][:50]:
+            current_app.logger.warning(f"Wallet balance drift: {item}")
+    else:
+        current_app.logger.info(
+            f"Wallet balances verified for {report['checked']} students, no drift"
+        )
+
+    return report
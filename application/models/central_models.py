@@ -13,7 +13,8 @@ import jwt
 import traceback
 from flask import current_app
 from application import db
-from sqlalchemy import or_, and_, cast, String
+from sqlalchemy import or_, and_, cast, String, event
+import json
 
 
 # Use Flask-SQLAlchemy's Model base class
@@ -158,6 +159,31 @@ class QuickbooksAuditLog(BaseModel):
             db.session.rollback()
             raise e
 
+    @classmethod
+    def bulk_update_status(cls, updates):
+        """
+        Set status and message on many audit log entries in one statement.
+
+        Args:
+            updates (list[tuple]): (id, status, error_message) per entry
+        """
+        if not updates:
+            return 0
+        from sqlalchemy import bindparam
+        table = cls.__table__
+        try:
+            db.session.execute(
+                table.update()
+                .where(table.c.id == bindparam("b_id"))
+                .values(operation_status=bindparam("b_status"), error_message=bindparam("b_message")),
+                [{"b_id": i, "b_status": status, "b_message": message} for i, status, message in updates],
+            )
+            db.session.commit()
+            return len(updates)
+        except Exception as e:
+            db.session.rollback()
+            raise e
+
 
 class SystemConfiguration(BaseModel):
     """System-wide configuration settings"""
@@ -179,6 +205,9 @@ class IntegrationLog(BaseModel):
     operation = Column(String(100), nullable=False)
     status = Column(String(20), nullable=False)  # 'Success', 'Failure', 'Pending'
     external_transaction_id = Column(String(255), nullable=True)
+    # external_transaction_id, or the transaction_id inside response_data when
+    # the caller did not set it; filled by _set_integration_log_transaction_key
+    transaction_key = Column(String(255), nullable=True, index=True)
     request_data = Column(Text, nullable=True)
     response_data = Column(Text, nullable=True)
     error_details = Column(Text, nullable=True)
@@ -205,7 +234,31 @@ class IntegrationLog(BaseModel):
     @classmethod
     def get_log_by_transaction_id(cls, transaction_id):
         """Retrieve log by external transaction ID"""
-        return cls.query.filter_by(external_transaction_id=transaction_id).first()
+        return cls.query.filter_by(transaction_key=transaction_id).first()
+
+    @staticmethod
+    def extract_transaction_key(external_transaction_id, response_data):
+        """Resolve the transaction id a log row is indexed under"""
+        if external_transaction_id:
+            return str(external_transaction_id)[:255]
+        data = response_data
+        if isinstance(data, (str, bytes)):
+            try:
+                data = json.loads(data)
+            except ValueError:
+                return None
+        if isinstance(data, dict) and data.get("transaction_id"):
+            return str(data["transaction_id"])[:255]
+        return None
+
+
+@event.listens_for(IntegrationLog, "before_insert")
+@event.listens_for(IntegrationLog, "before_update")
+def _set_integration_log_transaction_key(mapper, connection, target):
+    """Keep the indexed transaction_key in step with the logged payload"""
+    target.transaction_key = IntegrationLog.extract_transaction_key(
+        target.external_transaction_id, target.response_data
+    )
 
 class ApiClient(BaseModel):
     """
@@ -431,41 +484,18 @@ class AuthenticationService:
             tuple: (is_valid: bool, payload_or_error: dict or str)
         """
         try:
-            current_app.logger.info("🔍 === JWT VALIDATION START ===")
-            current_app.logger.info(f"Token length: {len(token)}")
-            current_app.logger.info(f"Token starts with: {token[:10]}...")
-            current_app.logger.info(f"Token ends with: ...{token[-10:]}")
-
             secret_key = current_app.config.get('SECRET_KEY', 'fallback-secret-key')
-            current_app.logger.info(f"Using secret key: {secret_key[:10]}... (length: {len(secret_key)})")
-            current_app.logger.info(f"Secret key is fallback: {secret_key == 'fallback-secret-key'}")
-
-            current_app.logger.info("🔍 Attempting JWT decode with HS256")
             payload = jwt.decode(token, secret_key, algorithms=['HS256'])
-            current_app.logger.info("==YES==JWT decoded successfully")
-            current_app.logger.info(f"Token payload keys: {list(payload.keys())}")
-            current_app.logger.info(f"Token payload: {payload}")
 
             # Verify client still exists and is active
             client_id = payload.get('client_id')
-            current_app.logger.info(f"🔍 Looking up client ID: {client_id}")
-
             client = ApiClient.query.get(client_id)
-            current_app.logger.info(f"Client found in database: {bool(client)}")
-
-            if client:
-                current_app.logger.info(f"Client details: {client.client_name} ({client.gateway_name})")
-                current_app.logger.info(f"Client active status: {client.is_active}")
-                current_app.logger.info(f"Client permissions: {client.permissions}")
-            else:
-                current_app.logger.warning(f"❌ No client found with ID: {client_id}")
 
             if not client or not client.is_active:
-                current_app.logger.warning("❌ Client no longer active or not found")
+                current_app.logger.warning(f"❌ Client {client_id} no longer active or not found")
                 return False, "Client no longer active"
 
-            current_app.logger.info("==YES==JWT validation successful")
-            current_app.logger.info("🔍 === JWT VALIDATION END ===")
+            current_app.logger.debug("JWT validated for client %s", client_id)
             return True, payload
 
         except jwt.ExpiredSignatureError as e:
@@ -473,7 +503,6 @@ class AuthenticationService:
             return False, "Token has expired"
         except jwt.InvalidTokenError as e:
             current_app.logger.warning(f"❌ Invalid JWT token: {str(e)}")
-            current_app.logger.warning(f"Token that failed: {token[:50]}...")
             return False, "Invalid token"
         except Exception as e:
             current_app.logger.error(f"💥 JWT validation error: {str(e)}")
@@ -649,4 +678,155 @@ class ApiAccessLog(BaseModel):
         except Exception as e:
             db.session.rollback()
             current_app.logger.error(f"Error logging API access: {e}")
-            return None
\ No newline at end of file
+            return None
+
+class GatewayStatementImport(BaseModel):
+    """A gateway (Urubuto/BK) statement file loaded into the staging table"""
+    __tablename__ = "gateway_statement_imports"
+
+    file_name = db.Column(db.String(255), nullable=False)
+    file_hash = db.Column(db.String(64), nullable=False, unique=True)
+    row_count = db.Column(db.Integer, nullable=False, default=0)
+    inserted_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_count = db.Column(db.Integer, nullable=False, default=0)
+    # lines not staged: Int. Txn Ref. saved in lossy scientific notation
+    rejected_count = db.Column(db.Integer, nullable=False, default=0)
+    # staged lines whose Txn Date did not parse (excluded from date-range reports)
+    undated_count = db.Column(db.Integer, nullable=False, default=0)
+    txn_date_from = db.Column(db.DateTime, nullable=True)
+    txn_date_to = db.Column(db.DateTime, nullable=True)
+    status = db.Column(db.String(20), nullable=False, default="loading")  # 'loading', 'loaded', 'failed'
+
+    def __repr__(self):
+        return f"<GatewayStatementImport {self.file_name} {self.status}>"
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "file_name": self.file_name,
+            "file_hash": self.file_hash,
+            "row_count": self.row_count,
+            "inserted_count": self.inserted_count,
+            "updated_count": self.updated_count,
+            "rejected_count": self.rejected_count,
+            "undated_count": self.undated_count,
+            "txn_date_from": self.txn_date_from.isoformat() if self.txn_date_from else None,
+            "txn_date_to": self.txn_date_to.isoformat() if self.txn_date_to else None,
+            "status": self.status,
+            "imported_at": self.created_at.isoformat() if self.created_at else None,
+        }
+
+
+class GatewayStatementTransaction(BaseModel):
+    """One gateway statement line, deduplicated on the Int. Txn Ref."""
+    __tablename__ = "gateway_statement_transactions"
+
+    transaction_reference = db.Column(db.String(64), nullable=False, unique=True)
+    payer_code = db.Column(db.String(50), nullable=True, index=True)
+    paid_amount = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    slip_no = db.Column(db.String(100), nullable=True)
+    txn_status = db.Column(db.String(30), nullable=True)
+    txn_date = db.Column(db.DateTime, nullable=True)
+    import_id = db.Column(db.Integer, db.ForeignKey("gateway_statement_imports.id"), nullable=True, index=True)
+
+    __table_args__ = (
+        db.Index("ix_gateway_statement_txn_date_status", "txn_date", "txn_status"),
+    )
+
+    def __repr__(self):
+        return f"<GatewayStatementTransaction {self.transaction_reference} {self.paid_amount}>"
+
+
+class ReconciliationWatermark(db.Model):
+    """Highest source row already examined by an incremental reconciliation"""
+    __tablename__ = "reconciliation_watermarks"
+
+    name = db.Column(db.String(100), primary_key=True)
+    last_id = db.Column(db.BigInteger, nullable=False, default=0)
+    rows_examined = db.Column(db.BigInteger, nullable=False, default=0)
+    last_run_at = db.Column(db.DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<ReconciliationWatermark {self.name} last_id={self.last_id}>"
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "last_id": self.last_id,
+            "rows_examined": self.rows_examined,
+            "last_run_at": self.last_run_at.isoformat() if self.last_run_at else None,
+        }
+
+
+class ReconciliationDiscrepancy(BaseModel):
+    """A transaction that did not reconcile; kept until a later run resolves it"""
+    __tablename__ = "reconciliation_discrepancies"
+
+    reconciliation = db.Column(db.String(100), nullable=False)
+    transaction_id = db.Column(db.String(255), nullable=False)
+    kind = db.Column(db.String(30), nullable=False)  # 'missing', 'amount_mismatch'
+    status = db.Column(db.String(20), nullable=False, default="open")  # 'open', 'resolved'
+    payer_code = db.Column(db.String(255), nullable=True)
+    expected_amount = db.Column(db.Numeric(14, 2), nullable=True)
+    actual_amount = db.Column(db.Numeric(14, 2), nullable=True)
+    observation = db.Column(db.String(500), nullable=True)
+    payment_date_time = db.Column(db.String(50), nullable=True)
+    source_id = db.Column(db.BigInteger, nullable=True)
+    resolved_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.UniqueConstraint("reconciliation", "transaction_id", name="uq_reconciliation_discrepancy_txn"),
+        db.Index("ix_reconciliation_discrepancy_open", "reconciliation", "status", "kind"),
+    )
+
+    def __repr__(self):
+        return f"<ReconciliationDiscrepancy {self.reconciliation} {self.transaction_id} {self.kind}>"
+
+    def to_dict(self):
+        return {
+            "external_transaction_id": self.transaction_id,
+            "kind": self.kind,
+            "status": self.status,
+            "payer_code": self.payer_code,
+            "expected_amount": float(self.expected_amount) if self.expected_amount is not None else None,
+            "actual_amount": float(self.actual_amount) if self.actual_amount is not None else None,
+            "observation": self.observation,
+            "payment_date_time": self.payment_date_time,
+            "detected_at": self.created_at.isoformat() if self.created_at else None,
+            "resolved_at": self.resolved_at.isoformat() if self.resolved_at else None,
+        }
+
+
+class DuplicateFinding(BaseModel):
+    """One duplicated transaction id found by the scheduled duplicate scan"""
+    __tablename__ = "duplicate_findings"
+
+    source = db.Column(db.String(50), nullable=False)  # 'integration_log', 'wallet'
+    duplicate_key = db.Column(db.String(255), nullable=False)
+    occurrences = db.Column(db.Integer, nullable=False)
+    keep_id = db.Column(db.BigInteger, nullable=False)
+    duplicate_ids = db.Column(db.Text, nullable=False)  # JSON list of the redundant row ids
+    total_amount = db.Column(db.Numeric(14, 2), nullable=True)
+    first_seen_at = db.Column(db.DateTime, nullable=True)
+    last_seen_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.UniqueConstraint("source", "duplicate_key", name="uq_duplicate_finding_key"),
+        db.Index("ix_duplicate_finding_source_occurrences", "source", "occurrences"),
+    )
+
+    def __repr__(self):
+        return f"<DuplicateFinding {self.source} {self.duplicate_key} x{self.occurrences}>"
+
+    def to_dict(self):
+        return {
+            "source": self.source,
+            "duplicate_key": self.duplicate_key,
+            "occurrences": self.occurrences,
+            "keep_id": self.keep_id,
+            "duplicate_ids": json.loads(self.duplicate_ids or "[]"),
+            "total_amount": float(self.total_amount) if self.total_amount is not None else None,
+            "first_seen_at": self.first_seen_at.isoformat() if self.first_seen_at else None,
+            "last_seen_at": self.last_seen_at.isoformat() if self.last_seen_at else None,
+            "detected_at": self.created_at.isoformat() if self.created_at else None,
+        }
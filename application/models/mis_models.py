@@ -13,6 +13,10 @@ from sqlalchemy.types import Numeric
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from application.utils.database import db_manager
+from application.utils.enrichment import (
+    LookupRelation, register_lookups, int_key, cached_lookup, was_prefetched
+)
+from application.utils.reference_cache import checksum, reference_cache
 from application import db
 from sqlalchemy import or_, and_
 from sqlalchemy.orm import joinedload, foreign, load_only
@@ -165,9 +169,16 @@ class Payment(MISBaseModel):
     pushed_date = db.Column(DateTime)
     qk_id = db.Column(db.String(255))  # QuickBooks Payment ID
     sync_token = db.Column(db.String(10))  # To store QuickBooks SyncToken
-    student_wallet_ref = db.Column(db.String(250))
+    # Wallet credit (sales receipt) reference a payment was settled from;
+    # indexed so per-receipt totals read only that receipt's payments
+    student_wallet_ref = db.Column(db.String(250), index=True)
     is_prepayment = db.Column(db.Boolean, default=False)
 
+    # TEXT column: MySQL indexes a prefix, enough for Urubuto/bank references
+    __table_args__ = (
+        db.Index("ix_payment_external_transaction_id", "external_transaction_id", mysql_length=64),
+    )
+
     # Relationships
     level = relationship("TblLevel", backref="payments", lazy='joined')
     bank = relationship("TblBank", backref="payments", lazy='joined')
@@ -573,7 +584,9 @@ class TblStudentWallet(MISBaseModel):
     sync_status = db.Column(db.Integer, nullable=True)
     amount = db.Column(db.Numeric(12, 2), nullable=True, default=0.00)
 
-
+    __table_args__ = (
+        db.Index("ix_student_wallet_external_transaction_id", "external_transaction_id", mysql_length=64),
+    )
 
     def __repr__(self):
         return f"<TableStudentWallet id={self.id} reg_no={self.reg_no}>"
@@ -618,6 +631,37 @@ class TblStudentWallet(MISBaseModel):
             current_app.logger.error(f"Error getting wallet for reg_no {reg_no}: {str(e)}")
             return None
 
+    @classmethod
+    def increment_dept(cls, session, wallet_id, amount):
+        """
+        Atomically add an amount to a wallet balance.
+
+        The new balance is computed by the database in a single UPDATE
+        (``COALESCE(dept, 0) + :amount``), so concurrent top-ups for the same
+        wallet cannot overwrite each other. The row is read back inside the
+        same transaction, which still holds the row lock taken by the UPDATE.
+
+        Args:
+            session: Active MIS session; the caller commits
+            wallet_id (int): Wallet primary key
+            amount (float): Amount to add
+
+        Returns:
+            float | None: The new balance, or None if the wallet does not exist
+        """
+        table = cls.__table__
+        result = session.execute(
+            table.update()
+            .where(table.c.id == wallet_id)
+            .values(dept=func.coalesce(table.c.dept, 0) + float(amount))
+        )
+        if result.rowcount == 0:
+            return None
+
+        return session.execute(
+            db.select(table.c.dept).where(table.c.id == wallet_id)
+        ).scalar()
+
 
     @classmethod
     def get_by_reference_number(cls, reference_number):
@@ -846,7 +890,7 @@ class TblStudentWallet(MISBaseModel):
             return False
 
 from decimal import Decimal
-from sqlalchemy import func
+from sqlalchemy import func, case, event
 from sqlalchemy.orm import relationship
 
 
@@ -993,24 +1037,51 @@ class TblStudentWalletLedger(MISBaseModel):
     # -------------------------------------------------
 
     @classmethod
-    def _get_available_credits(cls, student_id, session):
-        credits = (
+    def _get_available_credits(cls, student_id, session, lock=True):
+        """
+        Return the student's credits that still have funds, oldest first.
+
+        Consumption for every credit is computed with one aggregate over the
+        student's debits instead of a SUM per credit.
+
+        Args:
+            student_id (str): Student reg_no
+            session: Active MIS session (the lock is held by its transaction)
+            lock (bool): Lock the credit rows FOR UPDATE
+
+        Returns:
+            list[tuple] | None: (credit, remaining) pairs in FIFO order
+        """
+        query = (
             session.query(cls)
             .filter_by(student_id=student_id, direction="credit")
-            .order_by(cls.created_at.asc())
-            .with_for_update()
+            .order_by(cls.created_at.asc(), cls.id.asc())
+        )
+        if lock:
+            query = query.with_for_update()
+        credits = query.all()
+
+        if not credits:
+            return None
+
+        used_by_credit = dict(
+            session.query(
+                cls.parent_credit_id,
+                func.coalesce(func.sum(cls.amount), 0)
+            )
+            .filter(
+                cls.student_id == student_id,
+                cls.direction == "debit",
+                cls.parent_credit_id.isnot(None)
+            )
+            .group_by(cls.parent_credit_id)
             .all()
         )
 
         result = []
 
         for credit in credits:
-            used = (
-                session.query(func.coalesce(func.sum(cls.amount), 0))
-                .filter(cls.parent_credit_id == credit.id)
-                .scalar()
-            ) or Decimal("0.00")
-
+            used = Decimal(used_by_credit.get(credit.id) or "0.00")
             remaining = credit.original_amount + used
 
             if remaining > 0:
@@ -1018,6 +1089,30 @@ class TblStudentWalletLedger(MISBaseModel):
 
         return result or None
 
+    @staticmethod
+    def allocate_fifo(credits, amount):
+        """
+        Split an amount across available credits, oldest first.
+
+        Args:
+            credits (list[tuple]): (credit, remaining) pairs in FIFO order
+            amount (Decimal): Amount to allocate
+
+        Returns:
+            tuple: ([(credit, consumed)], unallocated amount)
+        """
+        remaining = Decimal(amount)
+        allocations = []
+
+        for credit, available in credits or []:
+            if remaining <= 0:
+                break
+            consume = min(available, remaining)
+            allocations.append((credit, consume))
+            remaining -= consume
+
+        return allocations, remaining
+
     @classmethod
     def update_credit_amount(cls, credit_id, amount):
         """
@@ -1045,6 +1140,12 @@ class TblStudentWalletLedger(MISBaseModel):
         - multiple sales receipts
         - partial exhaustion
         - FIFO allocation
+
+        Credits are locked, allocated in memory and the debit rows and credit
+        updates are written in the same transaction that holds the lock.
+
+        Returns:
+            dict: Amount applied, amount left unallocated and debit count
         """
 
         remaining = Decimal(invoice_amount)
@@ -1058,13 +1159,11 @@ class TblStudentWalletLedger(MISBaseModel):
                 student_id, session
             )
 
-            for credit, available in credits:
-
-                if remaining <= 0:
-                    break
-
-                consume = min(available, remaining)
+            allocations, remaining = TblStudentWalletLedger.allocate_fifo(
+                credits, remaining
+            )
 
+            for credit, consume in allocations:
                 session.add(
                     TblStudentWalletLedger(
                         student_id=student_id,
@@ -1076,35 +1175,56 @@ class TblStudentWalletLedger(MISBaseModel):
                         parent_credit_id=credit.id
                     )
                 )
-
-                remaining -= consume
-                # deduct from available credit
-                update_credit = TblStudentWalletLedger.update_credit_amount(credit.id, -consume)
-                if not update_credit:
-                    current_app.logger.error(f"Failed to update credit amount for credit ID {credit.id}")
-                    continue
-
-                current_app.logger.info(
-                    f"Debited {consume} from credit {credit.id} "
-                    f"for student {student_id}. "
-                    f"Remaining invoice amount: {remaining}"
-                )
+                # deduct from available credit while the row is still locked
+                credit.amount -= consume
 
             session.commit()
 
+        applied = Decimal(invoice_amount) - remaining
+        current_app.logger.info(
+            f"Debited {applied} from {len(allocations)} credit(s) "
+            f"for student {student_id}. "
+            f"Remaining invoice amount: {remaining}"
+        )
+
+        return {
+            "applied": float(applied),
+            "unallocated": float(remaining),
+            "debits": len(allocations),
+        }
 
     # -------------------------------------------------
 
+    @classmethod
+    def signed_movement(cls):
+        """
+        SQL expression for the balance effect of a ledger row.
+
+        Credits count at their immutable original amount (their ``amount`` is
+        reduced as debits consume them), debits at their signed amount.
+        """
+        return case(
+            (cls.direction == "credit", cls.original_amount),
+            else_=cls.amount
+        )
+
     @staticmethod
     def get_wallet_balance(student_id):
         """
         Total wallet balance (credits − debits).
+
+        Reads the maintained TblStudentWalletBalance snapshot; the ledger is
+        only summed when a student has no snapshot yet.
         """
 
         with TblStudentWalletLedger.get_session() as session:
+            snapshot = session.get(TblStudentWalletBalance, student_id)
+            if snapshot is not None:
+                return float(snapshot.balance)
+
             balance = (
                 session.query(
-                    func.coalesce(func.sum(TblStudentWalletLedger.amount), 0)
+                    func.coalesce(func.sum(TblStudentWalletLedger.signed_movement()), 0)
                 )
                 .filter(TblStudentWalletLedger.student_id == student_id)
                 .scalar()
@@ -1181,6 +1301,182 @@ class TblStudentWalletLedger(MISBaseModel):
                 return wallet_ledger
             return None
 
+class TblStudentWalletBalance(MISBaseModel):
+    """
+    Running wallet balance per student, maintained from the ledger.
+
+    Every ledger insert adjusts the row in the same transaction (see the
+    ``after_insert`` listener below), so balance reads are a primary key
+    lookup instead of a SUM over the student's ledger.
+    """
+    __tablename__ = "tbl_student_wallet_balance"
+
+    student_id = db.Column(db.String(255), primary_key=True)
+    balance = db.Column(db.Numeric(12, 2), nullable=False, default=0)
+    ledger_entries = db.Column(db.Integer, nullable=False, default=0)
+    last_ledger_id = db.Column(db.BigInteger, nullable=True)
+    updated_at = db.Column(
+        db.DateTime,
+        nullable=False,
+        server_default=db.text("CURRENT_TIMESTAMP")
+    )
+
+    def __repr__(self):
+        return f"<TblStudentWalletBalance student={self.student_id} balance={self.balance}>"
+
+    def to_dict(self):
+        return {
+            "student_id": self.student_id,
+            "balance": float(self.balance) if self.balance is not None else 0.0,
+            "ledger_entries": self.ledger_entries,
+            "last_ledger_id": self.last_ledger_id,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+        }
+
+    @classmethod
+    def apply_deltas(cls, connection, deltas, last_ledger_ids=None, entries=None):
+        """
+        Add balance movements for several students on an open connection.
+
+        Callers that insert ledger rows with Core statements (which bypass the
+        ORM listener) use this to keep the snapshot in the same transaction.
+
+        Args:
+            connection: Connection taking part in the ledger transaction
+            deltas (dict): student_id -> Decimal movement
+            last_ledger_ids (dict): Optional student_id -> newest ledger id
+            entries (dict): Optional student_id -> number of ledger rows added
+        """
+        if not deltas:
+            return
+
+        table = cls.__table__
+        now = datetime.now()
+        last_ledger_ids = last_ledger_ids or {}
+        entries = entries or {}
+        rows = [
+            {
+                "student_id": student_id,
+                "balance": Decimal(delta),
+                "ledger_entries": entries.get(student_id, 1),
+                "last_ledger_id": last_ledger_ids.get(student_id),
+                "updated_at": now,
+            }
+            for student_id, delta in deltas.items()
+        ]
+
+        if connection.dialect.name == "mysql":
+            from sqlalchemy.dialects.mysql import insert as mysql_insert
+
+            stmt = mysql_insert(table)
+            stmt = stmt.on_duplicate_key_update(
+                balance=table.c.balance + stmt.inserted.balance,
+                ledger_entries=table.c.ledger_entries + stmt.inserted.ledger_entries,
+                last_ledger_id=func.coalesce(stmt.inserted.last_ledger_id, table.c.last_ledger_id),
+                updated_at=stmt.inserted.updated_at,
+            )
+            connection.execute(stmt, rows)
+            return
+
+        for row in rows:
+            result = connection.execute(
+                table.update()
+                .where(table.c.student_id == row["student_id"])
+                .values(
+                    balance=table.c.balance + row["balance"],
+                    ledger_entries=table.c.ledger_entries + row["ledger_entries"],
+                    last_ledger_id=func.coalesce(row["last_ledger_id"], table.c.last_ledger_id),
+                    updated_at=row["updated_at"],
+                )
+            )
+            if result.rowcount == 0:
+                connection.execute(table.insert().values(**row))
+
+    @classmethod
+    def verify(cls, student_ids=None, repair=False, tolerance=Decimal("0.01")):
+        """
+        Re-derive balances from the ledger and report snapshots that drifted.
+
+        Args:
+            student_ids (list[str]|None): Restrict to these students, None for all
+            repair (bool): Overwrite drifted or missing snapshots with the ledger value
+            tolerance (Decimal): Largest difference that is not reported
+
+        Returns:
+            dict: Counts and the list of drifted students
+        """
+        ledger = TblStudentWalletLedger
+
+        with cls.get_session() as session:
+            derived_query = (
+                session.query(
+                    ledger.student_id,
+                    func.coalesce(func.sum(ledger.signed_movement()), 0),
+                    func.count(ledger.id),
+                    func.max(ledger.id),
+                )
+                .group_by(ledger.student_id)
+            )
+            snapshot_query = session.query(cls)
+            if student_ids is not None:
+                derived_query = derived_query.filter(ledger.student_id.in_(student_ids))
+                snapshot_query = snapshot_query.filter(cls.student_id.in_(student_ids))
+
+            derived = {
+                row[0]: (Decimal(row[1]), row[2], row[3])
+                for row in derived_query.all()
+            }
+            snapshots = {snap.student_id: snap for snap in snapshot_query.all()}
+
+            drift = []
+            for student_id in set(derived) | set(snapshots):
+                expected, count, last_id = derived.get(student_id, (Decimal("0"), 0, None))
+                snap = snapshots.get(student_id)
+                actual = Decimal(snap.balance) if snap is not None else None
+
+                if actual is not None and abs(actual - expected) <= tolerance:
+                    continue
+
+                drift.append({
+                    "student_id": student_id,
+                    "snapshot_balance": float(actual) if actual is not None else None,
+                    "ledger_balance": float(expected),
+                    "difference": float(expected - (actual or Decimal("0"))),
+                })
+
+                if repair:
+                    if snap is None:
+                        snap = cls(student_id=student_id)
+                        session.add(snap)
+                    snap.balance = expected
+                    snap.ledger_entries = count
+                    snap.last_ledger_id = last_id
+                    snap.updated_at = datetime.now()
+
+            if repair:
+                session.commit()
+
+        return {
+            "checked": len(set(derived) | set(snapshots)),
+            "drifted": len(drift),
+            "repaired": len(drift) if repair else 0,
+            "drift": drift,
+        }
+
+
+@event.listens_for(TblStudentWalletLedger, "after_insert")
+def _update_wallet_balance_snapshot(mapper, connection, target):
+    """Keep TblStudentWalletBalance in step with every ORM ledger insert."""
+    movement = target.original_amount if target.direction == "credit" else target.amount
+    if movement is None:
+        return
+    TblStudentWalletBalance.apply_deltas(
+        connection,
+        {target.student_id: Decimal(movement)},
+        last_ledger_ids={target.student_id: target.id},
+    )
+
+
 class TblStudentWalletHistory(MISBaseModel):
     """Ledger / history for wallet transactions"""
     __tablename__ = "tbl_student_wallet_history"
@@ -1383,9 +1679,8 @@ class TblBank(MISBaseModel):
             dict: Bank details or None if not found
         """
         try:
-            with cls.get_session() as session:
-                bank = session.query(cls).filter(cls.bank_id == bank_id).first()
-                return bank.to_dict() if bank else []
+            bank = reference_cache.get(cls, bank_id)
+            return bank.to_dict() if bank else []
         except Exception as e:
             from flask import current_app
             current_app.logger.error(f"Error getting bank details for ID {bank_id}: {str(e)}")
@@ -1495,11 +1790,10 @@ class TblCampus(MISBaseModel):
             int: QuickBooks location ID or None if not found
         """
         try:
-            with MISBaseModel.get_session() as session:
-                campus = session.query(TblCampus).filter(TblCampus.camp_id == camp_id).first()
-                if campus and campus.quickbooks_id:
-                    return campus.quickbooks_id
-                return None
+            campus = reference_cache.get(TblCampus, camp_id)
+            if campus and campus.quickbooks_id:
+                return campus.quickbooks_id
+            return None
         except Exception as e:
             from flask import current_app
             current_app.logger.error(f"Error getting location ID for campus ID {camp_id}: {str(e)}")
@@ -1655,6 +1949,62 @@ class TblImvoice(MISBaseModel):
             current_app.logger.error(f"Error getting deposit amount for invoice {reference_number}: {str(e)}")
             return None
 
+    @classmethod
+    def decrement_balance(cls, session, amount, invoice_id=None, reference_number=None):
+        """
+        Atomically deduct an amount from an invoice balance.
+
+        The new balance is computed by the database in a single UPDATE
+        (``GREATEST(0, COALESCE(balance, dept) - :amount)``), so concurrent
+        callbacks for the same invoice cannot overwrite each other's deduction.
+        The row is read back inside the same transaction, which still holds the
+        row lock taken by the UPDATE.
+
+        Args:
+            session: Active MIS session; the caller commits
+            amount (float): Amount to deduct, must be positive
+            invoice_id (int): Invoice primary key
+            reference_number (str): Invoice reference number (first match), used
+                when invoice_id is not given
+
+        Returns:
+            float | None: The new balance, or None if the invoice does not exist
+        """
+        if amount is None or float(amount) <= 0:
+            raise ValueError("amount must be greater than zero")
+
+        table = cls.__table__
+
+        if invoice_id is None:
+            if reference_number is None:
+                raise ValueError("invoice_id or reference_number is required")
+            invoice_id = session.execute(
+                db.select(table.c.id)
+                .where(table.c.reference_number == reference_number)
+                .order_by(table.c.id.asc())
+                .limit(1)
+            ).scalar()
+            if invoice_id is None:
+                return None
+
+        if session.get_bind().dialect.name == "mysql":
+            floor_at_zero = func.greatest
+        else:
+            floor_at_zero = func.max
+
+        current_balance = func.coalesce(table.c.balance, table.c.dept, 0)
+        result = session.execute(
+            table.update()
+            .where(table.c.id == invoice_id)
+            .values(balance=floor_at_zero(0, current_balance - float(amount)))
+        )
+        if result.rowcount == 0:
+            return None
+
+        return session.execute(
+            db.select(table.c.balance).where(table.c.id == invoice_id)
+        ).scalar()
+
     @classmethod
     def apply_payment_to_invoice(cls, invoice_id, amount_paid):
         """
@@ -1665,16 +2015,9 @@ class TblImvoice(MISBaseModel):
 
         try:
             with MISBaseModel.get_session() as session:
-                invoice = session.query(cls).filter(cls.id == invoice_id).first()
-                invoice_balance = invoice.balance or invoice.dept
-                if not invoice:
-                    return None
-                
-                    
-                invoice.balance = max(0, invoice_balance - amount_paid)
+                new_balance = cls.decrement_balance(session, amount_paid, invoice_id=invoice_id)
                 session.commit()
-
-                return invoice.balance
+                return new_balance
 
         except Exception as e:
             current_app.logger.error(
@@ -1696,6 +2039,28 @@ class TblImvoice(MISBaseModel):
                 return True
             return False
 
+    @classmethod
+    def clear_quickbooks_rows(cls, invoice_ids):
+        """Bulk version of ``update_invoice_quickbooks_row`` for deleted invoices"""
+        from application.utils.bulk_query import chunked
+        invoice_ids = list(invoice_ids)
+        if not invoice_ids:
+            return 0
+        updated = 0
+        with MISBaseModel.get_session() as session:
+            for batch in chunked(invoice_ids):
+                updated += session.query(cls).filter(cls.id.in_(batch)).update(
+                    {
+                        cls.quickbooks_id: None,
+                        cls.sync_token: None,
+                        cls.QuickBk_Status: None,
+                        cls.pushed_by: None,
+                        cls.pushed_date: None,
+                    },
+                    synchronize_session=False,
+                )
+        return updated
+
 
     
         
@@ -1716,14 +2081,17 @@ class TblImvoice(MISBaseModel):
         """
         try:
             with cls.get_session() as session:
-                invoice = session.query(cls).filter(cls.reference_number == reference_number).first()
-                if invoice:
-                    # The balance cannot be negative
-                    new_balance = max(0, (invoice.balance or invoice.dept) - amount_paid)
-                    invoice.balance = new_balance
-                    session.commit()
-                    return new_balance, invoice
-                return None, None
+                invoice_id = session.query(cls.id).filter(
+                    cls.reference_number == reference_number
+                ).order_by(cls.id.asc()).limit(1).scalar()
+                if invoice_id is None:
+                    return None, None
+
+                # The balance cannot be negative; the database clamps it at zero
+                new_balance = cls.decrement_balance(session, amount_paid, invoice_id=invoice_id)
+                invoice = session.query(cls).populate_existing().filter(cls.id == invoice_id).first()
+                session.commit()
+                return new_balance, invoice
         except Exception as e:
             from flask import current_app
             current_app.logger.error(f"Error updating invoice balance for reference {reference_number}: {str(e)}")
@@ -2210,14 +2578,12 @@ class TblIncomeCategory(MISBaseModel):
             TblIncomeCategory: Income category record or None if not found
         """
         try:
-            with MISBaseModel.get_session() as session:
-                cat_data_obj=session.query(TblIncomeCategory).filter(
-                    TblIncomeCategory.id == category_id,
-                    TblIncomeCategory.status_Id == 1
-                    ).first()
-                cat_data_dict=cat_data_obj.to_dict() if cat_data_obj else None
-                current_app.logger.info(f"Fetched category data for ID {category_id}: {cat_data_dict}")
-                return cat_data_dict
+            cat_data_obj = reference_cache.get(TblIncomeCategory, category_id)
+            if cat_data_obj and cat_data_obj.status_Id != 1:
+                cat_data_obj = None
+            cat_data_dict=cat_data_obj.to_dict() if cat_data_obj else None
+            current_app.logger.info(f"Fetched category data for ID {category_id}: {cat_data_dict}")
+            return cat_data_dict
         except Exception as e:
             current_app.logger.error(f"Error getting income category for ID {category_id}: {str(e)}")
             return None
@@ -2752,12 +3118,13 @@ class TblOnlineApplication(MISBaseModel):
             }
 
     def _get_enriched_campus_name(self):
-        """Get enriched campus name with fallback"""
+        """Get enriched campus name with fallback - uses prefetched data when available"""
         if not self.camp_id:
             return ''
         try:
-            from application.models.mis_models import TblCampus
-            campus = TblCampus.get_by_id(self.camp_id)
+            campus = cached_lookup(self, 'campus')
+            if not was_prefetched(self, 'campus'):
+                campus = reference_cache.get(TblCampus, self.camp_id)
             if campus:
                 return getattr(campus, 'camp_full_name', '') or getattr(campus, 'camp_short_name', '') or str(self.camp_id)
             return str(self.camp_id)
@@ -2765,12 +3132,13 @@ class TblOnlineApplication(MISBaseModel):
             return str(self.camp_id)
 
     def _get_enriched_intake_details(self):
-        """Get enriched intake details with fallback"""
+        """Get enriched intake details with fallback - uses prefetched data when available"""
         if not self.intake_id:
             return ''
         try:
-            from application.models.mis_models import TblIntake
-            intake = TblIntake.get_by_id(self.intake_id)
+            intake = cached_lookup(self, 'intake')
+            if not was_prefetched(self, 'intake'):
+                intake = reference_cache.get(TblIntake, self.intake_id)
             if intake:
                 return intake.to_dict()
                  #getattr(intake, 'intake_name', '') or getattr(intake, 'intake_details', '') or str(self.intake_id)
@@ -2779,12 +3147,13 @@ class TblOnlineApplication(MISBaseModel):
             return str(self.intake_id)
 
     def _get_enriched_program_name(self):
-        """Get enriched program name with fallback"""
+        """Get enriched program name with fallback - uses prefetched data when available"""
         if not self.opt_1:  # Primary option
             return ''
         try:
-            from application.models.mis_models import TblSpecialization
-            program = TblSpecialization.get_by_id(self.opt_1)
+            program = cached_lookup(self, 'specialization')
+            if not was_prefetched(self, 'specialization'):
+                program = reference_cache.get(TblSpecialization, self.opt_1)
             if program:
                 return getattr(program, 'splz_full_name', '') or getattr(program, 'splz_short_name', '') or str(self.opt_1)
             return str(self.opt_1)
@@ -2805,14 +3174,15 @@ class TblOnlineApplication(MISBaseModel):
                 if current_app:
                     current_app.logger.debug(f"Enriched program mode for applicant {self.appl_Id} (cached): {mode_name}")
                 return mode_name
+            if was_prefetched(self, 'program_mode'):
+                return str(self.prg_mode_id)
 
-            # Strategy 2: Fallback to database lookup (for non-batch scenarios)
-            from application.models.mis_models import TblProgramMode
-            mode = TblProgramMode.get_by_id(self.prg_mode_id)
+            # Strategy 2: Reference cache lookup (for non-batch scenarios)
+            mode = reference_cache.get(TblProgramMode, self.prg_mode_id)
             if mode:
                 mode_name = getattr(mode, 'prg_mode_full_name', '') or getattr(mode, 'prg_mode_short_name', '') or str(self.prg_mode_id)
                 if current_app:
-                    current_app.logger.debug(f"Enriched program mode for applicant {self.appl_Id} (db lookup): {mode_name}")
+                    current_app.logger.debug(f"Enriched program mode for applicant {self.appl_Id} (reference cache): {mode_name}")
                 return mode_name
             else:
                 if current_app:
@@ -2837,20 +3207,20 @@ class TblOnlineApplication(MISBaseModel):
                     current_app.logger.debug(f"Enriched country for applicant {self.appl_Id} (cached): {country_name}")
                 return country_name
 
-            # Strategy 2: Fallback to database lookup (for non-batch scenarios)
+            # Strategy 2: Reference cache lookup (for non-batch scenarios)
             if self.country_of_birth and str(self.country_of_birth).isdigit():
-                from application.models.mis_models import TblCountry
-                with self.get_session() as session:
-                    country = session.query(TblCountry).filter_by(cntr_id=int(self.country_of_birth)).first()
-                    if country:
-                        country_name = getattr(country, 'cntr_name', '') or getattr(country, 'cntr_nationality', '') or str(self.country_of_birth)
-                        if current_app:
-                            current_app.logger.debug(f"Enriched country for applicant {self.appl_Id} (db lookup): {country_name}")
-                        return country_name
-                    else:
-                        if current_app:
-                            current_app.logger.warning(f"Country ID {self.country_of_birth} not found for applicant {self.appl_Id}")
-                        return f"Country ID: {self.country_of_birth}"
+                if was_prefetched(self, 'country'):
+                    return f"Country ID: {self.country_of_birth}"
+                country = reference_cache.get(TblCountry, int(self.country_of_birth))
+                if country:
+                    country_name = getattr(country, 'cntr_name', '') or getattr(country, 'cntr_nationality', '') or str(self.country_of_birth)
+                    if current_app:
+                        current_app.logger.debug(f"Enriched country for applicant {self.appl_Id} (reference cache): {country_name}")
+                    return country_name
+                else:
+                    if current_app:
+                        current_app.logger.warning(f"Country ID {self.country_of_birth} not found for applicant {self.appl_Id}")
+                    return f"Country ID: {self.country_of_birth}"
 
             # Strategy 3: Return country_of_birth as-is if it's already a name
             if self.country_of_birth and not str(self.country_of_birth).isdigit():
@@ -3400,12 +3770,16 @@ class TblPersonalUg(MISBaseModel):
                         current_app.logger.debug(f"Level ID for student {self.reg_no} (cached reg program): {reg_program.level_id}")
                     return str(reg_program.level_id)
 
+            # Prefetched without a registration program: nothing left to look up
+            if was_prefetched(self, 'reg_program'):
+                return ''
+
             # Strategy 3: Fallback to database lookup (for non-batch scenarios)
-            from application.models.mis_models import TblRegisterProgramUg, TblLevel
+            from application.models.mis_models import TblRegisterProgramUg
             with self.get_session() as session:
                 reg_program = session.query(TblRegisterProgramUg).filter_by(reg_no=self.reg_no).first()
                 if reg_program and reg_program.level_id:
-                    level = session.query(TblLevel).filter_by(level_id=reg_program.level_id).first()
+                    level = reference_cache.get(TblLevel, reg_program.level_id)
                     if level:
                         level_name = getattr(level, 'level_full_name', '') or getattr(level, 'level_short_name', '') or str(reg_program.level_id)
                         if current_app:
@@ -3446,12 +3820,16 @@ class TblPersonalUg(MISBaseModel):
                         current_app.logger.debug(f"Campus ID for student {self.reg_no} (cached reg program): {reg_program.camp_id}")
                     return str(reg_program.camp_id)
 
+            # Prefetched without a registration program: nothing left to look up
+            if was_prefetched(self, 'reg_program'):
+                return ''
+
             # Strategy 3: Fallback to database lookup (for non-batch scenarios)
-            from application.models.mis_models import TblRegisterProgramUg, TblCampus
+            from application.models.mis_models import TblRegisterProgramUg
             with self.get_session() as session:
                 reg_program = session.query(TblRegisterProgramUg).filter_by(reg_no=self.reg_no).first()
                 if reg_program and hasattr(reg_program, 'camp_id') and reg_program.camp_id:
-                    campus = session.query(TblCampus).filter_by(camp_id=reg_program.camp_id).first()
+                    campus = reference_cache.get(TblCampus, reg_program.camp_id)
                     if campus:
                         campus_name = getattr(campus, 'camp_full_name', '') or getattr(campus, 'camp_short_name', '') or str(reg_program.camp_id)
                         if current_app:
@@ -3492,12 +3870,16 @@ class TblPersonalUg(MISBaseModel):
                         current_app.logger.debug(f"Program ID for student {self.reg_no} (cached reg program): {reg_program.splz_id}")
                     return str(reg_program.splz_id)
 
+            # Prefetched without a registration program: nothing left to look up
+            if was_prefetched(self, 'reg_program'):
+                return ''
+
             # Strategy 3: Fallback to database lookup (for non-batch scenarios)
-            from application.models.mis_models import TblRegisterProgramUg, TblSpecialization
+            from application.models.mis_models import TblRegisterProgramUg
             with self.get_session() as session:
                 reg_program = session.query(TblRegisterProgramUg).filter_by(reg_no=self.reg_no).first()
                 if reg_program and reg_program.splz_id:
-                    program = session.query(TblSpecialization).filter_by(splz_id=reg_program.splz_id).first()
+                    program = reference_cache.get(TblSpecialization, reg_program.splz_id)
                     if program:
                         program_name = getattr(program, 'splz_full_name', '') or getattr(program, 'splz_short_name', '') or str(reg_program.splz_id)
                         if current_app:
@@ -3538,12 +3920,16 @@ class TblPersonalUg(MISBaseModel):
                         current_app.logger.debug(f"Intake ID for student {self.reg_no} (cached reg program): {reg_program.intake_id}")
                     return str(reg_program.intake_id)
 
+            # Prefetched without a registration program: nothing left to look up
+            if was_prefetched(self, 'reg_program'):
+                return ''
+
             # Strategy 3: Fallback to database lookup (for non-batch scenarios)
-            from application.models.mis_models import TblRegisterProgramUg, TblIntake
+            from application.models.mis_models import TblRegisterProgramUg
             with self.get_session() as session:
                 reg_program = session.query(TblRegisterProgramUg).filter_by(reg_no=self.reg_no).first()
                 if reg_program and reg_program.intake_id:
-                    intake = session.query(TblIntake).filter_by(intake_id=reg_program.intake_id).first()
+                    intake = reference_cache.get(TblIntake, reg_program.intake_id)
                     if intake:
                         intake_details = f"{intake.intake_month} {intake.intake_no}" if intake.intake_month else str(reg_program.intake_id)
                         if current_app:
@@ -3584,32 +3970,32 @@ class TblPersonalUg(MISBaseModel):
                         current_app.logger.debug(f"Enriched country for student {self.reg_no} via relationship: {country_name}")
                     return country_name
 
-            # Strategy 3: Fallback to database lookup (for non-batch scenarios)
-            from application.models.mis_models import TblCountry
+            # Strategy 3: Reference cache lookup (for non-batch scenarios)
+            prefetched = was_prefetched(self, 'country')
 
             # Try cntr_id field first
-            if self.cntr_id:
-                with self.get_session() as session:
-                    country = session.query(TblCountry).filter_by(cntr_id=self.cntr_id).first()
-                    if country:
-                        country_name = getattr(country, 'cntr_name', '') or getattr(country, 'cntr_nationality', '') or str(self.cntr_id)
-                        if current_app:
-                            current_app.logger.debug(f"Enriched country for student {self.reg_no} via cntr_id (db lookup): {country_name}")
-                        return country_name
+            if self.cntr_id and not prefetched:
+                country = reference_cache.get(TblCountry, self.cntr_id)
+                if country:
+                    country_name = getattr(country, 'cntr_name', '') or getattr(country, 'cntr_nationality', '') or str(self.cntr_id)
+                    if current_app:
+                        current_app.logger.debug(f"Enriched country for student {self.reg_no} via cntr_id (reference cache): {country_name}")
+                    return country_name
 
             # Try nationality field as country ID
             if self.nationality and self.nationality.isdigit():
-                with self.get_session() as session:
-                    country = session.query(TblCountry).filter_by(cntr_id=int(self.nationality)).first()
-                    if country:
-                        country_name = getattr(country, 'cntr_name', '') or getattr(country, 'cntr_nationality', '') or self.nationality
-                        if current_app:
-                            current_app.logger.debug(f"Enriched country for student {self.reg_no} via nationality field (db lookup): {country_name}")
-                        return country_name
-                    else:
-                        if current_app:
-                            current_app.logger.warning(f"Country ID {self.nationality} not found for student {self.reg_no}")
-                        return f"Country ID: {self.nationality}"
+                if prefetched:
+                    return f"Country ID: {self.nationality}"
+                country = reference_cache.get(TblCountry, int(self.nationality))
+                if country:
+                    country_name = getattr(country, 'cntr_name', '') or getattr(country, 'cntr_nationality', '') or self.nationality
+                    if current_app:
+                        current_app.logger.debug(f"Enriched country for student {self.reg_no} via nationality field (reference cache): {country_name}")
+                    return country_name
+                else:
+                    if current_app:
+                        current_app.logger.warning(f"Country ID {self.nationality} not found for student {self.reg_no}")
+                    return f"Country ID: {self.nationality}"
 
             # Return nationality as-is if it's already a name
             if self.nationality and not self.nationality.isdigit():
@@ -4537,4 +4923,55 @@ class TblProgramType(MISBaseModel):
             'prg_type_id': self.prg_type_id,
             'prg_type_full_name': self.prg_type_full_name,
             'prg_type_short_name': self.prg_type_short_name
-        }
\ No newline at end of file
+        }
+
+# ----------------------------------------------------------------------
+# Lookup relations prefetched for customer enrichment
+# ----------------------------------------------------------------------
+
+def _reg_program_key(column):
+    """Keys read from the student's prefetched registration program"""
+    def keys(student):
+        reg_program = getattr(student, '_cached_reg_program', None)
+        return (getattr(reg_program, column),) if reg_program else ()
+    return keys
+
+
+register_lookups(
+    TblOnlineApplication,
+    LookupRelation('country', TblCountry, 'cntr_id', lambda a: (int_key(a.country_of_birth),)),
+    LookupRelation('program_mode', TblProgramMode, 'prg_mode_id', lambda a: (a.prg_mode_id,)),
+    LookupRelation('campus', TblCampus, 'camp_id', lambda a: (int_key(a.camp_id),)),
+    LookupRelation('intake', TblIntake, 'intake_id', lambda a: (a.intake_id,)),
+    LookupRelation('specialization', TblSpecialization, 'splz_id', lambda a: (int_key(a.opt_1),)),
+)
+
+register_lookups(
+    TblPersonalUg,
+    LookupRelation('country', TblCountry, 'cntr_id', lambda s: (s.cntr_id, int_key(s.nationality))),
+    LookupRelation('reg_program', TblRegisterProgramUg, 'reg_no', lambda s: (s.reg_no,)),
+    LookupRelation('level', TblLevel, 'level_id', _reg_program_key('level_id')),
+    LookupRelation('campus', TblCampus, 'camp_id', _reg_program_key('camp_id')),
+    LookupRelation('specialization', TblSpecialization, 'splz_id', _reg_program_key('splz_id')),
+    LookupRelation('intake', TblIntake, 'intake_id', _reg_program_key('intake_id')),
+)
+
+# ----------------------------------------------------------------------
+# Reference tables served from the in-process cache
+# ----------------------------------------------------------------------
+
+reference_cache.register(TblCountry, 'cntr_id')
+reference_cache.register(TblCampus, 'camp_id', markers=(checksum('quickbooks_id', 'camp_active'),))
+reference_cache.register(TblLevel, 'level_id')
+reference_cache.register(TblIntake, 'intake_id')
+reference_cache.register(TblSpecialization, 'splz_id')
+reference_cache.register(TblProgramMode, 'prg_mode_id')
+reference_cache.register(TblBank, 'bank_id', markers=(
+    checksum('qk_id', 'status'), lambda m: func.max(m.pushed_date),
+))
+reference_cache.register(TblIncomeCategory, 'id', markers=(
+    checksum('QuickBk_ctgId', 'income_account_qb', 'status_Id'), lambda m: func.max(m.pushed_date),
+))
+reference_cache.register(Province, 'province_id')
+reference_cache.register(TblDistrict, 'district_id')
+reference_cache.register(TblSector, 'sector_id')
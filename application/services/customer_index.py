@@ -0,0 +1,189 @@
+import json
+import os
+import time
+
+from flask import current_app
+
+from application.services.qb_batch import QB_QUERY_MAX_RESULTS
+from application.utils.bulk_query import chunked
+from application.utils.redis_pool import redis_client
+
+CUSTOMER_PAGE_SIZE = QB_QUERY_MAX_RESULTS
+
+# Only the columns the index keeps, in a stable order across pages
+CUSTOMER_INDEX_FIELDS = ("Id", "DisplayName", "SyncToken")
+
+# A full reload is done when the index is older than this
+CUSTOMER_INDEX_MAX_AGE_SECONDS = int(os.getenv("CUSTOMER_INDEX_MAX_AGE_SECONDS", 6 * 3600))
+
+INDEX_KEY = "qb_customer_index:names"
+LOADED_AT_KEY = "qb_customer_index:loaded_at"
+LOADING_KEY = f"{INDEX_KEY}:loading"
+PENDING_KEY = "qb_customer_index:pending"
+RELOADING_KEY = "qb_customer_index:reloading"
+
+# A crashed load stops capturing record() writes after this
+RELOADING_TTL_SECONDS = 3600
+
+# KEYS[1] index; KEYS[2] pending; KEYS[3] reloading flag; ARGV name, entry pairs
+RECORD_SCRIPT = """
+local reloading = redis.call('EXISTS', KEYS[3]) == 1
+for i = 1, #ARGV, 2 do
+    redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+    if reloading then
+        redis.call('HSET', KEYS[2], ARGV[i], ARGV[i + 1])
+    end
+end
+return 0
+"""
+
+# KEYS[1] loading; KEYS[2] index; KEYS[3] pending; KEYS[4] reloading flag;
+# KEYS[5] loaded_at; ARGV[1] load time
+SWAP_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('RENAME', KEYS[1], KEYS[2])
+else
+    redis.call('DEL', KEYS[2])
+end
+local pending = redis.call('HGETALL', KEYS[3])
+for i = 1, #pending, 2 do
+    redis.call('HSET', KEYS[2], pending[i], pending[i + 1])
+end
+redis.call('DEL', KEYS[3], KEYS[4])
+redis.call('SET', KEYS[5], ARGV[1])
+return #pending / 2
+"""
+
+
+class CustomerNameIndex:
+    """
+    Redis hash of QuickBooks customers by DisplayName -> Id and SyncToken.
+
+    QuickBooks rejects a create whose DisplayName is already used ("Duplicate
+    Name Exists"). Customer sync looks names up here first and turns those
+    creates into a link plus sparse update of the existing customer.
+
+    The index is loaded whole with paginated ``get_customers`` queries
+    (inactive customers included, as their names are still taken) and
+    swapped in atomically; ``record()`` writes made while a load runs are
+    kept aside and re-applied over the loaded names. It is reloaded when
+    older than ``CUSTOMER_INDEX_MAX_AGE_SECONDS`` and every successful sync
+    writes its customer back, so it stays current between reloads. Names are
+    compared case-insensitively with whitespace collapsed, as QuickBooks does.
+    """
+
+    def __init__(self, client=None, max_age=CUSTOMER_INDEX_MAX_AGE_SECONDS, logger=None):
+        self.client = client or redis_client
+        self.max_age = max_age
+        self.logger = logger or current_app.logger
+        self._record = self.client.register_script(RECORD_SCRIPT)
+        self._swap = self.client.register_script(SWAP_SCRIPT)
+
+    @staticmethod
+    def normalize(name):
+        return " ".join(str(name).split()).lower() if name else None
+
+    @staticmethod
+    def _entry(quickbooks_id, sync_token):
+        return json.dumps({"id": str(quickbooks_id), "sync_token": str(sync_token) if sync_token is not None else None})
+
+    def load(self, qb_service):
+        """
+        Rebuild the index from every QuickBooks customer.
+
+        Returns:
+            int: Number of indexed names
+        """
+        started = time.monotonic()
+        pipe = self.client.pipeline()
+        pipe.delete(LOADING_KEY, PENDING_KEY)
+        pipe.set(RELOADING_KEY, 1, ex=RELOADING_TTL_SECONDS)
+        pipe.execute()
+
+        count = 0
+        position = 1
+        while True:
+            response = qb_service.get_customers(
+                qb_service.realm_id, start_position=position,
+                max_results=CUSTOMER_PAGE_SIZE, include_inactive=True,
+                fields=CUSTOMER_INDEX_FIELDS, order_by="Id"
+            )
+            customers = response.get("QueryResponse", {}).get("Customer", [])
+            entries = {
+                self.normalize(c["DisplayName"]): self._entry(c["Id"], c.get("SyncToken"))
+                for c in customers if c.get("DisplayName")
+            }
+            if entries:
+                self.client.hset(LOADING_KEY, mapping=entries)
+                count += len(entries)
+            if len(customers) < CUSTOMER_PAGE_SIZE:
+                break
+            position += CUSTOMER_PAGE_SIZE
+
+        self._swap(keys=[LOADING_KEY, INDEX_KEY, PENDING_KEY, RELOADING_KEY, LOADED_AT_KEY], args=[time.time()])
+
+        self.logger.info(f"QuickBooks customer index loaded: {count} names in {time.monotonic() - started:.1f}s")
+        return count
+
+    def age(self):
+        """Seconds since the last load, or None when never loaded"""
+        loaded_at = self.client.get(LOADED_AT_KEY)
+        return time.time() - float(loaded_at) if loaded_at else None
+
+    def ensure_fresh(self, qb_service):
+        """
+        Reload the index when missing or older than ``max_age``.
+
+        Failures are logged, not raised: without the index, sync falls back
+        to plain creates.
+
+        Returns:
+            bool: True when the index is usable
+        """
+        try:
+            age = self.age()
+            if age is None or age > self.max_age:
+                self.load(qb_service)
+            return True
+        except Exception as e:
+            self.logger.warning(f"QuickBooks customer index unavailable: {e}")
+            return False
+
+    def lookup(self, names):
+        """
+        Existing QuickBooks customers for the given DisplayNames.
+
+        Returns:
+            dict: {name: {"id", "sync_token"}} for the names in QuickBooks
+        """
+        names = [name for name in dict.fromkeys(names) if name]
+        found = {}
+        for batch in chunked(names, CUSTOMER_PAGE_SIZE):
+            values = self.client.hmget(INDEX_KEY, [self.normalize(name) for name in batch])
+            found.update({name: json.loads(value) for name, value in zip(batch, values) if value})
+        return found
+
+    def record(self, customers):
+        """
+        Add or refresh entries after customers are created or updated.
+
+        Args:
+            customers (dict): {display_name: (quickbooks_id, sync_token)}
+        """
+        entries = {
+            self.normalize(name): self._entry(quickbooks_id, sync_token)
+            for name, (quickbooks_id, sync_token) in customers.items() if name and quickbooks_id
+        }
+        if entries:
+            self._record(
+                keys=[INDEX_KEY, PENDING_KEY, RELOADING_KEY],
+                args=[item for pair in entries.items() for item in pair],
+            )
+
+    def stats(self):
+        age = self.age()
+        return {
+            "names": self.client.hlen(INDEX_KEY),
+            "age_seconds": round(age) if age is not None else None,
+            "max_age_seconds": self.max_age,
+        }
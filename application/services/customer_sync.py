@@ -22,7 +22,10 @@ from sqlalchemy.orm import joinedload
 from application.models.mis_models import TblOnlineApplication, TblPersonalUg
 from application.models.central_models import QuickBooksConfig, QuickbooksAuditLog
 from application.services.quickbooks import QuickBooks
+from application.services.customer_upsert import CustomerUpsert, CustomerUpsertEngine, FAILED
+from application.services.customer_index import CustomerNameIndex
 from application.utils.database import db_manager
+from application.utils.enrichment import prefetch_lookups
 from application import db
 from application.helpers.json_field_helper import JSONFieldHelper
 from application.helpers.json_encoder import EnhancedJSONEncoder
@@ -195,47 +198,10 @@ class CustomerSyncService:
                 if not applicants:
                     return applicants
 
-                # Step 2: Batch load countries to avoid N+1 queries
-                country_ids = []
-                for app in applicants:
-                    if app.country_of_birth and str(app.country_of_birth).isdigit():
-                        country_ids.append(int(app.country_of_birth))
-
-                country_map = {}
-                if country_ids:
-                    unique_country_ids = list(set(country_ids))
-                    from application.models.mis_models import TblCountry
-                    countries = session.query(TblCountry).filter(TblCountry.cntr_id.in_(unique_country_ids)).all()
-                    country_map = {c.cntr_id: c for c in countries}
-                    logger.debug(f"Batch loaded {len(countries)} countries for {len(unique_country_ids)} unique IDs")
-
-                # Step 3: Batch load program modes to avoid N+1 queries
-                mode_ids = []
-                for app in applicants:
-                    if app.prg_mode_id:
-                        mode_ids.append(app.prg_mode_id)
-
-                mode_map = {}
-                if mode_ids:
-                    unique_mode_ids = list(set(mode_ids))
-                    from application.models.mis_models import TblProgramMode
-                    modes = session.query(TblProgramMode).filter(TblProgramMode.prg_mode_id.in_(unique_mode_ids)).all()
-                    mode_map = {m.prg_mode_id: m for m in modes}
-                    logger.debug(f"Batch loaded {len(modes)} program modes for {len(unique_mode_ids)} unique IDs")
-
-                # Step 4: Attach pre-loaded data to applicants for efficient access
-                for app in applicants:
-                    # Attach country data
-                    if app.country_of_birth and str(app.country_of_birth).isdigit():
-                        country_id = int(app.country_of_birth)
-                        app._cached_country = country_map.get(country_id)
-                    else:
-                        app._cached_country = None
-
-                    # Attach program mode data
-                    app._cached_program_mode = mode_map.get(app.prg_mode_id) if app.prg_mode_id else None
+                # Step 2: One query per registered lookup table (country, mode, campus, intake, program)
+                prefetch_lookups(session, applicants)
 
-                logger.info(f"Optimized batch loading completed: {len(applicants)} applicants, {len(country_map)} countries, {len(mode_map)} modes")
+                logger.info(f"Optimized batch loading completed: {len(applicants)} applicants with prefetched lookups")
                 return applicants
             
         except Exception as e:
@@ -279,109 +245,11 @@ class CustomerSyncService:
                 if not students:
                     return students
 
-                # Step 2: Batch load countries for nationality enrichment
-                country_ids = []
-                for student in students:
-                    if student.nationality and student.nationality.isdigit():
-                        country_ids.append(int(student.nationality))
-                    if student.cntr_id:
-                        country_ids.append(student.cntr_id)
-
-                country_map = {}
-                if country_ids:
-                    unique_country_ids = list(set(country_ids))
-                    from application.models.mis_models import TblCountry
-                    countries = session.query(TblCountry).filter(TblCountry.cntr_id.in_(unique_country_ids)).all()
-                    country_map = {c.cntr_id: c for c in countries}
-                    logger.debug(f"Batch loaded {len(countries)} countries for {len(unique_country_ids)} unique IDs")
-
-                # Step 3: Batch load registration program data for enrichment
-                reg_nos = [s.reg_no for s in students if s.reg_no]
-                reg_program_map = {}
-                if reg_nos:
-                    from application.models.mis_models import TblRegisterProgramUg
-                    reg_programs = session.query(TblRegisterProgramUg).filter(TblRegisterProgramUg.reg_no.in_(reg_nos)).all()
-                    reg_program_map = {rp.reg_no: rp for rp in reg_programs}
-                    logger.debug(f"Batch loaded {len(reg_programs)} registration programs for {len(reg_nos)} students")
-
-                # Step 4: Batch load related lookup data
-                level_ids = []
-                campus_ids = []
-                specialization_ids = []
-                intake_ids = []
-
-                for reg_program in reg_programs:
-                    if reg_program.level_id:
-                        level_ids.append(reg_program.level_id)
-                    if reg_program.camp_id:
-                        campus_ids.append(reg_program.camp_id)
-                    if reg_program.splz_id:
-                        specialization_ids.append(reg_program.splz_id)
-                    if reg_program.intake_id:
-                        intake_ids.append(reg_program.intake_id)
-
-                # Batch load levels
-                level_map = {}
-                if level_ids:
-                    unique_level_ids = list(set(level_ids))
-                    from application.models.mis_models import TblLevel
-                    levels = session.query(TblLevel).filter(TblLevel.level_id.in_(unique_level_ids)).all()
-                    level_map = {l.level_id: l for l in levels}
-                    logger.debug(f"Batch loaded {len(levels)} levels")
-
-                # Batch load campuses
-                campus_map = {}
-                if campus_ids:
-                    unique_campus_ids = list(set(campus_ids))
-                    from application.models.mis_models import TblCampus
-                    campuses = session.query(TblCampus).filter(TblCampus.camp_id.in_(unique_campus_ids)).all()
-                    campus_map = {c.camp_id: c for c in campuses}
-                    logger.debug(f"Batch loaded {len(campuses)} campuses")
-
-                # Batch load specializations
-                specialization_map = {}
-                if specialization_ids:
-                    unique_spec_ids = list(set(specialization_ids))
-                    from application.models.mis_models import TblSpecialization
-                    specializations = session.query(TblSpecialization).filter(TblSpecialization.splz_id.in_(unique_spec_ids)).all()
-                    specialization_map = {s.splz_id: s for s in specializations}
-                    logger.debug(f"Batch loaded {len(specializations)} specializations")
-
-                # Batch load intakes
-                intake_map = {}
-                if intake_ids:
-                    unique_intake_ids = list(set(intake_ids))
-                    from application.models.mis_models import TblIntake
-                    intakes = session.query(TblIntake).filter(TblIntake.intake_id.in_(unique_intake_ids)).all()
-                    intake_map = {i.intake_id: i for i in intakes}
-                    logger.debug(f"Batch loaded {len(intakes)} intakes")
-
-                # Step 5: Attach cached data to students
-                for student in students:
-                    # Attach country data
-                    student._cached_country = None
-                    if student.cntr_id and student.cntr_id in country_map:
-                        student._cached_country = country_map[student.cntr_id]
-                    elif student.nationality and student.nationality.isdigit():
-                        country_id = int(student.nationality)
-                        student._cached_country = country_map.get(country_id)
-
-                    # Attach registration program data
-                    reg_program = reg_program_map.get(student.reg_no)
-                    student._cached_reg_program = reg_program
-
-                    if reg_program:
-                        student._cached_level = level_map.get(reg_program.level_id)
-                        student._cached_campus = campus_map.get(reg_program.camp_id)
-                        student._cached_specialization = specialization_map.get(reg_program.splz_id)
-                        student._cached_intake = intake_map.get(reg_program.intake_id)
-                    else:
-                        student._cached_level = None
-                        student._cached_campus = None
-                        student._cached_specialization = None
-                        student._cached_intake = None
+                # Step 2: One query per registered lookup table (country, registration
+                # program, then level, campus, specialization and intake through it)
+                prefetch_lookups(session, students)
 
-                logger.info(f"Optimized batch loading completed: {len(students)} students with cached enrichment data")
+                logger.info(f"Optimized batch loading completed: {len(students)} students with prefetched lookups")
                 return students
                 
         except Exception as e:
@@ -702,12 +570,18 @@ class CustomerSyncService:
             
             # Get QuickBooks service
             qb_service = self._get_qb_service()
+            name_index = CustomerNameIndex()
+            existing = self._existing_customers(name_index, [student.get('reg_no')]).get(student.get('reg_no'))
 
-            # Map student data
-            qb_customer_data = self.map_student_to_quickbooks_customer(student)
+            if existing:
+                # Already in QuickBooks under this reg_no: link and update instead of a failing create
+                response = self._upsert_one(self._student_upsert(f"student-{student.get('per_id_ug')}", student, existing))
+            else:
+                # Map student data
+                qb_customer_data = self.map_student_to_quickbooks_customer(student)
 
-            # Create customer in QuickBooks
-            response = qb_service.create_customer(qb_service.realm_id, qb_customer_data)
+                # Create customer in QuickBooks
+                response = qb_service.create_customer(qb_service.realm_id, qb_customer_data)
             current_app.logger.info(f"QuickBooks response for student {student.get('per_id_ug')}: {response}")
 
             if 'Customer' in response:
@@ -720,6 +594,7 @@ class CustomerSyncService:
                     sync_token=response['Customer'].get('SyncToken'),
 
                 )
+                self._record_customers(name_index, {student.get('reg_no'): (qb_customer_id, response['Customer'].get('SyncToken'))})
 
                 # Log successful sync
                 self._log_customer_sync_audit(student.get('per_id_ug'), 'Student', 'SUCCESS', f"Synced to QuickBooks ID: {qb_customer_id}")
@@ -837,13 +712,87 @@ class CustomerSyncService:
             current_app.logger.error(f"QuickBooks batch API call failed: {e}")
             raise e
 
+    def _get_upsert_engine(self) -> CustomerUpsertEngine:
+        """Batch create/update engine sharing this service's QuickBooks client"""
+        return CustomerUpsertEngine(qb_service=self._get_qb_service())
+
+    def _existing_customers(self, name_index: Optional[CustomerNameIndex], display_names: List[str]) -> Dict:
+        """Customer index hits for the given DisplayNames (empty when the index is unavailable)"""
+        if name_index is None or not display_names:
+            return {}
+        try:
+            existing = name_index.lookup(display_names)
+        except Exception as e:
+            current_app.logger.warning(f"QuickBooks customer index lookup failed: {e}")
+            return {}
+        if existing:
+            current_app.logger.info(f"Linking {len(existing)} customers already in QuickBooks by DisplayName")
+        return existing
+
+    def _record_customers(self, name_index: Optional[CustomerNameIndex], customers: Dict):
+        """Write synced customers back to the index so it stays current between reloads"""
+        if name_index is None or not customers:
+            return
+        try:
+            name_index.record(customers)
+        except Exception as e:
+            current_app.logger.warning(f"QuickBooks customer index not updated: {e}")
+
+    def _upsert_one(self, record: CustomerUpsert) -> Dict:
+        """Push one record through the batch engine; returns the QuickBooks item response"""
+        outcome = self._get_upsert_engine().upsert([record])[record.key]
+        return outcome.get('response') or {"Fault": {"Error": [{"Detail": outcome.get('error')}]}}
+
+    def _get_name_index(self) -> Optional[CustomerNameIndex]:
+        """DisplayName index of QuickBooks customers, reloaded when stale; None if unavailable"""
+        name_index = CustomerNameIndex()
+        return name_index if name_index.ensure_fresh(self._get_qb_service()) else None
+
+    def _student_upsert(self, key: str, student_data: Dict, existing: Optional[Dict] = None) -> CustomerUpsert:
+        """
+        Create payload for a new student, sparse update for one already in QuickBooks.
+        ``existing`` is a customer index hit for an unlinked student's DisplayName.
+        """
+        quickbooks_id = student_data.get('qk_id') or None
+        sync_token = student_data.get('sync_token') or None
+        if not quickbooks_id and existing:
+            quickbooks_id, sync_token = existing['id'], existing.get('sync_token')
+        if not quickbooks_id:
+            return CustomerUpsert(key=key, customer=self.map_student_to_quickbooks_customer(student_data))
+        return CustomerUpsert(
+            key=key,
+            customer=self.map_student_to_quickbooks_customer_update(student_data, quickbooks_id, sparse=True, SyncToken=sync_token),
+            quickbooks_id=quickbooks_id,
+            sync_token=sync_token
+        )
+
+    def _applicant_upsert(self, key: str, applicant_data: Dict, existing: Optional[Dict] = None) -> CustomerUpsert:
+        """
+        Create payload for a new applicant, sparse update for one already in QuickBooks.
+        ``existing`` is a customer index hit for an unlinked applicant's DisplayName.
+        """
+        quickbooks_id = applicant_data.get('quickbooks_id') or None
+        sync_token = applicant_data.get('sync_token') or None
+        if not quickbooks_id and existing:
+            quickbooks_id, sync_token = existing['id'], existing.get('sync_token')
+        if not quickbooks_id:
+            return CustomerUpsert(key=key, customer=self.map_applicant_to_quickbooks_customer(applicant_data))
+        return CustomerUpsert(
+            key=key,
+            customer=self.map_applicant_to_quickbooks_customer_update(applicant_data, quickbooks_id, sparse=True, SyncToken=sync_token),
+            quickbooks_id=quickbooks_id,
+            sync_token=sync_token
+        )
+
     def sync_all_unsynchronized_students_in_batches(self, batch_size: int = 20) -> Dict:
         """
-        Fetches unsynchronized students in batches, maps their data to QuickBooks
-        customer format, and sends them for batch creation/update in QuickBooks.
+        Fetches unsynchronized students in batches and upserts them in QuickBooks:
+        students without a QuickBooks id are created, the others sparse-updated,
+        both packed into the same batch requests (see CustomerUpsertEngine).
         Updates sync status and logs audit trails for each student.
         """
-        realm_id = self._get_qb_service().realm_id  # Ensure qb_service is initialized
+        upsert_engine = self._get_upsert_engine()
+        name_index = self._get_name_index()
 
         total_processed = 0
         total_succeeded = 0
@@ -860,88 +809,69 @@ class CustomerSyncService:
 
             current_app.logger.info(f"Processing batch of {len(students_batch)} unsynchronized students (offset: {offset})")
 
-            batch_operations = []
             student_per_id_map = {}  # To map bId back to student for status update
 
-            # 2. Prepare Batch Requests
-            for i, student_orm in enumerate(students_batch):
+            # 2. Prepare create/update records
+            for student_orm in students_batch:
                 # Convert ORM object to dictionary for consistent access
                 student_data = student_orm.to_dict_for_quickbooks()
-                
                 per_id_ug = student_data.get('per_id_ug')
-                reg_no = student_data.get('reg_no')
-                
+
                 # Mark as IN_PROGRESS immediately to prevent reprocessing by other tasks
                 self._update_student_sync_status(per_id_ug, CustomerSyncStatus.IN_PROGRESS.value)
 
-                qb_customer_data = self.map_student_to_quickbooks_customer(student_data)
-                
-                # Assign a unique bId for each operation in the batch
-                # Use per_id_ug as bId or a combination for unique identification
                 bId = f"student-{per_id_ug}"
                 student_per_id_map[bId] = student_data # Store the dictionary, not the ORM object
 
-                batch_operations.append({
-                    "operation": "create",  # Assuming new customer creation. Adjust for update if needed.
-                    "bId": bId,
-                    "Customer": qb_customer_data
-                })
-
-            batch_payload = {
-                "BatchItemRequest": batch_operations
-            }
+            # Students already in QuickBooks under their reg_no are linked instead of failing as duplicates
+            existing = self._existing_customers(
+                name_index, [data.get('reg_no') for data in student_per_id_map.values() if not data.get('qk_id')]
+            )
+            records = [
+                self._student_upsert(bId, data, existing.get(data.get('reg_no')))
+                for bId, data in student_per_id_map.items()
+            ]
 
             try:
-                # 3. Execute Batch Request
-                quickbooks_batch_response = self._get_qb_service().make_batch_request(realm_id, batch_payload)
-                current_app.logger.info(f"QuickBooks batch response: {quickbooks_batch_response}")
-
-                # 4. Process Batch Response
-                for item_response in quickbooks_batch_response.get("BatchItemResponse", []):
-                    bId = item_response.get("bId")
-                    student_data = student_per_id_map.get(bId)  # Retrieve student dictionary
-
-                    if not student_data:
-                        current_app.logger.warning(f"Student with bId {bId} not found in map. Skipping status update.")
-                        continue
-                    
+                # 3. Execute batch requests (stale SyncTokens are refetched and retried)
+                outcomes = upsert_engine.upsert(records)
+
+                # 4. Process outcomes
+                synced_names = {}
+                for bId, student_data in student_per_id_map.items():
+                    outcome = outcomes.get(bId, {"status": FAILED, "error": "No batch response"})
                     per_id_ug = student_data.get('per_id_ug')
                     reg_no = student_data.get('reg_no')
 
-                    if "Customer" in item_response and item_response['Customer'].get('Id'):
-                        # Success
-                        quickbooks_id = item_response['Customer']['Id']
-                        self._update_student_sync_status(per_id_ug, CustomerSyncStatus.SYNCED.value, quickbooks_id=quickbooks_id, sync_token=item_response['Customer'].get('SyncToken'))
-                        self._log_customer_sync_audit(per_id_ug, 'Student', 'SUCCESS', f"Synced to QuickBooks ID: {quickbooks_id}")
+                    if outcome["status"] != FAILED:
+                        quickbooks_id = outcome["quickbooks_id"]
+                        self._update_student_sync_status(per_id_ug, CustomerSyncStatus.SYNCED.value, quickbooks_id=quickbooks_id, sync_token=outcome.get('sync_token'))
+                        synced_names[reg_no] = (quickbooks_id, outcome.get('sync_token'))
+                        self._log_customer_sync_audit(per_id_ug, 'Student', 'SUCCESS', f"Synced ({outcome['status']}) to QuickBooks ID: {quickbooks_id}")
                         all_results.append(CustomerSyncResult(
                             customer_id=reg_no, customer_type='Student', success=True, quickbooks_id=quickbooks_id,
-                            details=item_response
+                            details=outcome.get('response')
                         ))
                         total_succeeded += 1
                     else:
-                        # Failure
-                        error_detail = "Unknown error during batch sync."
-                        if "Fault" in item_response and "Error" in item_response['Fault']:
-                            error_detail = item_response['Fault']['Error'][0].get('Detail', error_detail)
-                        
-                        # Log the full error response for debugging
-                        current_app.logger.error(f"Failed to sync student {reg_no} (bId: {bId}). Error: {error_detail}. Full response: {item_response}")
+                        error_detail = outcome.get('error') or "Unknown error during batch sync."
+                        current_app.logger.error(f"Failed to sync student {reg_no} (bId: {bId}). Error: {error_detail}. Full response: {outcome.get('response')}")
 
                         self._update_student_sync_status(per_id_ug, CustomerSyncStatus.FAILED.value)
                         self._log_customer_sync_audit(per_id_ug, 'Student', 'ERROR', f"Batch sync failed: {error_detail}")
                         all_results.append(CustomerSyncResult(
                             customer_id=reg_no, customer_type='Student', success=False, error_message=error_detail,
-                            details=item_response
+                            details=outcome.get('response')
                         ))
                         total_failed += 1
+                self._record_customers(name_index, synced_names)
             except Exception as e:
                 current_app.logger.error(f"Overall error during QuickBooks batch request: {e}")
                 current_app.logger.error(traceback.format_exc())
                 # If the entire batch request fails, mark all students in the current batch as failed
                 for student_orm in students_batch:
-                    # In this outer exception, student_orm is the raw ORM object from students_batch
-                    per_id_ug = student_orm.per_id_ug # Access directly from ORM object
-                    reg_no = student_orm.reg_no     # Access directly from ORM object
+                    per_id_ug = student_orm.per_id_ug
+                    reg_no = student_orm.reg_no
                     self._update_student_sync_status(per_id_ug, CustomerSyncStatus.FAILED.value)
                     self._log_customer_sync_audit(per_id_ug, 'Student', 'ERROR', f"Overall batch request failed: {str(e)}")
                     all_results.append(CustomerSyncResult(
@@ -964,11 +894,13 @@ class CustomerSyncService:
 
     def sync_all_unsynchronized_applicants_in_batches(self, batch_size: int = 20) -> Dict:
         """
-        Fetches unsynchronized applicants in batches, maps their data to QuickBooks
-        customer format, and sends them for batch creation/update in QuickBooks.
+        Fetches unsynchronized applicants in batches and upserts them in QuickBooks:
+        applicants without a QuickBooks id are created, the others sparse-updated,
+        both packed into the same batch requests (see CustomerUpsertEngine).
         Updates sync status and logs audit trails for each applicant.
         """
-        realm_id = self._get_qb_service().realm_id
+        upsert_engine = self._get_upsert_engine()
+        name_index = self._get_name_index()
 
         total_processed = 0
         total_succeeded = 0
@@ -979,89 +911,71 @@ class CustomerSyncService:
         while True:
             # 1. Fetch a batch of unsynchronized applicants
             applicants_batch = self.get_unsynchronized_applicants(limit=batch_size, offset=offset)
-            current_app.logger.info(f"batch applicants {applicants_batch} and length {len(applicants_batch)}")
             if not applicants_batch:
                 current_app.logger.info("No more unsynchronized applicants to process.")
                 break
 
             current_app.logger.info(f"Processing batch of {len(applicants_batch)} unsynchronized applicants (offset: {offset})")
 
-            batch_operations = []
             applicant_per_id_map = {}  # To map bId back to applicant for status update
 
-            # 2. Prepare Batch Requests
-            for i, applicant_orm in enumerate(applicants_batch):
+            # 2. Prepare create/update records
+            for applicant_orm in applicants_batch:
                 # Convert ORM object to dictionary for consistent access
                 applicant_data = applicant_orm.to_dict_for_quickbooks()
-                current_app.logger.info(f"applicant data {applicant_data}")
                 appl_id = applicant_data.get('appl_Id')
-                tracking_id = applicant_data.get('tracking_id')
-                
+
                 # Mark as IN_PROGRESS immediately to prevent reprocessing by other tasks
-                self._update_applicant_sync_status(appl_id, CustomerSyncStatus.IN_PROGRESS.value)
-                current_app.logger.info(f"Applicant data for QuickBooks mapping: {applicant_data}")
-                qb_customer_data = self.map_applicant_to_quickbooks_customer(applicant_data)
-                current_app.logger.info(f"QuickBooks customer data for applicant {appl_id}: {qb_customer_data}")
+                self._update_applicant_sync_status(applicant_data.get('tracking_id'), CustomerSyncStatus.IN_PROGRESS.value)
 
-                # Assign a unique bId for each operation in the batch
                 bId = f"applicant-{appl_id}"
                 applicant_per_id_map[bId] = applicant_data # Store the dictionary
 
-                batch_operations.append({
-                    "operation": "create",  # Assuming new customer creation
-                    "bId": bId,
-                    "Customer": qb_customer_data
-                })
-
-            batch_payload = {
-                "BatchItemRequest": batch_operations
-            }
+            # Applicants already in QuickBooks under their tracking id are linked instead of failing as duplicates
+            existing = self._existing_customers(
+                name_index, [data.get('tracking_id') for data in applicant_per_id_map.values() if not data.get('quickbooks_id')]
+            )
+            records = [
+                self._applicant_upsert(bId, data, existing.get(data.get('tracking_id')))
+                for bId, data in applicant_per_id_map.items()
+            ]
 
             try:
-                # 3. Execute Batch Request
-                quickbooks_batch_response = self._get_qb_service().make_batch_request(realm_id, batch_payload)
-                current_app.logger.info(f"QuickBooks batch response for applicants: {quickbooks_batch_response}")
-
-                # 4. Process Batch Response
-                for item_response in quickbooks_batch_response.get("BatchItemResponse", []):
-                    bId = item_response.get("bId")
-                    applicant_data = applicant_per_id_map.get(bId)
-
-                    if not applicant_data:
-                        current_app.logger.warning(f"Applicant with bId {bId} not found in map. Skipping status update.")
-                        continue
-                    
+                # 3. Execute batch requests (stale SyncTokens are refetched and retried)
+                outcomes = upsert_engine.upsert(records)
+
+                # 4. Process outcomes
+                synced_names = {}
+                for bId, applicant_data in applicant_per_id_map.items():
+                    outcome = outcomes.get(bId, {"status": FAILED, "error": "No batch response"})
                     appl_id = applicant_data.get('appl_Id')
                     tracking_id = applicant_data.get('tracking_id')
 
-                    if "Customer" in item_response and item_response['Customer'].get('Id'):
-                        # Success
-                        quickbooks_id = item_response['Customer']['Id']
-                        self._update_applicant_sync_status(appl_id, CustomerSyncStatus.SYNCED.value, quickbooks_id=quickbooks_id)
-                        self._log_customer_sync_audit(appl_id, 'Applicant', 'SUCCESS', f"Synced to QuickBooks ID: {quickbooks_id}")
+                    if outcome["status"] != FAILED:
+                        quickbooks_id = outcome["quickbooks_id"]
+                        self._update_applicant_sync_status(tracking_id, CustomerSyncStatus.SYNCED.value, quickbooks_id=quickbooks_id, sync_token=outcome.get('sync_token'))
+                        synced_names[tracking_id] = (quickbooks_id, outcome.get('sync_token'))
+                        self._log_customer_sync_audit(appl_id, 'Applicant', 'SUCCESS', f"Synced ({outcome['status']}) to QuickBooks ID: {quickbooks_id}")
                         all_results.append(CustomerSyncResult(
                             customer_id=tracking_id, customer_type='Applicant', success=True, quickbooks_id=quickbooks_id,
-                            details=item_response
+                            details=outcome.get('response')
                         ))
                         total_succeeded += 1
                         update_db_data = TblOnlineApplication.update_applicant_quickbooks_status(tracking_id, quickbooks_id, pushed_by="ApplicantSyncService", QuickBk_Status=1)
                         if update_db_data:
                             current_app.logger.info(f"Successfully updated applicant {appl_id} with QuickBooks ID {quickbooks_id}")
                     else:
-                        # Failure
-                        error_detail = "Unknown error during batch sync."
-                        if "Fault" in item_response and "Error" in item_response['Fault']:
-                            error_detail = item_response['Fault']['Error'][0].get('Detail', error_detail)
-                        
-                        current_app.logger.error(f"Failed to sync applicant {tracking_id} (bId: {bId}). Error: {error_detail}. Full response: {item_response}")
-
-                        self._update_applicant_sync_status(appl_id, CustomerSyncStatus.FAILED.value)
+                        error_detail = outcome.get('error') or "Unknown error during batch sync."
+                        current_app.logger.error(f"Failed to sync applicant {tracking_id} (bId: {bId}). Error: {error_detail}. Full response: {outcome.get('response')}")
+
+                        self._update_applicant_sync_status(tracking_id, CustomerSyncStatus.FAILED.value)
                         self._log_customer_sync_audit(appl_id, 'Applicant', 'ERROR', f"Batch sync failed: {error_detail}")
                         all_results.append(CustomerSyncResult(
                             customer_id=tracking_id, customer_type='Applicant', success=False, error_message=error_detail,
-                            details=item_response
+                            details=outcome.get('response')
                         ))
                         total_failed += 1
+                self._record_customers(name_index, synced_names)
             except Exception as e:
                 current_app.logger.error(f"Overall error during QuickBooks batch request for applicants: {e}")
                 current_app.logger.error(traceback.format_exc())
@@ -1069,7 +983,7 @@ class CustomerSyncService:
                 for applicant_orm in applicants_batch:
                     appl_id = applicant_orm.appl_Id
                     tracking_id = applicant_orm.tracking_id
-                    self._update_applicant_sync_status(appl_id, CustomerSyncStatus.FAILED.value)
+                    self._update_applicant_sync_status(tracking_id, CustomerSyncStatus.FAILED.value)
                     self._log_customer_sync_audit(appl_id, 'Applicant', 'ERROR', f"Overall batch request failed: {str(e)}")
                     all_results.append(CustomerSyncResult(
                         customer_id=tracking_id, customer_type='Applicant', success=False, error_message=str(e)
@@ -1118,13 +1032,19 @@ class CustomerSyncService:
         try:
             # Get QuickBooks service
             qb_service = self._get_qb_service()
+            name_index = CustomerNameIndex()
+            existing = self._existing_customers(name_index, [applicant.get('tracking_id')]).get(applicant.get('tracking_id'))
 
-            # Map applicant data
-            qb_customer_data = self.map_applicant_to_quickbooks_customer(applicant)
-            current_app.logger.info(f"QuickBooks customer data for applicant {applicant.get('tracking_id')}: {qb_customer_data}")
+            if existing:
+                # Already in QuickBooks under this tracking id: link and update instead of a failing create
+                response = self._upsert_one(self._applicant_upsert(f"applicant-{applicant.get('tracking_id')}", applicant, existing))
+            else:
+                # Map applicant data
+                qb_customer_data = self.map_applicant_to_quickbooks_customer(applicant)
+                current_app.logger.info(f"QuickBooks customer data for applicant {applicant.get('tracking_id')}: {qb_customer_data}")
 
-            # Create customer in QuickBooks
-            response = qb_service.create_customer(qb_service.realm_id, qb_customer_data)
+                # Create customer in QuickBooks
+                response = qb_service.create_customer(qb_service.realm_id, qb_customer_data)
             current_app.logger.info(f"QuickBooks response for applicant {applicant.get('tracking_id')}: {response}")
             if 'Customer' in response:
                 # Success - update sync status
@@ -1135,6 +1055,7 @@ class CustomerSyncService:
                     quickbooks_id=qb_customer_id,
                     sync_token=response['Customer'].get('SyncToken')
                 )
+                self._record_customers(name_index, {applicant.get('tracking_id'): (qb_customer_id, response['Customer'].get('SyncToken'))})
 
                 # Log successful sync
                 self._log_customer_sync_audit(applicant.get('tracking_id'), 'Applicant', 'SUCCESS', f"Synced to QuickBooks ID: {qb_customer_id}")
@@ -1181,8 +1102,15 @@ class CustomerSyncService:
             Dictionary response from QuickBooks API
         """
         try:
-            qb_service = self._get_qb_service()
-            response = qb_service.update_customer(realm_id=qb_service.realm_id, customer_data=qb_customer_data)
+            # Sent through the batch engine so a stale SyncToken is refetched and the update retried
+            key = f"customer-{qb_customer_id}"
+            record = CustomerUpsert(
+                key=key,
+                customer=qb_customer_data,
+                quickbooks_id=qb_customer_id,
+                sync_token=qb_customer_data.get('SyncToken')
+            )
+            response = self._upsert_one(record)
             current_app.logger.info(f"QuickBooks update response for customer {qb_customer_id}: {response}")
             return response
         except Exception as e:
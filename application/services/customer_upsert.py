@@ -0,0 +1,165 @@
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from flask import current_app
+
+from application.services.qb_batch import QB_BATCH_LIMIT, batch_error, fetch_sync_tokens, send_batch
+from application.services.quickbooks import QuickBooks
+from application.utils.bulk_query import chunked
+
+# Rounds of "refetch SyncTokens and resend" after stale object faults
+DEFAULT_TOKEN_RETRIES = 2
+
+# QuickBooks error code for an update sent with an outdated SyncToken
+STALE_OBJECT_ERROR_CODE = "5010"
+
+OPERATION_CREATE = "create"
+OPERATION_UPDATE = "update"
+
+CREATED = "created"
+UPDATED = "updated"
+FAILED = "failed"
+
+
+@dataclass
+class CustomerUpsert:
+    """
+    One customer to push to QuickBooks.
+
+    Records with a ``quickbooks_id`` are sent as sparse updates, the others
+    as creates. ``sync_token`` is the locally stored token; it is refetched
+    when missing or rejected as stale.
+    """
+    key: str
+    customer: Dict
+    quickbooks_id: Optional[str] = None
+    sync_token: Optional[str] = None
+
+    @property
+    def operation(self):
+        return OPERATION_UPDATE if self.quickbooks_id else OPERATION_CREATE
+
+
+class CustomerUpsertEngine:
+    """
+    Creates and sparse-updates QuickBooks customers with batch requests.
+
+    Creates and updates share batch requests of up to 30 operations. Updates
+    without a SyncToken get one from a single ``Id IN (...)`` query before
+    the first send; updates rejected with a stale object fault get fresh
+    tokens the same way and only those items are resent.
+    """
+
+    def __init__(self, batch_size=QB_BATCH_LIMIT, token_retries=DEFAULT_TOKEN_RETRIES,
+                 qb_service=None, logger=None):
+        self.batch_size = min(batch_size, QB_BATCH_LIMIT)
+        self.token_retries = token_retries
+        self.qb_service = qb_service
+        self.logger = logger or current_app.logger
+
+    def _get_qb_service(self):
+        if self.qb_service is None:
+            self.qb_service = QuickBooks()
+        return self.qb_service
+
+    @staticmethod
+    def is_stale(item_response):
+        """True when QuickBooks rejected the item for an outdated SyncToken"""
+        for error in (item_response or {}).get("Fault", {}).get("Error") or []:
+            if str(error.get("code")) == STALE_OBJECT_ERROR_CODE or "stale" in str(error.get("Message", "")).lower():
+                return True
+        return False
+
+    def _send_batch(self, items):
+        return send_batch(self._get_qb_service(), items)
+
+    def fetch_sync_tokens(self, qb_ids):
+        """
+        Current SyncToken per customer id, one query per 1000 ids.
+
+        Inactive customers are included so merged or deactivated customers
+        still resolve.
+
+        Returns:
+            dict: {qb_id: sync_token} for ids that exist
+        """
+        return fetch_sync_tokens(self._get_qb_service(), "Customer", qb_ids, self.batch_size,
+                                 condition="Active IN (true, false)")
+
+    def _item(self, record):
+        if record.operation == OPERATION_CREATE:
+            return {"bId": record.key, "operation": OPERATION_CREATE, "Customer": record.customer}
+        customer = dict(record.customer, Id=str(record.quickbooks_id), SyncToken=str(record.sync_token), sparse=True)
+        return {"bId": record.key, "operation": OPERATION_UPDATE, "Customer": customer}
+
+    def _refresh_tokens(self, records, outcomes):
+        """Set fresh tokens on ``records``; those whose customer is gone fail"""
+        tokens = self.fetch_sync_tokens([str(r.quickbooks_id) for r in records])
+        ready = []
+        for record in records:
+            token = tokens.get(str(record.quickbooks_id))
+            if token is None:
+                outcomes[record.key] = {
+                    "status": FAILED,
+                    "error": f"QuickBooks customer {record.quickbooks_id} not found",
+                }
+            else:
+                record.sync_token = token
+                ready.append(record)
+        return ready
+
+    def upsert(self, records):
+        """
+        Push the given customers.
+
+        Args:
+            records (list[CustomerUpsert]): Customers with unique keys
+
+        Returns:
+            dict: {key: {"status": created|updated|failed, "quickbooks_id"?,
+            "sync_token"?, "error"?, "response"?}}
+        """
+        outcomes = {}
+        pending = [r for r in records if r.operation == OPERATION_CREATE or r.sync_token]
+        missing_token = [r for r in records if r.operation == OPERATION_UPDATE and not r.sync_token]
+        if missing_token:
+            pending.extend(self._refresh_tokens(missing_token, outcomes))
+
+        retries = 0
+        stale_total = 0
+        while pending:
+            responses = {}
+            for batch in chunked(pending, self.batch_size):
+                responses.update(self._send_batch([self._item(record) for record in batch]))
+
+            stale = []
+            for record in pending:
+                item = responses.get(record.key)
+                customer = (item or {}).get("Customer")
+                if customer and customer.get("Id"):
+                    outcomes[record.key] = {
+                        "status": CREATED if record.operation == OPERATION_CREATE else UPDATED,
+                        "quickbooks_id": str(customer["Id"]),
+                        "sync_token": customer.get("SyncToken"),
+                        "response": item,
+                    }
+                elif record.operation == OPERATION_UPDATE and retries < self.token_retries and self.is_stale(item):
+                    stale.append(record)
+                else:
+                    outcomes[record.key] = {"status": FAILED, "error": batch_error(item), "response": item}
+
+            if not stale:
+                break
+            retries += 1
+            stale_total += len(stale)
+            self.logger.info(f"Refetching SyncTokens for {len(stale)} stale customer updates (round {retries})")
+            pending = self._refresh_tokens(stale, outcomes)
+
+        counts = {status: 0 for status in (CREATED, UPDATED, FAILED)}
+        for outcome in outcomes.values():
+            counts[outcome["status"]] += 1
+        self.logger.info(
+            f"Customer upsert: {counts[CREATED]} created, {counts[UPDATED]} updated, "
+            f"{counts[FAILED]} failed ({stale_total} stale token retries)"
+        )
+        return outcomes
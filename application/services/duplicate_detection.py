@@ -0,0 +1,248 @@
+import json
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import func, select, delete, case
+
+from application import db
+from application.models.central_models import IntegrationLog, DuplicateFinding
+from application.models.mis_models import TblStudentWallet
+from application.utils.bulk_query import chunked
+
+# Ids per DELETE ... WHERE id IN (...) statement
+DELETE_CHUNK_SIZE = 1000
+
+# Integration log statuses ranked for the row kept per transaction: the
+# callback logs FAILED/PENDING attempts before the VALID one, and the
+# reconciler only counts VALID logs, so those must survive a cleanup.
+# Unlisted statuses rank after these; ties keep the lowest id.
+KEPT_LOG_STATUS_RANK = {"VALID": 0, "SUCCESS": 0, "PENDING_SETTLEMENT": 1}
+
+# source -> table columns the scan projects. Only integration logs are
+# cleanable: a duplicated wallet row carries a balance, so it is reported for
+# manual review instead of being deleted. Integration logs group on the
+# indexed transaction_key, which also covers logs that only carry the
+# transaction id inside response_data.
+DUPLICATE_SOURCES = {
+    "integration_log": {
+        "table": IntegrationLog.__table__,
+        "key": "transaction_key",
+        "amount": None,
+        "seen_at": "created_at",
+        "rank": ("status", KEPT_LOG_STATUS_RANK),
+        "cleanable": True,
+    },
+    "wallet": {
+        "table": TblStudentWallet.__table__,
+        "key": "external_transaction_id",
+        "amount": "dept",
+        "seen_at": "date",
+        "rank": None,
+        "cleanable": False,
+    },
+}
+
+
+class DuplicateDetector:
+    """
+    Duplicate detection over a narrow projection of each source table.
+
+    Grouping happens in the database: ``GROUP BY key HAVING COUNT(*) > 1``
+    finds the duplicated keys and ``ROW_NUMBER() OVER (PARTITION BY key
+    ORDER BY rank, id)`` picks the row kept per key, so only the duplicated
+    keys and ids ever reach Python. The best ranked row (a VALID log over a
+    failed attempt) is kept, the oldest one among equals.
+    """
+
+    def __init__(self, session=None, logger=None):
+        self.session = session or db.session
+        self.logger = logger or current_app.logger
+
+    @staticmethod
+    def _source(source):
+        if source not in DUPLICATE_SOURCES:
+            raise ValueError(f"Unknown duplicate source: {source}")
+        return DUPLICATE_SOURCES[source]
+
+    def _ranked(self, source):
+        """Subquery of (id, key, rn, occurrences) for rows whose key is not NULL"""
+        config = self._source(source)
+        table = config["table"]
+        key = table.c[config["key"]]
+        order_by = [table.c.id]
+        if config["rank"]:
+            column, ranks = config["rank"]
+            order_by.insert(0, case(ranks, value=func.upper(table.c[column]), else_=len(ranks)))
+        return (
+            select(
+                table.c.id.label("id"),
+                key.label("duplicate_key"),
+                func.row_number().over(partition_by=key, order_by=order_by).label("rn"),
+                func.count().over(partition_by=key).label("occurrences"),
+            )
+            .where(key.isnot(None))
+            .subquery()
+        )
+
+    def ranked_rows(self, source):
+        """(id, duplicate_key, rn) of every row of a duplicated key; rn 1 is kept"""
+        ranked = self._ranked(source)
+        return self.session.execute(
+            select(ranked.c.id, ranked.c.duplicate_key, ranked.c.rn)
+            .where(ranked.c.occurrences > 1)
+            .order_by(ranked.c.duplicate_key, ranked.c.id)
+        ).all()
+
+    def find(self, source):
+        """
+        Duplicated keys of a source.
+
+        Returns:
+            list[dict]: One entry per key with its occurrence count, the kept
+            id, the redundant ids, total amount and first/last seen
+        """
+        config = self._source(source)
+        table = config["table"]
+        key = table.c[config["key"]]
+        seen_at = table.c[config["seen_at"]]
+        amount = table.c[config["amount"]] if config["amount"] else None
+
+        columns = [
+            key.label("duplicate_key"),
+            func.count().label("occurrences"),
+            func.min(seen_at).label("first_seen_at"),
+            func.max(seen_at).label("last_seen_at"),
+        ]
+        if amount is not None:
+            columns.append(func.sum(amount).label("total_amount"))
+
+        groups = self.session.execute(
+            select(*columns)
+            .where(key.isnot(None))
+            .group_by(key)
+            .having(func.count() > 1)
+            .order_by(key)
+        ).mappings().all()
+        if not groups:
+            return []
+
+        kept, redundant = {}, {}
+        for row in self.ranked_rows(source):
+            if row.rn == 1:
+                kept[row.duplicate_key] = row.id
+            else:
+                redundant.setdefault(row.duplicate_key, []).append(row.id)
+
+        return [
+            {
+                "source": source,
+                "duplicate_key": group["duplicate_key"],
+                "occurrences": int(group["occurrences"]),
+                "keep_id": kept.get(group["duplicate_key"]),
+                "duplicate_ids": redundant.get(group["duplicate_key"], []),
+                "total_amount": float(group["total_amount"])
+                if amount is not None and group["total_amount"] is not None else None,
+                "first_seen_at": group["first_seen_at"],
+                "last_seen_at": group["last_seen_at"],
+            }
+            for group in groups
+        ]
+
+    def redundant_rows(self, source):
+        """(id, duplicate_key) of every row of a key other than the kept one"""
+        return [row for row in self.ranked_rows(source) if row.rn > 1]
+
+    def refresh_report(self, sources=None):
+        """
+        Rebuild the ``duplicate_findings`` rows of each source.
+
+        Each source's rows are replaced in one transaction, so readers see
+        either the previous scan or the new one.
+
+        Returns:
+            dict: {source: number of duplicated keys}
+        """
+        table = DuplicateFinding.__table__
+        counts = {}
+        for source in sources or DUPLICATE_SOURCES:
+            findings = self.find(source)
+            now = datetime.now()
+            try:
+                self.session.execute(delete(table).where(table.c.source == source))
+                if findings:
+                    self.session.execute(table.insert(), [
+                        {
+                            **finding,
+                            "duplicate_key": str(finding["duplicate_key"])[:255],
+                            "duplicate_ids": json.dumps(finding["duplicate_ids"]),
+                            "created_at": now,
+                            "updated_at": now,
+                        }
+                        for finding in findings
+                    ])
+                self.session.commit()
+            except Exception:
+                self.session.rollback()
+                raise
+            counts[source] = len(findings)
+
+        self.logger.info(f"Duplicate report refreshed: {counts}")
+        return counts
+
+    def report(self, source=None, limit=None, offset=0):
+        """Stored findings, most duplicated first"""
+        query = self.session.query(DuplicateFinding)
+        if source:
+            query = query.filter(DuplicateFinding.source == source)
+        query = query.order_by(
+            DuplicateFinding.occurrences.desc(), DuplicateFinding.id.asc()
+        ).offset(offset)
+        if limit:
+            query = query.limit(limit)
+        return [finding.to_dict() for finding in query.all()]
+
+    def cleanup(self, source, dry_run=True):
+        """
+        Delete every redundant row of a source, keeping the best ranked row
+        per key.
+
+        All deletes run in a single transaction: either every duplicate is
+        removed or none is. With ``dry_run`` nothing is written and the
+        result lists what would be deleted.
+
+        Returns:
+            dict: Keys affected, rows (to be) deleted and their ids
+        """
+        config = self._source(source)
+        if not config["cleanable"]:
+            raise ValueError(f"Duplicates in {source} must be resolved manually")
+
+        rows = self.redundant_rows(source)
+        ids = [row.id for row in rows]
+        result = {
+            "source": source,
+            "dry_run": dry_run,
+            "duplicate_keys": len({row.duplicate_key for row in rows}),
+            "rows_to_delete": len(ids),
+            "deleted_ids": ids,
+        }
+        if dry_run or not ids:
+            return result
+
+        table = config["table"]
+        try:
+            for chunk in chunked(ids, DELETE_CHUNK_SIZE):
+                self.session.execute(delete(table).where(table.c.id.in_(chunk)))
+            # the report no longer describes this source once its duplicates are gone
+            self.session.execute(
+                delete(DuplicateFinding.__table__).where(DuplicateFinding.__table__.c.source == source)
+            )
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+
+        self.logger.info(
+            f"Removed {len(ids)} duplicate {source} rows across {result['duplicate_keys']} keys"
+        )
+        return result
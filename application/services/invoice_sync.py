@@ -454,9 +454,8 @@ class InvoiceSyncService:
             qb_customer_id = meta.get('customer_id')
             amount_paid = meta.get('amount_paid') if meta.get('amount_paid') else None
 
-            # check for funds in the wallet ledger
-            available_credits = TblStudentWalletLedger._get_available_credits(invoice.reg_no, db.session)
-            if not available_credits:
+            # check for funds in the wallet (balance snapshot, one primary key read)
+            if TblStudentWalletLedger.get_wallet_balance(invoice.reg_no) <= 0:
                 raise ValueError(f"Invoice {invoice.id} has no available credits in the wallet.")
 
             if not qb_item_id:
@@ -936,8 +935,8 @@ class InvoiceSyncService:
                 if invoice:
                     invoice.QuickBk_Status = status
                     invoice.pushed_date = datetime.now()
-                    invoice.pushed_by = "InvoiceSyncService",
-                    invoice.quickbooks_id = quickbooks_id if quickbooks_id else invoice.quickbooks_id,
+                    invoice.pushed_by = "InvoiceSyncService"
+                    invoice.quickbooks_id = quickbooks_id if quickbooks_id else invoice.quickbooks_id
                     invoice.sync_token = sync_token if sync_token else invoice.sync_token
                     invoice.balance = balance if balance else invoice.dept
                 # Store QuickBooks ID in a custom field or comment if needed
@@ -12,12 +12,22 @@ import json
 from application.helpers.json_encoder import EnhancedJSONEncoder
 from application.utils.database import db_manager
 import re
-from sqlalchemy import extract
 
-from sqlalchemy import extract, func
+from sqlalchemy import func, literal, union_all, bindparam
 from flask import jsonify
 import traceback
 
+# Opening balances are carried over from the last fully closed financial year.
+DEFAULT_OPENING_BALANCE_YEAR = 2024
+
+# Student tables that carry an ``opening_balance`` column, keyed by the names
+# used in task arguments.
+OPENING_BALANCE_TABLES = {
+    "TblPersonalUg": TblPersonalUg,
+    "TblOnlineApplication": TblOnlineApplication,
+}
+
+
 class OpeningBalanceSyncService:
     """
     Service to handle syncing of opening balance to QuickBooks
@@ -26,48 +36,235 @@ class OpeningBalanceSyncService:
     def __init__(self, logger=None):
         self.logger = logger or current_app.logger
 
-    def get_outstanding_balance(self, reg_no: str):
+    @staticmethod
+    def period_bounds(year=None, start=None, end=None):
+        """
+        Resolve the [start, end) datetime range covered by an opening balance.
+
+        Using a half-open range instead of ``extract('year', ...)`` keeps the
+        date filters sargable so MySQL can use the date indexes.
+
+        Args:
+            year (int): Financial year to cover (defaults to 2024)
+            start (datetime|date|str): Explicit inclusive start, overrides year
+            end (datetime|date|str): Explicit exclusive end (cutoff), overrides year
+
+        Returns:
+            tuple: (start datetime, end datetime)
+        """
+        year = int(year or DEFAULT_OPENING_BALANCE_YEAR)
+        period_start = datetime(year, 1, 1)
+        period_end = datetime(year + 1, 1, 1)
+
+        if start is not None:
+            period_start = start if isinstance(start, datetime) else datetime.fromisoformat(str(start))
+        if end is not None:
+            period_end = end if isinstance(end, datetime) else datetime.fromisoformat(str(end))
+
+        if period_end <= period_start:
+            raise ValueError("Opening balance period end must be after its start")
+
+        return period_start, period_end
+
+    def compute_outstanding_balances(self, session, reg_nos=None, year=None, start=None, end=None):
+        """
+        Compute invoice totals, payment totals and outstanding balances for many
+        students in a single aggregate query.
+
+        Invoices and payments for the period are combined with UNION ALL and
+        summed with one ``GROUP BY reg_no``, so the cost is one round-trip for
+        the whole batch instead of two per student.
+
+        Args:
+            session: MIS database session
+            reg_nos (list[str]|None): Restrict to these students, or None for all
+            year (int): Financial year (see period_bounds)
+            start, end: Optional explicit period bounds (see period_bounds)
+
+        Returns:
+            dict: reg_no -> {"invoice_total", "payment_total", "outstanding_balance"}
         """
-        Fetch total amount from 2024 invoices and payments for a given reg_no
+        period_start, period_end = self.period_bounds(year, start, end)
+
+        invoices = (
+            session.query(
+                TblImvoice.reg_no.label("reg_no"),
+                func.coalesce(TblImvoice.dept, 0).label("invoice_amount"),
+                literal(0).label("payment_amount"),
+            )
+            .filter(
+                TblImvoice.reg_no.isnot(None),
+                TblImvoice.invoice_date >= period_start,
+                TblImvoice.invoice_date < period_end,
+            )
+        )
+        payments = (
+            session.query(
+                Payment.reg_no.label("reg_no"),
+                literal(0).label("invoice_amount"),
+                func.coalesce(Payment.amount, 0).label("payment_amount"),
+            )
+            .filter(
+                Payment.reg_no.isnot(None),
+                Payment.recorded_date >= period_start,
+                Payment.recorded_date < period_end,
+            )
+        )
+
+        if reg_nos is not None:
+            reg_nos = list(reg_nos)
+            if not reg_nos:
+                return {}
+            invoices = invoices.filter(TblImvoice.reg_no.in_(reg_nos))
+            payments = payments.filter(Payment.reg_no.in_(reg_nos))
+
+        movements = union_all(invoices.statement, payments.statement).subquery()
+        rows = (
+            session.query(
+                movements.c.reg_no,
+                func.sum(movements.c.invoice_amount),
+                func.sum(movements.c.payment_amount),
+            )
+            .group_by(movements.c.reg_no)
+            .all()
+        )
+
+        balances = {}
+        for reg_no, invoice_total, payment_total in rows:
+            invoice_total = float(invoice_total or 0)
+            payment_total = float(payment_total or 0)
+            balances[reg_no] = {
+                "invoice_total": invoice_total,
+                "payment_total": payment_total,
+                "outstanding_balance": invoice_total - payment_total,
+            }
+
+        # Students with no movement in the period still get an explicit zero
+        for reg_no in reg_nos or []:
+            balances.setdefault(reg_no, {
+                "invoice_total": 0.0,
+                "payment_total": 0.0,
+                "outstanding_balance": 0.0,
+            })
+
+        return balances
+
+    def write_opening_balances(self, session, balances, student_table="TblPersonalUg"):
+        """
+        Persist computed outstanding balances as ``opening_balance`` in bulk.
+
+        Current values are read in one query and only changed rows are written,
+        using a single executemany UPDATE.
+
+        Args:
+            session: MIS database session
+            balances (dict): Output of compute_outstanding_balances
+            student_table (str): "TblPersonalUg" or "TblOnlineApplication"
+
+        Returns:
+            dict: {"updated", "skipped", "missing"} counts and the changed reg_nos
+        """
+        model = OPENING_BALANCE_TABLES.get(student_table)
+        if model is None:
+            raise ValueError(f"Invalid student_table: {student_table}")
+
+        result = {"updated": 0, "skipped": 0, "missing": 0, "changed": []}
+        if not balances:
+            return result
+
+        current = dict(
+            session.query(model.reg_no, model.opening_balance)
+            .filter(model.reg_no.in_(list(balances.keys())))
+            .all()
+        )
+
+        changes = []
+        for reg_no, totals in balances.items():
+            if reg_no not in current:
+                result["missing"] += 1
+                continue
+            new_balance = totals["outstanding_balance"]
+            if current[reg_no] is not None and float(current[reg_no]) == new_balance:
+                result["skipped"] += 1
+                continue
+            changes.append({"b_reg_no": reg_no, "b_opening_balance": new_balance})
+
+        if changes:
+            table = model.__table__
+            session.execute(
+                table.update()
+                .where(table.c.reg_no == bindparam("b_reg_no"))
+                .values(opening_balance=bindparam("b_opening_balance")),
+                changes,
+            )
+            result["updated"] = len(changes)
+            result["changed"] = [change["b_reg_no"] for change in changes]
+
+        return result
+
+    def bulk_update_opening_balances(self, reg_nos=None, student_table="TblPersonalUg",
+                                     year=None, start=None, end=None, chunk_size=1000):
+        """
+        Recompute and store opening balances for a batch of students, or for
+        every student with movements in the period when ``reg_nos`` is None.
+
+        Args:
+            reg_nos (list[str]|None): Students to update, None for all
+            student_table (str): "TblPersonalUg" or "TblOnlineApplication"
+            year (int): Financial year (see period_bounds)
+            start, end: Optional explicit period bounds (see period_bounds)
+            chunk_size (int): Rows per UPDATE transaction
+
+        Returns:
+            dict: Totals of updated, skipped and missing students
+        """
+        totals = {"total": 0, "updated": 0, "skipped": 0, "missing": 0}
+
+        with db_manager.get_mis_session() as session:
+            balances = self.compute_outstanding_balances(
+                session, reg_nos=reg_nos, year=year, start=start, end=end
+            )
+
+        totals["total"] = len(balances)
+        items = list(balances.items())
+
+        for offset in range(0, len(items), chunk_size):
+            chunk = dict(items[offset:offset + chunk_size])
+            with db_manager.get_mis_session() as session:
+                written = self.write_opening_balances(session, chunk, student_table)
+            totals["updated"] += written["updated"]
+            totals["skipped"] += written["skipped"]
+            totals["missing"] += written["missing"]
+
+        self.logger.info(
+            f"[OpeningBalanceSyncService] Bulk opening balance update for {student_table}: "
+            f"{totals['updated']} updated, {totals['skipped']} unchanged, "
+            f"{totals['missing']} not in table ({totals['total']} computed)"
+        )
+        return totals
+
+    def get_outstanding_balance(self, reg_no: str, year=None):
+        """
+        Fetch total amount from the year's invoices and payments for a given reg_no
         and return a JSON with totals and outstanding balance
         """
         try:
+            year = int(year or DEFAULT_OPENING_BALANCE_YEAR)
             with db_manager.get_mis_session() as session:
-                # Total invoices for 2024
-                invoice_total = (
-                    session.query(func.coalesce(func.sum(TblImvoice.dept), 0))
-                    .filter(
-                        TblImvoice.reg_no == reg_no,
-                        extract('year', TblImvoice.invoice_date) == 2024
-                    )
-                    .scalar()
-                )
-
-                # Total payments for 2024
-                payment_total = (
-                    session.query(func.coalesce(func.sum(Payment.amount), 0))
-                    .filter(
-                        Payment.reg_no == reg_no,
-                        extract('year', Payment.recorded_date) == 2024
-                    )
-                    .scalar()
-                )
-
-                outstanding_balance = invoice_total - payment_total
+                totals = self.compute_outstanding_balances(session, reg_nos=[reg_no], year=year)[reg_no]
+                invoice_total = totals["invoice_total"]
+                payment_total = totals["payment_total"]
+                outstanding_balance = totals["outstanding_balance"]
+
                 # update the opening balance in the database for reference
-                # Fetch student record using the same session
-                student = session.query(TblPersonalUg).filter_by(reg_no=reg_no).first()
-                if not student:
-                    student = session.query(TblOnlineApplication).filter_by(reg_no=reg_no).first()
-
-                if student and student.opening_balance != outstanding_balance:
-                    student.opening_balance = outstanding_balance
-                    session.commit() 
-                    
+                written = self.write_opening_balances(session, {reg_no: totals}, "TblPersonalUg")
+                if written["missing"]:
+                    self.write_opening_balances(session, {reg_no: totals}, "TblOnlineApplication")
+
             result = {
                 "reg_no": reg_no,
-                "invoice_total_2024": float(invoice_total),
-                "payment_total_2024": float(payment_total),
+                f"invoice_total_{year}": float(invoice_total),
+                f"payment_total_{year}": float(payment_total),
                 "outstanding_balance": float(outstanding_balance)
             }
 
@@ -0,0 +1,369 @@
+import json
+import os
+import time
+
+import pandas as pd
+from flask import current_app
+
+from application.models.mis_models import TblPersonalUg
+from application.services.payment_sync import PaymentSyncService
+from application.services.qb_batch import QB_BATCH_LIMIT, QB_QUERY_MAX_RESULTS, batch_error, run_queries, send_batch
+from application.services.statement_ingest import read_file_columns, clean_amount
+from application.services.statement_store import StatementStoreService
+from application.utils.bulk_query import chunked, select_in
+
+# DocNumbers per "DocNumber IN (...)" lookup query
+DOC_NUMBER_QUERY_CHUNK = 50
+
+OPERATION_CREATE = "create"
+OPERATION_VOID = "void"
+OPERATION_DELETE = "delete"
+
+# Checkpointed statuses that are not retried on resume
+DONE_STATUSES = {"created", "voided", "deleted", "skipped"}
+
+CREATE_COLUMNS = ["Transaction date", "Number", "Name", "Amount"]
+
+
+class PaymentFileCheckpoint:
+    """
+    Append-only JSON lines record of processed file keys.
+
+    The first line identifies the source file (content hash and operation);
+    every later line is one processed key. Lines are flushed and fsynced per
+    batch, so after a crash at most the batch in flight is repeated.
+    """
+
+    def __init__(self, path, file_hash, operation):
+        self.path = path
+        self.file_hash = file_hash
+        self.operation = operation
+
+    def load(self):
+        """
+        Outcomes already recorded for this file.
+
+        A checkpoint written for different file content or another operation
+        is moved aside and an empty state returned.
+
+        Returns:
+            dict: {key: entry} (the last entry per key wins)
+        """
+        if not os.path.exists(self.path):
+            return {}
+
+        entries = {}
+        with open(self.path) as f:
+            header = json.loads(f.readline() or "{}")
+            if header.get("file_hash") != self.file_hash or header.get("operation") != self.operation:
+                stale = f"{self.path}.{int(time.time())}.stale"
+                os.replace(self.path, stale)
+                current_app.logger.warning(f"Checkpoint {self.path} belongs to another file; moved to {stale}")
+                return {}
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # a torn final line from a crash mid-write
+                    continue
+                entries[entry["key"]] = entry
+        return entries
+
+    def record(self, entries):
+        """Append processed keys and force them to disk"""
+        if not entries:
+            return
+        new_file = not os.path.exists(self.path)
+        with open(self.path, "a") as f:
+            if new_file:
+                f.write(json.dumps({"file_hash": self.file_hash, "operation": self.operation}) + "\n")
+            for entry in entries:
+                f.write(json.dumps(entry, default=str) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def reset(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class BulkPaymentFileEngine:
+    """
+    Creates, voids or deletes QuickBooks payments listed in a file using
+    batch requests.
+
+    All rows are read and validated up front; existing payments are looked
+    up with batched ``DocNumber IN (...)`` queries, and the work is sent in
+    batch requests of up to ``QB_BATCH_LIMIT`` operations. Each batch's
+    outcome is checkpointed next to the file so an interrupted run resumes
+    with the first unfinished DocNumber.
+    """
+
+    def __init__(self, operation, deposit_account_id, payment_method_id=None,
+                 batch_size=QB_BATCH_LIMIT, checkpoint_path=None, service=None, logger=None):
+        if operation not in (OPERATION_CREATE, OPERATION_VOID, OPERATION_DELETE):
+            raise ValueError(f"Unsupported operation: {operation}")
+        self.operation = operation
+        self.deposit_account_id = str(deposit_account_id)
+        self.payment_method_id = payment_method_id
+        self.batch_size = min(batch_size, QB_BATCH_LIMIT)
+        self.checkpoint_path = checkpoint_path
+        self.service = service or PaymentSyncService()
+        self.logger = logger or current_app.logger
+
+    # ------------------------------------------------------------------
+    # Validation
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _resolve_customers(reg_nos):
+        """Map registration number -> QuickBooks customer id"""
+        with TblPersonalUg.get_session() as session:
+            rows = select_in(
+                session, session.query(TblPersonalUg.reg_no, TblPersonalUg.qk_id),
+                TblPersonalUg.reg_no, reg_nos,
+            )
+            return {row.reg_no: row.qk_id for row in rows if row.qk_id}
+
+    def load_create_rows(self, file_path):
+        """
+        Read and validate a payment creation file.
+
+        Returns:
+            tuple: (items, invalid). Items are dicts keyed by ``DocNumber``;
+            invalid entries carry the 1-based file row and a reason.
+        """
+        df = read_file_columns(file_path, CREATE_COLUMNS)
+        df["Amount"] = clean_amount(df["Amount"])
+        df["Number"] = df["Number"].fillna("").astype(str).str.strip()
+        df["Name"] = df["Name"].where(df["Name"].isna(), df["Name"].astype(str).str.strip())
+        txn_dates = pd.to_datetime(df["Transaction date"], errors="coerce")
+
+        customers = self._resolve_customers(df["Name"].dropna().unique().tolist())
+
+        items, invalid, seen = [], [], set()
+        for position, (row, txn_date) in enumerate(zip(df.itertuples(index=False), txn_dates), start=1):
+            doc_number, name, amount = row.Number, row.Name, row.Amount
+            reason = None
+            if pd.isna(name) or pd.isna(amount) or pd.isna(txn_date):
+                reason = "missing data"
+            elif not doc_number:
+                reason = "missing DocNumber"
+            elif amount == 0:
+                reason = "missing Amount"
+            elif name not in customers:
+                reason = f"Customer not found for registration number: {name}"
+            elif doc_number in seen:
+                reason = "duplicate DocNumber in file"
+
+            if reason:
+                invalid.append({"row": position, "doc_number": doc_number or None, "reason": reason})
+                continue
+
+            seen.add(doc_number)
+            items.append({
+                "key": doc_number,
+                "payment": {
+                    "DocNumber": doc_number,
+                    "CustomerRef": {"value": str(customers[name])},
+                    "DepositToAccountRef": {"value": self.deposit_account_id},
+                    "PaymentMethodRef": {"value": self.payment_method_id},
+                    "TotalAmt": float(amount),
+                    "TxnDate": txn_date.strftime("%Y-%m-%d"),
+                },
+            })
+        return items, invalid
+
+    @staticmethod
+    def load_doc_numbers(file_path):
+        """Unique DocNumbers from the file's ``Number`` column"""
+        df = read_file_columns(file_path, ["Number"])
+        numbers = df["Number"].dropna().astype(str).str.strip()
+        return [n for n in numbers.unique().tolist() if n]
+
+    # ------------------------------------------------------------------
+    # QuickBooks access
+    # ------------------------------------------------------------------
+
+    def _send_batch(self, items):
+        return send_batch(self.service._get_qb_service(), items)
+
+    def _existing_payments(self, doc_numbers):
+        """
+        Look up payments by DocNumber, several IN queries per batch request.
+
+        Returns:
+            dict: {doc_number: [payment, ...]}
+        """
+        queries = []
+        for chunk in chunked(doc_numbers, DOC_NUMBER_QUERY_CHUNK):
+            quoted = ", ".join("'" + n.replace("'", "\\'") + "'" for n in chunk)
+            queries.append(
+                "SELECT Id, SyncToken, DocNumber, TotalAmt, CustomerRef, DepositToAccountRef "
+                f"FROM Payment WHERE DocNumber IN ({quoted}) MAXRESULTS {QB_QUERY_MAX_RESULTS}"
+            )
+        found = {}
+        for payment in run_queries(self.service._get_qb_service(), queries, "Payment", self.batch_size,
+                                   label="Payment lookup"):
+            found.setdefault(str(payment.get("DocNumber")), []).append(payment)
+        return found
+
+    def _in_deposit_account(self, payment):
+        deposit_ref = payment.get("DepositToAccountRef")
+        return isinstance(deposit_ref, dict) and deposit_ref.get("value") == self.deposit_account_id
+
+    # ------------------------------------------------------------------
+    # Planning
+    # ------------------------------------------------------------------
+
+    def _plan_create(self, items, existing):
+        """Split create items into batch operations and skipped keys"""
+        operations, skipped = [], []
+        for item in items:
+            if any(self._in_deposit_account(p) for p in existing.get(item["key"], [])):
+                skipped.append({"key": item["key"], "status": "skipped", "reason": "already exists"})
+                continue
+            operations.append((item["key"], {
+                "bId": f"c{len(operations)}",
+                "operation": "create",
+                "Payment": item["payment"],
+            }))
+        return operations, skipped
+
+    def _plan_update(self, doc_numbers, existing):
+        """Void/delete operations for every matching payment of each DocNumber"""
+        operations, skipped, failed = [], [], []
+        for doc_number in doc_numbers:
+            payments = [p for p in existing.get(doc_number, []) if self._in_deposit_account(p)]
+            doc_operations = []
+            broken = False
+            for payment in payments:
+                if not payment.get("Id") or not payment.get("SyncToken"):
+                    broken = True
+                    break
+                if self.operation == OPERATION_VOID and payment.get("TotalAmt") == 0:
+                    continue
+                body = {"Id": str(payment["Id"]), "SyncToken": str(payment["SyncToken"])}
+                if self.operation == OPERATION_VOID:
+                    op = {"operation": "update", "optionsData": "void", "Payment": {**body, "sparse": True}}
+                else:
+                    op = {"operation": "delete", "Payment": body}
+                doc_operations.append((doc_number, {"bId": f"p{payment['Id']}", **op}))
+
+            if broken:
+                # retried on resume with fresh Ids/SyncTokens
+                failed.append({"key": doc_number, "status": "failed", "error": "Missing Id/SyncToken"})
+            elif doc_operations:
+                operations.extend(doc_operations)
+            else:
+                reason = "not found" if not existing.get(doc_number) else "nothing to do in deposit account"
+                skipped.append({"key": doc_number, "status": "skipped", "reason": reason})
+        return operations, skipped, failed
+
+    # ------------------------------------------------------------------
+    # Run
+    # ------------------------------------------------------------------
+
+    def run(self, file_path, restart=False):
+        """
+        Process a payment file.
+
+        Args:
+            file_path (str): Excel/CSV file
+            restart (bool): Ignore (and discard) an existing checkpoint
+
+        Returns:
+            dict: Counts per outcome, invalid rows and throughput
+        """
+        started = time.monotonic()
+        checkpoint = PaymentFileCheckpoint(
+            self.checkpoint_path or f"{file_path}.{self.operation}.checkpoint.jsonl",
+            StatementStoreService.file_digest(file_path),
+            self.operation,
+        )
+        if restart:
+            checkpoint.reset()
+        done = {key for key, entry in checkpoint.load().items() if entry.get("status") in DONE_STATUSES}
+
+        invalid = []
+        if self.operation == OPERATION_CREATE:
+            items, invalid = self.load_create_rows(file_path)
+            keys = [item["key"] for item in items]
+        else:
+            keys = self.load_doc_numbers(file_path)
+        pending_keys = [key for key in keys if key not in done]
+        self.logger.info(
+            f"Bulk payment {self.operation}: {len(keys)} valid keys, {len(invalid)} invalid rows, "
+            f"{len(keys) - len(pending_keys)} already done, {len(pending_keys)} to process"
+        )
+
+        existing = self._existing_payments(pending_keys) if pending_keys else {}
+        failed_entries = []
+        if self.operation == OPERATION_CREATE:
+            pending = set(pending_keys)
+            operations, skipped = self._plan_create([i for i in items if i["key"] in pending], existing)
+        else:
+            operations, skipped, failed_entries = self._plan_update(pending_keys, existing)
+        checkpoint.record(skipped + failed_entries)
+
+        counts = {"skipped": len(skipped), "failed": len(failed_entries)}
+        success_status = {OPERATION_CREATE: "created", OPERATION_VOID: "voided",
+                          OPERATION_DELETE: "deleted"}[self.operation]
+        counts[success_status] = 0
+
+        # a key is checkpointed once all its operations have an outcome
+        remaining_ops = {}
+        for key, _ in operations:
+            remaining_ops[key] = remaining_ops.get(key, 0) + 1
+        key_errors = {}
+        key_qb_ids = {}
+
+        processed_ops = 0
+        for number, batch in enumerate(chunked(operations, self.batch_size), start=1):
+            responses = self._send_batch([op for _, op in batch])
+            finished = []
+            for key, op in batch:
+                item = responses.get(op["bId"])
+                if item and "Payment" in item:
+                    key_qb_ids.setdefault(key, []).append(item["Payment"].get("Id"))
+                else:
+                    key_errors.setdefault(key, []).append(batch_error(item))
+                remaining_ops[key] -= 1
+                if remaining_ops[key] == 0:
+                    if key in key_errors:
+                        finished.append({"key": key, "status": "failed", "error": "; ".join(key_errors[key]),
+                                         "qb_ids": key_qb_ids.get(key, [])})
+                        counts["failed"] += 1
+                    else:
+                        finished.append({"key": key, "status": success_status, "qb_ids": key_qb_ids[key]})
+                        counts[success_status] += 1
+            checkpoint.record(finished)
+
+            processed_ops += len(batch)
+            elapsed = time.monotonic() - started
+            self.logger.info(
+                f"Batch {number}: {processed_ops}/{len(operations)} operations, "
+                f"{processed_ops / elapsed if elapsed else 0:.1f} ops/s"
+            )
+
+        elapsed = time.monotonic() - started
+        report = {
+            "operation": self.operation,
+            "total": len(keys) + len(invalid),
+            "already_done": len(keys) - len(pending_keys),
+            "invalid": len(invalid),
+            **counts,
+            "operations_sent": len(operations),
+            "elapsed_seconds": round(elapsed, 2),
+            "operations_per_second": round(len(operations) / elapsed, 2) if elapsed else 0.0,
+            "checkpoint": checkpoint.path,
+            "invalid_rows": invalid,
+        }
+        self.logger.info(
+            f"Bulk payment {self.operation} completed | " +
+            " ".join(f"{k}={v}" for k, v in report.items() if k != "invalid_rows")
+        )
+        return report
@@ -0,0 +1,83 @@
+"""
+QuickBooks batch request helpers shared by the bulk services
+
+Bulk payment files, customer upserts and deletions all pack operations and
+queries into ``/batch`` requests. ``send_batch`` answers every item by its
+``bId`` (a failed request maps each item to the request's Fault),
+``run_queries`` packs ``SELECT`` statements into batches and
+``fetch_sync_tokens`` reads current SyncTokens with ``Id IN (...)`` queries.
+"""
+
+from application.utils.bulk_query import chunked
+
+# QuickBooks accepts at most 30 items per batch request
+QB_BATCH_LIMIT = 30
+
+# QuickBooks caps query results at 1000 rows
+QB_QUERY_MAX_RESULTS = 1000
+
+
+def batch_error(item_response):
+    """First error message of a batch item response"""
+    errors = (item_response or {}).get("Fault", {}).get("Error") or [{}]
+    return errors[0].get("Detail") or errors[0].get("Message") or "Unknown error"
+
+
+def send_batch(qb, items):
+    """
+    Send one batch request.
+
+    Returns:
+        dict: {bId: item response}; a failed request maps every bId to its Fault
+    """
+    response = qb.make_batch_request(qb.realm_id, {"BatchItemRequest": items})
+    if "BatchItemResponse" not in response:
+        fault = response.get("Fault") or {"Error": [{"Message": "Empty batch response"}]}
+        return {item["bId"]: {"Fault": fault} for item in items}
+    return {item.get("bId"): item for item in response["BatchItemResponse"]}
+
+
+def run_queries(qb, queries, entity, batch_size=QB_BATCH_LIMIT, label=None):
+    """
+    Run ``SELECT`` statements several per batch request.
+
+    Args:
+        queries (list): Query strings
+        entity (str): QuickBooks entity the queries return
+        label (str): Prefix of the error raised for a faulted query
+
+    Returns:
+        list: Every ``entity`` row returned, in query order
+
+    Raises:
+        RuntimeError: When any query comes back with a Fault
+    """
+    label = label or f"{entity} query"
+    items = [{"bId": f"q{number}", "Query": query} for number, query in enumerate(queries)]
+    rows = []
+    for batch in chunked(items, min(batch_size, QB_BATCH_LIMIT)):
+        for bid, item in send_batch(qb, batch).items():
+            if "Fault" in item:
+                raise RuntimeError(f"{label} {bid} failed: {batch_error(item)}")
+            rows.extend(item.get("QueryResponse", {}).get(entity, []))
+    return rows
+
+
+def fetch_sync_tokens(qb, entity, qb_ids, batch_size=QB_BATCH_LIMIT, condition=None):
+    """
+    Current SyncToken per id, one query per 1000 ids.
+
+    Args:
+        condition (str): Extra ``WHERE`` clause ANDed to the ``Id IN (...)``
+
+    Returns:
+        dict: {qb_id: sync_token} for ids that exist
+    """
+    extra = f" AND {condition}" if condition else ""
+    queries = [
+        f"SELECT Id, SyncToken FROM {entity} "
+        f"WHERE Id IN ({', '.join(repr(str(i)) for i in chunk)}){extra} MAXRESULTS {QB_QUERY_MAX_RESULTS}"
+        for chunk in chunked(list(dict.fromkeys(qb_ids)), QB_QUERY_MAX_RESULTS)
+    ]
+    rows = run_queries(qb, queries, entity, batch_size, label=f"{entity} SyncToken query")
+    return {str(row["Id"]): str(row["SyncToken"]) for row in rows}
@@ -0,0 +1,160 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from application.services.qb_batch import (
+    QB_BATCH_LIMIT, QB_QUERY_MAX_RESULTS, batch_error, fetch_sync_tokens, send_batch,
+)
+from application.services.quickbooks import QuickBooks
+from application.utils.bulk_query import chunked
+from application.utils.redis_pool import redis_client
+
+# Parallel batch requests; QuickBooks allows 10 concurrent requests per company
+DEFAULT_CONCURRENCY = 4
+
+# Deleted ids are remembered this long so reruns skip them
+CHECKPOINT_TTL_SECONDS = 30 * 86400
+
+DELETION_ENTITIES = ("SalesReceipt", "Invoice")
+
+DELETED = "deleted"
+MISSING = "missing"
+FAILED = "failed"
+
+
+class DeletionCheckpoint:
+    """Redis set of QuickBooks ids already deleted (or found gone) per entity"""
+
+    def __init__(self, entity, client=None):
+        self.key = f"qb_deletion:{entity}:done"
+        self.client = client or redis_client
+
+    def pending(self, qb_ids):
+        """The ids not yet recorded as done, in input order"""
+        pending = []
+        for batch in chunked(qb_ids, QB_QUERY_MAX_RESULTS):
+            pipe = self.client.pipeline(transaction=False)
+            for qb_id in batch:
+                pipe.sismember(self.key, qb_id)
+            pending.extend(qb_id for qb_id, done in zip(batch, pipe.execute()) if not done)
+        return pending
+
+    def mark_done(self, qb_ids):
+        if not qb_ids:
+            return
+        pipe = self.client.pipeline(transaction=False)
+        pipe.sadd(self.key, *qb_ids)
+        pipe.expire(self.key, CHECKPOINT_TTL_SECONDS)
+        pipe.execute()
+
+    def reset(self):
+        self.client.delete(self.key)
+
+
+class QuickBooksDeletionEngine:
+    """
+    Deletes QuickBooks sales receipts or invoices by id.
+
+    Current SyncTokens are read with one ``Id IN (...)`` query per 1000 ids
+    (ids the query no longer returns are already gone), deletes are packed
+    into batch requests of up to 30 operations, and batches run on a small
+    thread pool. Every finished id is checkpointed in Redis, so a rerun only
+    touches ids that have not been deleted yet.
+    """
+
+    def __init__(self, entity, concurrency=DEFAULT_CONCURRENCY, batch_size=QB_BATCH_LIMIT,
+                 checkpoint=None, qb_service=None, logger=None):
+        if entity not in DELETION_ENTITIES:
+            raise ValueError(f"Unsupported entity: {entity}")
+        self.entity = entity
+        self.concurrency = max(1, concurrency)
+        self.batch_size = min(batch_size, QB_BATCH_LIMIT)
+        self.checkpoint = checkpoint or DeletionCheckpoint(entity)
+        self.qb_service = qb_service
+        self.logger = logger or current_app.logger
+
+    def _get_qb_service(self):
+        # one client shared by all workers so token refreshes are not repeated per thread
+        if self.qb_service is None:
+            self.qb_service = QuickBooks()
+        return self.qb_service
+
+    def _send_batch(self, items):
+        return send_batch(self._get_qb_service(), items)
+
+    def fetch_sync_tokens(self, qb_ids):
+        """
+        Current SyncToken per id, one query per 1000 ids.
+
+        Returns:
+            dict: {qb_id: sync_token} for ids that still exist
+        """
+        return fetch_sync_tokens(self._get_qb_service(), self.entity, qb_ids, self.batch_size)
+
+    def _delete_batch(self, app, batch):
+        """Worker: one batch request of deletes"""
+        with app.app_context():
+            items = [
+                {"bId": qb_id, "operation": "delete", self.entity: {"Id": qb_id, "SyncToken": token}}
+                for qb_id, token in batch
+            ]
+            try:
+                responses = self._send_batch(items)
+            except Exception as e:
+                current_app.logger.error(f"{self.entity} delete batch failed: {e}")
+                return {qb_id: {"status": FAILED, "error": str(e)} for qb_id, _ in batch}
+
+        outcomes = {}
+        for qb_id, _ in batch:
+            item = responses.get(qb_id)
+            if item and self.entity in item:
+                outcomes[qb_id] = {"status": DELETED}
+            else:
+                outcomes[qb_id] = {"status": FAILED, "error": batch_error(item)}
+        return outcomes
+
+    def delete(self, qb_ids):
+        """
+        Delete the given QuickBooks ids.
+
+        Args:
+            qb_ids (iterable[str]): QuickBooks ids
+
+        Returns:
+            dict: {qb_id: {"status": deleted|missing|failed, "error"?}}. Ids
+            already checkpointed by an earlier run are reported as ``missing``.
+        """
+        started = time.monotonic()
+        qb_ids = list(dict.fromkeys(str(i) for i in qb_ids if i))
+        pending = self.checkpoint.pending(qb_ids)
+        pending_set = set(pending)
+        outcomes = {qb_id: {"status": MISSING} for qb_id in qb_ids if qb_id not in pending_set}
+        if not pending:
+            return outcomes
+
+        tokens = self.fetch_sync_tokens(pending)
+        gone = [qb_id for qb_id in pending if qb_id not in tokens]
+        for qb_id in gone:
+            outcomes[qb_id] = {"status": MISSING}
+        self.checkpoint.mark_done(gone)
+
+        work = [(qb_id, tokens[qb_id]) for qb_id in pending if qb_id in tokens]
+        app = current_app._get_current_object()
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            for result in pool.map(lambda batch: self._delete_batch(app, batch),
+                                   chunked(work, self.batch_size)):
+                outcomes.update(result)
+                # checkpoint as each batch lands so a crash loses at most in-flight batches
+                self.checkpoint.mark_done([i for i, o in result.items() if o["status"] == DELETED])
+
+        elapsed = time.monotonic() - started
+        counts = {status: 0 for status in (DELETED, MISSING, FAILED)}
+        for outcome in outcomes.values():
+            counts[outcome["status"]] += 1
+        self.logger.info(
+            f"{self.entity} deletion: {counts[DELETED]} deleted, {counts[MISSING]} already gone, "
+            f"{counts[FAILED]} failed in {elapsed:.1f}s "
+            f"({len(work) / elapsed if elapsed else 0:.1f} deletes/s)"
+        )
+        return outcomes
@@ -7,15 +7,20 @@ import os
 import logging
 import urllib.parse  # For URL encoding
 import re  # For regular expressions
+import time
 from flask import current_app
 from application.helpers.quickbooks_helpers import QuickBooksHelper
 from application.helpers.json_encoder import EnhancedJSONEncoder
+from application.utils.structured_logging import log_payload
+from application.utils.instrumentation import record_qb_call
 import os, sys
 from datetime import datetime, timedelta
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 class QuickBooks:
     """
     A class to interact with the QuickBooks Online API, including methods for authentication
@@ -38,7 +43,7 @@ class QuickBooks:
         self.client_secret = os.getenv("QUICK_BOOKS_SECRET")
         self.redirect_uri = os.getenv("QUICK_BOOKS_REDIRECT_URI")
         self.api_base_url = os.getenv("QUICK_BOOKS_BASEURL_SANDBOX")
-        self.token_url = "https://oauth.platform.intuit.com/oauth2/v1/tokens/bearer"
+        self.token_url = os.getenv("QUICK_BOOKS_TOKEN_URL", "https://oauth.platform.intuit.com/oauth2/v1/tokens/bearer")
 
         # Initialize tokens
         self.access_token = None
@@ -120,7 +125,7 @@ class QuickBooks:
 
     def refresh_access_token(self):
         """Refresh the QuickBooks access token using the refresh token."""
-        current_app.logger.info(f"Starting token refresh with refresh token: {self.refresh_token}")
+        current_app.logger.info("Starting token refresh")
 
         if not self.refresh_token:
             current_app.logger.error("No refresh token available for refresh")
@@ -140,8 +145,7 @@ class QuickBooks:
 
         if response.status_code == 200:
             tokens = response.json()
-            current_app.logger.info(f"Received new tokens. Access token starts with: {tokens['access_token'][:10]}...")
-            current_app.logger.info(f"New refresh token: {tokens['refresh_token']}")
+            current_app.logger.info("Received new tokens")
 
             self.access_token = tokens['access_token']
             self.refresh_token = tokens['refresh_token']  # Update refresh token
@@ -187,19 +191,16 @@ class QuickBooks:
         Returns:
             dict: The JSON response from the QuickBooks API.
         """
-        current_app.logger.info(f"Making {method} request to endpoint: {endpoint}")
+        logger.debug("QuickBooks %s %s", method, endpoint)
 
         # Check token status
         if not self.access_token:
             if self.refresh_token:
                 current_app.logger.warning("No access token available. Attempting to refresh...")
                 self.refresh_access_token()
-                current_app.logger.info(f"After refresh - Access token: {self.access_token[:10]}... Refresh token: {self.refresh_token}")
             else:
                 current_app.logger.error("No access token or refresh token available")
                 raise ValueError("Access token is required to make requests.")
-        else:
-            current_app.logger.info(f"Using existing access token: {self.access_token[:10]}...")
 
         def _make_http_call():
             headers = {
@@ -209,25 +210,32 @@ class QuickBooks:
             }
 
             url = f"{self.api_base_url}/{endpoint}"
-            current_app.logger.info(f"Making request to URL: {url}")
 
             if method.upper() == "GET":
-                current_app.logger.info(f"GET request with params: {params}")
-                return requests.get(url, headers=headers, params=params)
+                logger.debug("GET %s params=%s", url, params)
+                send = lambda: requests.get(url, headers=headers, params=params)
             elif method.upper() == "POST":
-                current_app.logger.info(f"POST request with data: {data}")
-                return requests.post(url, headers=headers, json=data)
+                log_payload(logger, f"POST {endpoint} body", data)
+                send = lambda: requests.post(url, headers=headers, json=data)
             elif method.upper() == "PUT":
-                current_app.logger.info(f"PUT request with data: {data}")
-                return requests.put(url, headers=headers, json=data)
+                log_payload(logger, f"PUT {endpoint} body", data)
+                send = lambda: requests.put(url, headers=headers, json=data)
             else:
                 current_app.logger.error(f"Unsupported HTTP method: {method}")
                 raise ValueError(f"Unsupported HTTP method: {method}")
 
+            call_started = time.perf_counter()
+            status = "error"
+            try:
+                response = send()
+                status = response.status_code
+                return response
+            finally:
+                record_qb_call(method, endpoint, status, time.perf_counter() - call_started)
+
         # Attempt initial request
-        current_app.logger.info("Making initial API request")
+        started = time.perf_counter()
         response = _make_http_call()
-        current_app.logger.info(f"Initial response status code: {response.status_code}")
 
         # Handle token expiration
         if response.status_code == 401:
@@ -235,34 +243,21 @@ class QuickBooks:
             if "token" in response.text.lower() or "authentication" in response.text.lower():
                 current_app.logger.warning("Access token appears to be expired. Attempting to refresh...")
                 try:
-                    # Log current tokens before refresh
-                    current_app.logger.info(f"Before refresh - Access token: {self.access_token[:10]}... Refresh token: {self.refresh_token}")
-
-                    # Refresh the token
-                    refresh_result = self.refresh_access_token()
-                    current_app.logger.info(f"Token refresh successful: {refresh_result is not None}")
-                    current_app.logger.info(f"After refresh - Access token: {self.access_token[:10]}... Refresh token: {self.refresh_token}")
-
-                    # Retry the request with the new token
+                    self.refresh_access_token()
                     current_app.logger.info("Retrying request with new token")
                     response = _make_http_call()
-                    current_app.logger.info(f"Retry response status code: {response.status_code}")
                 except Exception as e:
                     current_app.logger.error(f"Token refresh failed: {e}")
-                    current_app.logger.error(f"Error details: {str(e)}")
                     raise
 
+        logger.debug("QuickBooks %s %s -> %s in %.0fms", method, endpoint, response.status_code,
+                      (time.perf_counter() - started) * 1000)
+
         if response.status_code in [200, 201]:
-            current_app.logger.info("API request successful")
             return response.json()
         else:
-            # Log the error details
             current_app.logger.error(f"Final API call failed: {response.status_code} {response.text}")
 
-            # Log the current tokens for debugging
-            current_app.logger.error(f"Current access token: {self.access_token[:10]}...")
-            current_app.logger.error(f"Current refresh token: {self.refresh_token}")
-
             # Raise exception with error details
             raise Exception(f"API request failed: {response.status_code} {response.text}")
 
@@ -282,12 +277,29 @@ class QuickBooks:
             current_app.logger.error(f"Error creating customer in QuickBooks: {e}")
             raise
 
-    def get_customers(self, realm_id, params=None):
-        """Retrieve a list of customers."""
+    def get_customers(self, realm_id, params=None, start_position=None, max_results=None, include_inactive=False,
+                      fields=None, order_by=None):
+        """
+        Retrieve a list of customers.
+
+        ``start_position`` (1-based) and ``max_results`` (at most 1000) page
+        through large customer lists, in a stable order when ``order_by`` is
+        given; ``include_inactive`` also returns deactivated and merged
+        customers. ``fields`` selects only those columns instead of ``*``.
+        """
         endpoint = f"{realm_id}/query"
-        query = "SELECT * FROM Customer"
-        if params:
-            query += " WHERE " + " AND ".join(f"{k}='{v}'" for k, v in params.items())
+        query = f"SELECT {', '.join(fields) if fields else '*'} FROM Customer"
+        conditions = [f"{k}='{v}'" for k, v in (params or {}).items()]
+        if include_inactive:
+            conditions.append("Active IN (true, false)")
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        if order_by:
+            query += f" ORDERBY {order_by}"
+        if start_position:
+            query += f" STARTPOSITION {start_position}"
+        if max_results:
+            query += f" MAXRESULTS {max_results}"
         return self.make_request(endpoint, method="GET", params={"query": query})
 
     def update_customer(self, realm_id, customer_data):
@@ -1558,9 +1570,9 @@ class QuickBooks:
         """
         endpoint = f"{realm_id}/batch"
         try:
-            current_app.logger.info(f"Making batch request with data: {batch_data}")
+            logger.debug("QuickBooks batch of %d items", len(batch_data.get("BatchItemRequest", [])))
             response = self.make_request(endpoint, method="POST", data=batch_data)
-            current_app.logger.info(f"Batch request successful: {response}")
+            log_payload(logger, "Batch response", response)
             return response
         except Exception as e:
             current_app.logger.error(f"Error making batch request: {str(e)}")
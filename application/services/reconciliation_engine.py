@@ -0,0 +1,327 @@
+import json
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import func, bindparam, select
+
+from application import db
+from application.models.central_models import (
+    IntegrationLog, ReconciliationWatermark, ReconciliationDiscrepancy
+)
+from application.models.mis_models import TblStudentWalletHistory
+from application.utils.bulk_query import select_in
+
+# Integration logs before this payment time predate the wallet go-live
+DEFAULT_RECONCILIATION_CUTOFF = "2026-01-12 00:00:00"
+DEFAULT_BATCH_SIZE = 2000
+
+DISCREPANCY_MISSING = "missing"
+DISCREPANCY_AMOUNT_MISMATCH = "amount_mismatch"
+
+
+class IntegrationWalletReconciler:
+    """
+    Incremental reconciliation of VALID Urubuto integration logs against
+    ``tbl_student_wallet_history``.
+
+    Each run only reads integration logs with an id above the stored
+    watermark, then re-checks the discrepancies still open from earlier runs
+    (wallet history may have been back-filled since). Work per run is
+    therefore proportional to new logs plus open discrepancies, not to the
+    size of the history.
+    """
+
+    NAME = "integration_logs_vs_wallet_history"
+
+    def __init__(self, session=None, cutoff=DEFAULT_RECONCILIATION_CUTOFF,
+                 batch_size=DEFAULT_BATCH_SIZE, logger=None):
+        self.session = session or db.session
+        self.cutoff = cutoff
+        self.batch_size = batch_size
+        self.logger = logger or current_app.logger
+
+    # ------------------------------------------------------------------
+    # Watermark
+    # ------------------------------------------------------------------
+
+    def watermark(self):
+        """Return (creating if needed) this reconciliation's watermark row"""
+        mark = self.session.get(ReconciliationWatermark, self.NAME)
+        if mark is None:
+            mark = ReconciliationWatermark(name=self.NAME, last_id=0, rows_examined=0)
+            self.session.add(mark)
+            self.session.flush()
+        return mark
+
+    # ------------------------------------------------------------------
+    # Source parsing
+    # ------------------------------------------------------------------
+
+    def _parse_log(self, row):
+        """Extract the reconciliation fields from one integration log row"""
+        try:
+            data = json.loads(row.response_data)
+        except (TypeError, ValueError):
+            return None
+        if not isinstance(data, dict):
+            return None
+
+        tx_id = data.get("transaction_id")
+        amount = data.get("amount")
+        payment_date_time = data.get("payment_date_time")
+        if not tx_id or amount is None or not payment_date_time:
+            return None
+        if str(payment_date_time) <= self.cutoff:
+            return None
+        try:
+            amount = float(amount)
+        except (TypeError, ValueError):
+            return None
+
+        return {
+            "transaction_id": str(tx_id),
+            "amount": amount,
+            "payer_code": data.get("payer_code"),
+            "observation": (data.get("observation") or "")[:500] or None,
+            "payment_date_time": str(payment_date_time),
+            "source_id": row.id,
+        }
+
+    def _history_amounts(self, transaction_ids):
+        """Wallet history amount per transaction id (bounded IN batches)"""
+        if not transaction_ids:
+            return {}
+        history = TblStudentWalletHistory.__table__
+        rows = select_in(
+            self.session,
+            select(history.c.external_transaction_id, history.c.amount),
+            history.c.external_transaction_id,
+            transaction_ids,
+        )
+        return {row.external_transaction_id: float(row.amount) for row in rows}
+
+    # ------------------------------------------------------------------
+    # Results
+    # ------------------------------------------------------------------
+
+    def _record(self, entries, history_map):
+        """
+        Store discrepancies for examined entries and resolve ones that now match.
+
+        Returns:
+            dict: counts of opened and resolved discrepancies
+        """
+        table = ReconciliationDiscrepancy.__table__
+        existing = {
+            row.transaction_id: row
+            for row in select_in(
+                self.session,
+                select(table.c.id, table.c.transaction_id, table.c.status)
+                .where(table.c.reconciliation == self.NAME),
+                table.c.transaction_id,
+                entries,
+            )
+        }
+
+        now = datetime.now()
+        inserts, updates, resolved_ids = [], [], []
+        for tx_id, entry in entries.items():
+            actual = history_map.get(tx_id)
+            if actual is None:
+                kind = DISCREPANCY_MISSING
+            elif actual != entry["amount"]:
+                kind = DISCREPANCY_AMOUNT_MISMATCH
+            else:
+                kind = None
+
+            current = existing.get(tx_id)
+            if kind is None:
+                if current is not None and current.status == "open":
+                    resolved_ids.append(current.id)
+                continue
+
+            values = {
+                "kind": kind,
+                "status": "open",
+                "payer_code": entry["payer_code"],
+                "expected_amount": entry["amount"],
+                "actual_amount": actual,
+                "observation": entry["observation"],
+                "payment_date_time": entry["payment_date_time"],
+                "source_id": entry["source_id"],
+                "resolved_at": None,
+                "updated_at": now,
+            }
+            if current is None:
+                inserts.append({
+                    "reconciliation": self.NAME, "transaction_id": tx_id,
+                    "created_at": now, **values,
+                })
+            else:
+                updates.append({"b_id": current.id, **{f"b_{k}": v for k, v in values.items()}})
+
+        if inserts:
+            self.session.execute(table.insert(), inserts)
+        if updates:
+            self.session.execute(
+                table.update()
+                .where(table.c.id == bindparam("b_id"))
+                .values({key[2:]: bindparam(key) for key in updates[0] if key != "b_id"}),
+                updates,
+            )
+        if resolved_ids:
+            self.session.execute(
+                table.update()
+                .where(table.c.id.in_(resolved_ids))
+                .values(status="resolved", resolved_at=now, updated_at=now)
+            )
+        return {"opened": len(inserts) + len(updates), "resolved": len(resolved_ids)}
+
+    # ------------------------------------------------------------------
+    # Runs
+    # ------------------------------------------------------------------
+
+    def _examine_new_logs(self, mark):
+        """Process integration logs above the watermark in id-ordered batches"""
+        logs = IntegrationLog.__table__
+        stats = {"logs_examined": 0, "transactions_checked": 0, "opened": 0, "resolved": 0}
+
+        while True:
+            rows = self.session.execute(
+                logs.select()
+                .with_only_columns(logs.c.id, logs.c.response_data)
+                .where(
+                    logs.c.id > mark.last_id,
+                    logs.c.status == "VALID",
+                    logs.c.response_data.isnot(None),
+                )
+                .order_by(logs.c.id.asc())
+                .limit(self.batch_size)
+            ).fetchall()
+            if not rows:
+                break
+
+            entries = {}
+            for row in rows:
+                entry = self._parse_log(row)
+                if entry:
+                    # a later log for the same transaction supersedes earlier ones
+                    entries[entry["transaction_id"]] = entry
+
+            if entries:
+                counts = self._record(entries, self._history_amounts(entries))
+                stats["opened"] += counts["opened"]
+                stats["resolved"] += counts["resolved"]
+                stats["transactions_checked"] += len(entries)
+
+            mark.last_id = rows[-1].id
+            mark.rows_examined = (mark.rows_examined or 0) + len(rows)
+            stats["logs_examined"] += len(rows)
+            # commit per batch so an interrupted run resumes from here
+            self.session.commit()
+
+            if len(rows) < self.batch_size:
+                break
+
+        return stats
+
+    def _recheck_open(self):
+        """Re-evaluate still-open discrepancies against current wallet history"""
+        table = ReconciliationDiscrepancy.__table__
+        resolved = rechecked = 0
+        last_id = 0
+
+        while True:
+            rows = self.session.execute(
+                table.select()
+                .where(
+                    table.c.reconciliation == self.NAME,
+                    table.c.status == "open",
+                    table.c.id > last_id,
+                )
+                .order_by(table.c.id.asc())
+                .limit(self.batch_size)
+            ).fetchall()
+            if not rows:
+                break
+
+            entries = {
+                row.transaction_id: {
+                    "amount": float(row.expected_amount),
+                    "payer_code": row.payer_code,
+                    "observation": row.observation,
+                    "payment_date_time": row.payment_date_time,
+                    "source_id": row.source_id,
+                }
+                for row in rows
+            }
+            counts = self._record(entries, self._history_amounts(entries))
+            resolved += counts["resolved"]
+            rechecked += len(rows)
+            last_id = rows[-1].id
+            self.session.commit()
+
+            if len(rows) < self.batch_size:
+                break
+
+        return {"rechecked": rechecked, "resolved": resolved}
+
+    def run(self, recheck_open=True):
+        """
+        Examine new integration logs and refresh open discrepancies.
+
+        Returns:
+            dict: Run statistics and the watermark after the run
+        """
+        started_at = datetime.now()
+        mark = self.watermark()
+        start_id = mark.last_id
+
+        stats = self._examine_new_logs(mark)
+        if recheck_open:
+            recheck = self._recheck_open()
+            stats["rechecked_open"] = recheck["rechecked"]
+            stats["resolved"] += recheck["resolved"]
+
+        mark.last_run_at = datetime.now()
+        self.session.commit()
+
+        stats["watermark"] = {"from": start_id, "to": mark.last_id}
+        stats["duration_seconds"] = (datetime.now() - started_at).total_seconds()
+        self.logger.info(f"Reconciliation {self.NAME} run: {stats}")
+        return stats
+
+    def summary(self):
+        """Open discrepancy counts per kind, read from the results table"""
+        table = ReconciliationDiscrepancy.__table__
+        counts = dict(
+            self.session.execute(
+                table.select()
+                .with_only_columns(table.c.kind, func.count(table.c.id))
+                .where(table.c.reconciliation == self.NAME, table.c.status == "open")
+                .group_by(table.c.kind)
+            ).fetchall()
+        )
+        mark = self.session.get(ReconciliationWatermark, self.NAME)
+        return {
+            "total_checked": int(mark.rows_examined) if mark else 0,
+            "missing_count": int(counts.get(DISCREPANCY_MISSING, 0)),
+            "mismatched_count": int(counts.get(DISCREPANCY_AMOUNT_MISMATCH, 0)),
+            "watermark": mark.to_dict() if mark else None,
+        }
+
+    def open_discrepancies(self, kind=None, limit=None, offset=0):
+        """Open discrepancies, oldest first"""
+        query = (
+            self.session.query(ReconciliationDiscrepancy)
+            .filter(
+                ReconciliationDiscrepancy.reconciliation == self.NAME,
+                ReconciliationDiscrepancy.status == "open",
+            )
+        )
+        if kind:
+            query = query.filter(ReconciliationDiscrepancy.kind == kind)
+        query = query.order_by(ReconciliationDiscrepancy.id.asc()).offset(offset)
+        if limit:
+            query = query.limit(limit)
+        return [discrepancy.to_dict() for discrepancy in query.all()]
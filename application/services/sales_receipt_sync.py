@@ -11,6 +11,7 @@ from datetime import datetime
 import json
 from application.helpers.json_encoder import EnhancedJSONEncoder
 from application.utils.database import db_manager
+from application.utils.reference_cache import reference_cache
 import re
 
 
@@ -128,7 +129,7 @@ class SalesReceiptSyncService:
         Raises:
             ValueError: If item not found or missing QuickBooks ID
         """
-        item = TblIncomeCategory.get_by_id(fee_category_id)
+        item = reference_cache.get(TblIncomeCategory, fee_category_id)
         
         if not item or not item.income_account_qb:
             current_app.logger.error(f"Income category {fee_category_id} not found or missing QuickBooks mapping")
@@ -0,0 +1,246 @@
+import numpy as np
+import pandas as pd
+
+# Column names used by the Urubuto/BK gateway statement export
+STATEMENT_REFERENCE = "Int. Txn Ref."
+STATEMENT_EXTERNAL_REFERENCE = "Ext. Txn Ref."
+STATEMENT_PAYER_CODE = "Payer Code"
+STATEMENT_AMOUNT = "Paid Amount"
+STATEMENT_STATUS = "Txn Status"
+STATEMENT_SLIP = "Bank Slip"
+STATEMENT_DATE = "Txn Date"
+
+STATEMENT_REQUIRED_COLUMNS = {
+    STATEMENT_PAYER_CODE,
+    STATEMENT_AMOUNT,
+    STATEMENT_STATUS,
+    STATEMENT_REFERENCE,
+}
+
+# Statuses counted as money received
+STATEMENT_INCLUDED_STATUSES = ("SUCCESSFUL", "PENDING_SETTLEMENT")
+
+DEFAULT_CHUNK_SIZE = 5000
+
+
+class StatementFormatError(ValueError):
+    """Raised when a statement file is missing required columns"""
+
+    def __init__(self, missing_columns):
+        self.missing_columns = sorted(missing_columns)
+        super().__init__(f"Missing required columns: {self.missing_columns}")
+
+
+def clean_amount(series):
+    """
+    Vectorised conversion of "43,000"-style amounts to floats.
+
+    Unparseable values become 0, matching the previous per-endpoint parsing.
+    """
+    return pd.to_numeric(
+        series.astype(str).str.replace(",", "", regex=False).str.strip(),
+        errors="coerce"
+    ).fillna(0.0)
+
+
+def _file_columns(file_path):
+    """Read only the header row and return the stripped column names"""
+    if file_path.lower().endswith((".xlsx", ".xls")):
+        header = pd.read_excel(file_path, nrows=0)
+    else:
+        header = pd.read_csv(file_path, nrows=0)
+    return {str(c).strip(): c for c in header.columns}
+
+
+def iter_file_chunks(file_path, columns, chunksize=DEFAULT_CHUNK_SIZE, required=None):
+    """
+    Stream selected columns of a CSV/Excel file as string-typed DataFrames.
+
+    Only the requested columns are parsed and every value is read as ``str``,
+    so pandas never has to infer types (payer codes keep their leading zeros,
+    20-digit references do not overflow int64). Column names are stripped.
+
+    Args:
+        file_path (str): CSV or Excel file
+        columns (iterable[str]): Columns to load; missing optional ones are skipped
+        chunksize (int): Rows per chunk
+        required (iterable[str] | None): Columns that must exist (default: all of ``columns``)
+
+    Yields:
+        pd.DataFrame: Chunks with stripped column names
+
+    Raises:
+        StatementFormatError: When required columns are missing
+    """
+    available = _file_columns(file_path)
+    required = set(columns if required is None else required)
+    missing = required - set(available)
+    if missing:
+        raise StatementFormatError(missing)
+
+    usecols = [available[c] for c in columns if c in available]
+
+    if file_path.lower().endswith((".xlsx", ".xls")):
+        # openpyxl cannot stream through pandas; parse the selected columns once
+        frame = pd.read_excel(file_path, usecols=usecols, dtype=str)
+        frame.columns = frame.columns.str.strip()
+        for start in range(0, len(frame), chunksize):
+            yield frame.iloc[start:start + chunksize]
+        return
+
+    reader = pd.read_csv(
+        file_path,
+        header=0,
+        usecols=usecols,
+        dtype=str,
+        skip_blank_lines=True,
+        chunksize=chunksize,
+    )
+    for chunk in reader:
+        chunk.columns = chunk.columns.str.strip()
+        yield chunk
+
+
+def read_file_columns(file_path, columns, required=None, chunksize=DEFAULT_CHUNK_SIZE):
+    """Load selected columns of a CSV/Excel file into one string-typed DataFrame"""
+    chunks = list(iter_file_chunks(file_path, columns, chunksize=chunksize, required=required))
+    if not chunks:
+        return pd.DataFrame(columns=list(columns))
+    return pd.concat(chunks, ignore_index=True)
+
+
+class StatementIngestService:
+    """
+    Chunked, vectorised parsing of gateway bank statements.
+
+    Each chunk is filtered to included statuses and reduced to the columns
+    the reports need before it is kept, so memory follows the number of
+    successful transactions rather than the size of the export.
+    """
+
+    def __init__(self, chunksize=DEFAULT_CHUNK_SIZE, statuses=STATEMENT_INCLUDED_STATUSES):
+        self.chunksize = chunksize
+        # None keeps every status (used when staging the full statement)
+        self.statuses = tuple(statuses) if statuses is not None else None
+
+    def iter_transactions(self, file_path):
+        """
+        Yield normalised transaction chunks from a statement file.
+
+        Yields:
+            pd.DataFrame: columns transaction_reference, payer_code,
+            paid_amount (float), slip_no (str or None), txn_date (str or None),
+            txn_status, external_reference (str or None)
+        """
+        columns = [
+            STATEMENT_REFERENCE, STATEMENT_PAYER_CODE, STATEMENT_AMOUNT,
+            STATEMENT_STATUS, STATEMENT_SLIP, STATEMENT_DATE, STATEMENT_EXTERNAL_REFERENCE,
+        ]
+        for chunk in iter_file_chunks(
+            file_path, columns, chunksize=self.chunksize, required=STATEMENT_REQUIRED_COLUMNS
+        ):
+            status = chunk[STATEMENT_STATUS].fillna("").str.strip()
+            if self.statuses is not None:
+                keep = status.isin(self.statuses)
+                chunk, status = chunk[keep], status[keep]
+            if chunk.empty:
+                continue
+
+            out = pd.DataFrame({
+                "transaction_reference": chunk[STATEMENT_REFERENCE].str.strip(),
+                "payer_code": chunk[STATEMENT_PAYER_CODE].fillna("").str.strip(),
+                "paid_amount": clean_amount(chunk[STATEMENT_AMOUNT]),
+                "txn_status": status,
+            })
+            for source, target in (
+                (STATEMENT_SLIP, "slip_no"),
+                (STATEMENT_DATE, "txn_date"),
+                (STATEMENT_EXTERNAL_REFERENCE, "external_reference"),
+            ):
+                if source in chunk.columns:
+                    out[target] = chunk[source].astype(object).where(chunk[source].notna(), None)
+                else:
+                    out[target] = None
+            yield out
+
+    def load_transactions(self, file_path):
+        """Return all included transactions of a statement as one DataFrame"""
+        chunks = list(self.iter_transactions(file_path))
+        if not chunks:
+            return pd.DataFrame(
+                columns=["transaction_reference", "payer_code", "paid_amount", "txn_status", "slip_no", "txn_date",
+                         "external_reference"]
+            )
+        return pd.concat(chunks, ignore_index=True)
+
+    @staticmethod
+    def group_by_payer(transactions):
+        """
+        Build the per-payer-code report from a transactions DataFrame.
+
+        The frame is stably sorted by payer code once; each payer's
+        transactions are then a contiguous slice of the records list, so no
+        Python loop runs per row.
+
+        Returns:
+            dict: {payer_code: {transaction_count, total_paid_amount, transactions}}
+        """
+        if transactions.empty:
+            return {}
+
+        ordered = transactions.sort_values("payer_code", kind="stable")
+        records = ordered[["transaction_reference", "paid_amount", "slip_no"]].to_dict("records")
+
+        totals = ordered.groupby("payer_code", sort=True)["paid_amount"].agg(["size", "sum"])
+        ends = np.cumsum(totals["size"].to_numpy())
+        starts = ends - totals["size"].to_numpy()
+
+        return {
+            str(payer_code): {
+                "transaction_count": int(count),
+                "total_paid_amount": float(total),
+                "transactions": records[start:end],
+            }
+            for payer_code, count, total, start, end in zip(
+                totals.index, totals["size"], totals["sum"], starts, ends
+            )
+        }
+
+    def summarize(self, file_path):
+        """
+        Parse a statement file into the ``/analyze-transactions`` report.
+
+        Returns:
+            dict: summary totals and per_payer_code breakdown
+        """
+        transactions = self.load_transactions(file_path)
+        return {
+            "summary": {
+                "total_transactions": int(len(transactions)),
+                "total_paid_amount": round(float(transactions["paid_amount"].sum()), 2),
+            },
+            "per_payer_code": self.group_by_payer(transactions),
+        }
+
+    @staticmethod
+    def to_absent_in_wallet(per_payer_code):
+        """
+        Convert a per-payer report into the ``absent_in_wallet`` payload
+        accepted by ``/sync-absent-wallet-payments``.
+        """
+        absent_in_wallet = []
+        for payer_code, info in per_payer_code.items():
+            transactions = info.get("transactions", [])
+            absent_in_wallet.append({
+                "cloud_total": info.get("total_paid_amount", 0),
+                "transaction_reference": str(transactions[0]["transaction_reference"]) if transactions else None,
+                "cloud_transactions": [
+                    {
+                        "paid_amount": tx.get("paid_amount"),
+                        "payer_code": payer_code,
+                        "slip_no": tx.get("slip_no"),
+                    }
+                    for tx in transactions
+                ],
+            })
+        return absent_in_wallet
@@ -0,0 +1,321 @@
+import hashlib
+import os
+import re
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+
+import pandas as pd
+from flask import current_app
+from sqlalchemy import func, bindparam, select
+
+from application import db
+from application.models.central_models import GatewayStatementImport, GatewayStatementTransaction
+from application.utils.bulk_query import select_in
+from application.services.statement_ingest import (
+    StatementIngestService, STATEMENT_INCLUDED_STATUSES, DEFAULT_CHUNK_SIZE
+)
+
+# Gateway exports write "11/02/2026 03:02:16" (day first)
+STATEMENT_DATE_FORMAT = "%d/%m/%Y %H:%M:%S"
+
+# An export re-saved from Excel writes the 20-digit Int. Txn Ref. as
+# "1.12026021101073E+019": 15 significant digits, so distinct transactions
+# collapse onto one reference
+SCIENTIFIC_REFERENCE = re.compile(r"^\d(\.\d+)?[eE]\+?\d+$")
+
+# Ext. Txn Ref. written by the gateway as "INT_<Int. Txn Ref.>"
+EXTERNAL_INT_REFERENCE = re.compile(r"^INT_(\d+)$")
+
+
+def recover_reference(reference, external_reference):
+    """
+    Exact Int. Txn Ref. of a statement line.
+
+    A scientific-notation reference is recovered from an ``INT_<ref>``
+    external reference that rounds to it; otherwise it cannot be trusted.
+
+    Returns:
+        str | None: The reference to stage the line under, None when lossy
+    """
+    if not SCIENTIFIC_REFERENCE.match(reference):
+        return reference
+    match = EXTERNAL_INT_REFERENCE.match(external_reference or "")
+    if not match:
+        return None
+    try:
+        rounded = Decimal(reference)
+        exact = Decimal(match.group(1))
+    except InvalidOperation:
+        return None
+    # half a unit in the last significant digit the export kept
+    if abs(exact - rounded) * 2 > Decimal(10) ** rounded.as_tuple().exponent:
+        return None
+    return match.group(1)
+
+
+class StatementStoreService:
+    """
+    Loads gateway statements once into ``gateway_statement_transactions``
+    and answers reconciliation queries from that table.
+
+    Files are identified by content hash, so re-submitting an export is a
+    no-op, and lines are deduplicated on ``Int. Txn Ref.`` so overlapping
+    exports only refresh the status, amount and slip of lines already staged.
+    The external reference is not a key: the gateway rewrites it between
+    exports and reuses short ones. Lines whose reference was saved in
+    scientific notation and cannot be recovered are rejected and counted.
+    """
+
+    def __init__(self, session=None, chunksize=DEFAULT_CHUNK_SIZE, logger=None):
+        self.session = session or db.session
+        self.chunksize = chunksize
+        self.logger = logger or current_app.logger
+
+    @staticmethod
+    def file_digest(file_path):
+        """SHA-256 of a file, read in 1 MiB blocks"""
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _to_rows(chunk):
+        """
+        Convert an ingest chunk into staging-table rows.
+
+        Returns:
+            tuple: (rows, rejected references, number of rows without a parseable txn_date)
+        """
+        references = chunk["transaction_reference"].fillna("")
+        chunk = chunk[references != ""]
+        references = references[references != ""]
+        lossy = references.str.match(SCIENTIFIC_REFERENCE)
+        if lossy.any():
+            references = references.copy()
+            references[lossy] = [
+                recover_reference(reference, external)
+                for reference, external in zip(references[lossy], chunk.loc[lossy, "external_reference"])
+            ]
+        rejected = chunk.loc[references.isna(), "transaction_reference"].tolist()
+        chunk = chunk.assign(transaction_reference=references)[references.notna()]
+
+        chunk = chunk.drop_duplicates("transaction_reference", keep="last")
+        txn_dates = pd.to_datetime(chunk["txn_date"], format=STATEMENT_DATE_FORMAT, errors="coerce")
+        frame = pd.DataFrame({
+            "transaction_reference": chunk["transaction_reference"],
+            "payer_code": chunk["payer_code"],
+            "paid_amount": chunk["paid_amount"].round(2),
+            "slip_no": chunk["slip_no"],
+            "txn_status": chunk["txn_status"],
+            "txn_date": txn_dates.astype(object).where(txn_dates.notna(), None),
+        })
+        return frame.to_dict("records"), rejected, int(txn_dates.isna().sum())
+
+    def _upsert(self, rows, import_id):
+        """
+        Insert new statement lines and refresh changed ones.
+
+        Returns:
+            tuple: (inserted, updated)
+        """
+        table = GatewayStatementTransaction.__table__
+        refs = [row["transaction_reference"] for row in rows]
+        existing = {
+            row.transaction_reference: row
+            for row in select_in(
+                self.session,
+                select(table.c.id, table.c.transaction_reference,
+                       table.c.txn_status, table.c.paid_amount, table.c.slip_no),
+                table.c.transaction_reference,
+                refs,
+            )
+        }
+
+        now = datetime.now()
+        new_rows, changed_rows = [], []
+        for row in rows:
+            current = existing.get(row["transaction_reference"])
+            if current is None:
+                new_rows.append({**row, "import_id": import_id, "created_at": now, "updated_at": now})
+            elif (current.txn_status != row["txn_status"]
+                  or Decimal(str(current.paid_amount)) != Decimal(str(row["paid_amount"]))
+                  or (row["slip_no"] and current.slip_no != row["slip_no"])):
+                changed_rows.append({
+                    "b_id": current.id,
+                    "b_txn_status": row["txn_status"],
+                    "b_paid_amount": row["paid_amount"],
+                    "b_slip_no": row["slip_no"] or current.slip_no,
+                    "b_import_id": import_id,
+                    "b_updated_at": now,
+                })
+
+        if new_rows:
+            self.session.execute(table.insert(), new_rows)
+        if changed_rows:
+            self.session.execute(
+                table.update()
+                .where(table.c.id == bindparam("b_id"))
+                .values(
+                    txn_status=bindparam("b_txn_status"),
+                    paid_amount=bindparam("b_paid_amount"),
+                    slip_no=bindparam("b_slip_no"),
+                    import_id=bindparam("b_import_id"),
+                    updated_at=bindparam("b_updated_at"),
+                ),
+                changed_rows,
+            )
+        return len(new_rows), len(changed_rows)
+
+    def import_file(self, file_path, force=False):
+        """
+        Stage a gateway statement file.
+
+        Args:
+            file_path (str): CSV/Excel statement export
+            force (bool): Re-read a file whose content was already loaded
+
+        Returns:
+            dict: Import record, plus ``already_loaded`` when skipped
+        """
+        file_hash = self.file_digest(file_path)
+        statement_import = (
+            self.session.query(GatewayStatementImport)
+            .filter(GatewayStatementImport.file_hash == file_hash)
+            .first()
+        )
+        if statement_import and statement_import.status == "loaded" and not force:
+            return {**statement_import.to_dict(), "already_loaded": True}
+
+        now = datetime.now()
+        if statement_import is None:
+            statement_import = GatewayStatementImport(
+                file_name=os.path.basename(file_path), file_hash=file_hash,
+                created_at=now, updated_at=now,
+            )
+            self.session.add(statement_import)
+        statement_import.status = "loading"
+        self.session.flush()
+
+        row_count = inserted = updated = undated = 0
+        rejected = []
+        date_from = date_to = None
+        try:
+            ingest = StatementIngestService(chunksize=self.chunksize, statuses=None)
+            for chunk in ingest.iter_transactions(file_path):
+                rows, chunk_rejected, chunk_undated = self._to_rows(chunk)
+                rejected.extend(chunk_rejected)
+                undated += chunk_undated
+                if not rows:
+                    continue
+                added, changed = self._upsert(rows, statement_import.id)
+                row_count += len(rows)
+                inserted += added
+                updated += changed
+
+                dates = [row["txn_date"] for row in rows if row["txn_date"] is not None]
+                if dates:
+                    date_from = min([d for d in (date_from, min(dates)) if d is not None])
+                    date_to = max([d for d in (date_to, max(dates)) if d is not None])
+
+            statement_import.row_count = row_count
+            statement_import.inserted_count = inserted
+            statement_import.updated_count = updated
+            statement_import.rejected_count = len(rejected)
+            statement_import.undated_count = undated
+            statement_import.txn_date_from = date_from
+            statement_import.txn_date_to = date_to
+            statement_import.status = "loaded"
+            statement_import.updated_at = datetime.now()
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            self.logger.exception(f"Statement import failed for {file_path}")
+            raise
+
+        self.logger.info(
+            f"Statement {statement_import.file_name} loaded: {row_count} rows, "
+            f"{inserted} new, {updated} updated"
+        )
+        if rejected:
+            self.logger.warning(
+                f"Statement {statement_import.file_name}: {len(rejected)} lines rejected, "
+                f"Int. Txn Ref. in scientific notation (e.g. {rejected[:3]}); re-export the file as text"
+            )
+        if undated:
+            self.logger.warning(
+                f"Statement {statement_import.file_name}: {undated} lines have a Txn Date not in "
+                f"{STATEMENT_DATE_FORMAT} and are left out of date-range reports"
+            )
+        return {
+            **statement_import.to_dict(),
+            "rejected_references": rejected[:20],
+            "already_loaded": False,
+        }
+
+    def list_imports(self):
+        """Loaded statement files with the transaction date range each covers"""
+        imports = (
+            self.session.query(GatewayStatementImport)
+            .order_by(GatewayStatementImport.txn_date_from.asc())
+            .all()
+        )
+        return [statement_import.to_dict() for statement_import in imports]
+
+    def _range_query(self, date_from, date_to, statuses):
+        query = self.session.query(GatewayStatementTransaction)
+        if date_from is not None:
+            query = query.filter(GatewayStatementTransaction.txn_date >= date_from)
+        if date_to is not None:
+            query = query.filter(GatewayStatementTransaction.txn_date < date_to)
+        if statuses:
+            query = query.filter(GatewayStatementTransaction.txn_status.in_(statuses))
+        return query
+
+    def transactions(self, date_from=None, date_to=None, statuses=STATEMENT_INCLUDED_STATUSES):
+        """
+        Staged statement lines in ``[date_from, date_to)`` as a DataFrame
+        shaped like ``StatementIngestService.load_transactions``.
+        """
+        rows = (
+            self._range_query(date_from, date_to, statuses)
+            .with_entities(
+                GatewayStatementTransaction.transaction_reference,
+                GatewayStatementTransaction.payer_code,
+                GatewayStatementTransaction.paid_amount,
+                GatewayStatementTransaction.txn_status,
+                GatewayStatementTransaction.slip_no,
+                GatewayStatementTransaction.txn_date,
+            )
+            .order_by(GatewayStatementTransaction.txn_date.asc(), GatewayStatementTransaction.id.asc())
+            .all()
+        )
+        frame = pd.DataFrame(
+            rows,
+            columns=["transaction_reference", "payer_code", "paid_amount", "txn_status", "slip_no", "txn_date"],
+        )
+        frame["paid_amount"] = frame["paid_amount"].astype(float)
+        return frame
+
+    def summarize(self, date_from=None, date_to=None, statuses=STATEMENT_INCLUDED_STATUSES):
+        """
+        The ``/analyze-transactions`` report for a date range, from staged lines.
+        """
+        totals = (
+            self._range_query(date_from, date_to, statuses)
+            .with_entities(
+                func.count(GatewayStatementTransaction.id),
+                func.coalesce(func.sum(GatewayStatementTransaction.paid_amount), 0),
+            )
+            .one()
+        )
+        return {
+            "summary": {
+                "total_transactions": int(totals[0]),
+                "total_paid_amount": round(float(totals[1]), 2),
+            },
+            "per_payer_code": StatementIngestService.group_by_payer(
+                self.transactions(date_from, date_to, statuses)
+            ),
+        }
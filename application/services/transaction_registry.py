@@ -0,0 +1,125 @@
+from flask import current_app
+from sqlalchemy import select, literal, union_all
+
+from application.models.mis_models import Payment, TblStudentWallet, TblStudentWalletHistory
+from application.models.central_models import IntegrationLog
+from application.utils.bulk_query import chunked
+
+# Every table that records an external (Urubuto/bank) transaction id, keyed by
+# the source name returned from lookups. Each column is backed by an index
+# (see the ``transaction id indexes`` Alembic revisions).
+TRANSACTION_SOURCES = {
+    "payment": (Payment.__table__.c.id, Payment.__table__.c.external_transaction_id),
+    "wallet": (TblStudentWallet.__table__.c.id, TblStudentWallet.__table__.c.external_transaction_id),
+    "wallet_history": (
+        TblStudentWalletHistory.__table__.c.id,
+        TblStudentWalletHistory.__table__.c.external_transaction_id,
+    ),
+    "integration_log": (IntegrationLog.__table__.c.id, IntegrationLog.__table__.c.transaction_key),
+}
+
+
+class TransactionRegistry:
+    """
+    Unified lookup of external transaction ids across payments, wallets,
+    wallet history and integration logs.
+
+    All sources are probed in a single UNION ALL statement, one indexed
+    equality/IN probe per table, so an idempotency check costs one round
+    trip regardless of how many tables carry the transaction. Bulk lookups
+    send one such statement per bounded batch of ids.
+    """
+
+    @staticmethod
+    def build_query(transaction_ids, sources=None):
+        """
+        Build the UNION ALL probe for the given transaction ids.
+
+        Args:
+            transaction_ids (list[str]): External transaction ids
+            sources (list[str] | None): Restrict to these sources (default: all)
+
+        Returns:
+            CompoundSelect: Rows of (source, record_id, transaction_id)
+        """
+        sources = list(sources or TRANSACTION_SOURCES)
+        unknown = set(sources) - set(TRANSACTION_SOURCES)
+        if unknown:
+            raise ValueError(f"Unknown transaction sources: {sorted(unknown)}")
+
+        selects = []
+        for source in sources:
+            id_column, txn_column = TRANSACTION_SOURCES[source]
+            selects.append(
+                select(
+                    literal(source).label("source"),
+                    id_column.label("record_id"),
+                    txn_column.label("transaction_id"),
+                ).where(txn_column.in_(transaction_ids))
+            )
+        return union_all(*selects)
+
+    @classmethod
+    def lookup(cls, transaction_ids, sources=None, session=None):
+        """
+        Find where each transaction id has already been recorded.
+
+        Args:
+            transaction_ids (iterable[str]): External transaction ids
+            sources (list[str] | None): Restrict to these sources (default: all)
+            session: Optional session; defaults to a MIS session
+
+        Returns:
+            dict: {transaction_id: {source: record_id}} for ids found anywhere
+        """
+        transaction_ids = sorted({str(t) for t in transaction_ids if t})
+        if not transaction_ids:
+            return {}
+
+        def run(active_session):
+            # bounded IN lists per statement for large reconciliation batches
+            rows = []
+            for batch in chunked(transaction_ids):
+                rows.extend(active_session.execute(cls.build_query(batch, sources)).all())
+            return rows
+
+        if session is not None:
+            rows = run(session)
+        else:
+            with Payment.get_session() as mis_session:
+                rows = run(mis_session)
+
+        found = {}
+        for row in rows:
+            # the first record per source wins (ids are unique per table)
+            found.setdefault(row.transaction_id, {}).setdefault(row.source, row.record_id)
+        return found
+
+    @classmethod
+    def find(cls, transaction_id, sources=None, session=None):
+        """
+        Find where a single transaction id has been recorded.
+
+        Returns:
+            dict: {source: record_id}, empty when the transaction is new
+        """
+        if not transaction_id:
+            return {}
+        return cls.lookup([transaction_id], sources=sources, session=session).get(str(transaction_id), {})
+
+    @classmethod
+    def is_duplicate(cls, transaction_id, sources=None):
+        """
+        Check whether a transaction id has already been processed.
+
+        Lookup errors are logged and treated as "not a duplicate" so callers
+        keep the behaviour of the per-table checks they replace.
+        """
+        try:
+            matches = cls.find(transaction_id, sources=sources)
+        except Exception as e:
+            current_app.logger.error(f"Transaction registry lookup failed for {transaction_id}: {str(e)}")
+            return False
+        if matches:
+            current_app.logger.info(f"Transaction {transaction_id} already recorded in: {matches}")
+        return bool(matches)
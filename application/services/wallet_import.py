@@ -0,0 +1,252 @@
+import json
+from collections import defaultdict
+from datetime import datetime, date
+from decimal import Decimal
+
+from flask import current_app
+
+from application.models.central_models import IntegrationLog
+from application.models.mis_models import (
+    TblStudentWallet, TblStudentWalletHistory, TblStudentWalletLedger,
+    TblStudentWalletBalance, TblPersonalUg, TblOnlineApplication,
+)
+from application.utils.bulk_query import select_in
+
+ABSENT_TOPUP_CHANNEL = "MOMO"
+ABSENT_TOPUP_BANK_ID = 2
+ABSENT_TOPUP_FEE_CATEGORY = 128
+ABSENT_TOPUP_STATUS = "SUCCESS"
+# History rows for gateway payments missing from the wallet are dated at the
+# 25 Jan 2026 cut-over, as the per-record sync always did.
+ABSENT_TOPUP_POSTED_AT = datetime(2026, 1, 25, 22, 0, 0)
+
+
+class AbsentWalletPaymentImporter:
+    """
+    Set-based import of gateway payments that never reached the wallet.
+
+    Payers, wallets and already-recorded transaction references for the
+    whole payload are resolved with a handful of bulk queries; wallet
+    history, ledger and integration log rows are then written with batched
+    inserts in a single MIS transaction. Per-record statuses match the
+    ``/sync-absent-wallet-payments`` per-record loop.
+    """
+
+    def __init__(self, logger=None):
+        self.logger = logger or current_app.logger
+
+    @staticmethod
+    def _flatten(records):
+        """(transaction_reference, cloud transaction) pairs in payload order"""
+        return [
+            (record.get("transaction_reference"), tx)
+            for record in records
+            for tx in (record.get("cloud_transactions") or [])
+        ]
+
+    @staticmethod
+    def _resolve_payers(session, payer_codes):
+        """Map payer code -> reg_no for students, then applicants"""
+        students = {
+            row.reg_no: row.reg_no
+            for row in select_in(
+                session, session.query(TblPersonalUg.reg_no), TblPersonalUg.reg_no, payer_codes
+            )
+        }
+        remaining = [code for code in payer_codes if code not in students]
+        applicants = {
+            row.tracking_id: row.tracking_id
+            for row in select_in(
+                session, session.query(TblOnlineApplication.tracking_id),
+                TblOnlineApplication.tracking_id, remaining,
+            )
+        }
+        return {**applicants, **students}
+
+    def import_records(self, records):
+        """
+        Import an ``absent_in_wallet`` payload.
+
+        Args:
+            records (list[dict]): ``absent_in_wallet`` entries
+
+        Returns:
+            list[dict]: One status entry per processed cloud transaction
+        """
+        items = self._flatten(records)
+        if not items:
+            return []
+
+        references = [str(ref) for ref, _ in items if ref]
+        payer_codes = list(dict.fromkeys(tx.get("payer_code") for _, tx in items if tx.get("payer_code")))
+
+        with TblStudentWalletHistory.get_session() as session:
+            history_refs = {
+                row.external_transaction_id
+                for row in select_in(
+                    session, session.query(TblStudentWalletHistory.external_transaction_id),
+                    TblStudentWalletHistory.external_transaction_id, references,
+                )
+            }
+            ledger_refs = {
+                row.trans_code
+                for row in select_in(
+                    session, session.query(TblStudentWalletLedger.trans_code),
+                    TblStudentWalletLedger.trans_code, references,
+                )
+            }
+            payers = self._resolve_payers(session, payer_codes)
+            # Locked until commit: a live callback's increment_dept on one of
+            # these wallets waits instead of being overwritten by dept below
+            wallets = {
+                wallet.reg_no: wallet
+                for wallet in select_in(
+                    session, session.query(TblStudentWallet).with_for_update().populate_existing(),
+                    TblStudentWallet.reg_no, sorted(set(payers.values())),
+                )
+            }
+
+            now = datetime.now()
+            results = []
+            history_rows, ledger_rows, log_rows = [], [], []
+            ledger_deltas = defaultdict(Decimal)
+            ledger_entries = defaultdict(int)
+
+            for transaction_reference, tx in items:
+                payer_code = tx.get("payer_code")
+                slip_no = tx.get("slip_no")
+                amount = float(tx.get("paid_amount", 0))
+                reference = str(transaction_reference) if transaction_reference else None
+
+                if reference in history_refs:
+                    results.append({
+                        "payer_code": payer_code,
+                        "transaction_reference": transaction_reference,
+                        "status": "DUPLICATE"
+                    })
+                    continue
+
+                reg_no = payers.get(payer_code)
+                if reg_no is None:
+                    results.append({
+                        "payer_code": payer_code,
+                        "status": "FAILED",
+                        "reason": "Payer not found"
+                    })
+                    continue
+
+                wallet = wallets.get(reg_no)
+                balance_before = float(wallet.dept or 0.0) if wallet else 0.0
+                balance_after = balance_before + amount
+
+                history_rows.append({
+                    "wallet_id": wallet.id if wallet else None,
+                    "reg_no": reg_no,
+                    "reference_number": (wallet.reference_number or None) if wallet
+                    else f"{int(now.strftime('%Y%m%d%H%M%S'))}_{reg_no}",
+                    "transaction_type": "TOPUP",
+                    "slip_no": slip_no,
+                    "amount": amount,
+                    "balance_before": balance_before,
+                    "balance_after": balance_after,
+                    "trans_code": reference,
+                    "external_transaction_id": reference,
+                    "payment_chanel": ABSENT_TOPUP_CHANNEL,
+                    "bank_id": wallet.bank_id if wallet else ABSENT_TOPUP_BANK_ID,
+                    "created_at": ABSENT_TOPUP_POSTED_AT,
+                    "comment": "Wallet top-up",
+                    "created_by": "SYSTEM",
+                })
+                history_refs.add(reference)
+
+                if reference in ledger_refs:
+                    # history is back-filled but the ledger (and wallet) already carry it
+                    results.append({
+                        "payer_code": payer_code,
+                        "transaction_reference": transaction_reference,
+                        "status": "LEDGER_EXISTS"
+                    })
+                    continue
+
+                if amount >= 0:
+                    ledger_rows.append({
+                        "student_id": reg_no,
+                        "direction": "credit",
+                        "original_amount": abs(Decimal(str(amount))),
+                        "amount": Decimal(str(amount)),
+                        "trans_code": reference,
+                        "payment_chanel": ABSENT_TOPUP_CHANNEL,
+                        "bank_id": ABSENT_TOPUP_BANK_ID,
+                        "source": "sales_receipt",
+                        "slip_no": slip_no,
+                        "created_at": now,
+                    })
+                    ledger_refs.add(reference)
+                    ledger_deltas[reg_no] += Decimal(str(amount))
+                    ledger_entries[reg_no] += 1
+
+                if wallet:
+                    wallet.dept = balance_after
+                    wallet.external_transaction_id = reference
+                    wallet.trans_code = reference
+                    wallet.payment_date = now
+                else:
+                    wallet = TblStudentWallet(
+                        reg_prg_id=int(now.strftime("%Y%m%d%H%M%S")),
+                        reg_no=reg_no,
+                        reference_number=f"{int(now.strftime('%Y%m%d%H%M%S'))}_{reg_no}",
+                        trans_code=reference,
+                        external_transaction_id=reference,
+                        payment_chanel=ABSENT_TOPUP_CHANNEL,
+                        payment_date=date.today(),
+                        is_paid="Yes",
+                        dept=amount,
+                        fee_category=ABSENT_TOPUP_FEE_CATEGORY,
+                        bank_id=ABSENT_TOPUP_BANK_ID,
+                        slip_no=slip_no if slip_no else "N/A"
+                    )
+                    session.add(wallet)
+                    # later payments for this payer reference the new wallet id
+                    session.flush()
+                    wallets[reg_no] = wallet
+
+                log_rows.append({
+                    "system_name": "UrubutoPay",
+                    "operation": "Wallet Payment",
+                    "status": ABSENT_TOPUP_STATUS,
+                    "external_transaction_id": reference,
+                    "transaction_key": reference,
+                    "payer_code": payer_code,
+                    "response_data": json.dumps(tx),
+                    "started_at": now,
+                    "completed_at": now,
+                    "created_at": now,
+                    "updated_at": now,
+                })
+
+                results.append({
+                    "payer_code": payer_code,
+                    "reg_no": reg_no,
+                    "amount": amount,
+                    "transaction_reference": transaction_reference,
+                    "status": "SUCCESS"
+                })
+
+            # wallet updates/creations flush first so history wallet_ids resolve
+            session.flush()
+            if history_rows:
+                session.execute(TblStudentWalletHistory.__table__.insert(), history_rows)
+            if ledger_rows:
+                session.execute(TblStudentWalletLedger.__table__.insert(), ledger_rows)
+                # Core inserts bypass the ledger listener; keep the snapshot in step
+                TblStudentWalletBalance.apply_deltas(
+                    session.connection(), dict(ledger_deltas), entries=dict(ledger_entries)
+                )
+            if log_rows:
+                session.execute(IntegrationLog.__table__.insert(), log_rows)
+
+        self.logger.info(
+            f"Absent wallet payments imported: {len(history_rows)} history, "
+            f"{len(ledger_rows)} ledger rows for {len(items)} transactions"
+        )
+        return results
@@ -16,17 +16,7 @@ from application.models.mis_models import TblOnlineApplication, TblImvoice, TblP
 from datetime import datetime
 from celery import group, shared_task
 from application.services.income_sync import IncomeSyncService
-
-
-import redis
-
-# Initialize Redis client (add this at the top of your file with other imports)
-redis_client = redis.Redis(
-    host=os.getenv('REDIS_HOST', 'localhost'),
-    port=int(os.getenv('REDIS_PORT', 6379)),
-    db=int(os.getenv('REDIS_DB', 0)),
-    decode_responses=True
-)
+from application.utils.redis_pool import redis_client, advance_offset
 
 flask_app = create_app(os.getenv('FLASK_ENV', 'development'))
 flask_app.logger.setLevel(logging.DEBUG)
@@ -548,8 +538,9 @@ def bulk_sync_applicants_task(self, tracking_ids=None, batch_size=50, filter_uns
             if current_offset is not None:
                 # Increment offset by successfully processed records (synced + skipped)
                 # Don't count failed records so they can be retried
-                new_offset = current_offset + total_synced + total_skipped
-                redis_client.set(offset_key, new_offset)
+                advanced, new_offset = advance_offset(offset_key, current_offset, total_synced + total_skipped)
+                if not advanced:
+                    flask_app.logger.warning(f"Sync offset moved by another run since {current_offset}; left at {new_offset}")
                 
                 flask_app.logger.info(
                     f"Updated sync offset from {current_offset} to {new_offset}"
@@ -1736,8 +1727,9 @@ def bulk_sync_invoices_task(self, invoice_ids=None, batch_size=50, filter_unsync
             if current_offset is not None:
                 # Increment offset by successfully processed records (synced + skipped)
                 # Don't count failed records so they can be retried
-                new_offset = current_offset + total_synced + total_skipped
-                redis_client.set(offset_key, new_offset)
+                advanced, new_offset = advance_offset(offset_key, current_offset, total_synced + total_skipped)
+                if not advanced:
+                    flask_app.logger.warning(f"Sync offset moved by another run since {current_offset}; left at {new_offset}")
                 
                 flask_app.logger.info(
                     f"Updated invoice sync offset from {current_offset} to {new_offset}"
@@ -2105,8 +2097,9 @@ def bulk_sync_payments_task(self, payment_ids=None, batch_size=100, filter_unsyn
             if current_offset is not None:
                 # Increment offset by successfully processed records (synced + skipped)
                 # Don't count failed records so they can be retried
-                new_offset = current_offset + total_synced + total_skipped
-                redis_client.set(offset_key, new_offset)
+                advanced, new_offset = advance_offset(offset_key, current_offset, total_synced + total_skipped)
+                if not advanced:
+                    flask_app.logger.warning(f"Sync offset moved by another run since {current_offset}; left at {new_offset}")
                 
                 flask_app.logger.info(
                     f"Updated payment sync offset from {current_offset} to {new_offset}"
@@ -0,0 +1,101 @@
+"""
+Helpers for filtering on large lists of ids
+
+A single ``IN (...)`` with thousands of bound values degrades MySQL's plan and
+can exceed ``max_allowed_packet``. ``select_in`` keeps short lists as one
+``IN``, splits medium lists into bounded batches and, for large lists, loads
+the ids into a session temporary table and filters with a semi-join.
+"""
+
+import itertools
+import uuid
+
+from sqlalchemy import Table, Column, MetaData, String, Text, select, text
+from sqlalchemy.orm import Query
+
+# Largest list sent as one IN (...)
+IN_LIST_CHUNK_SIZE = 1000
+
+# Lists longer than this are joined through a temporary table
+TEMP_TABLE_THRESHOLD = 10000
+
+
+def chunked(values, size=IN_LIST_CHUNK_SIZE):
+    """Yield successive lists of at most ``size`` items"""
+    iterator = iter(values)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def unique_values(values):
+    """De-duplicate ids preserving first-seen order and dropping None/empty"""
+    return list(dict.fromkeys(v for v in values if v is not None and v != ""))
+
+
+def _run(session, stmt):
+    """Execute an ORM Query or a select() and return all rows"""
+    if isinstance(stmt, Query):
+        return stmt.with_session(session).all()
+    return session.execute(stmt).all()
+
+
+def _temp_table_type(column):
+    """Id column type for the temp table; TEXT cannot be a MySQL key"""
+    if isinstance(column.type, (String, Text)):
+        return String(255)
+    return column.type
+
+
+def _select_via_temp_table(session, stmt, column, values):
+    connection = session.connection()
+    name = f"tmp_ids_{uuid.uuid4().hex[:12]}"
+    temp = Table(
+        name,
+        MetaData(),
+        Column("value", _temp_table_type(column), primary_key=True),
+        prefixes=["TEMPORARY"],
+    )
+    temp.create(connection)
+    try:
+        for batch in chunked(values, IN_LIST_CHUNK_SIZE):
+            connection.execute(temp.insert(), [{"value": v} for v in batch])
+        return list(_run(session, stmt.filter(column.in_(select(temp.c.value)))))
+    finally:
+        # plain DROP TABLE implicitly commits on MySQL, DROP TEMPORARY does not
+        if connection.dialect.name == "mysql":
+            connection.execute(text(f"DROP TEMPORARY TABLE IF EXISTS {name}"))
+        else:
+            temp.drop(connection)
+
+
+def select_in(session, stmt, column, values, chunk_size=IN_LIST_CHUNK_SIZE,
+              temp_table_threshold=TEMP_TABLE_THRESHOLD):
+    """
+    Run ``stmt`` filtered to rows whose ``column`` is in ``values``.
+
+    Args:
+        session: Session to execute with (its connection hosts any temp table)
+        stmt: ORM ``Query`` or ``select()`` without the IN filter
+        column: Column compared against the values
+        values (iterable): Ids to match; duplicates and None are ignored
+        chunk_size (int): Largest IN list sent in one statement
+        temp_table_threshold (int): Use a temporary table above this many ids
+
+    Returns:
+        list: Rows/entities from all batches. Each row matches one id, so
+        batches never overlap unless ``stmt`` itself yields duplicates.
+    """
+    values = unique_values(values)
+    if not values:
+        return []
+
+    if len(values) > temp_table_threshold:
+        return _select_via_temp_table(session, stmt, column, values)
+
+    results = []
+    for batch in chunked(values, chunk_size):
+        results.extend(_run(session, stmt.filter(column.in_(batch))))
+    return results
@@ -2,6 +2,7 @@
 import logging
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import worker_process_init, worker_ready, task_prerun, task_postrun
 from kombu import Queue
 
 log = logging.getLogger("celery.setup")
@@ -36,6 +37,30 @@ def make_celery(app):
         init_database_manager(app)
         app.logger.info("DatabaseManager ready — MIS DB works in Celery!")
 
+    # Each worker starts with the MIS reference tables in memory. Prefork
+    # children and the solo pool send worker_process_init; the gevent and
+    # threads pools run tasks in the main process, which only sends worker_ready.
+    def warm_reference_cache(sender=None, **kwargs):
+        pool = getattr(sender, "pool", None)
+        if pool is not None and type(pool).__module__ == "celery.concurrency.prefork":
+            return  # the parent runs no tasks; each child warms itself
+        with app.app_context():
+            try:
+                import application.models.mis_models  # registers the reference tables
+                from application.utils.reference_cache import reference_cache
+                if not reference_cache.is_warm():
+                    reference_cache.warm()
+            except Exception as e:
+                app.logger.warning(f"Reference cache not warmed at worker start: {e}")
+
+    worker_process_init.connect(warm_reference_cache, weak=False)
+    worker_ready.connect(warm_reference_cache, weak=False)
+
+    # Per-task DB, QuickBooks and Redis metrics, added to job:{job_id} hashes
+    from application.utils.instrumentation import task_started, task_finished
+    task_prerun.connect(task_started, weak=False)
+    task_postrun.connect(task_finished, weak=False)
+
     # Move all your beat/queues/routes here (or in create_app)
     celery.conf.update(
         timezone='Africa/Kigali',
@@ -43,6 +68,7 @@ def make_celery(app):
         task_queues=(
             Queue("celery"),
             Queue("payment_sync_queue"),
+            Queue("reconciliation_job_queue"),
         ),
         task_routes={
             "application.config_files.payment_sync.sync_payment_to_quickbooks_task": {
@@ -57,6 +83,9 @@ def make_celery(app):
             "application.tasks.delete_sales_receipt_master.delete_all_wallet_sales_receipts_master": {
                 "queue": "wallet_sync_queue"
             },
+            "application.config_files.reconciliation_job_task.run_reconciliation_job_task": {
+                "queue": "reconciliation_job_queue"
+            },
 
         },
         beat_schedule={
@@ -72,6 +101,22 @@ def make_celery(app):
             "task": "application.config_files.tasks.bulk_sync_applicants_task",
             "schedule": crontab(minute='6,42', hour='0-23', day_of_week='mon,tue,wed,thu,fri'),
             },
+            "verify_wallet_balances_nightly": {
+            "task": "application.config_files.wallet_balance_task.verify_wallet_balances_task",
+            "schedule": crontab(hour=1, minute=15),
+            },
+            "reconcile_integration_vs_wallet_history_hourly": {
+            "task": "application.config_files.reconciliation_task.reconcile_integration_vs_wallet_history_task",
+            "schedule": crontab(minute=25),
+            },
+            "refresh_duplicate_report_nightly": {
+            "task": "application.config_files.duplicate_detection_task.refresh_duplicate_report_task",
+            "schedule": crontab(hour=2, minute=40),
+            },
+            "refresh_customer_index": {
+            "task": "application.config_files.customer_index_task.refresh_customer_index_task",
+            "schedule": crontab(minute=50, hour='*/4'),
+            },
         }
     )
 
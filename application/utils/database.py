@@ -11,6 +11,8 @@ from sqlalchemy.pool import QueuePool
 from sqlalchemy.exc import DisconnectionError
 from flask import current_app
 import os
+from application.utils.instrumentation import instrument_engine
+from application.utils.query_profiler import QueryProfiler
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -25,6 +27,7 @@ class DatabaseManager:
     def __init__(self):
         self.engines = {}
         self.session_factories = {}
+        self.profiler = None
         self._setup_engines()
     
     def _setup_engines(self):
@@ -46,6 +49,9 @@ class DatabaseManager:
         if 'mis' in self.engines:
             return
 
+        if self.profiler is None:
+            self.profiler = QueryProfiler.from_config(config)
+
 
         try:
             engine = create_engine(
@@ -64,6 +70,7 @@ class DatabaseManager:
             
             # Add connection event listeners
             self._add_connection_listeners(engine)
+            instrument_engine(engine, 'mis')
             
             self.engines['mis'] = engine
             self.session_factories['mis'] = sessionmaker(
@@ -76,8 +83,10 @@ class DatabaseManager:
             logger.error(f"Failed to setup MIS database connection: {e}")
             raise
     
-    def _add_connection_listeners(self, engine):
-        """Add event listeners for connection management"""
+    def _add_connection_listeners(self, engine, name='mis'):
+        """Add event listeners for connection management (and the query profiler when enabled)"""
+        if self.profiler is not None:
+            self.profiler.attach(engine, name)
         
         @event.listens_for(engine, "connect")
         def set_sqlite_pragma(dbapi_connection, connection_record):
@@ -199,6 +208,10 @@ def init_database_manager(app):
     with app.app_context():
         try:
             db_manager.setup_mis_connection(app.config)
+            if db_manager.profiler is not None:
+                from application import db
+                db_manager.profiler.attach(db.engine, 'central')
+                app.logger.info("Query profiler enabled")
             app.logger.info("Database manager initialized successfully")
         except Exception as e:
             app.logger.error(f"Failed to initialize database manager: {e}")
@@ -0,0 +1,111 @@
+"""
+Declarative prefetch of lookup rows for customer enrichment
+
+Models register their lookup relations once (``register_lookups``); for any
+list of instances ``prefetch_lookups`` then loads each lookup table with one
+``IN`` query and attaches the row as ``_cached_<name>``. Lookups into the
+in-process reference cache (countries, campuses, ...) cost no query at all.
+The ``_get_enriched_*`` helpers read those attributes, so serialising a
+whole batch costs one query per non-reference lookup table instead of one
+per instance.
+"""
+
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable
+
+from application.utils.bulk_query import select_in
+from application.utils.reference_cache import reference_cache
+
+# model class -> ordered lookup relations
+LOOKUP_RELATIONS = {}
+
+_NOT_PREFETCHED = object()
+
+
+@dataclass(frozen=True)
+class LookupRelation:
+    """
+    One lookup attached to instances of a model.
+
+    Attributes:
+        name: Attached as ``_cached_<name>``
+        model: Lookup model class
+        column: Column of the lookup model matched against the keys
+        keys: Instance -> candidate keys; the first one found wins. May read
+            lookups registered earlier, e.g. ``obj._cached_reg_program``
+    """
+    name: str
+    model: Any
+    column: str
+    keys: Callable[[Any], Iterable]
+
+    @property
+    def attribute(self):
+        return f"_cached_{self.name}"
+
+
+def register_lookups(model, *relations):
+    """Register lookup relations for ``model``, prefetched in the given order"""
+    LOOKUP_RELATIONS.setdefault(model, []).extend(relations)
+
+
+def int_key(value):
+    """``value`` as an int id when it is one (ids are often stored as strings)"""
+    if value is None:
+        return None
+    if isinstance(value, int):
+        return value
+    value = str(value).strip()
+    return int(value) if value.isdigit() else None
+
+
+def _candidate_keys(relation, obj):
+    return [key for key in (relation.keys(obj) or ()) if key is not None]
+
+
+def prefetch_lookups(session, objects, model=None):
+    """
+    Attach every registered lookup of ``model`` to ``objects``.
+
+    Args:
+        session: Session the lookups are queried with
+        objects (list): Instances of ``model``
+        model: Model class (default: the class of the first object)
+
+    Returns:
+        list: ``objects``, each carrying one ``_cached_<name>`` per relation
+        (``None`` when the lookup row does not exist)
+    """
+    if not objects:
+        return objects
+    model = model or type(objects[0])
+
+    for relation in LOOKUP_RELATIONS.get(model, ()):
+        if reference_cache.is_reference(relation.model):
+            rows = reference_cache.rows(relation.model, session)
+        else:
+            column = getattr(relation.model, relation.column)
+            keys = [key for obj in objects for key in _candidate_keys(relation, obj)]
+            rows = {
+                getattr(row, relation.column): row
+                for row in select_in(session, session.query(relation.model), column, keys)
+            }
+        for obj in objects:
+            found = None
+            for key in _candidate_keys(relation, obj):
+                if key in rows:
+                    found = rows[key]
+                    break
+            setattr(obj, relation.attribute, found)
+
+    return objects
+
+
+def cached_lookup(obj, name):
+    """The prefetched ``name`` lookup of ``obj``, or ``NOT_PREFETCHED``"""
+    return obj.__dict__.get(f"_cached_{name}", _NOT_PREFETCHED)
+
+
+def was_prefetched(obj, name):
+    """True once ``prefetch_lookups`` has attached ``name`` (even as None)"""
+    return cached_lookup(obj, name) is not _NOT_PREFETCHED
@@ -0,0 +1,356 @@
+"""
+Per-request and per-task instrumentation
+
+Each HTTP request and Celery task runs inside a ``Scope`` that counts the
+work done on its behalf:
+
+* database queries and their time, from ``before/after_cursor_execute``
+  events on the instrumented engines (central and MIS);
+* QuickBooks API calls, their latency and status (``record_qb_call`` from
+  ``QuickBooks.make_request``);
+* Redis commands and pipelines (``record_redis`` from ``redis_pool``).
+
+Finished scopes are added to the process-wide ``registry``, rendered in the
+Prometheus text format at ``/metrics``. Celery tasks run in other processes,
+so their totals are also added to shared ``metrics:task:{name}`` hashes
+(included in ``/metrics``) and, when the task takes a ``job_id``, to the
+``job:{job_id}`` progress hash as ``metrics_*`` fields.
+"""
+
+import inspect
+import logging
+import threading
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+TASK_METRICS_KEY = "metrics:task:{}"
+TASK_NAMES_KEY = "metrics:tasks"
+
+# Per-task totals kept in the shared task hashes and job hashes
+TASK_FIELDS = ("runs", "failures", "duration_ms", "db_queries", "db_ms", "qb_calls", "qb_ms", "redis_calls", "redis_ms")
+
+_scope = ContextVar("instrumentation_scope", default=None)
+_task_tokens = {}
+_scope_listeners = []
+
+
+class Scope:
+    """Work done on behalf of one request or task"""
+
+    def __init__(self, kind, name):
+        self.kind = kind
+        self.name = name
+        self.started = time.perf_counter()
+        self.duration = None
+        self.db_queries = 0
+        self.db_seconds = 0.0
+        self.qb_calls = 0
+        self.qb_seconds = 0.0
+        self.qb_errors = 0
+        self.redis_calls = 0
+        self.redis_seconds = 0.0
+        # {fingerprint: [count, seconds]}, filled by the query profiler when enabled
+        self.query_shapes = {}
+
+    def finish(self):
+        self.duration = time.perf_counter() - self.started
+        return self
+
+    def as_dict(self):
+        return {
+            "duration_ms": _ms(self.duration if self.duration is not None else time.perf_counter() - self.started),
+            "db_queries": self.db_queries,
+            "db_ms": _ms(self.db_seconds),
+            "qb_calls": self.qb_calls,
+            "qb_ms": _ms(self.qb_seconds),
+            "qb_errors": self.qb_errors,
+            "redis_calls": self.redis_calls,
+            "redis_ms": _ms(self.redis_seconds),
+        }
+
+
+def _ms(seconds):
+    return int(round(seconds * 1000))
+
+
+class MetricsRegistry:
+    """Thread-safe counters and summaries rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._values = {}
+            self._meta = {}
+
+    def inc(self, name, labels=None, amount=1, help_text="", kind="counter"):
+        key = (name, tuple(sorted((labels or {}).items())))
+        with self._lock:
+            self._meta.setdefault(name, (kind, help_text))
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def observe(self, name, seconds, labels=None, help_text=""):
+        """Add one observation to a summary (``_sum`` and ``_count``)"""
+        self.inc(f"{name}_sum", labels, seconds, help_text, kind="summary")
+        self.inc(f"{name}_count", labels, 1, help_text, kind="summary")
+
+    def value(self, name, labels=None):
+        with self._lock:
+            return self._values.get((name, tuple(sorted((labels or {}).items()))), 0)
+
+    def render(self):
+        with self._lock:
+            values = dict(self._values)
+            meta = dict(self._meta)
+        lines = []
+        described = set()
+        for (name, labels), value in sorted(values.items()):
+            family = name.rsplit("_", 1)[0] if meta[name][0] == "summary" else name
+            if family not in described:
+                kind, help_text = meta[name]
+                lines.append(f"# HELP {family} {help_text}")
+                lines.append(f"# TYPE {family} {kind}")
+                described.add(family)
+            lines.append(f"{name}{_labels(labels)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join(f'{key}="{value}"' for (key, _), value in zip(labels, escaped)) + "}"
+
+
+def _number(value):
+    return repr(round(value, 6)) if isinstance(value, float) else str(value)
+
+
+registry = MetricsRegistry()
+
+
+def current_scope():
+    return _scope.get()
+
+
+def start_scope(kind, name):
+    """Open a scope; returns the token for ``end_scope``"""
+    return _scope.set(Scope(kind, name))
+
+
+def on_scope_end(callback):
+    """Call ``callback(scope)`` whenever a scope finishes"""
+    if callback not in _scope_listeners:
+        _scope_listeners.append(callback)
+
+
+def end_scope(token):
+    """Close the scope opened with ``token`` and add it to the registry"""
+    scope = _scope.get()
+    _scope.reset(token)
+    if scope is None:
+        return None
+    scope.finish()
+    labels = {"scope": scope.kind, "name": scope.name}
+    registry.inc("scope_db_queries_total", labels, scope.db_queries, "Database queries per request or task")
+    registry.inc("scope_db_seconds_total", labels, scope.db_seconds, "Database time per request or task")
+    registry.inc("scope_quickbooks_calls_total", labels, scope.qb_calls, "QuickBooks API calls per request or task")
+    registry.inc("scope_quickbooks_seconds_total", labels, scope.qb_seconds, "QuickBooks API time per request or task")
+    registry.inc("scope_redis_calls_total", labels, scope.redis_calls, "Redis round trips per request or task")
+    registry.inc("scope_redis_seconds_total", labels, scope.redis_seconds, "Redis time per request or task")
+    for callback in _scope_listeners:
+        try:
+            callback(scope)
+        except Exception as e:
+            logger.warning("Scope listener failed: %s", e)
+    return scope
+
+
+# ---------------------------------------------------------------------------
+# Sources
+# ---------------------------------------------------------------------------
+
+def record_db_query(database, seconds):
+    scope = _scope.get()
+    if scope is not None:
+        scope.db_queries += 1
+        scope.db_seconds += seconds
+    registry.observe("db_query_duration_seconds", seconds, {"db": database}, "Database query latency")
+
+
+def record_qb_call(method, endpoint, status, seconds):
+    """
+    Count one QuickBooks HTTP call.
+
+    ``endpoint`` is reduced to its resource ("customer", "query", "batch")
+    so the realm id and query strings do not become labels.
+    """
+    path = endpoint.split("?", 1)[0].strip("/").split("/")
+    resource = path[1] if len(path) > 1 else path[0]
+    scope = _scope.get()
+    if scope is not None:
+        scope.qb_calls += 1
+        scope.qb_seconds += seconds
+        if status == "error" or int(status) >= 400:
+            scope.qb_errors += 1
+    registry.inc("quickbooks_requests_total", {"resource": resource, "method": method.upper(), "status": status},
+                 help_text="QuickBooks API calls")
+    registry.observe("quickbooks_request_duration_seconds", seconds, {"resource": resource},
+                     "QuickBooks API call latency")
+
+
+def record_redis(kind, seconds, failed=False):
+    scope = _scope.get()
+    if scope is not None:
+        scope.redis_calls += 1
+        scope.redis_seconds += seconds
+    registry.observe("redis_call_duration_seconds", seconds, {"kind": kind}, "Redis command and pipeline latency")
+    if failed:
+        registry.inc("redis_errors_total", help_text="Failed Redis calls")
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("instrumentation_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get("instrumentation_started")
+    if started:
+        record_db_query(conn.info.get("instrumentation_db", "unknown"), time.perf_counter() - started.pop())
+
+
+def instrument_engine(engine, name):
+    """Time every query on ``engine`` into the current scope (idempotent)"""
+    if event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        return
+
+    @event.listens_for(engine, "engine_connect")
+    def label_connection(conn):
+        conn.info["instrumentation_db"] = name
+
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+# ---------------------------------------------------------------------------
+# Flask
+# ---------------------------------------------------------------------------
+
+def init_instrumentation(app):
+    """Measure every request and instrument the central database engine"""
+    from flask import g, request
+
+    @app.before_request
+    def start_request_scope():
+        g._instrumentation_token = start_scope("http", request.endpoint or "unmatched")
+
+    @app.after_request
+    def finish_request_scope(response):
+        token = g.pop("_instrumentation_token", None)
+        scope = end_scope(token) if token is not None else None
+        if scope is not None:
+            labels = {"endpoint": scope.name, "method": request.method, "status": response.status_code}
+            registry.inc("http_requests_total", labels, help_text="HTTP requests")
+            registry.observe("http_request_duration_seconds", scope.duration, {"endpoint": scope.name},
+                             "HTTP request latency")
+        return response
+
+    @app.teardown_request
+    def reset_request_scope(exc):
+        token = g.pop("_instrumentation_token", None)
+        if token is not None:
+            end_scope(token)
+
+    with app.app_context():
+        try:
+            from application import db
+            instrument_engine(db.engine, "central")
+        except Exception as e:
+            app.logger.warning(f"Central database not instrumented: {e}")
+
+
+# ---------------------------------------------------------------------------
+# Celery
+# ---------------------------------------------------------------------------
+
+def _job_id(task, args, kwargs):
+    if kwargs and kwargs.get("job_id"):
+        return kwargs["job_id"]
+    try:
+        return inspect.signature(task.run).bind_partial(*(args or ()), **(kwargs or {})).arguments.get("job_id")
+    except (TypeError, ValueError):
+        return None
+
+
+def task_started(task_id=None, task=None, **kwargs):
+    """``task_prerun`` handler"""
+    _task_tokens[task_id] = start_scope("task", task.name)
+
+
+def task_finished(task_id=None, task=None, args=None, kwargs=None, state=None, client=None, **extra):
+    """
+    ``task_postrun`` handler: close the scope and add its totals to the
+    shared task hash and, when the task has a ``job_id``, its job hash.
+    """
+    token = _task_tokens.pop(task_id, None)
+    if token is None:
+        return
+    scope = end_scope(token)
+    if scope is None:
+        return
+
+    totals = scope.as_dict()
+    totals.pop("qb_errors")
+    totals["runs"] = 1
+    totals["failures"] = 0 if state == "SUCCESS" else 1
+
+    from application.utils.redis_pool import redis_client, JOB_TTL_SECONDS
+    client = client or redis_client
+    job_id = _job_id(task, args, kwargs)
+    try:
+        pipe = client.pipeline(transaction=False)
+        for field in TASK_FIELDS:
+            pipe.hincrby(TASK_METRICS_KEY.format(task.name), field, totals[field])
+        pipe.sadd(TASK_NAMES_KEY, task.name)
+        if job_id:
+            for field in TASK_FIELDS:
+                pipe.hincrby(f"job:{job_id}", f"metrics_{field}", totals[field])
+            pipe.expire(f"job:{job_id}", JOB_TTL_SECONDS)
+        pipe.execute()
+    except Exception as e:
+        logger.warning("Task metrics for %s not recorded: %s", task.name, e)
+
+
+def render_task_metrics(client=None):
+    """Shared Celery task totals (all workers) in the Prometheus text format"""
+    from application.utils.redis_pool import redis_client
+    client = client or redis_client
+    names = sorted(client.smembers(TASK_NAMES_KEY))
+    if not names:
+        return ""
+    pipe = client.pipeline(transaction=False)
+    for name in names:
+        pipe.hgetall(TASK_METRICS_KEY.format(name))
+    tasks = MetricsRegistry()
+    for name, totals in zip(names, pipe.execute()):
+        for field, value in totals.items():
+            if field in TASK_FIELDS:
+                tasks.inc(f"celery_task_{field}_total", {"task": name}, int(value),
+                          f"Celery task {field.replace('_', ' ')} across all workers")
+    return tasks.render()
+
+
+def render_metrics():
+    """This process's registry plus the shared task totals"""
+    text = registry.render()
+    try:
+        text += render_task_metrics()
+    except Exception as e:
+        logger.warning("Task metrics unavailable: %s", e)
+    return text
@@ -0,0 +1,275 @@
+"""
+Background job mode for long-running API endpoints
+
+An endpoint decorated with ``background_job`` keeps its normal synchronous
+behaviour, but called with ``?mode=job`` it only enqueues the work on Celery
+and answers ``202`` with a job id. Progress lives in the ``job:{job_id}``
+Redis hash used by the sync tasks.
+
+The finished JSON response is stored in Redis next to that hash, with the
+same TTL, so any web process can serve it and it expires with the job:
+
+* ``job:{job_id}:result`` the whole body, streamed in ranges as a download
+* ``job:{job_id}:meta`` its scalar/summary fields
+* ``job:{job_id}:list:{path}`` one JSON item per entry of each list in the
+  body, so a page is an ``LRANGE`` and only that page is decoded
+"""
+
+import json
+import uuid
+from datetime import datetime
+from functools import wraps
+
+from flask import g, request, jsonify, url_for
+
+from application.utils.redis_pool import redis_client
+
+JOB_TTL_SECONDS = 86400
+JOB_QUEUE = "reconciliation_job_queue"
+
+# List items pushed per RPUSH, and bytes per GETRANGE when downloading
+RESULT_PUSH_BATCH = 1000
+RESULT_CHUNK_BYTES = 1024 * 1024
+
+# Progress is written every this many items (plus the last one)
+PROGRESS_EVERY = 100
+
+# job name -> (undecorated view function, default result list to paginate)
+JOB_HANDLERS = {}
+
+
+def job_key(job_id):
+    return f"job:{job_id}"
+
+
+def result_key(job_id):
+    return f"{job_key(job_id)}:result"
+
+
+def meta_key(job_id):
+    return f"{job_key(job_id)}:meta"
+
+
+def list_key(job_id, path):
+    return f"{job_key(job_id)}:list:{path}"
+
+
+def background_job(name, page_key=None):
+    """
+    Allow ``?mode=job`` on an endpoint.
+
+    Place it directly above the view function (below the route, auth and
+    logging decorators) so the request is authenticated before submission
+    and the worker runs the bare view.
+
+    Args:
+        name (str): Job name, also the prefix of generated job ids
+        page_key (str): Dotted path of the result list paginated by default
+    """
+    def decorator(f):
+        JOB_HANDLERS[name] = (f, page_key)
+
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if request.args.get("mode") != "job":
+                return f(*args, **kwargs)
+            return submit_job(name)
+        return wrapper
+    return decorator
+
+
+def submit_job(name):
+    """Enqueue the current request as a background job and answer 202"""
+    from application.config_files.reconciliation_job_task import run_reconciliation_job_task
+
+    job_id = f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    args = request.args.to_dict()
+    args.pop("mode", None)
+    payload = request.get_json(silent=True)
+
+    redis_client.hset(job_key(job_id), mapping={
+        "status": "queued",
+        "name": name,
+        "processed": 0,
+        "total": 0,
+        "submitted_at": datetime.now().isoformat()
+    })
+    redis_client.expire(job_key(job_id), JOB_TTL_SECONDS)
+
+    task = run_reconciliation_job_task.apply_async(
+        args=[job_id, name, request.method, payload, args],
+        queue=JOB_QUEUE
+    )
+    redis_client.hset(job_key(job_id), "task_id", task.id)
+
+    return jsonify({
+        "status": "queued",
+        "job_id": job_id,
+        "status_url": url_for("reconciliation.get_job_status", job_id=job_id),
+        "result_url": url_for("reconciliation.get_job_result", job_id=job_id),
+        "download_url": url_for("reconciliation.download_job_result", job_id=job_id)
+    }), 202
+
+
+def report_progress(processed, total):
+    """
+    Record loop progress for the job running this request.
+
+    A no-op for synchronous requests; writes are throttled to every
+    ``PROGRESS_EVERY`` items so progress costs one Redis call per batch.
+    """
+    job_id = g.get("job_id")
+    if not job_id:
+        return
+    if processed % PROGRESS_EVERY and processed != total:
+        return
+    redis_client.hset(job_key(job_id), mapping={"processed": processed, "total": total})
+
+
+def execute_job(app, job_id, name, method="POST", payload=None, args=None):
+    """
+    Run a registered endpoint for a job and store its JSON response.
+
+    Returns:
+        dict: The final job hash
+    """
+    key = job_key(job_id)
+    handler, _ = JOB_HANDLERS[name]
+    start_time = datetime.now()
+    redis_client.hset(key, mapping={"status": "running", "start_time": start_time.isoformat()})
+
+    try:
+        with app.test_request_context(method=method, json=payload, query_string=args or {}):
+            g.job_id = job_id
+            response = app.make_response(handler())
+            body = response.get_json(silent=True)
+
+        lists = store_result(job_id, body)
+
+        status = "completed" if response.status_code < 400 else "failed"
+        final = {
+            "status": status,
+            "status_code": response.status_code,
+            "has_result": 1,
+            "result_lists": json.dumps(lists),
+        }
+        if status == "failed" and isinstance(body, dict):
+            final["error"] = str(body.get("message") or body.get("error") or "")
+    except Exception as e:
+        app.logger.exception(f"Background job {job_id} failed")
+        final = {"status": "failed", "error": str(e)}
+
+    end_time = datetime.now()
+    final.update({
+        "end_time": end_time.isoformat(),
+        "duration": (end_time - start_time).total_seconds()
+    })
+    redis_client.hset(key, mapping=final)
+    redis_client.expire(key, JOB_TTL_SECONDS)
+    return redis_client.hgetall(key)
+
+
+def get_job(job_id):
+    """The job hash, or None for unknown/expired jobs"""
+    return redis_client.hgetall(job_key(job_id)) or None
+
+
+def _result_lists(value, path=""):
+    """(dotted path, list) for every list in a result, outside other lists"""
+    if isinstance(value, list):
+        yield path, value
+    elif isinstance(value, dict):
+        for name, child in value.items():
+            yield from _result_lists(child, f"{path}.{name}" if path else str(name))
+
+
+def store_result(job_id, body, client=None):
+    """
+    Store a job's JSON response in Redis with the job TTL.
+
+    Returns:
+        list[str]: Dotted paths of the lists that can be paginated
+    """
+    client = client or redis_client
+    pipe = client.pipeline(transaction=False)
+    # ASCII JSON, so byte ranges of the stored string never split a character
+    pipe.set(result_key(job_id), json.dumps(body, default=str), ex=JOB_TTL_SECONDS)
+
+    lists = []
+    if isinstance(body, dict):
+        meta = {k: v for k, v in body.items() if not _has_list(v)}
+        pipe.set(meta_key(job_id), json.dumps(meta, default=str), ex=JOB_TTL_SECONDS)
+        for path, items in _result_lists(body):
+            key = list_key(job_id, path)
+            pipe.delete(key)
+            for start in range(0, len(items), RESULT_PUSH_BATCH):
+                pipe.rpush(key, *[json.dumps(item, default=str) for item in items[start:start + RESULT_PUSH_BATCH]])
+            pipe.expire(key, JOB_TTL_SECONDS)
+            lists.append(path)
+    pipe.execute()
+    return lists
+
+
+def has_result(job):
+    return bool(job.get("has_result"))
+
+
+def load_result(job_id):
+    """Parsed result of a finished job, or None when none is stored"""
+    body = redis_client.get(result_key(job_id))
+    return json.loads(body) if body is not None else None
+
+
+def iter_result(job_id, chunk_size=RESULT_CHUNK_BYTES):
+    """Yield a stored result's JSON in ``chunk_size`` pieces"""
+    key = result_key(job_id)
+    size = redis_client.strlen(key)
+    for start in range(0, size, chunk_size):
+        yield redis_client.getrange(key, start, start + chunk_size - 1)
+
+
+def paginate_result(job_id, job, key, page=1, per_page=100):
+    """
+    Read one page of a list out of a stored job result.
+
+    Args:
+        job_id (str): Job id
+        job (dict): The job hash (lists the paginated paths)
+        key (str): Dotted path to the list, e.g. ``absent.absent_in_wallet``
+        page (int): 1-based page number
+        per_page (int): Items per page
+
+    Returns:
+        dict: The page plus the result's scalar/summary fields
+
+    Raises:
+        KeyError: When the result has no list at ``key``
+    """
+    if key not in json.loads(job.get("result_lists") or "[]"):
+        raise KeyError(key)
+
+    page = max(page, 1)
+    per_page = max(per_page, 1)
+    start = (page - 1) * per_page
+
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.llen(list_key(job_id, key))
+    pipe.lrange(list_key(job_id, key), start, start + per_page - 1)
+    pipe.get(meta_key(job_id))
+    total, items, meta = pipe.execute()
+    return {
+        "key": key,
+        "page": page,
+        "per_page": per_page,
+        "total": total,
+        "pages": (total + per_page - 1) // per_page,
+        "items": [json.loads(item) for item in items],
+        "meta": json.loads(meta) if meta else {},
+    }
+
+
+def _has_list(value):
+    """True for lists and dicts holding lists (the paginated parts of a result)"""
+    if isinstance(value, list):
+        return True
+    return isinstance(value, dict) and any(_has_list(v) for v in value.values())
@@ -0,0 +1,205 @@
+"""
+Optional SQL profiler for the database engines
+
+Enabled with ``QUERY_PROFILER_ENABLED`` and attached by ``DatabaseManager``
+to the MIS and central engines. For every query it:
+
+* fingerprints the statement (literals and placeholders replaced, ``IN``
+  lists collapsed) and counts each shape within the current request or task
+  scope (``instrumentation``). A shape repeated ``N_PLUS_ONE_THRESHOLD``
+  times in one scope is reported as a likely N+1 pattern, e.g. one
+  campus/category lookup per invoice in ``map_invoice_to_quickbooks``;
+* logs statements slower than ``SLOW_QUERY_MS`` with their EXPLAIN plan.
+
+``report()`` aggregates both per endpoint/task, served at
+``/health/query-profile``.
+"""
+
+import logging
+import re
+import threading
+import time
+from functools import lru_cache
+
+from sqlalchemy import event
+
+from application.utils import instrumentation
+from application.utils.instrumentation import registry
+
+logger = logging.getLogger(__name__)
+
+# Shapes kept per endpoint in the report
+REPORT_TOP_SHAPES = 10
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|\?|:\w+")
+_IN_LIST = re.compile(r"\bin\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+_SPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=4096)
+def fingerprint(statement):
+    """Statement shape with literals and bound values replaced by ``?``"""
+    shape = _STRING.sub("?", statement)
+    shape = _PLACEHOLDER.sub("?", shape)
+    shape = _NUMBER.sub("?", shape)
+    shape = _IN_LIST.sub("in (...)", shape)
+    return _SPACE.sub(" ", shape).strip().lower()
+
+
+class QueryProfiler:
+    """
+    Slow-query and N+1 detector fed by cursor events.
+
+    Args:
+        slow_threshold_ms (float): Queries at or over this are logged with
+            their plan
+        repeat_threshold (int): Executions of one shape within a scope that
+            flag it as N+1
+        explain (bool): Run EXPLAIN for slow SELECT statements
+    """
+
+    def __init__(self, slow_threshold_ms=500, repeat_threshold=10, explain=True):
+        self.slow_threshold = slow_threshold_ms / 1000.0
+        self.repeat_threshold = repeat_threshold
+        self.explain = explain
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        instrumentation.on_scope_end(self.scope_finished)
+
+    @classmethod
+    def from_config(cls, config):
+        """Profiler from app config, or None when disabled"""
+        if str(config.get('QUERY_PROFILER_ENABLED', '')).lower() not in ('1', 'true', 'yes'):
+            return None
+        return cls(
+            slow_threshold_ms=float(config.get('SLOW_QUERY_MS', 500)),
+            repeat_threshold=int(config.get('N_PLUS_ONE_THRESHOLD', 10)),
+            explain=str(config.get('QUERY_PROFILER_EXPLAIN', 'true')).lower() in ('1', 'true', 'yes'),
+        )
+
+    def attach(self, engine, name):
+        """Profile every query on ``engine`` (idempotent)"""
+        if event.contains(engine, "before_cursor_execute", self._before_cursor_execute):
+            return
+
+        @event.listens_for(engine, "engine_connect")
+        def label_connection(conn):
+            conn.info["profiler_db"] = name
+
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", self._after_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("profiler_started", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get("profiler_started")
+        if not started:
+            return
+        seconds = time.perf_counter() - started.pop()
+        shape = fingerprint(statement)
+
+        scope = instrumentation.current_scope()
+        if scope is not None:
+            entry = scope.query_shapes.setdefault(shape, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+
+        if seconds >= self.slow_threshold:
+            self._slow_query(conn, statement, parameters, executemany, seconds, scope, context)
+
+    def _slow_query(self, conn, statement, parameters, executemany, seconds, scope, context=None):
+        database = conn.info.get("profiler_db", "unknown")
+        registry.inc("db_slow_queries_total", {"db": database}, help_text="Queries over SLOW_QUERY_MS")
+        if scope is not None:
+            with self._lock:
+                self._endpoint(scope)["slow_queries"] += 1
+        # A streamed (server-side cursor) result is still unread on this
+        # connection; EXPLAIN there would make the driver drain and truncate it
+        streaming = context is not None and (
+            context.execution_options.get("stream_results") or getattr(context, "_is_server_side", False)
+        )
+        plan = (self.explain_plan(conn, statement, parameters)
+                if self.explain and not executemany and not streaming else None)
+        logger.warning(
+            "Slow query on %s (%.0fms) in %s: %s",
+            database, seconds * 1000, scope.name if scope is not None else "-", _SPACE.sub(" ", statement)[:500],
+            extra={"query_plan": plan, "query_ms": round(seconds * 1000, 1)},
+        )
+
+    def explain_plan(self, conn, statement, parameters):
+        """
+        EXPLAIN rows for a SELECT, run on the raw DBAPI connection so the
+        plan query itself is neither timed nor profiled.
+        """
+        if not statement.lstrip().lower().startswith("select"):
+            return None
+        prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+        try:
+            cursor = conn.connection.dbapi_connection.cursor()
+            try:
+                cursor.execute(prefix + statement, parameters or ())
+                return [list(row) for row in cursor.fetchall()]
+            finally:
+                cursor.close()
+        except Exception as e:
+            return f"EXPLAIN failed: {e}"
+
+    def _endpoint(self, scope):
+        return self._endpoints.setdefault((scope.kind, scope.name), {
+            "scope": scope.kind, "name": scope.name, "runs": 0, "queries": 0, "db_ms": 0.0,
+            "slow_queries": 0, "n_plus_one_runs": 0, "shapes": {},
+        })
+
+    def scope_finished(self, scope):
+        """Flag repeated shapes and fold the scope into the endpoint report"""
+        repeated = {shape: entry for shape, entry in scope.query_shapes.items() if entry[0] >= self.repeat_threshold}
+        for shape, (count, seconds) in repeated.items():
+            logger.warning("Possible N+1 in %s: %d x %s (%.0fms)", scope.name, count, shape[:300], seconds * 1000)
+            registry.inc("db_n_plus_one_total", {"scope": scope.kind, "name": scope.name},
+                         help_text="Requests or tasks repeating one query shape over N_PLUS_ONE_THRESHOLD")
+
+        with self._lock:
+            report = self._endpoint(scope)
+            report["runs"] += 1
+            report["queries"] += sum(count for count, _ in scope.query_shapes.values())
+            report["db_ms"] += sum(seconds for _, seconds in scope.query_shapes.values()) * 1000
+            if repeated:
+                report["n_plus_one_runs"] += 1
+            for shape, (count, seconds) in scope.query_shapes.items():
+                totals = report["shapes"].setdefault(shape, {"count": 0, "db_ms": 0.0, "max_per_run": 0})
+                totals["count"] += count
+                totals["db_ms"] += seconds * 1000
+                totals["max_per_run"] = max(totals["max_per_run"], count)
+            if len(report["shapes"]) > REPORT_TOP_SHAPES * 5:
+                report["shapes"] = dict(sorted(report["shapes"].items(), key=lambda item: -item[1]["db_ms"])
+                                        [:REPORT_TOP_SHAPES * 5])
+
+    def report(self):
+        """
+        Per-endpoint/task profile, heaviest database time first.
+
+        Returns:
+            list: [{scope, name, runs, queries, db_ms, queries_per_run,
+                slow_queries, n_plus_one_runs, top_shapes}]
+        """
+        with self._lock:
+            endpoints = [dict(report, shapes=dict(report["shapes"])) for report in self._endpoints.values()]
+        result = []
+        for report in sorted(endpoints, key=lambda r: -r["db_ms"]):
+            shapes = report.pop("shapes")
+            report["db_ms"] = round(report["db_ms"], 1)
+            report["queries_per_run"] = round(report["queries"] / report["runs"], 1) if report["runs"] else 0
+            report["top_shapes"] = [
+                dict(totals, shape=shape, db_ms=round(totals["db_ms"], 1),
+                     suspect_n_plus_one=totals["max_per_run"] >= self.repeat_threshold)
+                for shape, totals in sorted(shapes.items(), key=lambda item: -item[1]["db_ms"])[:REPORT_TOP_SHAPES]
+            ]
+            result.append(report)
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._endpoints = {}
@@ -0,0 +1,214 @@
+"""
+Shared Redis connection pool for the app, Celery tasks and services
+
+Every module uses ``redis_client`` from here instead of building its own
+``redis.Redis``, so a process holds one bounded pool (``REDIS_MAX_CONNECTIONS``)
+with socket timeouts and connection health checks. Commands and pipelines
+are timed into ``metrics`` and the current request/task scope
+(``instrumentation``); ``redis_health`` reports ping latency, pool usage
+and those timings.
+
+Helpers for the batch sync tasks:
+
+* ``update_job_progress`` adds a batch's counters to the ``job:{job_id}``
+  hash in one pipelined round trip.
+* ``advance_offset`` moves a sync offset forward atomically (Lua), only if
+  it still holds the value the run started from, so overlapping runs cannot
+  skip or repeat a window.
+* ``release_lock`` deletes a ``SET NX`` lock only while it still holds the
+  caller's token, so a run that outlived its lock's expiry cannot release
+  the lock of the run that took over.
+"""
+
+import os
+import threading
+import time
+
+import redis
+from redis.client import Pipeline
+
+from application.utils import instrumentation
+
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 50))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", 5))
+REDIS_HEALTH_CHECK_INTERVAL = 30
+
+JOB_TTL_SECONDS = 86400
+
+# KEYS[1] offset key; ARGV[1] offset the run started from; ARGV[2] step
+ADVANCE_OFFSET_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+if current ~= tonumber(ARGV[1]) then
+    return {0, current}
+end
+local advanced = current + tonumber(ARGV[2])
+redis.call('SET', KEYS[1], advanced)
+return {1, advanced}
+"""
+
+# KEYS[1] lock key; ARGV[1] token the lock was taken with
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisMetrics:
+    """Thread-safe call counts and latencies for one process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.calls = {"command": 0, "pipeline": 0}
+            self.errors = 0
+            self.total_seconds = 0.0
+            self.max_seconds = 0.0
+
+    def record(self, kind, seconds, failed=False):
+        with self._lock:
+            self.calls[kind] += 1
+            self.total_seconds += seconds
+            self.max_seconds = max(self.max_seconds, seconds)
+            if failed:
+                self.errors += 1
+
+    def snapshot(self):
+        with self._lock:
+            calls = sum(self.calls.values())
+            return {
+                "commands": self.calls["command"],
+                "pipelines": self.calls["pipeline"],
+                "errors": self.errors,
+                "avg_ms": round(self.total_seconds / calls * 1000, 3) if calls else None,
+                "max_ms": round(self.max_seconds * 1000, 3),
+            }
+
+
+metrics = RedisMetrics()
+
+
+def _timed(kind, call):
+    started = time.perf_counter()
+    failed = False
+    try:
+        return call()
+    except redis.RedisError:
+        failed = True
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        metrics.record(kind, seconds, failed)
+        instrumentation.record_redis(kind, seconds, failed)
+
+
+class InstrumentedPipeline(Pipeline):
+    """Pipeline whose round trip is timed as one call"""
+
+    def execute(self, raise_on_error=True):
+        return _timed("pipeline", lambda: super(InstrumentedPipeline, self).execute(raise_on_error))
+
+
+class InstrumentedRedis(redis.Redis):
+    """``redis.Redis`` recording every command and pipeline in ``metrics``"""
+
+    def execute_command(self, *args, **options):
+        return _timed("command", lambda: super(InstrumentedRedis, self).execute_command(*args, **options))
+
+    def pipeline(self, transaction=True, shard_hint=None):
+        return InstrumentedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+pool = redis.ConnectionPool(
+    host=os.getenv("REDIS_HOST", "localhost"),
+    port=int(os.getenv("REDIS_PORT", 6379)),
+    db=int(os.getenv("REDIS_DB", 0)),
+    decode_responses=True,
+    max_connections=REDIS_MAX_CONNECTIONS,
+    socket_timeout=REDIS_SOCKET_TIMEOUT,
+    socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
+    health_check_interval=REDIS_HEALTH_CHECK_INTERVAL,
+)
+
+redis_client = InstrumentedRedis(connection_pool=pool)
+
+_advance_offset = redis_client.register_script(ADVANCE_OFFSET_SCRIPT)
+_release_lock = redis_client.register_script(RELEASE_LOCK_SCRIPT)
+
+
+def update_job_progress(job_id, counters, fields=None, client=None):
+    """
+    Add a batch's counters to the job hash in a single round trip.
+
+    Args:
+        job_id (str): Job id (hash ``job:{job_id}``)
+        counters (dict): {field: increment}, e.g. synced/failed/skipped
+        fields (dict): Plain values to set alongside
+    """
+    key = f"job:{job_id}"
+    pipe = (client or redis_client).pipeline(transaction=False)
+    for field, amount in counters.items():
+        pipe.hincrby(key, field, int(amount))
+    if fields:
+        pipe.hset(key, mapping=fields)
+    pipe.expire(key, JOB_TTL_SECONDS)
+    pipe.execute()
+
+
+def advance_offset(key, expected, step, client=None):
+    """
+    Move the offset at ``key`` from ``expected`` to ``expected + step``.
+
+    Nothing is written when the stored offset is no longer ``expected``
+    (another run advanced or reset it meanwhile).
+
+    Returns:
+        tuple: (advanced (bool), offset now stored (int))
+    """
+    script = _advance_offset if client is None else client.register_script(ADVANCE_OFFSET_SCRIPT)
+    advanced, offset = script(keys=[key], args=[int(expected), int(step)])
+    return bool(advanced), int(offset)
+
+
+def release_lock(key, token, client=None):
+    """
+    Delete the lock at ``key`` if it still holds ``token``.
+
+    Returns:
+        bool: True when the lock was ours and is now released
+    """
+    script = _release_lock if client is None else client.register_script(RELEASE_LOCK_SCRIPT)
+    return bool(script(keys=[key], args=[token]))
+
+
+def pool_stats(connection_pool=None):
+    connection_pool = connection_pool or pool
+    return {
+        "max_connections": connection_pool.max_connections,
+        "created": getattr(connection_pool, "_created_connections", None),
+        "in_use": len(getattr(connection_pool, "_in_use_connections", ())),
+        "available": len(getattr(connection_pool, "_available_connections", ())),
+    }
+
+
+def redis_health(client=None):
+    """
+    Ping Redis and report latency, pool usage and command timings.
+
+    Returns:
+        dict: ``ok`` plus details; never raises
+    """
+    client = client or redis_client
+    started = time.perf_counter()
+    try:
+        client.ping()
+        status = {"ok": True, "latency_ms": round((time.perf_counter() - started) * 1000, 3)}
+    except redis.RedisError as e:
+        status = {"ok": False, "error": str(e)}
+    status["pool"] = pool_stats(client.connection_pool)
+    status["metrics"] = metrics.snapshot()
+    return status
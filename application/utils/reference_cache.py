@@ -0,0 +1,296 @@
+"""
+In-process cache of the small, almost static MIS reference tables
+
+Countries, campuses, levels, intakes, specializations, program modes,
+banks, income categories and the province/district/sector tables are a few
+hundred KB in total but are read on every enrichment and mapping path. They
+are loaded whole into per-process dicts keyed by primary key, so a lookup
+is a dict access instead of a query.
+
+Freshness: every ``REFERENCE_CACHE_CHECK_SECONDS`` the next lookup compares
+a cheap per-table signature (row count, highest id and any registered
+change markers) with the one taken at load time and reloads only the
+tables that changed. The PHP MIS edits these tables directly, so tables
+whose QuickBooks mappings or status change in place register a
+``checksum`` marker over those columns. ORM writes to a cached
+table, and ``invalidate``, drop it as soon as the session commits and bump
+a Redis generation so other processes reload at their next check.
+"""
+
+import logging
+import os
+import threading
+import time
+from contextlib import nullcontext
+from datetime import datetime
+from functools import reduce
+
+import redis
+from sqlalchemy import String, cast, event, func, literal, select
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session, object_session
+from sqlalchemy.sql.functions import FunctionElement
+
+from application.utils.database import db_manager
+from application.utils.redis_pool import redis_client
+
+logger = logging.getLogger(__name__)
+
+REFERENCE_CACHE_CHECK_SECONDS = int(os.getenv("REFERENCE_CACHE_CHECK_SECONDS", 300))
+GENERATION_KEY = "reference_cache:generation"
+
+# session.info key collecting the cached models written in a transaction
+DIRTY_MODELS_KEY = "reference_cache_dirty"
+
+
+class _RowChecksum(FunctionElement):
+    """Aggregate that changes whenever any of its columns changes on any row"""
+    type = String()
+    name = "row_checksum"
+    inherit_cache = True
+
+
+def _joined_row(element):
+    values = [func.coalesce(cast(column, String), "") for column in element.clauses]
+    return reduce(lambda left, right: left + literal("|") + right, values)
+
+
+@compiles(_RowChecksum)
+def _compile_row_checksum(element, compiler, **kw):
+    # SQLite (tests, benchmarks): the concatenated rows themselves
+    return f"group_concat({compiler.process(_joined_row(element), **kw)}, ';')"
+
+
+@compiles(_RowChecksum, "mysql")
+def _compile_row_checksum_mysql(element, compiler, **kw):
+    return f"COALESCE(SUM(CRC32({compiler.process(_joined_row(element), **kw)})), 0)"
+
+
+def checksum(*columns):
+    """
+    Signature marker over ``columns`` (attribute names) and the primary key
+    of every row, for mappings that are edited in place.
+
+    Returns:
+        callable: ``model -> aggregate`` for ``ReferenceCache.register``
+    """
+    return lambda model: _RowChecksum(
+        *model.__mapper__.primary_key, *[getattr(model, column) for column in columns]
+    )
+
+
+class _Table:
+    """One cached reference table"""
+
+    def __init__(self, model, key, markers):
+        self.model = model
+        self.key = key
+        self.markers = markers
+        self.rows = None
+        self.signature = None
+        self.version = 0
+        self.loaded_at = None
+
+    @property
+    def name(self):
+        return self.model.__tablename__
+
+    def signature_query(self):
+        key = getattr(self.model, self.key)
+        return select(func.count(), func.max(key), *[marker(self.model) for marker in self.markers])
+
+
+class ReferenceCache:
+    """
+    Process-wide dicts of reference rows keyed by primary key.
+
+    Rows are detached ORM instances shared read-only between threads; a
+    reload builds a new dict and swaps it in, so readers never see a
+    half-loaded table.
+    """
+
+    def __init__(self, check_interval=REFERENCE_CACHE_CHECK_SECONDS, client=redis_client):
+        self.check_interval = check_interval
+        self.client = client
+        self.tables = {}
+        self.generation = None
+        self.last_check = 0.0
+        self._lock = threading.RLock()
+
+    def register(self, model, key, markers=()):
+        """
+        Cache ``model`` keyed by its ``key`` column.
+
+        Args:
+            model: MIS model class
+            key (str): Primary key attribute name
+            markers (tuple): Callables ``model -> aggregate`` added to the
+                freshness signature, for columns that change in place
+        """
+        self.tables[model] = _Table(model, key, tuple(markers))
+        for name in ("after_insert", "after_update", "after_delete"):
+            event.listen(model, name, _mark_dirty)
+
+    def is_reference(self, model):
+        return model in self.tables
+
+    def is_warm(self):
+        """True when every registered table is loaded"""
+        return bool(self.tables) and all(table.rows is not None for table in self.tables.values())
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+
+    def _session(self, session):
+        if session is not None:
+            return nullcontext(session)
+        return db_manager.get_mis_session()
+
+    def _load(self, session, table):
+        rows = session.query(table.model).all()
+        signature = tuple(session.execute(table.signature_query()).one())
+        # instances must outlive the session
+        for row in rows:
+            session.expunge(row)
+        table.rows = {getattr(row, table.key): row for row in rows}
+        table.signature = signature
+        table.version += 1
+        table.loaded_at = datetime.now()
+        logger.debug(f"Reference table {table.name} loaded: {len(rows)} rows (v{table.version})")
+
+    def _read_generation(self):
+        if self.client is None:
+            return None
+        try:
+            return self.client.get(GENERATION_KEY)
+        except redis.RedisError as e:
+            logger.warning(f"Reference cache generation unavailable: {e}")
+            return self.generation
+
+    def warm(self, session=None):
+        """
+        Load every registered table.
+
+        Returns:
+            dict: {table name: row count}
+        """
+        with self._lock, self._session(session) as session:
+            for table in self.tables.values():
+                self._load(session, table)
+            self.generation = self._read_generation()
+            self.last_check = time.monotonic()
+        counts = {table.name: len(table.rows) for table in self.tables.values()}
+        logger.info(f"Reference cache warmed: {counts}")
+        return counts
+
+    def refresh_if_stale(self, session=None, force=False):
+        """
+        Reload the tables whose signature changed since they were loaded.
+
+        Called from lookups at most once per ``check_interval``; ``force``
+        checks immediately.
+
+        Returns:
+            list[str]: Names of the reloaded tables
+        """
+        if not force and time.monotonic() - self.last_check < self.check_interval:
+            return []
+
+        with self._lock:
+            if not force and time.monotonic() - self.last_check < self.check_interval:
+                return []
+            self.last_check = time.monotonic()
+            if all(table.rows is None for table in self.tables.values()):
+                return []
+
+            generation = self._read_generation()
+            invalidated = generation != self.generation
+            self.generation = generation
+
+            reloaded = []
+            with self._session(session) as session:
+                for table in self.tables.values():
+                    if table.rows is None:
+                        continue
+                    if invalidated or tuple(session.execute(table.signature_query()).one()) != table.signature:
+                        self._load(session, table)
+                        reloaded.append(table.name)
+
+        if reloaded:
+            logger.info(f"Reference cache reloaded: {reloaded}")
+        return reloaded
+
+    def invalidate(self, model=None):
+        """
+        Drop one table (or all) so the next lookup reloads it, and tell
+        other processes to reload at their next check.
+        """
+        with self._lock:
+            for table in self.tables.values():
+                if model is None or table.model is model:
+                    table.rows = None
+            if self.client is not None:
+                try:
+                    self.generation = str(self.client.incr(GENERATION_KEY))
+                except redis.RedisError as e:
+                    logger.warning(f"Reference cache generation not bumped: {e}")
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+
+    def rows(self, model, session=None):
+        """All cached rows of ``model`` as ``{key: instance}``"""
+        table = self.tables[model]
+        self.refresh_if_stale(session)
+        rows = table.rows
+        if rows is None:
+            with self._lock, self._session(session) as session:
+                if table.rows is None:
+                    self._load(session, table)
+                rows = table.rows
+        return rows
+
+    def get(self, model, key, session=None):
+        """The ``model`` row with primary key ``key`` (ids given as strings work too)"""
+        if key is None:
+            return None
+        rows = self.rows(model, session)
+        if key not in rows and isinstance(key, str) and key.strip().isdigit():
+            key = int(key)
+        return rows.get(key)
+
+    def stats(self):
+        return {
+            "generation": self.generation,
+            "check_interval_seconds": self.check_interval,
+            "tables": {
+                table.name: {
+                    "rows": len(table.rows) if table.rows is not None else None,
+                    "version": table.version,
+                    "loaded_at": table.loaded_at.isoformat() if table.loaded_at else None,
+                }
+                for table in self.tables.values()
+            },
+        }
+
+
+reference_cache = ReferenceCache()
+
+
+def _mark_dirty(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(DIRTY_MODELS_KEY, set()).add(mapper.class_)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    for model in session.info.pop(DIRTY_MODELS_KEY, ()):
+        reference_cache.invalidate(model)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_dirty(session):
+    session.info.pop(DIRTY_MODELS_KEY, None)
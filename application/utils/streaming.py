@@ -0,0 +1,129 @@
+"""
+Streaming responses for large report endpoints
+
+``?format=ndjson`` or ``?format=csv`` switches a report from one ``jsonify``
+payload to a chunked response fed by a generator. Rows come from a
+server-side cursor (``stream_results``), so memory stays flat however many
+rows the report returns.
+"""
+
+import csv
+import io
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask import Response, current_app, request, stream_with_context
+from sqlalchemy.orm import Query
+
+STREAM_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+# Rows fetched from the cursor per round trip
+STREAM_BATCH_SIZE = 1000
+
+# Response chunks are flushed once the buffer passes this many characters
+STREAM_CHUNK_CHARS = 64 * 1024
+
+
+def requested_stream_format():
+    """The ``format`` query param when it names a streaming format, else None"""
+    fmt = (request.args.get("format") or "").lower()
+    return fmt if fmt in STREAM_FORMATS else None
+
+
+def iter_results(session, stmt, batch_size=STREAM_BATCH_SIZE):
+    """
+    Yield the rows of ``stmt`` through a server-side cursor.
+
+    Args:
+        session: Session to execute with
+        stmt: ORM ``Query``, ``select()`` or ``text()``
+        batch_size (int): Rows buffered per fetch
+    """
+    if isinstance(stmt, Query):
+        # yield_per turns on stream_results for ORM queries
+        yield from stmt.with_session(session).yield_per(batch_size)
+        return
+    result = session.execute(
+        stmt, execution_options={"stream_results": True, "yield_per": batch_size}
+    )
+    for partition in result.partitions():
+        yield from partition
+
+
+def _csv_value(value):
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _ndjson_lines(rows):
+    buffer = []
+    size = 0
+    for row in rows:
+        line = json.dumps(row, default=str) + "\n"
+        buffer.append(line)
+        size += len(line)
+        if size >= STREAM_CHUNK_CHARS:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def _csv_lines(rows, fieldnames):
+    buffer = io.StringIO()
+    writer = None
+    if fieldnames:
+        writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction="ignore")
+        writer.writeheader()
+
+    for row in rows:
+        if writer is None:
+            writer = csv.DictWriter(buffer, fieldnames=list(row), extrasaction="ignore")
+            writer.writeheader()
+        writer.writerow({key: _csv_value(value) for key, value in row.items()})
+        if buffer.tell() >= STREAM_CHUNK_CHARS:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def stream_rows(rows, fmt, filename, fieldnames=None):
+    """
+    Build a streaming response from an iterable of dict rows.
+
+    Args:
+        rows (iterable[dict]): Rows, typically a generator over ``iter_results``
+        fmt (str): ``ndjson`` or ``csv``
+        filename (str): Download name without extension
+        fieldnames (list[str] | None): CSV columns (default: keys of the first row)
+
+    Returns:
+        Response: Chunked response; nested CSV values are JSON-encoded
+    """
+    body = _csv_lines(rows, fieldnames) if fmt == "csv" else _ndjson_lines(rows)
+
+    def generate():
+        try:
+            yield from body
+        except Exception:
+            # headers are already sent; abort the stream so the client sees it truncated
+            current_app.logger.exception(f"Streaming {filename}.{fmt} failed")
+            raise
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype=STREAM_FORMATS[fmt],
+        headers={"Content-Disposition": f"attachment; filename={filename}.{fmt}"}
+    )
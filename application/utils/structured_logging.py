@@ -0,0 +1,139 @@
+"""
+Structured, level-gated logging for the app and Celery workers
+
+* Records are written as JSON lines by a file handler that runs on a
+  background ``QueueListener``: request and task threads only enqueue the
+  record, and the message is formatted once, on the writer thread.
+* Every gunicorn worker and Celery process appends to the same file, so
+  none of them rotates it: ``logrotate`` does (``scripts/logrotate.conf``)
+  and each process's ``WatchedFileHandler`` reopens the file once it has
+  been moved.
+* ``LOG_LEVEL`` sets the ``application`` logger level (INFO by default);
+  ``LOG_LEVELS`` overrides it per subsystem, e.g.
+  ``application.services.quickbooks=DEBUG,sqlalchemy.engine=WARNING``.
+* ``log_payload`` logs request/response bodies only when the logger is
+  enabled for the level and the record is sampled, truncated to
+  ``LOG_PAYLOAD_MAX_CHARS``; nothing is serialised otherwise.
+
+Log with ``%s`` arguments (``logger.debug("sent %s", item)``) on hot paths
+so the string is only built for records that are actually emitted.
+"""
+
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, WatchedFileHandler
+
+APP_LOGGER = "application"
+
+LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv("LOG_PAYLOAD_SAMPLE_RATE", 0.01))
+LOG_PAYLOAD_MAX_CHARS = int(os.getenv("LOG_PAYLOAD_MAX_CHARS", 2000))
+
+# Attributes every LogRecord has; anything else came in through ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, including ``extra`` fields"""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "module": record.module,
+            "line": record.lineno,
+            "process": record.process,
+            "thread": record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def parse_levels(spec):
+    """``"a=DEBUG,b=WARNING"`` -> ``{"a": "DEBUG", "b": "WARNING"}``"""
+    levels = {}
+    for part in (spec or "").split(","):
+        name, _, level = part.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def apply_levels(level, subsystem_levels=None):
+    """Set the application logger level and the per-subsystem overrides"""
+    logging.getLogger(APP_LOGGER).setLevel(level.upper() if isinstance(level, str) else level)
+    for name, subsystem_level in (subsystem_levels or {}).items():
+        logging.getLogger(name).setLevel(subsystem_level)
+
+
+def start_file_logging(path, logger=None):
+    """
+    Attach an asynchronous JSON lines file writer to ``logger``.
+
+    The file is opened in append mode and reopened when logrotate moves it,
+    so several processes can share it without losing records.
+
+    Returns:
+        QueueListener: The running writer (stopped at interpreter exit)
+    """
+    global _listener
+    logger = logger or logging.getLogger(APP_LOGGER)
+    if _listener is not None:
+        _listener.stop()
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    file_handler = WatchedFileHandler(path, encoding="utf-8")
+    file_handler.setFormatter(JsonFormatter())
+
+    records = queue.SimpleQueue()
+    for handler in [h for h in logger.handlers if isinstance(h, QueueHandler)]:
+        logger.removeHandler(handler)
+    logger.addHandler(QueueHandler(records))
+
+    _listener = QueueListener(records, file_handler, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_file_logging():
+    """Flush and stop the background writer"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_file_logging)
+
+
+def log_payload(logger, message, payload, level=logging.DEBUG, sample_rate=None):
+    """
+    Log a request/response body, sampled and truncated.
+
+    Skipped without serialising ``payload`` unless ``logger`` is enabled for
+    ``level`` and the record falls within ``sample_rate`` (default
+    ``LOG_PAYLOAD_SAMPLE_RATE``; 1 logs every payload).
+    """
+    if not logger.isEnabledFor(level):
+        return
+    rate = LOG_PAYLOAD_SAMPLE_RATE if sample_rate is None else sample_rate
+    if rate < 1 and random.random() >= rate:
+        return
+    text = payload if isinstance(payload, str) else json.dumps(payload, default=str)
+    if len(text) > LOG_PAYLOAD_MAX_CHARS:
+        text = f"{text[:LOG_PAYLOAD_MAX_CHARS]}... [{len(text)} chars]"
+    logger.log(level, "%s: %s", message, text, extra={"payload_sampled": rate < 1})
@@ -2,9 +2,8 @@
 
 import os
 import sys
+import argparse
 import logging
-import pandas as pd
-from datetime import datetime
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(BASE_DIR)
@@ -24,8 +23,9 @@ logger = logging.getLogger(__name__)
 # Imports
 # -------------------------------------------------
 from application import create_app
-from application.services.payment_sync import PaymentSyncService
 from application.models.central_models import QuickBooksConfig
+from application.services.payment_bulk import BulkPaymentFileEngine, OPERATION_CREATE
+from application.services.statement_ingest import StatementFormatError
 
 
 # -------------------------------------------------
@@ -44,11 +44,17 @@ PAYMENT_METHOD_ID = "2"
 # -------------------------------------------------
 # Core Logic
 # -------------------------------------------------
-def create_payments_from_excel():
+def create_payments_from_excel(file_path=FILE_PATH, restart=False):
+    """
+    Create the file's payments in QuickBooks with batch requests.
+
+    Progress is checkpointed next to the file; re-running after a crash
+    continues with the first DocNumber not yet created.
+    """
     logger.info("Starting QuickBooks Payment Creation Batch")
 
-    if not os.path.exists(FILE_PATH):
-        logger.error("Excel file not found: %s", FILE_PATH)
+    if not os.path.exists(file_path):
+        logger.error("Excel file not found: %s", file_path)
         return
 
     app = create_app()
@@ -59,131 +65,43 @@ def create_payments_from_excel():
             logger.error("QuickBooks not connected. Exiting.")
             return
 
-        df = pd.read_excel(FILE_PATH)
-
-        required_columns = [
-            "Transaction date",
-            "Number",
-            "Name",
-            "Amount",
-        ]
-
-        for col in required_columns:
-            if col not in df.columns:
-                logger.error("Missing required column: %s", col)
-                return
-
-        total = len(df)
-        logger.info("Loaded %s rows from Excel", total)
-
-        service = PaymentSyncService()
-
-        created = skipped = failed = 0
-
-        for idx, row in df.iterrows():
-            try:
-                if idx % 25 == 0:
-                    logger.info("Processing %s / %s", idx, total)
-
-                if pd.isna(row["Name"]) or pd.isna(row["Amount"]) or pd.isna(row["Transaction date"]):
-                    logger.warning("Skipping row %s (missing data)", idx)
-                    skipped += 1
-                    continue
-
-                if row["Number"] == "":
-                    logger.warning("Skipping row %s (missing DocNumber)", idx)
-                    skipped += 1
-                    continue
-
-                if row["Amount"] == "" or row["Amount"] == 0:
-                    logger.warning("Skipping row %s (missing Amount)", idx)
-                    skipped += 1
-                    continue
-
-                #query the payment first to see if it exists and skip
-                query = (
-                    "SELECT Id, SyncToken, DocNumber, TotalAmt, "
-                    "CustomerRef, DepositToAccountRef, MetaData.CreateTime "
-                    f"FROM Payment WHERE DocNumber = '{row['Number']}' MAXRESULTS 1000"
-                )
-                result = service.query_payment(query)
-                # Check if payment exists
-                query_response = result.get("QueryResponse")
-                payments = query_response.get("Payment", [])
-                logger.info("Found %s payments with DocNumber=%s", len(payments), row["Number"])
-                payment_exists = False
-                for payment in payments:
-                    deposit_value = payment.get("DepositToAccountRef", {}).get("value")
-                    if deposit_value == DEPOSIT_ACCOUNT_ID:
-                        logger.warning("Payment already exists | DocNumber=%s", row["Number"])
-                        skipped += 1
-                        payment_exists = True
-                        break
-
-                if payment_exists:
-                    continue
-
-                # Format date
-                txn_date = pd.to_datetime(row["Transaction date"], errors="coerce")
-                txn_date = txn_date.strftime("%Y-%m-%d")
-
-                payment_data = {
-                    "id": str(idx + 1),
-                    "trans_code": str(row["Number"]),
-                    "customer_ref_id": str(row["Name"]).strip(),
-                    "deposit_account_id": DEPOSIT_ACCOUNT_ID,
-                    "payment_method_id": PAYMENT_METHOD_ID,
-                    "amount": float(row["Amount"]),
-                    "date": txn_date,
-                }
-
-                logger.info(
-                    "Creating Payment | DocNumber=%s | Customer=%s | Amount=%s",
-                    payment_data["trans_code"],
-                    payment_data["customer_ref_id"],
-                    payment_data["amount"],
-                )
-
-                result = service.create_payment(payment_data)
-
-                # Robust response validation
-                if "Fault" in result:
-                    logger.error(
-                        "Creation failed | DocNumber=%s | %s",
-                        payment_data["trans_code"],
-                        result["Fault"],
-                    )
-                    failed += 1
-                    continue
-
-                if not result.get("Payment"):
-                    logger.error(
-                        "Unexpected response | DocNumber=%s | %s",
-                        payment_data["trans_code"],
-                        result,
-                    )
-                    failed += 1
-                    continue
-
-                created += 1
-
-            except Exception:
-                failed += 1
-                logger.exception("Unhandled error at row %s", idx)
+        engine = BulkPaymentFileEngine(
+            OPERATION_CREATE,
+            deposit_account_id=DEPOSIT_ACCOUNT_ID,
+            payment_method_id=PAYMENT_METHOD_ID,
+            logger=logger,
+        )
+
+        try:
+            report = engine.run(file_path, restart=restart)
+        except StatementFormatError as e:
+            logger.error("Missing required column(s): %s", ", ".join(e.missing_columns))
+            return
+
+        for entry in report["invalid_rows"]:
+            logger.warning("Skipping row %s (%s)", entry["row"], entry["reason"])
 
         logger.info(
-            "Batch completed | created=%s skipped=%s failed=%s total=%s",
-            created,
-            skipped,
-            failed,
-            total,
+            "Batch completed | created=%s skipped=%s failed=%s invalid=%s total=%s | %.1f payments/s",
+            report["created"],
+            report["skipped"],
+            report["failed"],
+            report["invalid"],
+            report["total"],
+            report["operations_per_second"],
         )
+        return report
 
 
 # -------------------------------------------------
 # Entrypoint
 # -------------------------------------------------
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create QuickBooks payments from a file")
+    parser.add_argument("--file", default=FILE_PATH, help="Excel/CSV file to process")
+    parser.add_argument("--restart", action="store_true", help="Discard the checkpoint and start over")
+    args = parser.parse_args()
+
     logger.info("QuickBooks Payment Creation Script Started")
-    create_payments_from_excel()
+    create_payments_from_excel(args.file, restart=args.restart)
     logger.info("QuickBooks Payment Creation Script Finished")
@@ -10,8 +10,8 @@ sys.path.append(BASE_DIR)
 
 from application import create_app, db
 from application.models.mis_models import TblImvoice
-from application.services.invoice_sync import InvoiceSyncService
-from application.models.central_models import QuickbooksAuditLog, QuickBooksConfig
+from application.services.qb_deletion import QuickBooksDeletionEngine, DELETED, MISSING
+from application.models.central_models import QuickBooksConfig
 
 # -------------------------------------------------
 # Logging
@@ -42,59 +42,43 @@ def delete_qb_invoices():
             logger.error("QuickBooks not connected. Exiting.")
             return
 
-        invoice_ids = [
-            i for (i,) in session.query(TblImvoice.id)
+        invoice_rows = (
+            session.query(TblImvoice.id, TblImvoice.quickbooks_id)
             .filter(TblImvoice.invoice_date >= PUSHED_FROM_DATE, TblImvoice.invoice_date <= PUSHED_TO_DATE, TblImvoice.quickbooks_id.isnot(None), TblImvoice.reference_number.isnot(None), TblImvoice.balance != TblImvoice.dept)
             .order_by(TblImvoice.invoice_date.desc())
-
             .all()
-        ]
+        )
 
-        invoice_ids = invoice_ids # Limit for testing purposes
-        logger.info("Fetched %s invoices for deletion", len(invoice_ids))
+        logger.info("Fetched %s invoices for deletion", len(invoice_rows))
 
-        if not invoice_ids:
+        if not invoice_rows:
             logger.warning("No invoices found — exiting")
             return
-        logger.info("Proceeding to delete invoices from QuickBooks, ids: %s", invoice_ids)
-        service = InvoiceSyncService()
-
-        deleted = skipped = failed = 0
-
-        for idx, invoice_id in enumerate(invoice_ids, start=1):
-            try:
-                logger.info("Processing %s / %s | invoice_id=%s", idx, len(invoice_ids), invoice_id)
-
-                # Fetch invoice object only when needed
-                invoice = TblImvoice.get_invoice_by_id(invoice_id)
-
-                if not invoice:
-                    logger.warning("Invoice ID %s not found, skipping", invoice_id)
-                    continue
-                logger.info("Deleting invoice : %s", invoice)
-                # Delete in QuickBooks
-                result = service.delete_invoice_from_quickbooks(invoice)
-
-                if result.success:
-                    TblImvoice.update_invoice_quickbooks_row(invoice_id)
-                    logger.info("Deleted invoice %s successfully", invoice_id)
-                else:
-                    logger.error(
-                        "Failed to delete invoice %s: %s", invoice_id, result.error_message
-                    )
-
-                # Commit every 50 invoices to make progress visible
-                if idx % 50 == 0:
-                    session.commit()
-                    logger.info("Committed batch at invoice %s", idx)
-
-            except Exception:
-                session.rollback()
-                logger.exception("Error processing invoice_id=%s", invoice_id)
-
-        # Final commit
-        session.commit()
-        logger.info("QuickBooks invoice deletion job completed")
+
+        # QuickBooks id -> MIS invoice ids (one QB invoice may back several rows)
+        qb_invoice_ids = {}
+        for invoice_id, quickbooks_id in invoice_rows:
+            qb_invoice_ids.setdefault(str(quickbooks_id), []).append(invoice_id)
+
+        engine = QuickBooksDeletionEngine("Invoice", logger=logger)
+        outcomes = engine.delete(qb_invoice_ids.keys())
+
+        cleared = []
+        failed = 0
+        for qb_id, outcome in outcomes.items():
+            if outcome["status"] in (DELETED, MISSING):
+                cleared.extend(qb_invoice_ids[qb_id])
+            else:
+                failed += 1
+                logger.error("Failed to delete QuickBooks invoice %s: %s", qb_id, outcome.get("error"))
+
+        # Clear the QuickBooks link on deleted invoices in bulk
+        TblImvoice.clear_quickbooks_rows(cleared)
+        logger.info(
+            "QuickBooks invoice deletion job completed | cleared=%s failed=%s",
+            len(cleared),
+            failed,
+        )
 
 
 if __name__ == "__main__":
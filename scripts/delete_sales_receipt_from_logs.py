@@ -4,7 +4,6 @@ import os
 import sys
 import logging
 import re
-from datetime import datetime
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(BASE_DIR)
@@ -24,8 +23,10 @@ logger = logging.getLogger(__name__)
 # Imports
 # -------------------------------------------------
 from application import create_app, db
-from application.services.sales_receipt_sync import SalesReceiptSyncService
 from application.models.central_models import QuickBooksConfig, QuickbooksAuditLog
+from application.services.qb_deletion import (
+    QuickBooksDeletionEngine, DEFAULT_CONCURRENCY, DELETED, MISSING
+)
 
 
 
@@ -43,29 +44,18 @@ def extract_quickbooks_id(message: str) -> str | None:
     return match.group(1) if match else None
 
 
-def get_current_sync_token_from_qb(qb_id: str) -> str:
-    """
-    Placeholder: fetch SalesReceipt from QuickBooks
-    and return its current SyncToken.
-    """
-    
-    service = SalesReceiptSyncService()
-    try:
-        sales_receipt = service.get_sales_receipt_from_quickbooks(qb_id)
-        if not sales_receipt:
-            logger.info("SalesReceipt qb_id=%s not found in QuickBooks", qb_id)
-            return None
-        logger.info("Fetched SalesReceipt: %s", sales_receipt)
-        return sales_receipt['details']['SalesReceipt']['SyncToken']
-    except Exception as e:
-        logger.error("Error fetching SalesReceipt qb_id=%s: %s", qb_id, str(e))
-        raise e
-
-
 # -------------------------------------------------
 # Main deletion logic
 # -------------------------------------------------
-def delete_all_wallet_sales_receipts(batch_size: int = 50):
+def delete_all_wallet_sales_receipts(batch_size: int = 1000, concurrency: int = DEFAULT_CONCURRENCY):
+    """
+    Delete every sales receipt recorded by a successful audit log.
+
+    Logs are handled ``batch_size`` at a time: SyncTokens are read in bulk,
+    deletes run as parallel QuickBooks batch requests and the audit log
+    statuses are updated in one statement per batch. Deleted ids are
+    checkpointed in Redis, so rerunning after a failure skips them.
+    """
     logger.info("Starting batch deletion using audit logs")
 
     app = create_app()
@@ -78,10 +68,10 @@ def delete_all_wallet_sales_receipts(batch_size: int = 50):
             return
 
         # -------------------------------------------------
-        # Fetch audit log rows
+        # Fetch audit log rows (narrow projection)
         # -------------------------------------------------
         logs = (
-            session.query(QuickbooksAuditLog)
+            session.query(QuickbooksAuditLog.id, QuickbooksAuditLog.error_message)
             .filter(
                 QuickbooksAuditLog.action_type == "sales_receipt",
                 QuickbooksAuditLog.operation_status == "SUCCESS",
@@ -96,94 +86,38 @@ def delete_all_wallet_sales_receipts(batch_size: int = 50):
         if not logs:
             return
 
-        service = SalesReceiptSyncService()
+        engine = QuickBooksDeletionEngine("SalesReceipt", concurrency=concurrency, logger=logger)
 
         deleted = skipped = failed = 0
 
-        for idx, log in enumerate(logs, start=1):
-            try:
-                if idx % 25 == 0:
-                    logger.info("Processing %s / %s", idx, total)
-
+        for start in range(0, total, batch_size):
+            batch = logs[start:start + batch_size]
+            log_qb_ids = {}
+            for log in batch:
                 qb_id = extract_quickbooks_id(log.error_message)
-
-                if not qb_id:
+                if qb_id:
+                    log_qb_ids[log.id] = qb_id
+                else:
                     logger.warning("Skipping audit_log_id=%s (no QB ID)", log.id)
                     skipped += 1
-                    continue
-
-                # -----------------------------------------
-                # SyncToken logic
-                # -----------------------------------------
-                sync_token = "0"
-                logger.info("Processing audit_log_id=%s for qb_id=%s", log.id, qb_id)
-                if log.error_message.startswith("Updated"):
-                    
-                    logger.info(
-                        "Fetching SyncToken for updated SalesReceipt qb_id=%s",
-                        qb_id,
-                    )
-                    sync_token = get_current_sync_token_from_qb(qb_id)
-                    if sync_token is None:
-                        logger.info("SalesReceipt deleted already, skipping qb_id=%s", qb_id)
-                        skipped += 1
-                        QuickbooksAuditLog.update_log_status(
-                            log.id,
-                            "SKIPPED",
-                            f"SalesReceipt ID: {qb_id} deleted already.",
-                        )
-                        continue
-                logger.info(
-                    "Deleting SalesReceipt qb_id=%s sync_token=%s",
-                    qb_id,
-                    sync_token,
-                )
-
-                result = service.delete_sales_receipt_in_quickbooks(
-                    qb_id,
-                    sync_token
-                )
-                if not result:
-                    failed += 1
-                    logger.error("Failed deleting qb_id=%s", qb_id)
-                    QuickbooksAuditLog.update_log_status(
-                        log.id,
-                        "SKIPPED",
-                        f"SalesReceipt ID: {qb_id} deleted already.",
-                    )
-                    continue
-                if not result.get("success"):
+
+            outcomes = engine.delete(log_qb_ids.values())
+
+            updates = []
+            for audit_log_id, qb_id in log_qb_ids.items():
+                outcome = outcomes[qb_id]
+                if outcome["status"] == DELETED:
+                    deleted += 1
+                    updates.append((audit_log_id, "DELETED", f"SalesReceipt ID: {qb_id} deleted successfully."))
+                elif outcome["status"] == MISSING:
+                    skipped += 1
+                    updates.append((audit_log_id, "SKIPPED", f"SalesReceipt ID: {qb_id} deleted already."))
+                else:
                     failed += 1
-                    logger.error(
-                        "Failed deleting qb_id=%s | %s",
-                        qb_id,
-                        result.get("error_message"),
-                    )
-                    
-                    continue
-
-                deleted += 1
-                QuickbooksAuditLog.update_log_status(
-                    log.id,
-                    "DELETED",
-                    f"SalesReceipt ID: {qb_id} deleted successfully.",
-                )
-                if idx % batch_size == 0:
-                    session.commit()
-                    logger.info("Committed batch at %s records", idx)
-
-            except NotImplementedError:
-                failed += 1
-                logger.error("SyncToken fetch not implemented for qb_id=%s", qb_id)
-
-            except Exception:
-                session.rollback()
-                failed += 1
-                logger.exception(
-                    "Unhandled error processing audit_log_id=%s", log.id
-                )
-
-        session.commit()
+                    logger.error("Failed deleting qb_id=%s | %s", qb_id, outcome.get("error"))
+
+            QuickbooksAuditLog.bulk_update_status(updates)
+            logger.info("Processed %s / %s", min(start + batch_size, total), total)
 
         logger.info(
             "Batch deletion completed | deleted=%s skipped=%s failed=%s total=%s",
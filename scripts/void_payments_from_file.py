@@ -2,8 +2,8 @@
 
 import os
 import sys
+import argparse
 import logging
-import pandas as pd
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(BASE_DIR)
@@ -23,8 +23,9 @@ logger = logging.getLogger(__name__)
 # Imports after sys.path fix
 # -------------------------------------------------
 from application import create_app
-from application.services.payment_sync import PaymentSyncService
 from application.models.central_models import QuickBooksConfig
+from application.services.payment_bulk import BulkPaymentFileEngine, OPERATION_VOID
+from application.services.statement_ingest import StatementFormatError
 
 
 # -------------------------------------------------
@@ -43,11 +44,15 @@ TARGET_DEPOSIT_ACCOUNT = "1211"
 # -------------------------------------------------
 # Core Logic
 # -------------------------------------------------
-def void_payments_from_excel():
+def void_payments_from_excel(file_path=FILE_PATH, restart=False):
+    """
+    Void the file's payments (by DocNumber) in the target deposit
+    account with batch requests, resuming from the checkpoint next to the file.
+    """
     logger.info("Starting QuickBooks payment void batch from Excel")
 
-    if not os.path.exists(FILE_PATH):
-        logger.error("Excel file not found: %s", FILE_PATH)
+    if not os.path.exists(file_path):
+        logger.error("Excel file not found: %s", file_path)
         return
 
     app = create_app()
@@ -61,141 +66,42 @@ def void_payments_from_excel():
             logger.error("QuickBooks not connected. Exiting.")
             return
 
-        # -----------------------------------------
-        # Load Excel file
-        # -----------------------------------------
-        df = pd.read_excel(FILE_PATH)
+        engine = BulkPaymentFileEngine(
+            OPERATION_VOID,
+            deposit_account_id=TARGET_DEPOSIT_ACCOUNT,
+            logger=logger,
+        )
 
-        if "Number" not in df.columns:
+        try:
+            report = engine.run(file_path, restart=restart)
+        except StatementFormatError:
             logger.error("Column 'Number' not found in Excel file.")
             return
 
-        doc_numbers = (
-            df["Number"]
-            .dropna()
-            .astype(str)
-            .str.strip()
-            .unique()
-            .tolist()
-        )
-
-        total = len(doc_numbers)
-
-        if not total:
+        if not report["total"]:
             logger.warning("No DocNumbers found in file. Exiting.")
-            return
-
-        logger.info("Loaded %s unique DocNumbers", total)
-
-        service = PaymentSyncService()
-
-        voided = skipped = failed = 0
-
-        # -----------------------------------------
-        # Process Each DocNumber
-        # -----------------------------------------
-        for idx, doc_number in enumerate(doc_numbers, start=1):
-            try:
-                if idx % 25 == 0:
-                    logger.info("Processing %s / %s", idx, total)
-
-                query = (
-                    "SELECT Id, SyncToken, DocNumber, TotalAmt, "
-                    "CustomerRef, DepositToAccountRef, MetaData.CreateTime "
-                    f"FROM Payment WHERE DocNumber = '{doc_number}'"
-                )
-
-                logger.info("Querying Payment | DocNumber=%s", doc_number)
-
-                result = service.query_payment(query)
-
-                query_response = result.get("QueryResponse")
-                if not query_response:
-                    logger.warning("No QueryResponse | DocNumber=%s", doc_number)
-                    skipped += 1
-                    continue
-
-                payments = query_response.get("Payment", [])
-
-                if not payments:
-                    logger.warning("Payment not found | DocNumber=%s", doc_number)
-                    skipped += 1
-                    continue
-
-
-                for payment in payments:
-                    deposit_ref = payment.get("DepositToAccountRef")
-
-                    if not (
-                        isinstance(deposit_ref, dict)
-                        and deposit_ref.get("value") == TARGET_DEPOSIT_ACCOUNT
-                    ):
-                        logger.info(
-                            "Skipping DocNumber=%s (Deposit account mismatch)",
-                            doc_number,
-                        )
-                        skipped += 1
-                        continue
-
-                    payment_id = payment.get("Id")
-                    sync_token = payment.get("SyncToken")
-                    total_amt = payment.get("TotalAmt")
-
-                    if not payment_id or not sync_token:
-                        logger.error(
-                            "Missing Id/SyncToken | DocNumber=%s",
-                            doc_number,
-                        )
-                        failed += 1
-                        continue
-                    
-                    if total_amt == 0:
-                        logger.info(
-                            "Skipping DocNumber=%s (TotalAmt=0)",
-                            doc_number,
-                        )
-                        skipped += 1
-                        continue
-
-                    logger.info(
-                        "Voiding Payment | DocNumber=%s | Id=%s",
-                        doc_number,
-                        payment_id,
-                    )
-
-                    void_result = service.void_payment(payment_id, sync_token)
-
-                    if not void_result.get("Payment"):
-                        logger.error(
-                            "Void failed | DocNumber=%s | %s",
-                            doc_number,
-                            void_result.get("error_message"),
-                        )
-                        failed += 1
-                        continue
-
-                    voided += 1
-
-            except Exception:
-                failed += 1
-                logger.exception(
-                    "Unhandled error processing DocNumber=%s",
-                    doc_number,
-                )
+            return report
 
         logger.info(
-            "Batch completed | voided=%s skipped=%s failed=%s total=%s",
-            voided,
-            skipped,
-            failed,
-            total,
+            "Batch completed | voided=%s skipped=%s failed=%s total=%s | %.1f payments/s",
+            report["voided"],
+            report["skipped"],
+            report["failed"],
+            report["total"],
+            report["operations_per_second"],
         )
+        return report
 
 
 # -------------------------------------------------
 # Entrypoint
 # -------------------------------------------------
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Void QuickBooks payments listed in a file")
+    parser.add_argument("--file", default=FILE_PATH, help="Excel/CSV file with a 'Number' column")
+    parser.add_argument("--restart", action="store_true", help="Discard the checkpoint and start over")
+    args = parser.parse_args()
+
     logger.info("QuickBooks Payment Void Script Started")
-    void_payments_from_excel()
+    void_payments_from_excel(args.file, restart=args.restart)
     logger.info("QuickBooks Payment Void Script Finished")
@@ -0,0 +1,244 @@
+"""
+In-memory Redis test double shared by the test modules
+
+``FakeRedis`` models the commands the application uses with redis-py's
+``decode_responses=True`` behaviour: values come back as strings, hashes
+and sets as copies. Each direct command, pipeline ``execute`` and script
+call counts as one ``round_trips``; a pipeline runs its queued commands
+atomically, like MULTI/EXEC. ``ttls`` records the expiry set per key (time
+never passes). ``register_script`` runs the application's Lua scripts in
+Python.
+"""
+
+import functools
+import threading
+
+import redis
+
+from application.services.customer_index import RECORD_SCRIPT, SWAP_SCRIPT
+from application.utils.redis_pool import ADVANCE_OFFSET_SCRIPT, RELEASE_LOCK_SCRIPT
+
+
+def command(method):
+    """A Redis command: one round trip when called directly"""
+    @functools.wraps(method)
+    def call(self, *args, **kwargs):
+        with self.lock:
+            self.round_trips += 1
+            return method(self, *args, **kwargs)
+    return call
+
+
+class FakePipeline:
+    """Queues commands and runs them on ``execute``, like redis-py"""
+
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        method = getattr(type(self.client), name)
+
+        def queue(*args, **kwargs):
+            self.commands.append((method.__wrapped__, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        with self.client.lock:
+            self.client.round_trips += 1
+            results = [method(self.client, *args, **kwargs) for method, args, kwargs in self.commands]
+        self.commands = []
+        return results
+
+
+class FakeRedis:
+    """Strings, hashes, lists and sets in ``values``; expiries in ``ttls``"""
+
+    def __init__(self):
+        self.values = {}
+        self.ttls = {}
+        self.round_trips = 0
+        self.lock = threading.RLock()
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    # keys
+
+    @command
+    def exists(self, *keys):
+        return sum(key in self.values for key in keys)
+
+    @command
+    def delete(self, *keys):
+        removed = 0
+        for key in keys:
+            self.ttls.pop(key, None)
+            removed += self.values.pop(key, None) is not None
+        return removed
+
+    @command
+    def expire(self, key, seconds):
+        if key not in self.values:
+            return False
+        self.ttls[key] = seconds
+        return True
+
+    @command
+    def rename(self, source, target):
+        if source not in self.values:
+            raise redis.ResponseError("no such key")
+        self.values[target] = self.values.pop(source)
+        self.ttls.pop(target, None)
+        if source in self.ttls:
+            self.ttls[target] = self.ttls.pop(source)
+        return True
+
+    # strings
+
+    @command
+    def get(self, key):
+        return self.values.get(key)
+
+    @command
+    def set(self, key, value, ex=None):
+        self.values[key] = str(value)
+        self.ttls.pop(key, None)
+        if ex:
+            self.ttls[key] = ex
+        return True
+
+    @command
+    def incr(self, key, amount=1):
+        value = int(self.values.get(key, 0)) + amount
+        self.values[key] = str(value)
+        return value
+
+    @command
+    def strlen(self, key):
+        return len(self.values.get(key, ""))
+
+    @command
+    def getrange(self, key, start, end):
+        return self.values.get(key, "")[start:end + 1]
+
+    # hashes
+
+    @command
+    def hset(self, key, field=None, value=None, mapping=None):
+        hash_ = self.values.setdefault(key, {})
+        items = dict(mapping or {})
+        if field is not None:
+            items[field] = value
+        added = sum(name not in hash_ for name in items)
+        hash_.update({name: str(item) for name, item in items.items()})
+        return added
+
+    @command
+    def hincrby(self, key, field, amount=1):
+        hash_ = self.values.setdefault(key, {})
+        value = int(hash_.get(field, 0)) + amount
+        hash_[field] = str(value)
+        return value
+
+    @command
+    def hgetall(self, key):
+        return dict(self.values.get(key, {}))
+
+    @command
+    def hmget(self, key, fields):
+        hash_ = self.values.get(key, {})
+        return [hash_.get(field) for field in fields]
+
+    @command
+    def hlen(self, key):
+        return len(self.values.get(key, {}))
+
+    # lists
+
+    @command
+    def rpush(self, key, *values):
+        list_ = self.values.setdefault(key, [])
+        list_.extend(str(value) for value in values)
+        return len(list_)
+
+    @command
+    def llen(self, key):
+        return len(self.values.get(key, []))
+
+    @command
+    def lrange(self, key, start, end):
+        list_ = self.values.get(key, [])
+        return list_[start:] if end == -1 else list_[start:end + 1]
+
+    # sets
+
+    @command
+    def sadd(self, key, *members):
+        set_ = self.values.setdefault(key, set())
+        added = {str(member) for member in members} - set_
+        set_.update(added)
+        return len(added)
+
+    @command
+    def sismember(self, key, member):
+        return str(member) in self.values.get(key, set())
+
+    @command
+    def smembers(self, key):
+        return set(self.values.get(key, set()))
+
+    # scripts
+
+    def register_script(self, script):
+        scripts = {
+            ADVANCE_OFFSET_SCRIPT: self._advance_offset,
+            RELEASE_LOCK_SCRIPT: self._release_lock,
+            RECORD_SCRIPT: self._record_customers,
+            SWAP_SCRIPT: self._swap_customer_index,
+        }
+        if script not in scripts:
+            raise NotImplementedError("FakeRedis has no Python version of this script")
+        run = scripts[script]
+
+        def call(keys, args):
+            with self.lock:
+                self.round_trips += 1
+                return run(keys, args)
+        return call
+
+    def _advance_offset(self, keys, args):
+        current = int(self.values.get(keys[0]) or 0)
+        if current != int(args[0]):
+            return [0, current]
+        self.values[keys[0]] = str(current + int(args[1]))
+        return [1, current + int(args[1])]
+
+    def _release_lock(self, keys, args):
+        if self.values.get(keys[0]) != args[0]:
+            return 0
+        del self.values[keys[0]]
+        self.ttls.pop(keys[0], None)
+        return 1
+
+    def _record_customers(self, keys, args):
+        index, pending, reloading = keys
+        entries = dict(zip(args[::2], args[1::2]))
+        self.hset.__wrapped__(self, index, mapping=entries)
+        if reloading in self.values:
+            self.hset.__wrapped__(self, pending, mapping=entries)
+        return 0
+
+    def _swap_customer_index(self, keys, args):
+        loading, index, pending, reloading, loaded_at = keys
+        if loading in self.values:
+            self.rename.__wrapped__(self, loading, index)
+        else:
+            self.delete.__wrapped__(self, index)
+        entries = self.values.get(pending, {})
+        if entries:
+            self.hset.__wrapped__(self, index, mapping=entries)
+        self.delete.__wrapped__(self, pending, reloading)
+        self.set.__wrapped__(self, loaded_at, args[0])
+        return len(entries)
@@ -0,0 +1,115 @@
+"""
+Tests for the benchmark harness: fake QuickBooks server, seeder and report
+"""
+
+import unittest
+import sys
+import os
+import json
+from urllib.request import Request, urlopen
+from urllib.error import HTTPError
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+
+from tools.benchmark.benchmarks import percentile
+from tools.benchmark.fake_quickbooks import FakeQuickBooksServer
+from tools.benchmark.run import compare
+from tools.benchmark.seed import Volumes, seed_database
+
+
+def _call(server, method, path, body=None):
+    data = json.dumps(body).encode() if body is not None else None
+    request = Request(f"{server.api_base_url}/{server.realm_id}/{path}", data=data, method=method,
+                      headers={"Content-Type": "application/json", "Accept": "application/json"})
+    try:
+        with urlopen(request) as response:
+            return response.status, json.loads(response.read())
+    except HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+class TestFakeQuickBooksServer(unittest.TestCase):
+
+    def test_customer_rules(self):
+        """Test duplicate DisplayNames and stale SyncTokens are rejected"""
+        with FakeQuickBooksServer() as server:
+            status, created = _call(server, "POST", "customer", {"DisplayName": "EAUR/2024/000001"})
+            self.assertEqual(status, 200)
+            customer = created["Customer"]
+
+            status, duplicate = _call(server, "POST", "customer", {"DisplayName": "eaur/2024/000001"})
+            self.assertEqual(status, 400)
+            self.assertEqual(duplicate["Fault"]["Error"][0]["code"], "6240")
+
+            update = {"Id": customer["Id"], "SyncToken": "0", "sparse": True, "GivenName": "Ada"}
+            self.assertEqual(_call(server, "POST", "customer", update)[1]["Customer"]["SyncToken"], "1")
+            self.assertEqual(_call(server, "POST", "customer", update)[0], 400)
+
+    def test_batch_and_query(self):
+        """Test batch items are answered by bId and visible to queries"""
+        with FakeQuickBooksServer() as server:
+            status, body = _call(server, "POST", "batch", {"BatchItemRequest": [
+                {"bId": "a", "operation": "create", "Customer": {"DisplayName": "A"}},
+                {"bId": "b", "operation": "create", "Customer": {"DisplayName": "B"}},
+            ]})
+            self.assertEqual(status, 200)
+            self.assertEqual({item["bId"] for item in body["BatchItemResponse"]}, {"a", "b"})
+
+            status, body = _call(server, "GET", "query?query=select%20*%20from%20Customer%20where%20DisplayName%20in%20('A')")
+            self.assertEqual([c["DisplayName"] for c in body["QueryResponse"]["Customer"]], ["A"])
+            self.assertEqual(server.stats["batch_items"], 2)
+
+    def test_rate_limit(self):
+        """Test requests over the per-minute limit get 429"""
+        with FakeQuickBooksServer(rate_limit_per_minute=2) as server:
+            statuses = [_call(server, "GET", "companyinfo/1")[0] for _ in range(3)]
+            self.assertEqual(statuses[-1], 429)
+            self.assertEqual(server.stats["http_429"], 1)
+
+
+class TestSeedDatabase(unittest.TestCase):
+
+    def test_seeds_requested_volumes(self):
+        """Test row counts follow the volumes and are reproducible"""
+        engine = create_engine("sqlite://")
+        counts = seed_database(engine, Volumes(students=20, invoices_per_student=2), seed=1)
+        self.assertEqual(counts["students"], 20)
+        self.assertEqual(counts["invoices"], 40)
+        self.assertEqual(counts["wallet_ledger"], counts["integration_logs"])
+        with engine.connect() as conn:
+            self.assertEqual(conn.execute(text("SELECT COUNT(*) FROM tbl_imvoice")).scalar(), 40)
+
+        again = seed_database(create_engine("sqlite://"), Volumes(students=20, invoices_per_student=2), seed=1)
+        self.assertEqual(again, counts)
+
+
+class TestReport(unittest.TestCase):
+
+    def test_percentile(self):
+        """Test nearest-rank percentiles"""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 95), 95)
+        self.assertEqual(percentile([7], 99), 7)
+        self.assertEqual(percentile([], 50), 0.0)
+
+    def test_compare_flags_regressions(self):
+        """Test slower p95, lower throughput and new errors are regressions"""
+        baseline = {"benchmarks": {"payment_sync": {
+            "p95_ms": 100.0, "throughput_per_s": 20.0, "db_queries_per_op": 8.0, "qb_calls_per_op": 2.0,
+            "error_rate": 0.0}}}
+        same = {"benchmarks": {"payment_sync": dict(baseline["benchmarks"]["payment_sync"], p95_ms=105.0)}}
+        self.assertEqual(compare(same, baseline, 0.15), [])
+
+        worse = {"benchmarks": {"payment_sync": {
+            "p95_ms": 150.0, "throughput_per_s": 12.0, "db_queries_per_op": 8.0, "qb_calls_per_op": 2.0,
+            "error_rate": 0.1}}}
+        flagged = {line.split(":")[0] for line in compare(worse, baseline, 0.15)}
+        self.assertEqual(flagged, {"payment_sync.p95_ms", "payment_sync.throughput_per_s", "payment_sync.error_rate"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+Tests for chunked IN-list and temporary table lookups
+"""
+
+import unittest
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event, select
+from sqlalchemy.orm import sessionmaker
+
+from application import db
+from application.models.mis_models import TblStudentWalletHistory
+from application.utils.bulk_query import select_in, chunked
+
+
+class TestSelectIn(unittest.TestCase):
+    """Test cases for select_in"""
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        self.statements = []
+
+        @event.listens_for(self.engine, "before_cursor_execute")
+        def record(conn, cursor, statement, parameters, context, executemany):
+            self.statements.append(statement)
+
+        db.metadata.create_all(self.engine, tables=[TblStudentWalletHistory.__table__])
+        self.session = sessionmaker(bind=self.engine)()
+        self.session.execute(TblStudentWalletHistory.__table__.insert(), [
+            {"reg_no": "P1", "transaction_type": "TOPUP", "amount": float(i),
+             "balance_before": 0, "balance_after": float(i), "external_transaction_id": f"T{i}"}
+            for i in range(50)
+        ])
+        self.session.commit()
+        self.statements.clear()
+        self.wanted = [f"T{i}" for i in range(0, 100, 2)] + ["T0", None]
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def _selects(self):
+        return [s for s in self.statements if s.lstrip().upper().startswith("SELECT")]
+
+    def test_chunked(self):
+        """Test batches are bounded and cover every value"""
+        self.assertEqual(list(chunked(range(5), 2)), [[0, 1], [2, 3], [4]])
+
+    def test_short_list_single_statement(self):
+        """Test a list under the chunk size is one IN query"""
+        rows = select_in(
+            self.session, self.session.query(TblStudentWalletHistory),
+            TblStudentWalletHistory.external_transaction_id, self.wanted,
+        )
+        self.assertEqual(len(rows), 25)
+        self.assertEqual(len(self._selects()), 1)
+
+    def test_chunked_lists(self):
+        """Test medium lists are split into bounded IN batches"""
+        history = TblStudentWalletHistory.__table__
+        rows = select_in(
+            self.session, select(history.c.external_transaction_id),
+            history.c.external_transaction_id, self.wanted, chunk_size=10,
+        )
+        self.assertEqual(len(rows), 25)
+        self.assertEqual(len(self._selects()), 5)
+
+    def test_temp_table_join(self):
+        """Test large lists are loaded into a temporary table and joined"""
+        rows = select_in(
+            self.session, self.session.query(TblStudentWalletHistory.external_transaction_id),
+            TblStudentWalletHistory.external_transaction_id, self.wanted,
+            temp_table_threshold=10,
+        )
+        self.assertEqual(sorted(r.external_transaction_id for r in rows),
+                         sorted(f"T{i}" for i in range(0, 50, 2)))
+        self.assertTrue(any("CREATE TEMPORARY TABLE" in s for s in self.statements))
+        self.assertTrue(any("DROP TABLE" in s for s in self.statements))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+"""
+Tests for the Celery worker start-up hooks
+"""
+
+import unittest
+from unittest.mock import patch
+import importlib.util
+import re
+import sys
+import os
+import threading
+
+# Add the project root to the Python path
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from flask import Flask
+
+from application.utils import celery_utils
+
+
+def _production_pool():
+    """The ``--pool`` run_celery_prod.sh starts workers with"""
+    with open(os.path.join(ROOT, "run_celery_prod.sh")) as f:
+        match = re.search(r"--pool[= ](\w+)", f.read())
+    return match.group(1) if match else "prefork"
+
+
+class TestReferenceCacheWarmup(unittest.TestCase):
+
+    def test_worker_start_warms_cache_under_production_pool(self):
+        """Test a worker running the production pool warms the reference cache once it is ready"""
+        pool = _production_pool()
+        if importlib.util.find_spec(pool) is None:
+            # gevent/eventlet not installed here: the threads pool shares their
+            # model (tasks in the main process, no worker_process_init)
+            pool = "threads"
+
+        app = Flask("warmup")
+        app.config.update(broker_url="memory://", RESULT_BACKEND="cache+memory://")
+        with patch("application.utils.database.init_database_manager"):
+            celery = celery_utils.make_celery(app)
+
+        warmed = threading.Event()
+        with patch("application.utils.reference_cache.ReferenceCache.warm",
+                   side_effect=lambda *args, **kwargs: warmed.set()):
+            worker = celery.Worker(
+                pool=pool, concurrency=1, hostname="warmup@localhost", redirect_stdouts=False,
+                without_heartbeat=True, without_mingle=True, without_gossip=True, quiet=True,
+            )
+            thread = threading.Thread(target=worker.start, daemon=True)
+            thread.start()
+            try:
+                self.assertTrue(warmed.wait(30), f"reference cache not warmed under the {pool} pool")
+            finally:
+                worker.stop(in_sighandler=False)
+                thread.join(10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+"""
+Tests for the QuickBooks customer DisplayName index
+"""
+
+import unittest
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+from application.services.customer_index import CustomerNameIndex, INDEX_KEY, CUSTOMER_INDEX_FIELDS
+from application.services.customer_sync import CustomerSyncService
+from tests.fakes import FakeRedis
+
+
+class FakeQuickBooks:
+    """Serves ``count`` customers named C0.. in pages"""
+
+    realm_id = "123"
+
+    def __init__(self, count, on_page=None):
+        self.customers = [{"Id": str(i + 1), "DisplayName": f"C{i}", "SyncToken": "0"} for i in range(count)]
+        self.pages = []
+        self.on_page = on_page
+
+    def get_customers(self, realm_id, params=None, start_position=None, max_results=None, include_inactive=False,
+                      fields=None, order_by=None):
+        assert include_inactive
+        assert (tuple(fields), order_by) == (CUSTOMER_INDEX_FIELDS, "Id")
+        self.pages.append(start_position)
+        if self.on_page:
+            self.on_page(start_position)
+        page = self.customers[start_position - 1:start_position - 1 + max_results]
+        return {"QueryResponse": {"Customer": page} if page else {}}
+
+
+class TestCustomerNameIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        self.addCleanup(self.ctx.pop)
+        self.redis = FakeRedis()
+        self.index = CustomerNameIndex(client=self.redis, logger=self.app.logger)
+
+    def test_load_pages_through_all_customers(self):
+        """Test customers are loaded 1000 per page and looked up case-insensitively"""
+        qb = FakeQuickBooks(2500)
+        self.assertEqual(self.index.load(qb), 2500)
+        self.assertEqual(qb.pages, [1, 1001, 2001])
+
+        found = self.index.lookup([" c1999 ", "C0", "missing"])
+        self.assertEqual(found, {" c1999 ": {"id": "2000", "sync_token": "0"}, "C0": {"id": "1", "sync_token": "0"}})
+
+    def test_reload_replaces_removed_names(self):
+        """Test a reload swaps the whole index in"""
+        self.index.record({"GONE": ("9", "4")})
+        self.index.load(FakeQuickBooks(1))
+        self.assertEqual(self.index.lookup(["GONE"]), {})
+        self.assertEqual(self.index.stats()["names"], 1)
+
+    def test_record_during_reload_survives_swap(self):
+        """Test customers synced while a load runs are kept over the loaded names"""
+        def sync_mid_load(position):
+            if position == 1001:
+                self.index.record({"C0": ("1", "3"), "NEW": ("9999", "0")})
+
+        self.index.load(FakeQuickBooks(1500, on_page=sync_mid_load))
+        self.assertEqual(self.index.lookup(["C0", "NEW", "C1499"]), {
+            "C0": {"id": "1", "sync_token": "3"},
+            "NEW": {"id": "9999", "sync_token": "0"},
+            "C1499": {"id": "1500", "sync_token": "0"},
+        })
+
+        self.index.load(FakeQuickBooks(1))
+        self.assertEqual(self.index.lookup(["NEW"]), {})
+
+    def test_ensure_fresh_reloads_only_when_stale(self):
+        """Test the index is loaded when missing and kept while young"""
+        qb = FakeQuickBooks(3)
+        self.assertTrue(self.index.ensure_fresh(qb))
+        self.assertTrue(self.index.ensure_fresh(qb))
+        self.assertEqual(qb.pages, [1])
+
+        self.index.max_age = -1
+        self.index.ensure_fresh(qb)
+        self.assertEqual(qb.pages, [1, 1])
+
+    def test_ensure_fresh_reports_unavailable(self):
+        """Test a failed load leaves sync to fall back to plain creates"""
+        qb = FakeQuickBooks(0)
+        qb.get_customers = lambda *args, **kwargs: (_ for _ in ()).throw(Exception("API request failed: 503"))
+        self.assertFalse(self.index.ensure_fresh(qb))
+
+    def test_record_keeps_index_current(self):
+        """Test synced customers are written back"""
+        self.index.record({"REG/1": ("55", "2"), None: ("1", "0")})
+        self.assertEqual(self.index.lookup(["reg/1"]), {"reg/1": {"id": "55", "sync_token": "2"}})
+        self.assertEqual(len(self.redis.values[INDEX_KEY]), 1)
+
+    def test_index_hit_turns_create_into_update(self):
+        """Test an unlinked student whose reg_no exists in QuickBooks becomes a sparse update"""
+        service = CustomerSyncService()
+        student = {"per_id_ug": 1, "reg_no": "REG/1", "first_name": "A", "last_name": "B", "qk_id": "", "sync_token": None}
+
+        record = service._student_upsert("student-1", student, {"id": "55", "sync_token": "2"})
+        self.assertEqual((record.operation, record.quickbooks_id, record.sync_token), ("update", "55", "2"))
+        self.assertEqual(record.customer["DisplayName"], "REG/1")
+
+        self.assertEqual(service._student_upsert("student-1", student).operation, "create")
+
+
+if __name__ == "__main__":
+    unittest.main()
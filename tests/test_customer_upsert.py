@@ -0,0 +1,162 @@
+"""
+Tests for the QuickBooks customer upsert engine
+"""
+
+import unittest
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+from application.services.customer_upsert import (
+    CustomerUpsertEngine, CustomerUpsert, CREATED, UPDATED, FAILED
+)
+
+
+class FakeQuickBooks:
+    """
+    Customers ``existing`` -> SyncToken; updates with another token are stale.
+    ``racing`` simulates another writer saving each customer just before us.
+    """
+
+    realm_id = "123"
+
+    def __init__(self, existing, racing=False):
+        self.existing = dict(existing)
+        self.racing = racing
+        self.requests = []
+        self.next_id = 100
+
+    def make_batch_request(self, realm_id, batch_data):
+        self.requests.append(batch_data)
+        responses = []
+        for item in batch_data["BatchItemRequest"]:
+            if "Query" in item:
+                ids = [i.strip("'") for i in item["Query"].split("IN (")[1].split(")")[0].split(", ")]
+                found = [{"Id": i, "SyncToken": self.existing[i]} for i in ids if i in self.existing]
+                responses.append({"bId": item["bId"], "QueryResponse": {"Customer": found}})
+            elif item["operation"] == "create":
+                self.next_id += 1
+                self.existing[str(self.next_id)] = "0"
+                responses.append({"bId": item["bId"], "Customer": {"Id": str(self.next_id), "SyncToken": "0"}})
+            else:
+                customer = item["Customer"]
+                assert customer["sparse"] is True
+                if self.racing and customer["Id"] in self.existing:
+                    self.existing[customer["Id"]] = str(int(self.existing[customer["Id"]]) + 1)
+                current = self.existing.get(customer["Id"])
+                if current is None:
+                    responses.append({"bId": item["bId"], "Fault": {"Error": [{"Detail": "Object Not Found"}]}})
+                elif customer["SyncToken"] != current:
+                    responses.append({"bId": item["bId"], "Fault": {"Error": [
+                        {"Message": "Stale Object Error", "Detail": "Stale Object Error : You and another user were working on the same thing.", "code": "5010"}
+                    ]}})
+                else:
+                    self.existing[customer["Id"]] = str(int(current) + 1)
+                    responses.append({"bId": item["bId"], "Customer": {"Id": customer["Id"], "SyncToken": self.existing[customer["Id"]]}})
+        return {"BatchItemResponse": responses}
+
+    def sent_items(self):
+        return [item for request in self.requests for item in request["BatchItemRequest"] if "Query" not in item]
+
+    def queries(self):
+        return [item for request in self.requests for item in request["BatchItemRequest"] if "Query" in item]
+
+
+class TestCustomerUpsertEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        self.addCleanup(self.ctx.pop)
+
+    def _engine(self, qb, **kwargs):
+        return CustomerUpsertEngine(qb_service=qb, logger=self.app.logger, **kwargs)
+
+    def test_creates_and_updates_share_one_batch(self):
+        """Test records are routed by local state and sent in a single request"""
+        qb = FakeQuickBooks({"7": "3"})
+        outcomes = self._engine(qb).upsert([
+            CustomerUpsert(key="student-1", customer={"DisplayName": "S1"}),
+            CustomerUpsert(key="student-2", customer={"DisplayName": "S2"}, quickbooks_id="7", sync_token="3"),
+        ])
+
+        self.assertEqual(len(qb.requests), 1)
+        self.assertEqual([i["operation"] for i in qb.sent_items()], ["create", "update"])
+        self.assertEqual(outcomes["student-1"]["status"], CREATED)
+        self.assertEqual(outcomes["student-2"], {
+            "status": UPDATED, "quickbooks_id": "7", "sync_token": "4",
+            "response": {"bId": "student-2", "Customer": {"Id": "7", "SyncToken": "4"}},
+        })
+
+    def test_missing_tokens_fetched_in_one_query(self):
+        """Test updates without a stored SyncToken are resolved before sending"""
+        qb = FakeQuickBooks({"7": "3", "8": "1"})
+        outcomes = self._engine(qb).upsert([
+            CustomerUpsert(key="a", customer={}, quickbooks_id="7"),
+            CustomerUpsert(key="b", customer={}, quickbooks_id="8"),
+            CustomerUpsert(key="c", customer={}, quickbooks_id="9"),
+        ])
+
+        self.assertEqual(len(qb.queries()), 1)
+        self.assertEqual(outcomes["a"]["status"], UPDATED)
+        self.assertEqual(outcomes["b"]["sync_token"], "2")
+        self.assertEqual(outcomes["c"], {"status": FAILED, "error": "QuickBooks customer 9 not found"})
+        self.assertEqual(len(qb.sent_items()), 2)
+
+    def test_stale_tokens_retry_only_failed_items(self):
+        """Test stale updates get fresh tokens and only they are resent"""
+        qb = FakeQuickBooks({"7": "5", "8": "1"})
+        outcomes = self._engine(qb).upsert([
+            CustomerUpsert(key="new", customer={"DisplayName": "N"}),
+            CustomerUpsert(key="fresh", customer={}, quickbooks_id="8", sync_token="1"),
+            CustomerUpsert(key="stale", customer={}, quickbooks_id="7", sync_token="2"),
+        ])
+
+        self.assertEqual({k: o["status"] for k, o in outcomes.items()},
+                         {"new": CREATED, "fresh": UPDATED, "stale": UPDATED})
+        self.assertEqual(outcomes["stale"]["sync_token"], "6")
+        self.assertEqual([i["bId"] for i in qb.sent_items()], ["new", "fresh", "stale", "stale"])
+        self.assertEqual(len(qb.queries()), 1)
+        self.assertIn("'7'", qb.queries()[0]["Query"])
+        self.assertNotIn("'8'", qb.queries()[0]["Query"])
+
+    def test_retries_are_bounded(self):
+        """Test an update that stays stale fails after the retry rounds"""
+        qb = FakeQuickBooks({"7": "5"}, racing=True)
+        outcomes = self._engine(qb, token_retries=2).upsert([
+            CustomerUpsert(key="stale", customer={}, quickbooks_id="7", sync_token="5"),
+        ])
+
+        self.assertEqual(outcomes["stale"]["status"], FAILED)
+        self.assertIn("Stale Object Error", outcomes["stale"]["error"])
+        self.assertEqual(len(qb.sent_items()), 3)
+
+    def test_batches_split_at_limit(self):
+        """Test more than 30 records are sent in several batch requests"""
+        qb = FakeQuickBooks({})
+        outcomes = self._engine(qb).upsert([
+            CustomerUpsert(key=f"s{i}", customer={"DisplayName": f"S{i}"}) for i in range(45)
+        ])
+
+        self.assertEqual([len(r["BatchItemRequest"]) for r in qb.requests], [30, 15])
+        self.assertTrue(all(o["status"] == CREATED for o in outcomes.values()))
+
+    def test_request_failure_fails_every_item(self):
+        """Test a faulted batch request marks each of its items failed"""
+        qb = FakeQuickBooks({})
+        qb.make_batch_request = lambda realm_id, data: {"Fault": {"Error": [{"Message": "Throttled"}]}}
+        outcomes = self._engine(qb).upsert([
+            CustomerUpsert(key="a", customer={}), CustomerUpsert(key="b", customer={}),
+        ])
+
+        self.assertEqual([o["status"] for o in outcomes.values()], [FAILED, FAILED])
+        self.assertEqual(outcomes["a"]["error"], "Throttled")
+
+
+if __name__ == "__main__":
+    unittest.main()
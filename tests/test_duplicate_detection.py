@@ -0,0 +1,155 @@
+"""
+Tests for the duplicate detection service
+"""
+
+import unittest
+from unittest.mock import Mock
+from datetime import datetime
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event, BigInteger
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+
+from application import db
+from application.models.central_models import IntegrationLog, DuplicateFinding
+from application.models.mis_models import TblStudentWallet
+from application.services.duplicate_detection import DuplicateDetector
+
+
+@compiles(BigInteger, "sqlite")
+def _sqlite_bigint(type_, compiler, **kw):
+    # SQLite only autoincrements INTEGER PRIMARY KEY
+    return "INTEGER"
+
+
+class TestDuplicateDetector(unittest.TestCase):
+    """Runs duplicate detection against an in-memory SQLite database"""
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        self.statements = []
+
+        @event.listens_for(self.engine, "before_cursor_execute")
+        def record(conn, cursor, statement, parameters, context, executemany):
+            self.statements.append(statement)
+
+        db.metadata.create_all(self.engine, tables=[
+            IntegrationLog.__table__, DuplicateFinding.__table__,
+        ])
+        # production wallets carry duplicates the model's unique constraint would reject
+        with self.engine.begin() as conn:
+            conn.exec_driver_sql(
+                "CREATE TABLE tbl_student_wallet (id INTEGER PRIMARY KEY, reg_prg_id INTEGER, "
+                "reg_no VARCHAR(200), external_transaction_id TEXT, dept FLOAT, amount NUMERIC, date DATETIME)"
+            )
+        self.session = sessionmaker(bind=self.engine)()
+        self.detector = DuplicateDetector(session=self.session, logger=Mock())
+
+        now = datetime(2026, 2, 1, 10, 0, 0)
+        self.session.execute(IntegrationLog.__table__.insert(), [
+            {"system_name": "UrubutoPay", "operation": "Wallet Payment", "status": "VALID",
+             "external_transaction_id": tx_id, "transaction_key": tx_id,
+             "started_at": now, "created_at": now, "updated_at": now}
+            for tx_id in ["T1", "T1", "T2", "T3", "T3", "T3", None, None]
+        ])
+        self.session.execute(TblStudentWallet.__table__.insert(), [
+            {"reg_prg_id": 1, "reg_no": "S1", "external_transaction_id": "W1", "dept": 10.0, "date": now},
+            {"reg_prg_id": 1, "reg_no": "S2", "external_transaction_id": "W1", "dept": 15.0, "date": now},
+            {"reg_prg_id": 1, "reg_no": "S3", "external_transaction_id": "W2", "dept": 5.0, "date": now},
+        ])
+        self.session.commit()
+        self.statements.clear()
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def _log_ids(self):
+        return [row.id for row in self.session.query(IntegrationLog.id).order_by(IntegrationLog.id)]
+
+    def test_find_groups_in_sql(self):
+        """Test duplicated keys, kept ids and redundant ids come from two queries"""
+        findings = self.detector.find("integration_log")
+
+        self.assertEqual(
+            [(f["duplicate_key"], f["occurrences"], f["keep_id"], f["duplicate_ids"]) for f in findings],
+            [("T1", 2, 1, [2]), ("T3", 3, 4, [5, 6])],
+        )
+        self.assertEqual(len(self.statements), 2)
+        self.assertIn("HAVING", self.statements[0])
+        self.assertIn("row_number() OVER", self.statements[1])
+
+    def test_valid_log_is_kept_over_failed_attempts(self):
+        """Test a failed attempt logged before the VALID callback is the one removed"""
+        logs = IntegrationLog.__table__
+        now = datetime(2026, 2, 1, 11, 0, 0)
+        # v2 callback logs carry the transaction id only in response_data
+        self.session.execute(logs.insert(), [
+            {"system_name": "UrubutoPay", "operation": "Wallet Payment", "status": status,
+             "external_transaction_id": None, "transaction_key": "T4",
+             "response_data": '{"transaction_id": "T4"}',
+             "started_at": now, "created_at": now, "updated_at": now}
+            for status in ["FAILED", "PENDING", "VALID"]
+        ])
+        self.session.commit()
+
+        finding = [f for f in self.detector.find("integration_log") if f["duplicate_key"] == "T4"][0]
+        self.assertEqual((finding["keep_id"], finding["duplicate_ids"]), (11, [9, 10]))
+
+        self.detector.cleanup("integration_log", dry_run=False)
+        remaining = self.session.query(IntegrationLog.status).filter(IntegrationLog.transaction_key == "T4").all()
+        self.assertEqual([row.status for row in remaining], ["VALID"])
+
+    def test_wallet_findings_include_amount(self):
+        """Test wallet duplicates report the summed amount"""
+        findings = self.detector.find("wallet")
+
+        self.assertEqual(len(findings), 1)
+        self.assertEqual(findings[0]["duplicate_key"], "W1")
+        self.assertEqual(findings[0]["total_amount"], 25.0)
+
+    def test_refresh_report_replaces_rows(self):
+        """Test the report table is rebuilt per source"""
+        self.assertEqual(self.detector.refresh_report(), {"integration_log": 2, "wallet": 1})
+        self.assertEqual(self.detector.refresh_report(["integration_log"]), {"integration_log": 2})
+
+        report = self.detector.report()
+        self.assertEqual(len(report), 3)
+        self.assertEqual(report[0]["duplicate_key"], "T3")
+        self.assertEqual(report[0]["duplicate_ids"], [5, 6])
+        self.assertEqual(len(self.detector.report("wallet")), 1)
+
+    def test_cleanup_dry_run_writes_nothing(self):
+        """Test a dry run lists the redundant rows without deleting them"""
+        result = self.detector.cleanup("integration_log")
+
+        self.assertTrue(result["dry_run"])
+        self.assertEqual(result["deleted_ids"], [2, 5, 6])
+        self.assertEqual(result["duplicate_keys"], 2)
+        self.assertEqual(len(self._log_ids()), 8)
+
+    def test_cleanup_keeps_oldest_row(self):
+        """Test cleanup deletes every redundant row and clears the source's report"""
+        self.detector.refresh_report()
+        result = self.detector.cleanup("integration_log", dry_run=False)
+
+        self.assertEqual(result["rows_to_delete"], 3)
+        self.assertEqual(self._log_ids(), [1, 3, 4, 7, 8])
+        self.assertEqual(self.detector.find("integration_log"), [])
+        self.assertEqual([f["source"] for f in self.detector.report()], ["wallet"])
+
+    def test_wallet_cleanup_refused(self):
+        """Test wallet duplicates are report-only"""
+        with self.assertRaises(ValueError):
+            self.detector.cleanup("wallet", dry_run=False)
+        with self.assertRaises(ValueError):
+            self.detector.find("unknown")
+
+
+if __name__ == "__main__":
+    unittest.main()
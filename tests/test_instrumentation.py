@@ -0,0 +1,96 @@
+"""
+Tests for per-request and per-task instrumentation
+"""
+
+import unittest
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import create_engine, text
+
+from application.utils import instrumentation
+from application.utils.instrumentation import (
+    registry, start_scope, end_scope, instrument_engine, record_qb_call, init_instrumentation,
+    task_finished, task_started, render_task_metrics
+)
+from tests.fakes import FakeRedis
+
+
+class FakeTask:
+    name = "application.config_files.sync_invoices_task.process_invoices_batch"
+
+    def run(self, batch, batch_num, total_batches, job_id):
+        pass
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def setUp(self):
+        registry.reset()
+
+    def test_scope_counts_queries_and_quickbooks_calls(self):
+        """Test queries and QuickBooks calls made inside a scope are attributed to it"""
+        engine = create_engine("sqlite://")
+        instrument_engine(engine, "mis")
+        instrument_engine(engine, "mis")  # idempotent
+
+        token = start_scope("task", "sync")
+        with engine.connect() as conn:
+            for _ in range(3):
+                conn.execute(text("SELECT 1"))
+        record_qb_call("POST", "123/batch", 200, 0.25)
+        record_qb_call("GET", "123/query?query=select", "error", 0.5)
+        scope = end_scope(token)
+
+        self.assertEqual(scope.db_queries, 3)
+        self.assertEqual((scope.qb_calls, scope.qb_errors), (2, 1))
+        self.assertEqual(scope.as_dict()["qb_ms"], 750)
+        self.assertEqual(registry.value("db_query_duration_seconds_count", {"db": "mis"}), 3)
+        self.assertEqual(registry.value("quickbooks_requests_total",
+                                        {"resource": "batch", "method": "POST", "status": 200}), 1)
+        self.assertIsNone(instrumentation.current_scope())
+
+    def test_requests_are_measured_per_endpoint(self):
+        """Test each request is counted under its endpoint and /metrics renders it"""
+        app = Flask(__name__)
+        init_instrumentation(app)
+
+        @app.route("/ping")
+        def ping():
+            record_qb_call("GET", "123/companyinfo/123", 200, 0.1)
+            return "pong"
+
+        client = app.test_client()
+        client.get("/ping")
+        client.get("/ping")
+
+        self.assertEqual(registry.value("http_requests_total", {"endpoint": "ping", "method": "GET", "status": 200}), 2)
+        self.assertEqual(registry.value("scope_quickbooks_calls_total", {"scope": "http", "name": "ping"}), 2)
+        rendered = registry.render()
+        self.assertIn("# TYPE http_request_duration_seconds summary", rendered)
+        self.assertIn('http_requests_total{endpoint="ping",method="GET",status="200"} 2', rendered)
+
+    def test_task_totals_attached_to_job_hash(self):
+        """Test a finished task adds its totals to its job hash and the shared task hash"""
+        redis = FakeRedis()
+        task = FakeTask()
+        args = (["INV1"], 1, 2, "invoice_sync_1")
+
+        for _ in range(2):
+            task_started(task_id="t1", task=task)
+            record_qb_call("POST", "123/batch", 200, 0.2)
+            task_finished(task_id="t1", task=task, args=args, kwargs={}, state="SUCCESS", client=redis)
+
+        job = redis.values["job:invoice_sync_1"]
+        self.assertEqual(job["metrics_runs"], "2")
+        self.assertEqual(job["metrics_qb_calls"], "2")
+        self.assertEqual(job["metrics_qb_ms"], "400")
+        self.assertIn(f'celery_task_runs_total{{task="{task.name}"}} 2', render_task_metrics(redis))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+"""
+Tests for the atomic invoice balance decrement
+"""
+
+import unittest
+from unittest.mock import patch
+from contextlib import contextmanager
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker, close_all_sessions
+
+from application import db
+from application.models.mis_models import TblImvoice, TblStudentWallet
+
+
+class TestInvoiceBalanceDecrement(unittest.TestCase):
+    """Test cases for TblImvoice.decrement_balance"""
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        self.statements = []
+
+        @event.listens_for(self.engine, "before_cursor_execute")
+        def record(conn, cursor, statement, parameters, context, executemany):
+            self.statements.append(statement)
+
+        # the invoice row loads its joined relationships, so create the full schema
+        db.metadata.create_all(self.engine)
+        self.Session = sessionmaker(bind=self.engine, expire_on_commit=False)
+
+        session = self.Session()
+        session.execute(TblImvoice.__table__.insert(), [
+            {"id": 1, "reference_number": "INV-1", "dept": 1000.0, "balance": None},
+            {"id": 2, "reference_number": "INV-2", "dept": 1000.0, "balance": 300.0},
+            {"id": 3, "reference_number": "INV-3", "dept": 1000.0, "balance": 0.0},
+        ])
+        session.execute(TblStudentWallet.__table__.insert(), [
+            {"id": 1, "reg_prg_id": 1, "reg_no": "REG-1", "dept": 500.0},
+            {"id": 2, "reg_prg_id": 2, "reg_no": "REG-2", "dept": None},
+        ])
+        session.commit()
+        session.close()
+        self.statements.clear()
+
+    def tearDown(self):
+        close_all_sessions()
+        self.engine.dispose()
+
+    def _balance(self, invoice_id):
+        session = self.Session()
+        try:
+            return session.query(TblImvoice.balance).filter(TblImvoice.id == invoice_id).scalar()
+        finally:
+            session.close()
+
+    def test_decrement_uses_dept_when_balance_is_null(self):
+        """Test an untouched invoice starts from its debit amount"""
+        session = self.Session()
+        self.assertEqual(TblImvoice.decrement_balance(session, 400, invoice_id=1), 600.0)
+        session.commit()
+        self.assertEqual(self._balance(1), 600.0)
+
+    def test_decrement_clamps_at_zero(self):
+        """Test overpayment never produces a negative balance"""
+        session = self.Session()
+        self.assertEqual(TblImvoice.decrement_balance(session, 500, invoice_id=2), 0.0)
+        session.commit()
+
+    def test_zero_balance_is_not_reset_to_dept(self):
+        """Test a fully paid invoice stays at zero"""
+        session = self.Session()
+        self.assertEqual(TblImvoice.decrement_balance(session, 100, invoice_id=3), 0.0)
+
+    def test_decrement_is_a_single_update(self):
+        """Test the new balance is computed in SQL rather than read-modify-write"""
+        session = self.Session()
+        TblImvoice.decrement_balance(session, 100, invoice_id=2)
+        updates = [s for s in self.statements if s.lstrip().upper().startswith("UPDATE")]
+        self.assertEqual(len(updates), 1)
+        self.assertIn("coalesce", updates[0].lower())
+
+    def test_sequential_deductions_accumulate(self):
+        """Test two deductions in separate transactions both apply"""
+        for _ in range(2):
+            session = self.Session()
+            TblImvoice.decrement_balance(session, 100, reference_number="INV-2")
+            session.commit()
+            session.close()
+        self.assertEqual(self._balance(2), 100.0)
+
+    def test_missing_invoice_returns_none(self):
+        """Test unknown invoices are reported as None"""
+        session = self.Session()
+        self.assertIsNone(TblImvoice.decrement_balance(session, 10, invoice_id=99))
+        self.assertIsNone(TblImvoice.decrement_balance(session, 10, reference_number="NOPE"))
+
+    def test_invalid_amount_rejected(self):
+        """Test non-positive amounts are rejected"""
+        session = self.Session()
+        with self.assertRaises(ValueError):
+            TblImvoice.decrement_balance(session, 0, invoice_id=1)
+
+    def test_update_invoice_balance_returns_row(self):
+        """Test the reference-number wrapper returns the new balance and row"""
+        @contextmanager
+        def session_scope():
+            session = self.Session()
+            try:
+                yield session
+                session.commit()
+            finally:
+                session.close()
+
+        with patch('application.models.mis_models.MISBaseModel.get_session', side_effect=session_scope):
+            new_balance, invoice = TblImvoice.update_invoice_balance("INV-1", 250)
+
+        self.assertEqual(new_balance, 750.0)
+        self.assertEqual(invoice.id, 1)
+        self.assertEqual(invoice.balance, 750.0)
+
+    def test_wallet_top_ups_accumulate(self):
+        """Test wallet credits are added in SQL, including to an empty balance"""
+        session = self.Session()
+        stale = session.get(TblStudentWallet, 1)
+        self.assertEqual(TblStudentWallet.increment_dept(session, 1, 200), 700.0)
+        self.assertEqual(TblStudentWallet.increment_dept(session, 1, 100), 800.0)
+        self.assertEqual(TblStudentWallet.increment_dept(session, 2, 50), 50.0)
+        self.assertIsNone(TblStudentWallet.increment_dept(session, 99, 50))
+
+        # an ORM flush of other columns keeps the SQL-side balance
+        stale.slip_no = "SLIP-1"
+        session.commit()
+        self.assertEqual(session.query(TblStudentWallet.dept).filter_by(id=1).scalar(), 800.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+"""
+Tests for the background job mode helpers
+"""
+
+import unittest
+from unittest.mock import patch
+import json
+import os
+import sys
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, jsonify, request
+
+from application.utils import jobs
+from tests.fakes import FakeRedis
+
+
+class TestBackgroundJobs(unittest.TestCase):
+
+    def setUp(self):
+        self.redis = FakeRedis()
+        patch.object(jobs, "redis_client", self.redis).start()
+        self.addCleanup(patch.stopall)
+
+        self.app = Flask(__name__)
+
+        @jobs.background_job("test_sum", page_key="rows")
+        def sum_records():
+            records = request.get_json()["records"]
+            for position, _ in enumerate(records, start=1):
+                jobs.report_progress(position, len(records))
+            return jsonify({
+                "status": "completed",
+                "summary": {"total": sum(records)},
+                "rows": [{"value": r} for r in records],
+            }), 200
+
+        self.view = sum_records
+        self.addCleanup(jobs.JOB_HANDLERS.pop, "test_sum", None)
+
+    def test_without_job_mode_runs_synchronously(self):
+        with self.app.test_request_context(method="POST", json={"records": [1, 2]}):
+            response = self.app.make_response(self.view())
+        self.assertEqual(response.get_json()["summary"]["total"], 3)
+        self.assertEqual(self.redis.round_trips, 0)
+
+    def test_job_mode_submits_instead_of_running(self):
+        with patch.object(jobs, "submit_job", return_value=("queued", 202)) as submit:
+            with self.app.test_request_context("/?mode=job", method="POST", json={"records": [1]}):
+                self.assertEqual(self.view(), ("queued", 202))
+        submit.assert_called_once_with("test_sum")
+
+    def test_execute_job_stores_result_and_progress(self):
+        records = list(range(250))
+        final = jobs.execute_job(self.app, "job1", "test_sum", payload={"records": records})
+
+        self.assertEqual(final["status"], "completed")
+        self.assertEqual(final["processed"], "250")
+        self.assertEqual(final["total"], "250")
+        self.assertEqual(json.loads(final["result_lists"]), ["rows"])
+        # progress writes are throttled (100, 200 and the last item), plus
+        # running, the stored result and the final status, its expiry and read-back
+        self.assertEqual(self.redis.round_trips, 8)
+
+        self.assertEqual(jobs.load_result("job1")["summary"]["total"], sum(records))
+        # every stored key expires with the job
+        self.assertTrue({"job:job1", "job:job1:result", "job:job1:meta", "job:job1:list:rows"} <= set(self.redis.ttls))
+
+    def test_execute_job_marks_errors_as_failed(self):
+        final = jobs.execute_job(self.app, "job2", "test_sum", payload={})
+        self.assertEqual(final["status"], "failed")
+        self.assertIn("error", final)
+        self.assertFalse(jobs.has_result(final))
+
+    def test_paginate_result(self):
+        result = {
+            "status": "success",
+            "summary": {"matched": 5},
+            "absent": {"absent_in_wallet": list(range(5)), "absent_in_cloud": []},
+        }
+        lists = jobs.store_result("job3", result, client=self.redis)
+        job = {"result_lists": json.dumps(lists)}
+        page = jobs.paginate_result("job3", job, "absent.absent_in_wallet", page=2, per_page=2)
+
+        self.assertEqual(page["items"], [2, 3])
+        self.assertEqual(page["total"], 5)
+        self.assertEqual(page["pages"], 3)
+        self.assertEqual(page["meta"], {"status": "success", "summary": {"matched": 5}})
+        self.assertEqual(jobs.paginate_result("job3", job, "absent.absent_in_cloud")["total"], 0)
+
+        with self.assertRaises(KeyError):
+            jobs.paginate_result("job3", job, "summary.matched")
+
+    def test_download_streams_in_chunks(self):
+        result = {"rows": [{"value": n} for n in range(50)]}
+        jobs.store_result("job4", result, client=self.redis)
+
+        chunks = list(jobs.iter_result("job4", chunk_size=64))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(json.loads("".join(chunks)), result)
+
+
+if __name__ == '__main__':
+    unittest.main()
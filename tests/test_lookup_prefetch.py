@@ -0,0 +1,177 @@
+"""
+Tests for the declarative lookup prefetch used by customer enrichment
+"""
+
+import unittest
+from unittest.mock import patch
+from datetime import datetime
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import create_engine, event, Integer, Float, Numeric, DateTime, Date, Boolean
+from sqlalchemy.orm import sessionmaker
+
+from application import db
+from application.models.mis_models import (
+    TblOnlineApplication, TblPersonalUg, TblRegisterProgramUg, TblCountry, TblProgramMode,
+    TblCampus, TblIntake, TblSpecialization, TblLevel, TblDistrict, TblSector, TblCell,
+    TblVillage, Province, TblProgramType, TblBank, TblIncomeCategory,
+)
+from application.utils.enrichment import prefetch_lookups, was_prefetched, LOOKUP_RELATIONS
+from application.utils.reference_cache import reference_cache
+
+TABLES = [
+    TblOnlineApplication, TblPersonalUg, TblRegisterProgramUg, TblCountry, TblProgramMode,
+    TblCampus, TblIntake, TblSpecialization, TblLevel, TblDistrict, TblSector, TblCell,
+    TblVillage, Province, TblProgramType, TblBank, TblIncomeCategory,
+]
+
+
+def _row(model, **values):
+    """Fill the NOT NULL columns the test does not care about"""
+    for column in model.__table__.columns:
+        if column.name in values or column.nullable or column.primary_key:
+            continue
+        if isinstance(column.type, (DateTime, Date)):
+            values[column.name] = datetime(2026, 1, 1)
+        elif isinstance(column.type, (Integer, Float, Numeric, Boolean)):
+            values[column.name] = 0
+        else:
+            values[column.name] = ""
+    return values
+
+
+class TestLookupPrefetch(unittest.TestCase):
+    """Prefetches applicant and student lookups from an in-memory SQLite database"""
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        self.addCleanup(self.ctx.pop)
+
+        self.engine = create_engine("sqlite://")
+        self.statements = []
+
+        @event.listens_for(self.engine, "before_cursor_execute")
+        def record(conn, cursor, statement, parameters, context, executemany):
+            self.statements.append(statement)
+
+        db.metadata.create_all(self.engine, tables=[model.__table__ for model in TABLES])
+        self.session = sessionmaker(bind=self.engine, expire_on_commit=False)()
+
+        def insert(model, *rows):
+            self.session.execute(model.__table__.insert(), [_row(model, **row) for row in rows])
+
+        insert(TblCountry, {"cntr_id": 1, "cntr_name": "Rwanda"}, {"cntr_id": 2, "cntr_name": "Kenya"})
+        insert(TblProgramMode, {"prg_mode_id": 1, "prg_mode_full_name": "Day"})
+        insert(TblCampus, {"camp_id": 1, "camp_full_name": "Kigali"}, {"camp_id": 2, "camp_full_name": "Rubavu"})
+        insert(TblIntake, {"intake_id": 1, "intake_month": "January", "intake_no": 1})
+        insert(TblSpecialization, {"splz_id": 1, "splz_full_name": "Accounting"},
+               {"splz_id": 2, "splz_full_name": "Nursing"})
+        insert(TblLevel, {"level_id": 1, "level_full_name": "Level 1"})
+        insert(TblOnlineApplication,
+               {"appl_Id": 1, "tracking_id": "A1", "country_of_birth": "1", "prg_mode_id": 1,
+                "camp_id": "1", "intake_id": 1, "opt_1": "1"},
+               {"appl_Id": 2, "tracking_id": "A2", "country_of_birth": "2", "prg_mode_id": 1,
+                "camp_id": "2", "intake_id": 1, "opt_1": "2"},
+               {"appl_Id": 3, "tracking_id": "A3", "country_of_birth": "99", "prg_mode_id": 7,
+                "camp_id": "9", "intake_id": None, "opt_1": "9"})
+        insert(TblPersonalUg,
+               {"per_id_ug": 1, "reg_no": "S1", "nationality": "2"},
+               {"per_id_ug": 2, "reg_no": "S2", "nationality": "Ugandan"})
+        insert(TblRegisterProgramUg,
+               {"reg_prg_id": 1, "reg_no": "S1", "level_id": 1, "camp_id": 2, "splz_id": 1, "intake_id": 1})
+        self.session.commit()
+
+        # reference tables come from the process cache, warmed like a worker start
+        patcher = patch.object(reference_cache, "client", None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        reference_cache.warm(self.session)
+        self.addCleanup(reference_cache.invalidate)
+        self.statements.clear()
+
+        # any per-instance fallback query would go through get_session
+        patcher = patch(
+            'application.models.mis_models.MISBaseModel.get_session',
+            side_effect=AssertionError("per-instance lookup query")
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def _selects(self):
+        return [s for s in self.statements if s.lstrip().upper().startswith("SELECT")]
+
+    def _non_reference_relations(self, model):
+        return [r for r in LOOKUP_RELATIONS[model] if not reference_cache.is_reference(r.model)]
+
+    def test_applicants_one_query_per_lookup(self):
+        """Test applicant enrichment costs one query per non-cached lookup table"""
+        applicants = self.session.query(TblOnlineApplication).order_by(TblOnlineApplication.appl_Id).all()
+        self.statements.clear()
+
+        prefetch_lookups(self.session, applicants)
+        self.assertEqual(len(self._selects()), len(self._non_reference_relations(TblOnlineApplication)))
+
+        self.statements.clear()
+        rows = [applicant.to_dict_for_quickbooks() for applicant in applicants]
+        self.assertEqual(self._selects(), [])
+
+        self.assertEqual(
+            [(r["campus_name"], r["program_name"], r["program_mode"], r["country_of_birth"]) for r in rows],
+            [("Kigali", "Accounting", "Day", "Rwanda"),
+             ("Rubavu", "Nursing", "Day", "Kenya"),
+             ("9", "9", "7", "Country ID: 99")],
+        )
+        self.assertEqual(rows[0]["intake_details"]["intake_month"], "January")
+        self.assertEqual(rows[2]["intake_details"], "")
+
+    def test_students_follow_registration_program(self):
+        """Test student lookups resolve through the prefetched registration program"""
+        students = self.session.query(TblPersonalUg).order_by(TblPersonalUg.per_id_ug).all()
+        self.statements.clear()
+
+        prefetch_lookups(self.session, students)
+        self.assertEqual(len(self._selects()), len(self._non_reference_relations(TblPersonalUg)))
+        self.assertEqual(len(self._selects()), 1)
+
+        self.statements.clear()
+        first, second = students
+        self.assertEqual(first._get_enriched_level_name(), "Level 1")
+        self.assertEqual(first._get_enriched_campus_name(), "Rubavu")
+        self.assertEqual(first._get_enriched_program_name(), "Accounting")
+        self.assertEqual(first._get_enriched_intake_details(), "January 1")
+        self.assertEqual(first._get_enriched_country_name(), "Kenya")
+
+        self.assertTrue(was_prefetched(second, "reg_program"))
+        self.assertEqual(second._get_enriched_campus_name(), "")
+        self.assertEqual(second._get_enriched_country_name(), "Ugandan")
+        self.assertEqual(self._selects(), [])
+
+    def test_unprefetched_applicant_uses_reference_cache(self):
+        """Test a single applicant is enriched from the cache without queries"""
+        applicant = self.session.query(TblOnlineApplication).filter_by(appl_Id=2).one()
+        self.statements.clear()
+
+        self.assertEqual(applicant._get_enriched_campus_name(), "Rubavu")
+        self.assertEqual(applicant._get_enriched_program_name(), "Nursing")
+        self.assertEqual(applicant._get_enriched_country_name(), "Kenya")
+        self.assertEqual(self._selects(), [])
+
+    def test_empty_list(self):
+        """Test an empty batch issues no queries"""
+        self.assertEqual(prefetch_lookups(self.session, []), [])
+        self.assertEqual(self.statements, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
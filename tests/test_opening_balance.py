@@ -0,0 +1,114 @@
+"""
+Tests for the set-based opening balance engine
+"""
+
+import unittest
+from unittest.mock import Mock
+from datetime import datetime
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from application import db
+from application.models.mis_models import TblImvoice, Payment, TblPersonalUg
+from application.services.opening_balance import OpeningBalanceSyncService
+
+
+class TestOpeningBalanceEngine(unittest.TestCase):
+    """Runs the aggregate queries against an in-memory SQLite database"""
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        db.metadata.create_all(
+            self.engine,
+            tables=[TblImvoice.__table__, Payment.__table__, TblPersonalUg.__table__]
+        )
+        self.session = sessionmaker(bind=self.engine)()
+        self.service = OpeningBalanceSyncService(logger=Mock())
+
+        self.session.execute(TblImvoice.__table__.insert(), [
+            {"reg_no": "A1", "dept": 1000.0, "invoice_date": datetime(2024, 3, 1), "date": datetime(2024, 3, 1)},
+            {"reg_no": "A1", "dept": 500.0, "invoice_date": datetime(2024, 12, 31, 23, 59), "date": datetime(2024, 12, 31)},
+            {"reg_no": "A1", "dept": 9999.0, "invoice_date": datetime(2025, 1, 1), "date": datetime(2025, 1, 1)},
+            {"reg_no": "B2", "dept": 300.0, "invoice_date": datetime(2024, 6, 1), "date": datetime(2024, 6, 1)},
+        ])
+        self.session.execute(Payment.__table__.insert(), [
+            {"reg_no": "A1", "amount": 400.0, "recorded_date": datetime(2024, 5, 1)},
+            {"reg_no": "A1", "amount": 50.0, "recorded_date": datetime(2023, 12, 31)},
+            {"reg_no": "C3", "amount": 200.0, "recorded_date": datetime(2024, 7, 1)},
+        ])
+        student_defaults = {
+            "no_principle_passes": "0", "max_or_grad": 0.0,
+            "secondary_notes": "", "secondary_school": "", "auth_ccs_nnc": "0",
+        }
+        self.session.execute(TblPersonalUg.__table__.insert(), [
+            {"reg_no": "A1", "opening_balance": 0.0, **student_defaults},
+            {"reg_no": "B2", "opening_balance": 300.0, **student_defaults},
+        ])
+        self.session.commit()
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def test_period_bounds_default_year(self):
+        """Test the default period is the 2024 calendar year"""
+        start, end = OpeningBalanceSyncService.period_bounds()
+        self.assertEqual(start, datetime(2024, 1, 1))
+        self.assertEqual(end, datetime(2025, 1, 1))
+
+    def test_period_bounds_cutoff_override(self):
+        """Test an explicit cutoff replaces the year end"""
+        start, end = OpeningBalanceSyncService.period_bounds(2024, end="2024-07-01")
+        self.assertEqual(start, datetime(2024, 1, 1))
+        self.assertEqual(end, datetime(2024, 7, 1))
+
+        with self.assertRaises(ValueError):
+            OpeningBalanceSyncService.period_bounds(2024, end="2023-01-01")
+
+    def test_compute_all_students(self):
+        """Test balances for every student come from one grouped pass"""
+        balances = self.service.compute_outstanding_balances(self.session, year=2024)
+
+        self.assertEqual(set(balances), {"A1", "B2", "C3"})
+        self.assertEqual(balances["A1"]["invoice_total"], 1500.0)
+        self.assertEqual(balances["A1"]["payment_total"], 400.0)
+        self.assertEqual(balances["A1"]["outstanding_balance"], 1100.0)
+        self.assertEqual(balances["C3"]["outstanding_balance"], -200.0)
+
+    def test_compute_selected_students_includes_zero_rows(self):
+        """Test requested students without movements get a zero balance"""
+        balances = self.service.compute_outstanding_balances(
+            self.session, reg_nos=["B2", "Z9"], year=2024
+        )
+        self.assertEqual(balances["B2"]["outstanding_balance"], 300.0)
+        self.assertEqual(balances["Z9"]["outstanding_balance"], 0.0)
+
+    def test_write_opening_balances_only_changed_rows(self):
+        """Test bulk write skips unchanged and missing students"""
+        balances = self.service.compute_outstanding_balances(self.session, year=2024)
+        written = self.service.write_opening_balances(self.session, balances, "TblPersonalUg")
+        self.session.commit()
+
+        self.assertEqual(written["updated"], 1)
+        self.assertEqual(written["skipped"], 1)
+        self.assertEqual(written["missing"], 1)
+        self.assertEqual(written["changed"], ["A1"])
+
+        stored = dict(self.session.query(TblPersonalUg.reg_no, TblPersonalUg.opening_balance).all())
+        self.assertEqual(stored["A1"], 1100.0)
+        self.assertEqual(stored["B2"], 300.0)
+
+    def test_write_opening_balances_invalid_table(self):
+        """Test an unknown student table is rejected"""
+        with self.assertRaises(ValueError):
+            self.service.write_opening_balances(self.session, {"A1": {}}, "TblUnknown")
+
+
+if __name__ == '__main__':
+    unittest.main()
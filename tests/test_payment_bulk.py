@@ -0,0 +1,177 @@
+"""
+Tests for the bulk QuickBooks payment file engine
+"""
+
+import unittest
+from unittest.mock import patch, Mock
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+from application.services.payment_bulk import (
+    BulkPaymentFileEngine, OPERATION_CREATE, OPERATION_VOID, QB_BATCH_LIMIT
+)
+
+
+class FakeQuickBooks:
+    """Answers batch requests; ``existing`` maps DocNumber -> payments"""
+
+    realm_id = "123"
+
+    def __init__(self, existing=None, fail_on_call=None):
+        self.existing = existing or {}
+        self.fail_on_call = fail_on_call
+        self.requests = []
+
+    def make_batch_request(self, realm_id, batch_data):
+        self.requests.append(batch_data)
+        if self.fail_on_call == len(self.requests):
+            raise RuntimeError("connection reset")
+
+        responses = []
+        for item in batch_data["BatchItemRequest"]:
+            if "Query" in item:
+                docs = item["Query"].split("IN (")[1].split(")")[0]
+                payments = [p for d in docs.split(", ") for p in self.existing.get(d.strip("'"), [])]
+                responses.append({"bId": item["bId"], "QueryResponse": {"Payment": payments}})
+            elif item["Payment"].get("TotalAmt") == -1:
+                responses.append({"bId": item["bId"], "Fault": {"Error": [{"Detail": "Invalid amount"}]}})
+            else:
+                responses.append({"bId": item["bId"], "Payment": {"Id": f"qb-{item['bId']}"}})
+        return {"BatchItemResponse": responses}
+
+
+class TestBulkPaymentFileEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        self.addCleanup(self.ctx.pop)
+
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+
+        patcher = patch.object(
+            BulkPaymentFileEngine, "_resolve_customers",
+            side_effect=lambda names: {n: f"C{n}" for n in names if n != "UNKNOWN"}
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def write_file(self, lines, name="payments.csv"):
+        path = os.path.join(self.tmp, name)
+        with open(path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+        return path
+
+    def engine(self, qb, operation=OPERATION_CREATE):
+        service = Mock()
+        service._get_qb_service.return_value = qb
+        return BulkPaymentFileEngine(operation, deposit_account_id="1211", payment_method_id="2",
+                                     service=service)
+
+    def create_file(self, count):
+        rows = ["Transaction date,Number,Name,Amount"]
+        rows += [f"2024-01-05,DOC{i},REG{i},\"1,000\"" for i in range(count)]
+        return self.write_file(rows)
+
+    def test_create_validates_and_batches(self):
+        path = self.write_file([
+            "Transaction date,Number,Name,Amount",
+            "2024-01-05,DOC1,REG1,500",
+            "2024-01-05,DOC2,UNKNOWN,500",
+            "2024-01-05,,REG3,500",
+            "2024-01-05,DOC4,REG4,0",
+            "2024-01-05,DOC1,REG1,500",
+            "2024-01-05,DOC5,REG5,700",
+        ])
+        existing = {"DOC5": [{"Id": "9", "DocNumber": "DOC5", "DepositToAccountRef": {"value": "1211"}}]}
+        qb = FakeQuickBooks(existing)
+
+        report = self.engine(qb).run(path)
+
+        self.assertEqual(report["created"], 1)
+        self.assertEqual(report["skipped"], 1)
+        self.assertEqual(report["invalid"], 4)
+        # one lookup batch, one create batch
+        self.assertEqual(len(qb.requests), 2)
+        payment = qb.requests[1]["BatchItemRequest"][0]["Payment"]
+        self.assertEqual(payment["DocNumber"], "DOC1")
+        self.assertEqual(payment["CustomerRef"], {"value": "CREG1"})
+        self.assertEqual(payment["TxnDate"], "2024-01-05")
+
+    def test_create_respects_batch_limit(self):
+        path = self.create_file(QB_BATCH_LIMIT * 2 + 5)
+        qb = FakeQuickBooks()
+
+        report = self.engine(qb).run(path)
+
+        self.assertEqual(report["created"], QB_BATCH_LIMIT * 2 + 5)
+        create_batches = [r for r in qb.requests if "Payment" in r["BatchItemRequest"][0]]
+        self.assertEqual([len(r["BatchItemRequest"]) for r in create_batches], [30, 30, 5])
+        self.assertEqual(create_batches[0]["BatchItemRequest"][0]["Payment"]["TotalAmt"], 1000.0)
+
+    def test_resume_after_crash_skips_checkpointed_rows(self):
+        path = self.create_file(70)
+
+        # request 1 is the lookup, 2 the first create batch, 3 crashes
+        with self.assertRaises(RuntimeError):
+            self.engine(FakeQuickBooks(fail_on_call=3)).run(path)
+
+        with open(f"{path}.create.checkpoint.jsonl") as f:
+            lines = [json.loads(line) for line in f]
+        self.assertEqual(len(lines), 1 + QB_BATCH_LIMIT)
+
+        qb = FakeQuickBooks()
+        report = self.engine(qb).run(path)
+
+        self.assertEqual(report["already_done"], QB_BATCH_LIMIT)
+        self.assertEqual(report["created"], 40)
+        sent = [item["Payment"]["DocNumber"] for r in qb.requests[1:] for item in r["BatchItemRequest"]]
+        self.assertEqual(sent[0], f"DOC{QB_BATCH_LIMIT}")
+
+    def test_changed_file_invalidates_checkpoint(self):
+        path = self.create_file(3)
+        self.engine(FakeQuickBooks()).run(path)
+
+        path = self.create_file(4)
+        report = self.engine(FakeQuickBooks()).run(path)
+
+        self.assertEqual(report["already_done"], 0)
+        self.assertEqual(report["created"], 4)
+
+    def test_void_plans_only_target_account_payments(self):
+        path = self.write_file(["Number", "D1", "D2", "D3", "D1"], name="void.csv")
+        existing = {
+            "D1": [
+                {"Id": "1", "SyncToken": "0", "DocNumber": "D1", "TotalAmt": 50,
+                 "DepositToAccountRef": {"value": "1211"}},
+                {"Id": "2", "SyncToken": "3", "DocNumber": "D1", "TotalAmt": 0,
+                 "DepositToAccountRef": {"value": "1211"}},
+            ],
+            "D2": [{"Id": "3", "SyncToken": "0", "DocNumber": "D2", "TotalAmt": 10,
+                    "DepositToAccountRef": {"value": "999"}}],
+        }
+        qb = FakeQuickBooks(existing)
+
+        report = self.engine(qb, OPERATION_VOID).run(path)
+
+        self.assertEqual(report["total"], 3)
+        self.assertEqual(report["voided"], 1)
+        self.assertEqual(report["skipped"], 2)
+        op = qb.requests[1]["BatchItemRequest"][0]
+        self.assertEqual(op["operation"], "update")
+        self.assertEqual(op["optionsData"], "void")
+        self.assertEqual(op["Payment"], {"Id": "1", "SyncToken": "0", "sparse": True})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,110 @@
+"""
+Tests for the QuickBooks deletion engine
+"""
+
+import unittest
+import threading
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+from application.services.qb_deletion import (
+    QuickBooksDeletionEngine, DeletionCheckpoint, DELETED, MISSING, FAILED
+)
+from tests.fakes import FakeRedis
+
+
+class FakeQuickBooks:
+    """Sales receipts ``existing`` -> SyncToken; ``reject`` ids fail to delete"""
+
+    realm_id = "123"
+
+    def __init__(self, existing, reject=()):
+        self.existing = dict(existing)
+        self.reject = set(reject)
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def make_batch_request(self, realm_id, batch_data):
+        with self.lock:
+            self.requests.append(batch_data)
+        responses = []
+        for item in batch_data["BatchItemRequest"]:
+            if "Query" in item:
+                ids = [i.strip("'") for i in item["Query"].split("IN (")[1].split(")")[0].split(", ")]
+                found = [{"Id": i, "SyncToken": self.existing[i]} for i in ids if i in self.existing]
+                responses.append({"bId": item["bId"], "QueryResponse": {"SalesReceipt": found}})
+            elif item["bId"] in self.reject:
+                responses.append({"bId": item["bId"], "Fault": {"Error": [{"Detail": "Stale object"}]}})
+            else:
+                receipt = item["SalesReceipt"]
+                assert receipt["SyncToken"] == self.existing[receipt["Id"]]
+                responses.append({"bId": item["bId"], "SalesReceipt": {"Id": receipt["Id"], "status": "Deleted"}})
+        return {"BatchItemResponse": responses}
+
+
+class TestQuickBooksDeletionEngine(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        self.addCleanup(self.ctx.pop)
+        self.redis = FakeRedis()
+
+    def engine(self, qb, concurrency=3):
+        return QuickBooksDeletionEngine(
+            "SalesReceipt", concurrency=concurrency, qb_service=qb,
+            checkpoint=DeletionCheckpoint("SalesReceipt", client=self.redis),
+        )
+
+    def test_reads_tokens_in_bulk_and_batches_deletes(self):
+        existing = {str(i): str(i % 3) for i in range(1, 101)}
+        qb = FakeQuickBooks(existing)
+
+        outcomes = self.engine(qb).delete([str(i) for i in range(1, 106)])
+
+        self.assertEqual(sum(o["status"] == DELETED for o in outcomes.values()), 100)
+        self.assertEqual([outcomes[str(i)]["status"] for i in range(101, 106)], [MISSING] * 5)
+        queries = [r for r in qb.requests if "Query" in r["BatchItemRequest"][0]]
+        self.assertEqual(len(queries), 1)
+        deletes = sorted(len(r["BatchItemRequest"]) for r in qb.requests if r not in queries)
+        self.assertEqual(deletes, [10, 30, 30, 30])
+
+    def test_rerun_skips_checkpointed_ids(self):
+        existing = {str(i): "0" for i in range(1, 11)}
+        qb = FakeQuickBooks(existing, reject={"4"})
+        first = self.engine(qb).delete(existing)
+        self.assertEqual(first["4"]["status"], FAILED)
+        self.assertEqual(first["4"]["error"], "Stale object")
+
+        qb = FakeQuickBooks(existing)
+        second = self.engine(qb).delete(existing)
+
+        self.assertEqual(second["4"]["status"], DELETED)
+        self.assertEqual(sum(o["status"] == MISSING for o in second.values()), 9)
+        query = qb.requests[0]["BatchItemRequest"][0]["Query"]
+        self.assertIn("IN ('4')", query)
+
+    def test_failed_batch_request_marks_items_failed(self):
+        qb = FakeQuickBooks({"1": "0"})
+        original = qb.make_batch_request
+
+        def fail_deletes(realm_id, batch_data):
+            if "Query" in batch_data["BatchItemRequest"][0]:
+                return original(realm_id, batch_data)
+            return {"Fault": {"Error": [{"Message": "Throttled"}]}}
+
+        qb.make_batch_request = fail_deletes
+        outcomes = self.engine(qb).delete(["1"])
+
+        self.assertEqual(outcomes["1"], {"status": FAILED, "error": "Throttled"})
+        self.assertEqual(self.redis.values.get("qb_deletion:SalesReceipt:done", set()), set())
+
+
+if __name__ == '__main__':
+    unittest.main()
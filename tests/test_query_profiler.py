@@ -0,0 +1,86 @@
+"""
+Tests for the slow-query and N+1 query profiler
+"""
+
+import unittest
+import sys
+import os
+import logging
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+
+from application.utils.instrumentation import start_scope, end_scope, instrument_engine
+from application.utils.query_profiler import QueryProfiler, fingerprint
+
+
+class TestQueryProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        instrument_engine(self.engine, "mis")
+        with self.engine.begin() as conn:
+            conn.execute(text("CREATE TABLE campus (id INTEGER PRIMARY KEY, location_id INTEGER)"))
+            conn.execute(text("INSERT INTO campus VALUES (1, 10), (2, 20)"))
+
+    def test_fingerprint_ignores_values(self):
+        """Test statements differing only in values share a shape"""
+        self.assertEqual(
+            fingerprint("SELECT * FROM campus WHERE id = 1 AND name = 'Kigali'"),
+            fingerprint("select *  from campus where id = %s and name = %(name)s"),
+        )
+        self.assertEqual(fingerprint("SELECT id FROM t WHERE id IN (?, ?, ?)"), "select id from t where id in (...)")
+
+    def test_repeated_shape_flagged_as_n_plus_one(self):
+        """Test one lookup per row within a scope is reported per endpoint"""
+        profiler = QueryProfiler(slow_threshold_ms=10000, repeat_threshold=5)
+        profiler.attach(self.engine, "mis")
+
+        token = start_scope("task", "sync_invoices")
+        with self.assertLogs("application.utils.query_profiler", logging.WARNING) as logs:
+            with self.engine.connect() as conn:
+                for camp_id in range(6):
+                    conn.execute(text("SELECT location_id FROM campus WHERE id = :id"), {"id": camp_id})
+                conn.execute(text("SELECT count(*) FROM campus"))
+            end_scope(token)
+
+        self.assertIn("Possible N+1 in sync_invoices: 6 x", logs.output[0])
+        report = profiler.report()[0]
+        self.assertEqual((report["name"], report["runs"], report["queries"], report["n_plus_one_runs"]),
+                         ("sync_invoices", 1, 7, 1))
+        suspects = [shape["shape"] for shape in report["top_shapes"] if shape["suspect_n_plus_one"]]
+        self.assertEqual(suspects, ["select location_id from campus where id = ?"])
+
+    def test_slow_query_logged_with_plan(self):
+        """Test queries over the threshold are logged with their EXPLAIN plan"""
+        profiler = QueryProfiler(slow_threshold_ms=0, repeat_threshold=100)
+        profiler.attach(self.engine, "mis")
+
+        with self.assertLogs("application.utils.query_profiler", logging.WARNING) as logs:
+            with self.engine.connect() as conn:
+                conn.execute(text("SELECT location_id FROM campus WHERE id = :id"), {"id": 1})
+
+        record = logs.records[0]
+        self.assertIn("Slow query on mis", record.getMessage())
+        self.assertTrue(record.query_plan and "campus" in str(record.query_plan).lower())
+
+    def test_streamed_query_is_not_explained(self):
+        """Test EXPLAIN is skipped while a server-side cursor result is unread"""
+        profiler = QueryProfiler(slow_threshold_ms=0, repeat_threshold=100)
+        profiler.attach(self.engine, "mis")
+        explained = []
+        profiler.explain_plan = lambda *args: explained.append(args)
+
+        with self.assertLogs("application.utils.query_profiler", logging.WARNING) as logs:
+            with self.engine.connect() as conn:
+                result = conn.execution_options(stream_results=True).execute(text("SELECT id FROM campus"))
+                self.assertEqual(len(result.fetchall()), 2)
+
+        self.assertEqual(explained, [])
+        self.assertIsNone(logs.records[0].query_plan)
+
+
+if __name__ == "__main__":
+    unittest.main()
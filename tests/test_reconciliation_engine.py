@@ -0,0 +1,153 @@
+"""
+Tests for the incremental integration log vs wallet history reconciliation
+"""
+
+import unittest
+from unittest.mock import Mock, patch
+from datetime import datetime
+import json
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from application import db
+from application.models.central_models import (
+    IntegrationLog, ReconciliationWatermark, ReconciliationDiscrepancy
+)
+from application.models.mis_models import TblStudentWalletHistory
+from application.services.reconciliation_engine import IntegrationWalletReconciler
+from application.config_files import reconciliation_task
+
+
+class TestIntegrationWalletReconciler(unittest.TestCase):
+    """Runs the reconciliation engine against an in-memory SQLite database"""
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        self.statements = []
+
+        @event.listens_for(self.engine, "before_cursor_execute")
+        def record(conn, cursor, statement, parameters, context, executemany):
+            self.statements.append(statement)
+
+        db.metadata.create_all(self.engine, tables=[
+            IntegrationLog.__table__, TblStudentWalletHistory.__table__,
+            ReconciliationWatermark.__table__, ReconciliationDiscrepancy.__table__,
+        ])
+        self.session = sessionmaker(bind=self.engine)()
+        self.reconciler = IntegrationWalletReconciler(session=self.session, batch_size=2, logger=Mock())
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def _log(self, tx_id, amount, when="2026-02-01 10:00:00", status="VALID"):
+        now = datetime.now()
+        self.session.execute(IntegrationLog.__table__.insert(), [{
+            "system_name": "UrubutoPay", "operation": "Callback", "status": status,
+            "response_data": json.dumps({
+                "transaction_id": tx_id, "amount": amount,
+                "payer_code": "P1", "payment_date_time": when,
+            }),
+            "started_at": now, "created_at": now, "updated_at": now,
+        }])
+
+    def _history(self, tx_id, amount):
+        self.session.execute(TblStudentWalletHistory.__table__.insert(), [{
+            "reg_no": "P1", "transaction_type": "TOPUP", "amount": amount,
+            "balance_before": 0, "balance_after": amount, "external_transaction_id": tx_id,
+        }])
+
+    def test_first_run_records_discrepancies(self):
+        """Test missing and mismatched transactions are stored as open results"""
+        self._log("T1", 100)
+        self._log("T2", 200)
+        self._log("T3", 300)
+        self._log("T0", 50, when="2026-01-01 00:00:00")   # before cutoff
+        self._log("TX", 10, status="INVALID")
+        self._history("T1", 100)
+        self._history("T2", 150)
+        self.session.commit()
+
+        run = self.reconciler.run()
+        summary = self.reconciler.summary()
+
+        self.assertEqual(run["logs_examined"], 4)
+        self.assertEqual(run["transactions_checked"], 3)
+        self.assertEqual(summary["missing_count"], 1)
+        self.assertEqual(summary["mismatched_count"], 1)
+        missing = self.reconciler.open_discrepancies("missing")
+        self.assertEqual([d["external_transaction_id"] for d in missing], ["T3"])
+
+    def test_second_run_only_reads_new_logs(self):
+        """Test the watermark skips logs examined earlier and resolves back-filled history"""
+        self._log("T1", 100)
+        self._log("T2", 200)
+        self.session.commit()
+        self.reconciler.run()
+
+        self._history("T1", 100)
+        self._log("T4", 400)
+        self.session.commit()
+        run = self.reconciler.run()
+
+        self.assertEqual(run["logs_examined"], 1)
+        self.assertEqual(run["rechecked_open"], 3)
+        self.assertEqual(run["resolved"], 1)
+        self.assertEqual(
+            sorted(d["external_transaction_id"] for d in self.reconciler.open_discrepancies()),
+            ["T2", "T4"],
+        )
+
+    def test_summary_reads_results_table_only(self):
+        """Test reporting does not touch integration logs or wallet history"""
+        self._log("T1", 100)
+        self.session.commit()
+        self.reconciler.run()
+        self.statements.clear()
+
+        self.reconciler.summary()
+        self.reconciler.open_discrepancies()
+
+        touched = " ".join(self.statements)
+        self.assertNotIn("integration_logs", touched)
+        self.assertNotIn("tbl_student_wallet_history", touched)
+
+
+class TestReconciliationTask(unittest.TestCase):
+
+    @patch.object(reconciliation_task, "current_app", Mock())
+    @patch.object(reconciliation_task, "release_lock")
+    @patch.object(reconciliation_task, "IntegrationWalletReconciler")
+    @patch.object(reconciliation_task, "redis_client")
+    def test_overlapping_run_is_skipped(self, redis_client, reconciler, release_lock):
+        """Test a run requested while another holds the lock does not touch the results"""
+        redis_client.set.return_value = None
+        result = reconciliation_task.reconcile_integration_vs_wallet_history_task.run()
+
+        self.assertTrue(result["skipped"])
+        reconciler.assert_not_called()
+        release_lock.assert_not_called()
+
+    @patch.object(reconciliation_task, "current_app", Mock())
+    @patch.object(reconciliation_task, "release_lock")
+    @patch.object(reconciliation_task, "IntegrationWalletReconciler")
+    @patch.object(reconciliation_task, "redis_client")
+    def test_lock_is_released_after_failure(self, redis_client, reconciler, release_lock):
+        """Test the run lock is dropped even when the run raises"""
+        redis_client.set.return_value = True
+        reconciler.return_value.run.side_effect = RuntimeError("deadlock")
+        with self.assertRaises(RuntimeError):
+            reconciliation_task.reconcile_integration_vs_wallet_history_task.run()
+
+        token = redis_client.set.call_args.args[1]
+        release_lock.assert_called_once_with(reconciliation_task.RUN_LOCK_KEY, token)
+
+
+if __name__ == '__main__':
+    unittest.main()
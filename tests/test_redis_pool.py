@@ -0,0 +1,71 @@
+"""
+Tests for the shared Redis pool helpers
+"""
+
+import unittest
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import redis
+
+from application.utils.redis_pool import (
+    InstrumentedRedis, update_job_progress, advance_offset, release_lock, redis_health, metrics,
+    JOB_TTL_SECONDS,
+)
+from tests.fakes import FakeRedis
+
+
+class TestRedisPool(unittest.TestCase):
+
+    def setUp(self):
+        self.redis = FakeRedis()
+
+    def test_job_progress_is_one_round_trip(self):
+        """Test counters and fields for a batch go out in a single pipeline"""
+        update_job_progress("job1", {"synced": 3, "failed": 1, "skipped": 0}, client=self.redis)
+        update_job_progress("job1", {"synced": 2, "failed": 0, "skipped": 1},
+                            fields={"last_batch": 2}, client=self.redis)
+
+        self.assertEqual(self.redis.round_trips, 2)
+        self.assertEqual(self.redis.values["job:job1"],
+                         {"synced": "5", "failed": "1", "skipped": "1", "last_batch": "2"})
+        self.assertEqual(self.redis.ttls["job:job1"], JOB_TTL_SECONDS)
+
+    def test_offset_advances_from_expected_value(self):
+        """Test the offset only moves when it still holds the run's start value"""
+        self.assertEqual(advance_offset("sync:offset", 0, 40, client=self.redis), (True, 40))
+        self.assertEqual(advance_offset("sync:offset", 40, 10, client=self.redis), (True, 50))
+
+        # a second run that started from 40 must not move it again
+        self.assertEqual(advance_offset("sync:offset", 40, 10, client=self.redis), (False, 50))
+        self.assertEqual(self.redis.values["sync:offset"], "50")
+
+    def test_lock_is_only_released_by_its_holder(self):
+        """Test a stale token leaves the current holder's lock in place"""
+        self.redis.values["run:lock"] = "second-run"
+
+        self.assertFalse(release_lock("run:lock", "first-run", client=self.redis))
+        self.assertEqual(self.redis.values["run:lock"], "second-run")
+        self.assertTrue(release_lock("run:lock", "second-run", client=self.redis))
+        self.assertNotIn("run:lock", self.redis.values)
+
+    def test_health_reports_unreachable_server(self):
+        """Test health never raises and counts the failed command"""
+        client = InstrumentedRedis(connection_pool=redis.ConnectionPool(
+            host="127.0.0.1", port=1, socket_connect_timeout=0.2, max_connections=2
+        ))
+        errors = metrics.snapshot()["errors"]
+
+        status = redis_health(client)
+
+        self.assertFalse(status["ok"])
+        self.assertIn("error", status)
+        self.assertEqual(status["pool"]["max_connections"], 2)
+        self.assertEqual(metrics.snapshot()["errors"], errors + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
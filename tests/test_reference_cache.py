@@ -0,0 +1,126 @@
+"""
+Tests for the in-process MIS reference table cache
+"""
+
+import unittest
+from unittest.mock import patch
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event, func
+from sqlalchemy.orm import sessionmaker
+
+from application import db
+from application.models.mis_models import TblCountry, TblProgramMode
+from application.utils.reference_cache import ReferenceCache, GENERATION_KEY, checksum
+from tests.fakes import FakeRedis
+
+
+class TestReferenceCache(unittest.TestCase):
+    """Runs the reference cache against an in-memory SQLite database"""
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        self.statements = []
+
+        @event.listens_for(self.engine, "before_cursor_execute")
+        def record(conn, cursor, statement, parameters, context, executemany):
+            self.statements.append(statement)
+
+        db.metadata.create_all(self.engine, tables=[TblCountry.__table__, TblProgramMode.__table__])
+        self.Session = sessionmaker(bind=self.engine, expire_on_commit=False)
+        self.session = self.Session()
+        self.session.execute(TblCountry.__table__.insert(), [
+            {"cntr_id": 1, "cntr_name": "Rwanda"}, {"cntr_id": 2, "cntr_name": "Kenya"},
+        ])
+        self.session.execute(TblProgramMode.__table__.insert(), [
+            {"prg_mode_id": 1, "prg_mode_full_name": "Day", "prg_mode_short_name": "D"},
+        ])
+        self.session.commit()
+
+        self.redis = FakeRedis()
+        self.cache = ReferenceCache(check_interval=3600, client=self.redis)
+        self.cache.register(TblCountry, "cntr_id")
+        self.cache.register(TblProgramMode, "prg_mode_id",
+                            markers=(lambda m: func.max(m.prg_mode_full_name),))
+        self.cache.warm(self.session)
+        self.statements.clear()
+
+        # instance-level listeners route committed writes to the module cache
+        patcher = patch("application.utils.reference_cache.reference_cache", self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def test_lookups_are_dict_hits(self):
+        """Test warmed lookups, including string ids, issue no queries"""
+        self.assertEqual(self.cache.get(TblCountry, 2).cntr_name, "Kenya")
+        self.assertEqual(self.cache.get(TblCountry, "1").cntr_name, "Rwanda")
+        self.assertIsNone(self.cache.get(TblCountry, 99))
+        self.assertIsNone(self.cache.get(TblCountry, None))
+        self.assertEqual(self.statements, [])
+
+    def test_refresh_reloads_only_changed_tables(self):
+        """Test the periodic check compares signatures and reloads changed tables"""
+        self.session.execute(TblCountry.__table__.insert(), [{"cntr_id": 3, "cntr_name": "Uganda"}])
+        self.session.commit()
+        self.statements.clear()
+
+        self.assertEqual(self.cache.refresh_if_stale(self.session), [])
+        self.assertEqual(self.statements, [])
+
+        self.assertEqual(self.cache.refresh_if_stale(self.session, force=True), ["tbl_country"])
+        self.assertEqual(self.cache.get(TblCountry, 3).cntr_name, "Uganda")
+        self.assertEqual(self.cache.stats()["tables"]["tbl_country"]["version"], 2)
+        self.assertEqual(self.cache.stats()["tables"]["tbl_program_mode"]["version"], 1)
+
+    def test_markers_catch_in_place_updates(self):
+        """Test a registered marker detects an update that keeps the row count"""
+        self.session.execute(
+            TblProgramMode.__table__.update().values(prg_mode_full_name="Evening")
+        )
+        self.session.commit()
+
+        self.assertEqual(self.cache.refresh_if_stale(self.session, force=True), ["tbl_program_mode"])
+        self.assertEqual(self.cache.get(TblProgramMode, 1).prg_mode_full_name, "Evening")
+
+    def test_checksum_catches_remapped_values(self):
+        """Test a checksum marker detects values moved between rows, which count and max miss"""
+        self.cache.register(TblCountry, "cntr_id", markers=(checksum("cntr_name"),))
+        self.cache.warm(self.session)
+        table = TblCountry.__table__
+        self.session.execute(table.update().where(table.c.cntr_id == 1).values(cntr_name="Kenya"))
+        self.session.execute(table.update().where(table.c.cntr_id == 2).values(cntr_name="Rwanda"))
+        self.session.commit()
+
+        self.assertEqual(self.cache.refresh_if_stale(self.session, force=True), ["tbl_country"])
+        self.assertEqual(self.cache.get(TblCountry, 1).cntr_name, "Kenya")
+
+    def test_orm_commit_invalidates_table(self):
+        """Test committing an ORM write to a cached table drops it"""
+        country = self.session.get(TblCountry, 1)
+        country.cntr_name = "Republic of Rwanda"
+        self.session.commit()
+
+        self.assertIsNone(self.cache.tables[TblCountry].rows)
+        self.assertIsNotNone(self.cache.tables[TblProgramMode].rows)
+        self.assertEqual(self.redis.values[GENERATION_KEY], "1")
+        self.assertEqual(self.cache.get(TblCountry, 1, self.session).cntr_name, "Republic of Rwanda")
+
+    def test_generation_bump_reloads_other_processes(self):
+        """Test another process's invalidation is picked up at the next check"""
+        self.redis.incr(GENERATION_KEY)
+
+        reloaded = self.cache.refresh_if_stale(self.session, force=True)
+        self.assertEqual(sorted(reloaded), ["tbl_country", "tbl_program_mode"])
+        self.assertEqual(self.cache.refresh_if_stale(self.session, force=True), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
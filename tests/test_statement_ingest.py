@@ -0,0 +1,84 @@
+"""
+Tests for chunked bank statement ingestion
+"""
+
+import unittest
+import tempfile
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from application.services.statement_ingest import (
+    StatementIngestService, StatementFormatError, read_file_columns, clean_amount
+)
+
+STATEMENT_CSV = '''"Int. Txn Ref.","Bank Slip","Payer Code","Paid Amount","Txn Date","Txn Status"
+"11202602110302160941","FT1","00818899","43,000","11/02/2026 03:02:16","SUCCESSFUL"
+"11202602110302160942",,"25900503","13,000","11/02/2026 03:05:00","PENDING_SETTLEMENT"
+"11202602110302160943","FT3","00818899","7,000","11/02/2026 04:00:00","SUCCESSFUL"
+"11202602110302160944","FT4","25900503","1,000","11/02/2026 05:00:00","FAILED"
+"11202602110302160945","FT5","25900503","abc","11/02/2026 06:00:00","SUCCESSFUL"
+'''
+
+
+class TestStatementIngest(unittest.TestCase):
+    """Test cases for StatementIngestService"""
+
+    def setUp(self):
+        handle = tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False)
+        handle.write(STATEMENT_CSV)
+        handle.close()
+        self.file_path = handle.name
+
+    def tearDown(self):
+        os.unlink(self.file_path)
+
+    def test_summarize_groups_per_payer(self):
+        """Test per-payer totals and transactions across several chunks"""
+        report = StatementIngestService(chunksize=2).summarize(self.file_path)
+
+        self.assertEqual(report["summary"], {"total_transactions": 4, "total_paid_amount": 63000.0})
+        payer = report["per_payer_code"]["00818899"]
+        self.assertEqual(payer["transaction_count"], 2)
+        self.assertEqual(payer["total_paid_amount"], 50000.0)
+        self.assertEqual(
+            [tx["transaction_reference"] for tx in payer["transactions"]],
+            ["11202602110302160941", "11202602110302160943"],
+        )
+
+        other = report["per_payer_code"]["25900503"]
+        self.assertEqual(other["transaction_count"], 2)
+        self.assertEqual(other["transactions"][0]["slip_no"], None)
+        self.assertEqual(other["transactions"][1]["paid_amount"], 0.0)
+
+    def test_missing_columns(self):
+        """Test a statement without the required columns is rejected"""
+        with open(self.file_path, "w") as f:
+            f.write('"Payer Code","Paid Amount"\n"1","2"\n')
+
+        with self.assertRaises(StatementFormatError) as ctx:
+            StatementIngestService().summarize(self.file_path)
+        self.assertEqual(ctx.exception.missing_columns, ["Int. Txn Ref.", "Txn Status"])
+
+    def test_to_absent_in_wallet(self):
+        """Test the report converts into the sync payload"""
+        report = StatementIngestService().summarize(self.file_path)
+        payload = StatementIngestService.to_absent_in_wallet(report["per_payer_code"])
+
+        first = next(p for p in payload if p["cloud_transactions"][0]["payer_code"] == "00818899")
+        self.assertEqual(first["cloud_total"], 50000.0)
+        self.assertEqual(first["transaction_reference"], "11202602110302160941")
+        self.assertEqual(len(first["cloud_transactions"]), 2)
+
+    def test_read_file_columns_keeps_strings(self):
+        """Test selected columns are loaded as strings with amounts cleaned separately"""
+        df = read_file_columns(self.file_path, ["Payer Code", "Paid Amount"])
+        self.assertEqual(list(df.columns), ["Payer Code", "Paid Amount"])
+        self.assertEqual(df["Payer Code"].iloc[0], "00818899")
+        self.assertEqual(clean_amount(df["Paid Amount"]).tolist(), [43000.0, 13000.0, 7000.0, 1000.0, 0.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+"""
+Tests for the gateway statement staging store
+"""
+
+import unittest
+from unittest.mock import Mock
+from datetime import datetime
+import tempfile
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from application import db
+from application.models.central_models import GatewayStatementImport, GatewayStatementTransaction
+from application.services.statement_store import StatementStoreService, recover_reference
+
+HEADER = '"Int. Txn Ref.","Bank Slip","Payer Code","Paid Amount","Txn Date","Txn Status"\n'
+JANUARY = HEADER + (
+    '"1001","FT1","00818899","43,000","12/01/2026 03:02:16","SUCCESSFUL"\n'
+    '"1002",,"25900503","13,000","13/01/2026 03:05:00","PENDING_SETTLEMENT"\n'
+    '"1003","FT3","00818899","7,000","14/01/2026 04:00:00","FAILED"\n'
+)
+# overlaps January: 1002 settled, 1004 is new
+FEBRUARY = HEADER + (
+    '"1002","FT2","25900503","13,000","13/01/2026 03:05:00","SUCCESSFUL"\n'
+    '"1004","FT4","25900503","1,000","02/02/2026 05:00:00","SUCCESSFUL"\n'
+)
+
+
+class TestStatementStore(unittest.TestCase):
+    """Runs the staging import against an in-memory SQLite database"""
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        db.metadata.create_all(
+            self.engine,
+            tables=[GatewayStatementImport.__table__, GatewayStatementTransaction.__table__]
+        )
+        self.session = sessionmaker(bind=self.engine)()
+        self.store = StatementStoreService(session=self.session, chunksize=2, logger=Mock())
+        self.files = []
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+        for path in self.files:
+            os.unlink(path)
+
+    def _write(self, content):
+        handle = tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False)
+        handle.write(content)
+        handle.close()
+        self.files.append(handle.name)
+        return handle.name
+
+    def test_import_is_idempotent_per_file(self):
+        """Test a file is staged once and re-imports are skipped"""
+        path = self._write(JANUARY)
+        first = self.store.import_file(path)
+        second = self.store.import_file(path)
+
+        self.assertFalse(first["already_loaded"])
+        self.assertEqual(first["inserted_count"], 3)
+        self.assertEqual(first["txn_date_from"], "2026-01-12T03:02:16")
+        self.assertEqual(first["txn_date_to"], "2026-01-14T04:00:00")
+        self.assertTrue(second["already_loaded"])
+        self.assertEqual(self.session.query(GatewayStatementTransaction).count(), 3)
+
+    def test_overlapping_files_dedupe_on_reference(self):
+        """Test overlapping exports update known lines instead of duplicating them"""
+        self.store.import_file(self._write(JANUARY))
+        result = self.store.import_file(self._write(FEBRUARY))
+
+        self.assertEqual(result["inserted_count"], 1)
+        self.assertEqual(result["updated_count"], 1)
+        status = (
+            self.session.query(GatewayStatementTransaction.txn_status)
+            .filter_by(transaction_reference="1002").scalar()
+        )
+        self.assertEqual(status, "SUCCESSFUL")
+        self.assertEqual(len(self.store.list_imports()), 2)
+
+    def test_summarize_by_date_range(self):
+        """Test reports come from staged lines filtered by date and status"""
+        self.store.import_file(self._write(JANUARY))
+        self.store.import_file(self._write(FEBRUARY))
+
+        report = self.store.summarize(datetime(2026, 1, 1), datetime(2026, 2, 1))
+
+        self.assertEqual(report["summary"], {"total_transactions": 2, "total_paid_amount": 56000.0})
+        self.assertEqual(set(report["per_payer_code"]), {"00818899", "25900503"})
+        # the settled line picked up its bank slip from the later export
+        self.assertEqual(report["per_payer_code"]["25900503"]["transactions"][0]["slip_no"], "FT2")
+
+    def test_scientific_references_are_recovered_or_rejected(self):
+        """Test Excel-mangled references never merge distinct transactions"""
+        path = self._write(
+            '"Int. Txn Ref.","Ext. Txn Ref.","Payer Code","Paid Amount","Txn Date","Txn Status"\n'
+            '"1.12026021101073E+019","INT_11202602110107297201","00818899","5,000","11/02/2026 01:07:29","SUCCESSFUL"\n'
+            '"1.12026021101073E+019","INT_11202602110107301544","25900503","7,000","11/02/2026 01:07:30","SUCCESSFUL"\n'
+            '"1.12026021101073E+019","3214","25900503","9,000","11/02/2026 01:07:31","SUCCESSFUL"\n'
+            '"11202602110107400000","","25900503","1,000","2026-02-11 01:07","SUCCESSFUL"\n'
+        )
+        result = self.store.import_file(path)
+
+        self.assertEqual(result["inserted_count"], 3)
+        self.assertEqual(result["rejected_count"], 1)
+        self.assertEqual(result["rejected_references"], ["1.12026021101073E+019"])
+        self.assertEqual(result["undated_count"], 1)
+        references = {row.transaction_reference for row in self.session.query(GatewayStatementTransaction)}
+        self.assertEqual(
+            references, {"11202602110107297201", "11202602110107301544", "11202602110107400000"}
+        )
+        # an INT_ reference that does not round to the exported value is not trusted
+        self.assertIsNone(recover_reference("1.12026021101073E+019", "INT_11202602110199999999"))
+        self.assertEqual(recover_reference("1001", None), "1001")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+"""
+Tests for streaming report responses
+"""
+
+import unittest
+from collections import namedtuple
+from datetime import datetime
+import csv
+import io
+import json
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import sessionmaker
+
+from application import db
+from application.models.central_models import IntegrationLog
+from application.utils.streaming import requested_stream_format, iter_results, stream_rows
+from application.api.v1.reconciliation import _iter_wallet_payment_summaries
+
+
+class TestStreaming(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        db.metadata.create_all(self.engine, tables=[IntegrationLog.__table__])
+        self.session = sessionmaker(bind=self.engine)()
+        now = datetime(2026, 2, 4, 10, 0, 0)
+        self.session.execute(IntegrationLog.__table__.insert(), [
+            {"system_name": "UrubutoPay", "operation": "Wallet Payment", "status": "VALID",
+             "payer_code": f"P{i}", "external_transaction_id": f"TX{i}",
+             "response_data": json.dumps({"amount": i}), "created_at": now, "updated_at": now}
+            for i in range(5)
+        ])
+        self.session.commit()
+        self.app = Flask(__name__)
+
+    def tearDown(self):
+        self.session.close()
+
+    def test_iter_results_accepts_query_select_and_text(self):
+        query = self.session.query(IntegrationLog.payer_code).order_by(IntegrationLog.id)
+        stmt = select(IntegrationLog.__table__.c.payer_code).order_by(IntegrationLog.__table__.c.id)
+        raw = text("SELECT payer_code FROM integration_logs ORDER BY id")
+
+        for source in (query, stmt, raw):
+            rows = list(iter_results(self.session, source, batch_size=2))
+            self.assertEqual([row.payer_code for row in rows], ["P0", "P1", "P2", "P3", "P4"])
+
+    def test_requested_stream_format(self):
+        with self.app.test_request_context("/?format=CSV"):
+            self.assertEqual(requested_stream_format(), "csv")
+        with self.app.test_request_context("/?format=xml"):
+            self.assertIsNone(requested_stream_format())
+        with self.app.test_request_context("/"):
+            self.assertIsNone(requested_stream_format())
+
+    def test_ndjson_stream(self):
+        rows = ({"id": i, "data": {"n": i}} for i in range(3))
+        with self.app.test_request_context("/"):
+            response = stream_rows(rows, "ndjson", "report")
+            body = response.get_data(as_text=True)
+
+        self.assertEqual(response.mimetype, "application/x-ndjson")
+        self.assertIn("report.ndjson", response.headers["Content-Disposition"])
+        self.assertEqual([json.loads(line) for line in body.splitlines()],
+                         [{"id": i, "data": {"n": i}} for i in range(3)])
+
+    def test_csv_stream_encodes_nested_values(self):
+        rows = ({"id": i, "payments": [i]} for i in range(2))
+        with self.app.test_request_context("/"):
+            response = stream_rows(rows, "csv", "report")
+            body = response.get_data(as_text=True)
+
+        parsed = list(csv.DictReader(io.StringIO(body)))
+        self.assertEqual(parsed[1], {"id": "1", "payments": "[1]"})
+
+    def test_wallet_payment_summaries_fold_contiguous_rows(self):
+        Row = namedtuple("Row", "reg_no reference_number payment_id payment_amount payment_date "
+                                "history_id history_amount history_created_at ledger_balance")
+        rows = [
+            Row("A", "R1", 1, 100, None, 10, 100, None, 40),
+            Row("A", "R1", 1, 100, None, 11, 50, None, 40),
+            Row("A", "R1", 2, 50, None, 10, 100, None, 40),
+            Row("A", "R1", 2, 50, None, 11, 50, None, 40),
+            Row("B", "R2", None, None, None, 12, 30, None, None),
+            Row("C", "R3", 3, 20, None, None, None, None, None),
+        ]
+        summaries = list(_iter_wallet_payment_summaries(iter(rows)))
+
+        self.assertEqual([s["reg_no"] for s in summaries], ["A", "C"])
+        self.assertEqual(summaries[0]["payment_total"], 150.0)
+        self.assertEqual(summaries[0]["wallet_history_total"], 150.0)
+        self.assertEqual(summaries[0]["ledger_balance"], 40.0)
+        self.assertIsNone(summaries[1]["ledger_balance"])
+        self.assertFalse(summaries[0]["mismatches"])
+        self.assertTrue(summaries[1]["mismatches"])
+
+
+if __name__ == '__main__':
+    unittest.main()
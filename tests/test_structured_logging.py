@@ -0,0 +1,111 @@
+"""
+Tests for the structured logging helpers
+"""
+
+import unittest
+import sys
+import os
+import json
+import logging
+import tempfile
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from application.utils.structured_logging import (
+    JsonFormatter, parse_levels, log_payload, start_file_logging, stop_file_logging
+)
+
+
+class Unprintable:
+    """Fails the test if a payload is serialised"""
+
+    def __str__(self):
+        raise AssertionError("payload was formatted")
+
+
+class ListHandler(logging.Handler):
+
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class TestStructuredLogging(unittest.TestCase):
+
+    def setUp(self):
+        self.logger = logging.getLogger("application.tests.structured")
+        self.logger.propagate = False
+        self.handler = ListHandler()
+        self.logger.addHandler(self.handler)
+        self.addCleanup(self.logger.handlers.clear)
+
+    def test_json_formatter_includes_extra_fields(self):
+        """Test records become one JSON object with args applied and extras kept"""
+        record = self.logger.makeRecord(self.logger.name, logging.INFO, __file__, 10,
+                                        "synced %d customers", (3,), None, extra={"job_id": "j1"})
+        entry = json.loads(JsonFormatter().format(record))
+
+        self.assertEqual(entry["message"], "synced 3 customers")
+        self.assertEqual(entry["level"], "INFO")
+        self.assertEqual(entry["job_id"], "j1")
+
+    def test_parse_levels(self):
+        """Test per-subsystem level overrides are parsed"""
+        self.assertEqual(parse_levels("a.b=debug, c = WARNING,,bad"), {"a.b": "DEBUG", "c": "WARNING"})
+        self.assertEqual(parse_levels(None), {})
+
+    def test_payload_skipped_below_level(self):
+        """Test payloads are never serialised when the level is disabled"""
+        self.logger.setLevel(logging.INFO)
+        log_payload(self.logger, "body", Unprintable(), sample_rate=1)
+        self.assertEqual(self.handler.records, [])
+
+    def test_payload_sampled_and_truncated(self):
+        """Test a sampled payload is logged truncated and unsampled ones are dropped"""
+        self.logger.setLevel(logging.DEBUG)
+        log_payload(self.logger, "body", Unprintable(), sample_rate=0)
+        log_payload(self.logger, "body", {"data": "x" * 5000}, sample_rate=1)
+
+        self.assertEqual(len(self.handler.records), 1)
+        message = self.handler.records[0].getMessage()
+        self.assertTrue(message.startswith('body: {"data": "xxx'))
+        self.assertLess(len(message), 2100)
+
+    def test_file_writer_runs_on_queue_listener(self):
+        """Test records reach the rotating file as JSON lines via the background writer"""
+        self.logger.setLevel(logging.INFO)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "logs", "app.log")
+            start_file_logging(path, logger=self.logger)
+            self.logger.info("batch %s done", 7)
+            stop_file_logging()
+
+            with open(path) as log_file:
+                lines = [json.loads(line) for line in log_file]
+        self.assertEqual([line["message"] for line in lines], ["batch 7 done"])
+
+    def test_file_writer_follows_external_rotation(self):
+        """Test the writer reopens the file after logrotate moves it"""
+        self.logger.setLevel(logging.INFO)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "app.log")
+            listener = start_file_logging(path, logger=self.logger)
+            self.logger.info("before rotation")
+            # wait for the writer before moving the file, as logrotate would find it
+            listener.stop()
+            listener.start()
+            os.rename(path, f"{path}.1")
+            self.logger.info("after rotation")
+            stop_file_logging()
+
+            with open(f"{path}.1") as rotated, open(path) as current:
+                self.assertEqual([json.loads(line)["message"] for line in rotated], ["before rotation"])
+                self.assertEqual([json.loads(line)["message"] for line in current], ["after rotation"])
+
+
+if __name__ == "__main__":
+    unittest.main()
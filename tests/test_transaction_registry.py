@@ -0,0 +1,94 @@
+"""
+Tests for the unified transaction id registry lookup
+"""
+
+import unittest
+import json
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from application import db
+from application.models.mis_models import Payment, TblStudentWallet, TblStudentWalletHistory
+from application.models.central_models import IntegrationLog
+from application.services.transaction_registry import TransactionRegistry
+
+
+class TestTransactionRegistry(unittest.TestCase):
+    """Runs the registry probe against an in-memory SQLite database"""
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        self.statements = []
+
+        @event.listens_for(self.engine, "before_cursor_execute")
+        def record(conn, cursor, statement, parameters, context, executemany):
+            self.statements.append(statement)
+
+        db.metadata.create_all(self.engine, tables=[
+            Payment.__table__, TblStudentWallet.__table__,
+            TblStudentWalletHistory.__table__, IntegrationLog.__table__,
+        ])
+        self.session = sessionmaker(bind=self.engine)()
+
+        self.session.execute(Payment.__table__.insert(), [
+            {"id": 1, "reg_no": "A1", "amount": 100.0, "external_transaction_id": "TX-PAY"},
+        ])
+        self.session.execute(TblStudentWallet.__table__.insert(), [
+            {"id": 7, "reg_prg_id": 1, "reg_no": "A1", "external_transaction_id": "TX-WAL"},
+        ])
+        self.session.execute(TblStudentWalletHistory.__table__.insert(), [
+            {"id": 3, "reg_no": "A1", "transaction_type": "TOPUP", "amount": 50.0,
+             "balance_before": 0.0, "balance_after": 50.0, "external_transaction_id": "TX-WAL"},
+        ])
+        self.session.add_all([
+            IntegrationLog(system_name="UrubutoPay", operation="Invoice Payment", status="success",
+                           response_data=json.dumps({"transaction_id": "TX-LOG", "amount": 10})),
+            IntegrationLog(system_name="UrubutoPay", operation="Wallet", status="success",
+                           external_transaction_id="TX-PAY", response_data="not json"),
+        ])
+        self.session.commit()
+        self.statements.clear()
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def test_integration_log_transaction_key(self):
+        """Test the indexed key falls back to the transaction id in the payload"""
+        keys = sorted(k for (k,) in self.session.query(IntegrationLog.transaction_key))
+        self.assertEqual(keys, ["TX-LOG", "TX-PAY"])
+
+    def test_lookup_probes_all_sources_in_one_statement(self):
+        """Test a bulk lookup returns every source in a single round trip"""
+        found = TransactionRegistry.lookup(["TX-PAY", "TX-WAL", "TX-LOG", "TX-NEW"], session=self.session)
+
+        self.assertEqual(len(self.statements), 1)
+        self.assertEqual(set(found["TX-PAY"]), {"payment", "integration_log"})
+        self.assertEqual(found["TX-PAY"]["payment"], 1)
+        self.assertEqual(found["TX-WAL"], {"wallet": 7, "wallet_history": 3})
+        self.assertEqual(set(found["TX-LOG"]), {"integration_log"})
+        self.assertNotIn("TX-NEW", found)
+
+    def test_find_restricted_sources(self):
+        """Test a single lookup can be limited to payment tables"""
+        self.assertEqual(
+            TransactionRegistry.find("TX-PAY", sources=["payment", "wallet"], session=self.session),
+            {"payment": 1},
+        )
+        self.assertEqual(TransactionRegistry.find("TX-LOG", sources=["wallet"], session=self.session), {})
+        self.assertEqual(TransactionRegistry.find(None, session=self.session), {})
+
+    def test_unknown_source_rejected(self):
+        """Test an unknown source name is rejected"""
+        with self.assertRaises(ValueError):
+            TransactionRegistry.find("TX-PAY", sources=["ledger"], session=self.session)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+"""
+Tests for the Urubuto webhook load test: export parsing, delivery plan and
+idempotency checks
+"""
+
+import unittest
+import sys
+import os
+from collections import Counter
+from datetime import datetime
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+
+from application.models.mis_models import TblStudentWallet, TblStudentWalletHistory
+from tools.benchmark.loadtest import (
+    DEFAULT_EXPORTS, _transaction, build_deliveries, check_idempotency, load_transactions, wallet_balances,
+)
+from tools.benchmark.seed import seed_payers
+
+
+def _row(**overrides):
+    row = {
+        "Int. Txn Ref.": "11202602032301420381", "Ext. Txn Ref.": "INT_11202602032301420381",
+        "Bank Slip": "FT26035JK084", "Payer Code": "26900614", "Payer Names": "Aisha Nikuze",
+        "Paid Amount": "30,000", "Payment Channel": "WALLET / MOMO", "Txn Date": "03/02/2026 23:01:42",
+        "Txn Status": "SUCCESSFUL", "Observation": "26900614/Aisha Nikuze/Tuition fees",
+    }
+    row.update(overrides)
+    return row
+
+
+class TestReplayPlan(unittest.TestCase):
+
+    def test_export_row_to_callback(self):
+        """Test export rows become callback payloads"""
+        transaction = _transaction(_row())
+        self.assertEqual(transaction["transaction_id"], "INT_11202602032301420381")
+        self.assertEqual(transaction["transaction_status"], "VALID")
+        self.assertEqual(transaction["amount"], 30000.0)
+        self.assertEqual(transaction["payment_date_time"], "2026-02-03 23:01:42")
+
+        pending = _transaction(_row(**{"Ext. Txn Ref.": "", "Bank Slip": "", "Txn Status": "PENDING"}))
+        self.assertEqual(pending["transaction_id"], "11202602032301420381")
+        self.assertEqual(pending["transaction_status"], "PENDING")
+        self.assertIsNone(pending["slip_number"])
+        self.assertIsNone(_transaction(_row(**{"Paid Amount": "n/a"})))
+
+    def test_exports_are_deduplicated(self):
+        """Test overlapping exports yield each transaction once"""
+        transactions = load_transactions([DEFAULT_EXPORTS])
+        self.assertTrue(transactions)
+        ids = [t["transaction_id"] for t in transactions]
+        self.assertEqual(len(ids), len(set(ids)))
+
+    def test_deliveries(self):
+        """Test every transaction is delivered, same-payer bursts and duplicates included"""
+        transactions = [
+            dict(_transaction(_row()), transaction_id=f"T{i}", payer_code=f"P{i % 3}") for i in range(30)
+        ]
+        bursts = build_deliveries(transactions, duplicate_ratio=0.2, concurrent_duplicate_ratio=0.1,
+                                  same_payer_ratio=1.0, seed=3)
+        delivered = Counter(t["transaction_id"] for burst in bursts for t in burst)
+        self.assertEqual(set(delivered), {t["transaction_id"] for t in transactions})
+        self.assertGreater(sum(delivered.values()), len(transactions))
+        self.assertTrue(any(len({t["transaction_id"] for t in burst}) == 10 for burst in bursts))
+        self.assertEqual(bursts, build_deliveries(transactions, 0.2, 0.1, 1.0, seed=3))
+
+
+class TestIdempotencyCheck(unittest.TestCase):
+
+    def test_violations(self):
+        """Test lost balance updates and unrecorded credits are reported"""
+        engine = create_engine("sqlite://")
+        seed_payers(engine, {"26900614": "Aisha Nikuze", "26900683": "Kevine IKIREZI"}, wallet_ratio=1.0)
+        opening = {reg_no: sum(rows) for reg_no, rows in wallet_balances(engine).items()}
+
+        transactions = [
+            dict(_transaction(_row()), transaction_id="A1", amount=1000.0),
+            dict(_transaction(_row()), transaction_id="A2", amount=500.0),
+            dict(_transaction(_row()), transaction_id="B1", payer_code="26900683", amount=700.0),
+        ]
+        wallets = TblStudentWallet.__table__
+        history = TblStudentWalletHistory.__table__
+        with engine.begin() as conn:
+            for tx, reg_no in (("A1", "26900614"), ("A2", "26900614")):
+                conn.execute(history.insert().values(
+                    reg_no=reg_no, reference_number="R", transaction_type="TOPUP", amount=1,
+                    balance_before=0, balance_after=0, external_transaction_id=tx, trans_code=tx,
+                    created_at=datetime(2026, 2, 3)))
+            # Only the second top-up reached the balance (a lost update)
+            conn.execute(wallets.update().where(wallets.c.reg_no == "26900614")
+                         .values(dept=opening["26900614"] + 500.0))
+
+        report = check_idempotency(engine, transactions, {"A1": ["ok"], "A2": ["ok"], "B1": ["ok"]}, opening)
+        self.assertEqual(report["balance_mismatches"]["examples"], ["26900614"])
+        self.assertEqual(report["missing_credits"]["examples"], ["B1"])
+        self.assertEqual(report["duplicate_history"]["count"], 0)
+        self.assertEqual(report["violations"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
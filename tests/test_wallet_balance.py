@@ -0,0 +1,112 @@
+"""
+Tests for the maintained wallet balance snapshot
+"""
+
+import unittest
+from unittest.mock import patch
+from contextlib import contextmanager
+from decimal import Decimal
+from datetime import datetime
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from application import db
+from application.models.mis_models import TblStudentWalletLedger, TblStudentWalletBalance
+
+
+class TestWalletBalanceSnapshot(unittest.TestCase):
+    """Test cases for TblStudentWalletBalance"""
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        db.metadata.create_all(
+            self.engine,
+            tables=[TblStudentWalletLedger.__table__, TblStudentWalletBalance.__table__]
+        )
+        self.Session = sessionmaker(bind=self.engine, expire_on_commit=False)
+
+        @contextmanager
+        def session_scope():
+            session = self.Session()
+            try:
+                yield session
+                session.commit()
+            finally:
+                session.close()
+
+        self.patcher = patch(
+            'application.models.mis_models.MISBaseModel.get_session',
+            side_effect=session_scope
+        )
+        self.patcher.start()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.engine.dispose()
+
+    def _add_ledger(self, session, **kwargs):
+        kwargs.setdefault("created_at", datetime(2025, 1, 1))
+        entry = TblStudentWalletLedger(**kwargs)
+        session.add(entry)
+        session.flush()
+        return entry
+
+    def test_orm_inserts_maintain_snapshot(self):
+        """Test credits and debits adjust the snapshot in the same transaction"""
+        session = self.Session()
+        self._add_ledger(session, id=1, student_id="S1", direction="credit",
+                         original_amount=Decimal("100"), amount=Decimal("100"), source="sales_receipt")
+        self._add_ledger(session, id=2, student_id="S1", direction="debit",
+                         original_amount=Decimal("-40"), amount=Decimal("-40"), source="invoice",
+                         parent_credit_id=1)
+        session.commit()
+
+        snapshot = session.get(TblStudentWalletBalance, "S1")
+        self.assertEqual(snapshot.balance, Decimal("60"))
+        self.assertEqual(snapshot.ledger_entries, 2)
+        self.assertEqual(snapshot.last_ledger_id, 2)
+        self.assertEqual(TblStudentWalletLedger.get_wallet_balance("S1"), 60.0)
+        session.close()
+
+    def test_rollback_discards_snapshot_change(self):
+        """Test a rolled back ledger insert leaves the snapshot untouched"""
+        session = self.Session()
+        self._add_ledger(session, id=1, student_id="S1", direction="credit",
+                         original_amount=Decimal("10"), amount=Decimal("10"), source="sales_receipt")
+        session.rollback()
+
+        self.assertIsNone(session.get(TblStudentWalletBalance, "S1"))
+        session.close()
+
+    def test_verify_reports_and_repairs_drift(self):
+        """Test the verifier re-derives balances from the ledger"""
+        session = self.Session()
+        self._add_ledger(session, id=1, student_id="S1", direction="credit",
+                         original_amount=Decimal("100"), amount=Decimal("100"), source="sales_receipt")
+        session.commit()
+        # simulate a write that bypassed the snapshot
+        session.execute(TblStudentWalletLedger.__table__.insert(), [{
+            "id": 2, "student_id": "S1", "direction": "debit", "original_amount": Decimal("-25"),
+            "amount": Decimal("-25"), "source": "invoice", "created_at": datetime(2025, 1, 2),
+        }])
+        session.commit()
+        session.close()
+
+        report = TblStudentWalletBalance.verify()
+        self.assertEqual(report["drifted"], 1)
+        self.assertEqual(report["drift"][0]["ledger_balance"], 75.0)
+        self.assertEqual(report["drift"][0]["snapshot_balance"], 100.0)
+
+        TblStudentWalletBalance.verify(repair=True)
+        self.assertEqual(TblStudentWalletBalance.verify()["drifted"], 0)
+        self.assertEqual(TblStudentWalletLedger.get_wallet_balance("S1"), 75.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
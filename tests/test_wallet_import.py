@@ -0,0 +1,164 @@
+"""
+Tests for the bulk absent wallet payment import
+"""
+
+import unittest
+from unittest.mock import patch, Mock
+from contextlib import contextmanager
+from decimal import Decimal
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event, BigInteger
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import sessionmaker
+
+from application import db
+from application.models.central_models import IntegrationLog
+from application.models.mis_models import (
+    TblStudentWallet, TblStudentWalletHistory, TblStudentWalletLedger,
+    TblStudentWalletBalance, TblPersonalUg, TblOnlineApplication,
+)
+from application.services.wallet_import import AbsentWalletPaymentImporter
+
+
+@compiles(BigInteger, "sqlite")
+def _sqlite_bigint(type_, compiler, **kw):
+    # SQLite only autoincrements INTEGER PRIMARY KEY
+    return "INTEGER"
+
+
+class TestAbsentWalletPaymentImporter(unittest.TestCase):
+    """Runs the bulk import against an in-memory SQLite database"""
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        self.statements = []
+
+        @event.listens_for(self.engine, "before_cursor_execute")
+        def record(conn, cursor, statement, parameters, context, executemany):
+            self.statements.append(statement)
+
+        db.metadata.create_all(self.engine, tables=[
+            TblStudentWallet.__table__, TblStudentWalletHistory.__table__,
+            TblStudentWalletLedger.__table__, TblStudentWalletBalance.__table__,
+            TblPersonalUg.__table__, TblOnlineApplication.__table__, IntegrationLog.__table__,
+        ])
+        self.Session = sessionmaker(bind=self.engine, expire_on_commit=False)
+
+        @contextmanager
+        def session_scope():
+            session = self.Session()
+            try:
+                yield session
+                session.commit()
+            except Exception:
+                session.rollback()
+                raise
+            finally:
+                session.close()
+
+        self.patcher = patch(
+            'application.models.mis_models.MISBaseModel.get_session',
+            side_effect=session_scope
+        )
+        self.patcher.start()
+
+        session = self.Session()
+        student_defaults = {
+            "no_principle_passes": "0", "max_or_grad": 0.0,
+            "secondary_notes": "", "secondary_school": "", "auth_ccs_nnc": "0",
+        }
+        session.execute(TblPersonalUg.__table__.insert(), [
+            {"reg_no": "S1", **student_defaults},
+            {"reg_no": "S2", **student_defaults},
+        ])
+        session.add(TblStudentWallet(reg_prg_id=1, reg_no="S1", reference_number="REF_S1", dept=100.0, bank_id=5))
+        session.add(TblStudentWalletHistory(
+            reg_no="S1", transaction_type="TOPUP", amount=10.0, balance_before=0.0,
+            balance_after=10.0, external_transaction_id="OLD",
+        ))
+        session.commit()
+        session.close()
+        self.statements.clear()
+
+    def tearDown(self):
+        self.patcher.stop()
+        self.engine.dispose()
+
+    def _payload(self):
+        return [
+            {"transaction_reference": "T1", "cloud_transactions": [
+                {"paid_amount": 50.0, "payer_code": "S1", "slip_no": "FT1"}]},
+            {"transaction_reference": "OLD", "cloud_transactions": [
+                {"paid_amount": 10.0, "payer_code": "S1", "slip_no": "FT0"}]},
+            {"transaction_reference": "T2", "cloud_transactions": [
+                {"paid_amount": 20.0, "payer_code": "S2", "slip_no": None}]},
+            {"transaction_reference": "T3", "cloud_transactions": [
+                {"paid_amount": 5.0, "payer_code": "S2", "slip_no": "FT3"}]},
+            {"transaction_reference": "T4", "cloud_transactions": [
+                {"paid_amount": 5.0, "payer_code": "NOBODY", "slip_no": "FT4"}]},
+            {"transaction_reference": "T5", "cloud_transactions": []},
+        ]
+
+    def test_statuses_match_per_record_sync(self):
+        """Test duplicates, unknown payers and successes are reported per transaction"""
+        results = AbsentWalletPaymentImporter(logger=Mock()).import_records(self._payload())
+
+        self.assertEqual(
+            [(r.get("transaction_reference"), r["status"]) for r in results],
+            [("T1", "SUCCESS"), ("OLD", "DUPLICATE"), ("T2", "SUCCESS"),
+             ("T3", "SUCCESS"), (None, "FAILED")],
+        )
+
+    def test_balances_chain_within_payload(self):
+        """Test wallets, history and ledger reflect every payment of the batch"""
+        AbsentWalletPaymentImporter(logger=Mock()).import_records(self._payload())
+        session = self.Session()
+
+        wallets = {w.reg_no: w for w in session.query(TblStudentWallet)}
+        self.assertEqual(wallets["S1"].dept, 150.0)
+        self.assertEqual(wallets["S2"].dept, 25.0)
+
+        t3 = session.query(TblStudentWalletHistory).filter_by(external_transaction_id="T3").one()
+        self.assertEqual((t3.balance_before, t3.balance_after), (20.0, 25.0))
+        self.assertEqual(t3.wallet_id, wallets["S2"].id)
+
+        self.assertEqual(session.query(TblStudentWalletLedger).count(), 3)
+        self.assertEqual(session.get(TblStudentWalletBalance, "S2").balance, Decimal("25.00"))
+        self.assertEqual(session.query(IntegrationLog).filter_by(transaction_key="T2").count(), 1)
+        session.close()
+
+    def test_round_trips_do_not_grow_per_transaction(self):
+        """Test lookups and inserts are batched rather than issued per transaction"""
+        AbsentWalletPaymentImporter(logger=Mock()).import_records(self._payload())
+
+        inserts = [s for s in self.statements if s.lstrip().upper().startswith("INSERT INTO TBL_STUDENT_WALLET_HISTORY")]
+        selects = [s for s in self.statements if s.lstrip().upper().startswith("SELECT")]
+        self.assertEqual(len(inserts), 1)
+        self.assertLessEqual(len(selects), 6)
+
+    def test_wallets_are_locked_for_the_import(self):
+        """Test wallet rows are read FOR UPDATE so concurrent top-ups wait for the commit"""
+        from sqlalchemy.dialects import mysql
+        from application.services import wallet_import
+
+        queries = []
+        original = wallet_import.select_in
+
+        def recording_select_in(session, stmt, column, values, **kwargs):
+            queries.append(stmt)
+            return original(session, stmt, column, values, **kwargs)
+
+        with patch.object(wallet_import, "select_in", side_effect=recording_select_in):
+            AbsentWalletPaymentImporter(logger=Mock()).import_records(self._payload())
+
+        wallet_query = next(q for q in queries if q.column_descriptions[0]["entity"] is TblStudentWallet)
+        self.assertIn("FOR UPDATE", str(wallet_query.statement.compile(dialect=mysql.dialect())))
+
+
+if __name__ == '__main__':
+    unittest.main()
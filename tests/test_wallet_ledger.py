@@ -0,0 +1,100 @@
+"""
+Tests for wallet ledger FIFO credit allocation
+"""
+
+import unittest
+from decimal import Decimal
+from datetime import datetime
+import sys
+import os
+
+# Add the project root to the Python path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from application import db
+from application.models.mis_models import TblStudentWalletLedger
+
+
+class TestWalletCreditAllocation(unittest.TestCase):
+    """Test cases for TblStudentWalletLedger credit allocation"""
+
+    def setUp(self):
+        self.engine = create_engine("sqlite://")
+        self.statements = []
+
+        @event.listens_for(self.engine, "before_cursor_execute")
+        def record(conn, cursor, statement, parameters, context, executemany):
+            self.statements.append(statement)
+
+        db.metadata.create_all(self.engine, tables=[TblStudentWalletLedger.__table__])
+        self.session = sessionmaker(bind=self.engine)()
+
+        rows = [
+            # three top-ups, the first partially consumed, the second fully consumed
+            dict(id=1, student_id="S1", direction="credit", original_amount=100, amount=100,
+                 source="sales_receipt", created_at=datetime(2025, 1, 1)),
+            dict(id=2, student_id="S1", direction="credit", original_amount=50, amount=50,
+                 source="sales_receipt", created_at=datetime(2025, 1, 2)),
+            dict(id=3, student_id="S1", direction="credit", original_amount=70, amount=70,
+                 source="sales_receipt", created_at=datetime(2025, 1, 3)),
+            dict(id=4, student_id="S1", direction="debit", original_amount=-30, amount=-30,
+                 source="invoice", parent_credit_id=1, created_at=datetime(2025, 1, 4)),
+            dict(id=5, student_id="S1", direction="debit", original_amount=-50, amount=-50,
+                 source="invoice", parent_credit_id=2, created_at=datetime(2025, 1, 4)),
+            dict(id=6, student_id="S2", direction="credit", original_amount=10, amount=10,
+                 source="sales_receipt", created_at=datetime(2025, 1, 1)),
+        ]
+        for row in rows:
+            row.setdefault("parent_credit_id", None)
+        self.session.execute(TblStudentWalletLedger.__table__.insert(), rows)
+        self.session.commit()
+        self.statements.clear()
+
+    def tearDown(self):
+        self.session.close()
+        self.engine.dispose()
+
+    def test_available_credits_fifo_remaining(self):
+        """Test remaining amounts are derived per credit in FIFO order"""
+        credits = TblStudentWalletLedger._get_available_credits("S1", self.session)
+
+        self.assertEqual([(c.id, r) for c, r in credits], [(1, Decimal("70")), (3, Decimal("70"))])
+
+    def test_available_credits_query_count_is_constant(self):
+        """Test consumption is aggregated instead of queried per credit"""
+        TblStudentWalletLedger._get_available_credits("S1", self.session)
+        selects = [s for s in self.statements if s.lstrip().upper().startswith("SELECT")]
+        self.assertEqual(len(selects), 2)
+
+    def test_available_credits_none_for_unknown_student(self):
+        """Test a student without credits returns None"""
+        self.assertIsNone(TblStudentWalletLedger._get_available_credits("NOPE", self.session))
+
+    def test_allocate_fifo_partial(self):
+        """Test allocation spans credits and stops when the amount is covered"""
+        credits = TblStudentWalletLedger._get_available_credits("S1", self.session)
+        allocations, unallocated = TblStudentWalletLedger.allocate_fifo(credits, Decimal("100"))
+
+        self.assertEqual([(c.id, a) for c, a in allocations], [(1, Decimal("70")), (3, Decimal("30"))])
+        self.assertEqual(unallocated, Decimal("0"))
+
+    def test_allocate_fifo_insufficient_funds(self):
+        """Test the shortfall is returned when credits run out"""
+        credits = TblStudentWalletLedger._get_available_credits("S1", self.session)
+        allocations, unallocated = TblStudentWalletLedger.allocate_fifo(credits, Decimal("200"))
+
+        self.assertEqual(sum(a for _, a in allocations), Decimal("140"))
+        self.assertEqual(unallocated, Decimal("60"))
+
+    def test_allocate_fifo_no_credits(self):
+        """Test allocating against no credits leaves everything unallocated"""
+        allocations, unallocated = TblStudentWalletLedger.allocate_fifo(None, Decimal("5"))
+        self.assertEqual(allocations, [])
+        self.assertEqual(unallocated, Decimal("5"))
+
+
+if __name__ == '__main__':
+    unittest.main()
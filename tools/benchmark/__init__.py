@@ -0,0 +1,16 @@
+"""
+Reproducible benchmark harness
+
+* ``fake_quickbooks``: local QuickBooks API with configurable latency, rate
+  limits and injected 401/429 responses;
+* ``seed``: realistic MIS volumes in a scratch SQLite or MySQL database;
+* ``environment``: the Flask app wired to both;
+* ``benchmarks`` / ``run``: invoice, payment, sales receipt and customer
+  sync, the Urubuto callback and reconciliation, reported as throughput and
+  latency percentiles with JSON output for regression comparison;
+* ``loadtest``: replays the Urubuto payment exports against the webhook
+  endpoints and checks the wallets for idempotency violations.
+
+Run ``python tools/benchmark/run.py --help`` or
+``python tools/benchmark/loadtest.py --help``.
+"""
@@ -0,0 +1,256 @@
+"""
+Sync, callback and reconciliation benchmarks
+
+Each benchmark runs one real code path ``ops`` times against the seeded
+database and the fake QuickBooks server and returns a ``BenchmarkResult``:
+throughput, latency percentiles, errors, and the database queries and
+QuickBooks calls per operation read from the instrumentation scopes.
+"""
+
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from application import db
+from application.utils import instrumentation
+
+from tools.benchmark.seed import PAYMENT_PERIOD_START, reg_no
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of ``values`` (0 when empty)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    ops: int = 0
+    errors: int = 0
+    seconds: float = 0.0
+    latencies: list = field(default_factory=list)
+    db_queries: int = 0
+    qb_calls: int = 0
+    items: int = None  # records handled, when an op covers several (batches)
+    error_samples: list = field(default_factory=list)
+
+    def add(self, seconds, ok, scope=None, error=None):
+        self.ops += 1
+        self.seconds += seconds
+        self.latencies.append(seconds)
+        if not ok:
+            self.errors += 1
+            if error and len(self.error_samples) < 5:
+                self.error_samples.append(str(error)[:200])
+        if scope is not None:
+            self.db_queries += scope.db_queries
+            self.qb_calls += scope.qb_calls
+
+    def as_dict(self):
+        ms = [latency * 1000 for latency in self.latencies]
+        return {
+            "ops": self.ops,
+            "errors": self.errors,
+            "error_rate": round(self.errors / self.ops, 4) if self.ops else 0.0,
+            "seconds": round(self.seconds, 3),
+            "throughput_per_s": round(self.ops / self.seconds, 2) if self.seconds else 0.0,
+            "items": self.ops if self.items is None else self.items,
+            "items_per_s": round((self.ops if self.items is None else self.items) / self.seconds, 2)
+            if self.seconds else 0.0,
+            "p50_ms": round(percentile(ms, 50), 2),
+            "p95_ms": round(percentile(ms, 95), 2),
+            "p99_ms": round(percentile(ms, 99), 2),
+            "max_ms": round(max(ms), 2) if ms else 0.0,
+            "db_queries_per_op": round(self.db_queries / self.ops, 2) if self.ops else 0.0,
+            "qb_calls_per_op": round(self.qb_calls / self.ops, 2) if self.ops else 0.0,
+            "error_samples": self.error_samples,
+        }
+
+
+class _LastScope:
+    """Keeps the most recently finished scope (request scopes end inside the test client)"""
+
+    def __init__(self):
+        self.scope = None
+        instrumentation.on_scope_end(self)
+
+    def __call__(self, scope):
+        self.scope = scope
+
+
+_last_scope = _LastScope()
+
+
+def _outcome(outcome):
+    """(ok, error) from a sync result object or dict"""
+    if isinstance(outcome, dict):
+        ok = outcome.get("success", True)
+        return bool(ok), None if ok else outcome.get("error_message") or outcome.get("message")
+    ok = getattr(outcome, "success", True)
+    return bool(ok), None if ok else getattr(outcome, "error_message", None)
+
+
+def _timed(result, func, *args):
+    """Run ``func`` in its own scope and add it to ``result``"""
+    token = instrumentation.start_scope("benchmark", result.name)
+    started = time.perf_counter()
+    try:
+        ok, error = _outcome(func(*args))
+    except Exception as e:
+        db.session.rollback()
+        ok, error = False, e
+    elapsed = time.perf_counter() - started
+    result.add(elapsed, ok, instrumentation.end_scope(token), error)
+    return result
+
+
+# ---------------------------------------------------------------------------
+# QuickBooks syncs
+# ---------------------------------------------------------------------------
+
+def _synced_students():
+    from application.models.mis_models import TblPersonalUg
+    return db.session.query(TblPersonalUg.reg_no).filter(TblPersonalUg.qk_id.isnot(None))
+
+
+def bench_invoice_sync(ops):
+    """``InvoiceSyncService.sync_single_invoice`` for invoices of synced students with wallet credits"""
+    from application.models.mis_models import TblImvoice, TblStudentWalletLedger
+    from application.services.invoice_sync import InvoiceSyncService
+
+    invoices = (db.session.query(TblImvoice)
+                .filter(TblImvoice.quickbooks_id.is_(None),
+                        TblImvoice.reg_no.in_(_synced_students()),
+                        TblImvoice.reg_no.in_(db.session.query(TblStudentWalletLedger.student_id)))
+                .order_by(TblImvoice.id).limit(ops).all())
+    service = InvoiceSyncService()
+    result = BenchmarkResult("invoice_sync")
+    for invoice in invoices:
+        _timed(result, service.sync_single_invoice, invoice)
+    return result
+
+
+def bench_payment_sync(ops):
+    """``PaymentSyncService.sync_single_payment`` for payments of synced students"""
+    from application.models.mis_models import Payment
+    from application.services.payment_sync import PaymentSyncService
+
+    payments = (db.session.query(Payment)
+                .filter(Payment.qk_id.is_(None), Payment.reg_no.in_(_synced_students()))
+                .order_by(Payment.id).limit(ops).all())
+    service = PaymentSyncService()
+    result = BenchmarkResult("payment_sync")
+    for payment in payments:
+        _timed(result, service.sync_single_payment, payment)
+    return result
+
+
+def bench_sales_receipt_sync(ops):
+    """``SalesReceiptSyncService.sync_single_sales_receipt`` for wallet ledger credits"""
+    from application.models.mis_models import TblStudentWalletLedger
+    from application.services.sales_receipt_sync import SalesReceiptSyncService
+
+    receipts = (db.session.query(TblStudentWalletLedger)
+                .filter(TblStudentWalletLedger.student_id.in_(_synced_students()))
+                .order_by(TblStudentWalletLedger.id).limit(ops).all())
+    service = SalesReceiptSyncService()
+    result = BenchmarkResult("sales_receipt_sync")
+    for receipt in receipts:
+        _timed(result, service.sync_single_sales_receipt, receipt)
+    return result
+
+
+def bench_customer_sync(batch_size=20):
+    """
+    ``sync_all_unsynchronized_students_in_batches`` over every unsynced
+    student; one op per batch, timed between successive batch fetches.
+    """
+    from application.services.customer_sync import CustomerSyncService
+
+    service = CustomerSyncService()
+    result = BenchmarkResult("customer_sync")
+    fetch = service.get_unsynchronized_students
+    marks = []
+
+    def timed_fetch(*args, **kwargs):
+        marks.append(time.perf_counter())
+        return fetch(*args, **kwargs)
+
+    service.get_unsynchronized_students = timed_fetch
+    token = instrumentation.start_scope("benchmark", result.name)
+    try:
+        summary = service.sync_all_unsynchronized_students_in_batches(batch_size=batch_size)
+    except Exception as e:
+        db.session.rollback()
+        summary = {"total_failed": 1}
+        result.error_samples.append(str(e)[:200])
+    marks.append(time.perf_counter())
+    scope = instrumentation.end_scope(token)
+
+    # The last fetch returns no students, so it closes the final batch
+    for started, finished in zip(marks, marks[1:-1]):
+        result.add(finished - started, True)
+    result.items = int(summary.get("total_processed", 0) or 0)
+    result.errors = int(summary.get("total_failed", 0) or 0)
+    result.db_queries, result.qb_calls = scope.db_queries, scope.qb_calls
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Urubuto callback and reconciliation
+# ---------------------------------------------------------------------------
+
+def callback_payload(transaction_id, payer_code, amount, paid_at, status="VALID"):
+    return {
+        "transaction_id": transaction_id,
+        "transaction_status": status,
+        "amount": amount,
+        "payer_code": payer_code,
+        "payment_channel_name": "MOMO",
+        "slip_number": f"S{transaction_id}",
+        "payment_date_time": paid_at.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def bench_urubuto_callback(app, token, ops, students, duplicate_ratio=0.1, seed=7):
+    """
+    POST ``/api/v1/urubuto/callback`` for random students, re-delivering a
+    share of earlier transactions to exercise the idempotent path.
+    """
+    rng = random.Random(seed)
+    client = app.test_client()
+    headers = {"Authorization": token}
+    result = BenchmarkResult("urubuto_callback")
+    delivered = []
+    for index in range(ops):
+        if delivered and rng.random() < duplicate_ratio:
+            payload = rng.choice(delivered)
+        else:
+            payload = callback_payload(f"BENCH{seed}{index:08d}", reg_no(rng.randint(1, students)),
+                                       float(rng.choice([5000, 20000, 75000])),
+                                       PAYMENT_PERIOD_START + timedelta(days=30, seconds=index))
+            delivered.append(payload)
+        _last_scope.scope = None
+        started = time.perf_counter()
+        response = client.post("/api/v1/urubuto/callback", json=payload, headers=headers)
+        elapsed = time.perf_counter() - started
+        result.add(elapsed, response.status_code == 200, _last_scope.scope,
+                   None if response.status_code == 200 else f"HTTP {response.status_code}: {response.get_data(as_text=True)}")
+    return result
+
+
+def bench_reconciliation(runs=1):
+    """``IntegrationWalletReconciler.run`` (the first run examines every seeded log)"""
+    from flask import current_app
+    from application.services.reconciliation_engine import IntegrationWalletReconciler
+
+    result = BenchmarkResult("reconciliation")
+    for _ in range(runs):
+        reconciler = IntegrationWalletReconciler(session=db.session, logger=current_app.logger)
+        _timed(result, reconciler.run)
+    return result
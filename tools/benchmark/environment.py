@@ -0,0 +1,142 @@
+"""
+Flask app wired to a seeded database and the fake QuickBooks server
+
+``benchmark_app`` builds the application the way ``create_app`` does, minus
+Celery and MySQL: the MIS and central models share ``database_url``,
+QuickBooks calls go to the fake server and requests are instrumented, so
+benchmarks can read query and API call counts from their scopes.
+"""
+
+import os
+
+from flask import Flask
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import SingletonThreadPool
+
+from application import db
+from application.config_files.config import TestingConfig
+from application.helpers.quickbooks_helpers import QuickBooksHelper
+
+BENCH_CLIENT_USERNAME = "bench_gateway"
+BENCH_CLIENT_PASSWORD = "bench-password"
+
+# Seeded income category used for wallet top-ups (sales receipts)
+PREPAYMENT_CATEGORY_ID = "128"
+
+# SQLite allows one writer per file, and the callback writes through nested
+# MIS sessions and ``db.session`` at once; on MySQL those are separate
+# connections that do not conflict. Every session of a thread therefore
+# shares that thread's connection (never reset on check-in), and other
+# threads wait for the write lock instead of failing.
+SQLITE_ENGINE_OPTIONS = {
+    "poolclass": SingletonThreadPool,
+    "pool_size": 1024,  # over the request threads; it closes arbitrary connections past this
+    "pool_reset_on_return": None,
+    "connect_args": {"check_same_thread": False, "timeout": 30},
+}
+
+
+def benchmark_app(database_url, quickbooks=None):
+    """
+    Args:
+        database_url (str): Seeded database (``seed_database``)
+        quickbooks (FakeQuickBooksServer): Running fake QuickBooks, if any
+    """
+    if quickbooks is not None:
+        os.environ["QUICK_BOOKS_BASEURL_SANDBOX"] = quickbooks.api_base_url
+        os.environ["QUICK_BOOKS_TOKEN_URL"] = quickbooks.token_url
+    os.environ.setdefault("PREPAYMENT_ID", PREPAYMENT_CATEGORY_ID)
+
+    from application import register_blueprints
+    from application.utils.database import db_manager
+    from application.utils.instrumentation import init_instrumentation
+
+    app = Flask("application")
+    app.config.from_object(TestingConfig)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=database_url,
+        SQLALCHEMY_RECORD_QUERIES=False,
+        SESSION_TYPE="null",
+        QUICKBOOKS_BASE_URL=os.getenv("QUICK_BOOKS_BASEURL_SANDBOX"),
+    )
+    sqlite = make_url(database_url).get_backend_name() == "sqlite"
+    if sqlite:
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = SQLITE_ENGINE_OPTIONS
+    db.init_app(app)
+
+    db_manager.engines.pop("mis", None)
+    db_manager.session_factories.pop("mis", None)
+    with app.app_context():
+        if sqlite:
+            # The MIS and central models share the engine (and so the connection)
+            db_manager._add_connection_listeners(db.engine)
+            db_manager.engines["mis"] = db.engine
+            db_manager.session_factories["mis"] = sessionmaker(bind=db.engine, expire_on_commit=False)
+        else:
+            db_manager.setup_mis_connection(app.config)
+    app.config["db_manager"] = db_manager
+
+    register_blueprints(app)
+    init_instrumentation(app)
+    return app
+
+
+def connect_quickbooks(app, quickbooks):
+    """Store an active QuickBooks connection for the fake realm"""
+    from application.models.central_models import QuickBooksConfig
+
+    with app.app_context():
+        QuickBooksConfig.query.delete()
+        db.session.add(QuickBooksConfig(
+            access_token=QuickBooksHelper.encrypt("bench-access"),
+            refresh_token=QuickBooksHelper.encrypt("bench-refresh"),
+            realm_id=quickbooks.realm_id,
+            is_active=True,
+        ))
+        db.session.commit()
+
+
+def create_gateway_client(app, username=BENCH_CLIENT_USERNAME, password=BENCH_CLIENT_PASSWORD):
+    """
+    API client allowed to call the Urubuto endpoints.
+
+    Returns:
+        str: ``Bearer`` token for the client
+    """
+    from application.models.central_models import ApiClient
+
+    with app.app_context():
+        client = ApiClient.query.filter_by(username=username).first()
+        if client is None:
+            client = ApiClient(
+                client_name="Benchmark gateway", username=username, client_type="payment_gateway",
+                gateway_name="urubuto_pay", permissions=["validation", "notifications", "payments"],
+                is_active=True, login_count=0,
+            )
+            client.set_password(password)
+            db.session.add(client)
+            db.session.commit()
+        return client.generate_jwt_token()
+
+
+def preload_quickbooks(app, quickbooks):
+    """
+    Load the QuickBooks entities the seeded rows already point at (bank
+    accounts, items, departments and synced customers) into the fake store,
+    so syncs find them the way they would in a connected company.
+    """
+    from application.models.mis_models import TblBank, TblCampus, TblIncomeCategory, TblPersonalUg
+    from application.utils.database import db_manager
+
+    store = quickbooks.store
+    with app.app_context(), db_manager.get_mis_session() as session:
+        for bank in session.query(TblBank).filter(TblBank.qk_id.isnot(None)):
+            store.put("Account", {"Id": bank.qk_id, "Name": bank.bank_name, "AccountType": "Bank", "Active": True})
+        for category in session.query(TblIncomeCategory).filter(TblIncomeCategory.QuickBk_ctgId.isnot(None)):
+            store.put("Item", {"Id": category.QuickBk_ctgId, "Name": category.name, "Type": "Service"})
+        for campus in session.query(TblCampus).filter(TblCampus.quickbooks_id.isnot(None)):
+            store.put("Department", {"Id": campus.quickbooks_id, "Name": campus.camp_full_name})
+        for student in session.query(TblPersonalUg).filter(TblPersonalUg.qk_id.isnot(None)):
+            store.put("Customer", {"Id": student.qk_id, "DisplayName": student.reg_no,
+                                   "GivenName": student.fname, "FamilyName": student.lname})
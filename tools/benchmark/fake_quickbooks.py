@@ -0,0 +1,338 @@
+"""
+Local stand-in for the QuickBooks Online API used by the benchmarks
+
+Serves the endpoints ``QuickBooks.make_request`` uses under
+``/v3/company/<realm>/``: entity create/update/delete/read, ``query``,
+``batch``, ``companyinfo`` and ``preferences``, plus the OAuth token
+endpoint. Entities are kept in memory with QuickBooks semantics that the
+sync code depends on: increasing SyncTokens (stale token -> 5010),
+unique customer DisplayNames (-> 6240) and sparse updates.
+
+Behaviour is configurable per run:
+
+* ``latency_ms`` / ``jitter_ms`` per request and ``batch_item_ms`` per batch item;
+* ``rate_limit_per_minute`` and ``max_concurrent`` (QuickBooks allows 500
+  requests a minute and 10 concurrent per realm) answered with 429;
+* ``error_401_rate`` and ``error_429_rate`` to inject token expiry and
+  throttling at random (seeded, so runs are reproducible).
+"""
+
+import json
+import random
+import re
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# URL resource -> entity name in payloads
+ENTITIES = {
+    "customer": "Customer", "invoice": "Invoice", "payment": "Payment", "salesreceipt": "SalesReceipt",
+    "refundreceipt": "RefundReceipt", "journalentry": "JournalEntry", "item": "Item", "account": "Account",
+    "department": "Department", "class": "Class", "vendor": "Vendor", "deposit": "Deposit",
+    "creditmemo": "CreditMemo", "customertype": "CustomerType",
+}
+
+FAULT_401 = {
+    "fault": {"error": [{"message": "message=AuthenticationFailed; errorCode=003200; statusCode=401",
+                         "detail": "Token expired", "code": "3200"}], "type": "AUTHENTICATION"},
+}
+FAULT_429 = {
+    "Fault": {"Error": [{"Message": "message=ThrottleExceeded; errorCode=003001; statusCode=429",
+                         "Detail": "The request limit was reached.", "code": "3001"}], "type": "SERVICE"},
+}
+
+_QUERY_FROM = re.compile(r"\bfrom\s+(\w+)", re.IGNORECASE)
+_QUERY_IN = re.compile(r"\b(\w+)\s+in\s*\(([^)]*)\)", re.IGNORECASE)
+_QUERY_EQ = re.compile(r"\b(\w+)\s*=\s*'((?:[^']|\\')*)'", re.IGNORECASE)
+_QUERY_START = re.compile(r"\bstartposition\s+(\d+)", re.IGNORECASE)
+_QUERY_MAX = re.compile(r"\bmaxresults\s+(\d+)", re.IGNORECASE)
+
+
+def _fault(code, message, detail=""):
+    return {"Fault": {"Error": [{"Message": message, "Detail": detail or message, "code": code}],
+                      "type": "ValidationFault"}}
+
+
+class QuickBooksStore:
+    """In-memory entities with SyncToken and DisplayName rules"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._next_id = 1000000  # above the ids the seeder maps rows to
+        self.entities = {}
+        self.customer_names = {}
+
+    def _new_id(self):
+        self._next_id += 1
+        return str(self._next_id)
+
+    def put(self, entity, record):
+        """Load an existing entity (keeps its Id)"""
+        with self._lock:
+            record = dict(record, Id=str(record["Id"]), SyncToken=str(record.get("SyncToken", "0")))
+            self.entities.setdefault(entity, {})[record["Id"]] = record
+            if entity == "Customer" and record.get("DisplayName"):
+                self.customer_names[" ".join(str(record["DisplayName"]).split()).lower()] = record["Id"]
+
+    def create(self, entity, body):
+        with self._lock:
+            if entity == "Customer":
+                name = " ".join(str(body.get("DisplayName", "")).split()).lower()
+                if name in self.customer_names:
+                    return 400, _fault("6240", "Duplicate Name Exists Error",
+                                       f"The name supplied already exists. : Id={self.customer_names[name]}")
+            record = dict(body, Id=self._new_id(), SyncToken="0",
+                          MetaData={"CreateTime": time.strftime("%Y-%m-%dT%H:%M:%S")})
+            if entity == "Customer" and name:
+                self.customer_names[name] = record["Id"]
+            self.entities.setdefault(entity, {})[record["Id"]] = record
+            return 200, {entity: record}
+
+    def update(self, entity, body):
+        with self._lock:
+            record = self.entities.get(entity, {}).get(str(body.get("Id")))
+            if record is None:
+                return 400, _fault("610", "Object Not Found", f"{entity} {body.get('Id')} not found")
+            if str(body.get("SyncToken")) != record["SyncToken"]:
+                return 400, _fault("5010", "Stale Object Error",
+                                   f"You and someone else are both making changes. SyncToken is {record['SyncToken']}")
+            updated = dict(record, **body) if body.get("sparse") else dict(body, MetaData=record.get("MetaData"))
+            updated["SyncToken"] = str(int(record["SyncToken"]) + 1)
+            self.entities[entity][updated["Id"]] = updated
+            return 200, {entity: updated}
+
+    def delete(self, entity, body):
+        with self._lock:
+            record = self.entities.get(entity, {}).pop(str(body.get("Id")), None)
+            if record is None:
+                return 400, _fault("610", "Object Not Found", f"{entity} {body.get('Id')} not found")
+            return 200, {entity: {"Id": record["Id"], "status": "Deleted"}}
+
+    def read(self, entity, entity_id):
+        with self._lock:
+            record = self.entities.get(entity, {}).get(str(entity_id))
+        if record is None:
+            return 400, _fault("610", "Object Not Found", f"{entity} {entity_id} not found")
+        return 200, {entity: record}
+
+    def query(self, statement):
+        """The subset of the query language the sync code sends"""
+        match = _QUERY_FROM.search(statement)
+        if not match:
+            return 400, _fault("4000", "Error parsing query", statement)
+        entity = next((name for name in ENTITIES.values() if name.lower() == match.group(1).lower()),
+                      match.group(1))
+        with self._lock:
+            records = list(self.entities.get(entity, {}).values())
+
+        for field, values in _QUERY_IN.findall(statement):
+            if field.lower() == "active":
+                continue
+            wanted = {value.strip().strip("'") for value in values.split(",")}
+            records = [r for r in records if str(r.get(field)) in wanted]
+        for field, value in _QUERY_EQ.findall(statement):
+            records = [r for r in records if str(r.get(field)) == value.replace("\\'", "'")]
+
+        if re.search(r"select\s+count\(\*\)", statement, re.IGNORECASE):
+            return 200, {"QueryResponse": {"totalCount": len(records)}}
+        start = int((_QUERY_START.search(statement) or [None, 1])[1])
+        limit = int((_QUERY_MAX.search(statement) or [None, 100])[1])
+        page = records[start - 1:start - 1 + limit]
+        return 200, {"QueryResponse": {entity: page, "startPosition": start, "maxResults": len(page)} if page else {}}
+
+
+class FakeQuickBooksServer:
+    """
+    Threaded HTTP server emulating QuickBooks for one realm.
+
+    Usage::
+
+        with FakeQuickBooksServer(latency_ms=80, rate_limit_per_minute=500) as qb:
+            os.environ["QUICK_BOOKS_BASEURL_SANDBOX"] = qb.api_base_url
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, realm_id="9130350000000001", latency_ms=0, jitter_ms=0,
+                 batch_item_ms=0, rate_limit_per_minute=None, max_concurrent=None, error_401_rate=0.0,
+                 error_429_rate=0.0, seed=1):
+        self.realm_id = realm_id
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.batch_item_ms = batch_item_ms
+        self.rate_limit_per_minute = rate_limit_per_minute
+        self.max_concurrent = max_concurrent
+        self.error_401_rate = error_401_rate
+        self.error_429_rate = error_429_rate
+        self.store = QuickBooksStore()
+        self.stats = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._window = deque()
+        self._active = 0
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def api_base_url(self):
+        """Value for ``QUICK_BOOKS_BASEURL_SANDBOX``"""
+        return f"{self.url}/v3/company"
+
+    @property
+    def token_url(self):
+        """Value for ``QUICK_BOOKS_TOKEN_URL``"""
+        return f"{self.url}/oauth2/v1/tokens/bearer"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-quickbooks", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # -- request admission -------------------------------------------------
+
+    def _admit(self):
+        """Delay (ms) to serve the request after, or the injected (status, body)"""
+        with self._lock:
+            now = time.monotonic()
+            while self._window and now - self._window[0] > 60:
+                self._window.popleft()
+            if self.rate_limit_per_minute and len(self._window) >= self.rate_limit_per_minute:
+                return 429, FAULT_429
+            if self.max_concurrent and self._active >= self.max_concurrent:
+                return 429, FAULT_429
+            roll = self._random.random()
+            if roll < self.error_401_rate:
+                return 401, FAULT_401
+            if roll < self.error_401_rate + self.error_429_rate:
+                return 429, FAULT_429
+            self._window.append(now)
+            self._active += 1
+            delay = self.latency_ms + (self._random.uniform(0, self.jitter_ms) if self.jitter_ms else 0)
+        return delay
+
+    def _count(self, key, amount=1):
+        with self._lock:
+            self.stats[key] += amount
+
+    def _release(self):
+        with self._lock:
+            self._active -= 1
+
+    # -- API ----------------------------------------------------------------
+
+    def dispatch(self, method, path, query, body):
+        """Answer one API call; returns (status, payload)"""
+        if path.rstrip("/").endswith("/oauth2/v1/tokens/bearer"):
+            self._count("token_refresh")
+            return 200, {"access_token": f"access-{time.time_ns()}", "refresh_token": "bench-refresh",
+                         "expires_in": 3600, "x_refresh_token_expires_in": 8726400, "token_type": "bearer"}
+
+        parts = path.strip("/").split("/")
+        if len(parts) < 4 or parts[:2] != ["v3", "company"]:
+            return 404, _fault("404", "Not found", path)
+        resource, rest = parts[3].lower(), parts[4:]
+
+        if resource == "batch":
+            items = (body or {}).get("BatchItemRequest", [])
+            self._count("batch_items", len(items))
+            if self.batch_item_ms:
+                time.sleep(self.batch_item_ms * len(items) / 1000.0)
+            return 200, {"BatchItemResponse": [self._batch_item(item) for item in items]}
+        if resource == "query":
+            statement = (query.get("query") or [""])[0] or (body or {}).get("query", "")
+            return self.store.query(statement)
+        if resource == "companyinfo":
+            return 200, {"CompanyInfo": {"Id": self.realm_id, "CompanyName": "Benchmark University"}}
+        if resource == "preferences":
+            return 200, {"Preferences": {"AccountingInfoPrefs": {}, "SalesFormsPrefs": {}}}
+
+        entity = ENTITIES.get(resource, resource[:1].upper() + resource[1:])
+        if method == "GET" and rest:
+            return self.store.read(entity, rest[0])
+        operation = (query.get("operation") or [""])[0].lower()
+        if operation == "delete":
+            return self.store.delete(entity, body or {})
+        if operation == "update" or (body or {}).get("Id"):
+            return self.store.update(entity, body or {})
+        return self.store.create(entity, body or {})
+
+    def _batch_item(self, item):
+        response = {"bId": item.get("bId")}
+        if "Query" in item:
+            status, payload = self.store.query(item["Query"])
+        else:
+            entity = next((key for key in item if key not in ("bId", "operation", "optionsData")), None)
+            operation = item.get("operation", "create")
+            if operation == "delete":
+                status, payload = self.store.delete(entity, item[entity])
+            elif operation == "update":
+                status, payload = self.store.update(entity, item[entity])
+            else:
+                status, payload = self.store.create(entity, item[entity])
+        response.update(payload)
+        return response
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _serve(self, method):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                admitted = server._admit()
+                if isinstance(admitted, tuple):
+                    status, payload = admitted
+                else:
+                    try:
+                        if admitted:
+                            time.sleep(admitted / 1000.0)
+                        url = urlparse(self.path)
+                        try:
+                            body = json.loads(raw) if raw and b"{" in raw[:1] else None
+                        except ValueError:
+                            body = None
+                        if body is None and raw:
+                            body = {key: values[0] for key, values in parse_qs(raw.decode()).items()}
+                        status, payload = server.dispatch(method, url.path, parse_qs(url.query), body)
+                    finally:
+                        server._release()
+                server._count(f"http_{status}")
+                server._count("requests")
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._serve("GET")
+
+            def do_POST(self):
+                self._serve("POST")
+
+            def do_PUT(self):
+                self._serve("PUT")
+
+        return Handler
@@ -0,0 +1,485 @@
+#!/usr/bin/env python3
+"""
+Load test for the Urubuto webhook endpoints
+
+Replays the transactions exported in ``application/files/payments_*.csv``
+against ``/api/v1/urubuto/authentication``, ``/validation`` and
+``/callback`` the way the gateway delivers them at a month-start peak:
+
+* every transaction is validated, then its callback delivered;
+* a share of callbacks is re-delivered later (``--duplicate-ratio``) and a
+  share twice at the same instant (``--concurrent-duplicate-ratio``);
+* all callbacks of a payer with several transactions are sent at once for
+  ``--same-payer-ratio`` of such payers;
+* each virtual gateway re-authenticates every ``--auth-every`` transactions.
+
+By default the app is served locally (threaded werkzeug server) on a fake
+MIS database seeded with the replayed payers. ``--target`` points the run
+at an app that is already running instead; pass its database with ``--db``
+to keep the idempotency checks.
+
+After the run the database is checked for idempotency violations: more than
+one wallet history row, ledger credit or wallet per transaction/payer, wallet
+balances that do not equal the opening balance plus the unique accepted
+top-ups (lost updates), and accepted transactions with no history row.
+
+    python tools/benchmark/loadtest.py --concurrency 32 --output load.json
+"""
+
+import argparse
+import asyncio
+import csv
+import glob
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlalchemy import create_engine, func, select  # noqa: E402
+
+from tools.benchmark.benchmarks import BenchmarkResult  # noqa: E402
+from tools.benchmark.environment import (  # noqa: E402
+    BENCH_CLIENT_PASSWORD, BENCH_CLIENT_USERNAME, benchmark_app, create_gateway_client,
+)
+from tools.benchmark.seed import Volumes, seed_database, seed_payers  # noqa: E402
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_EXPORTS = os.path.join(PROJECT_ROOT, "application", "files", "payments_*.csv")
+URUBUTO_PREFIX = "/api/v1/urubuto"
+MERCHANT_CODE = "TH39998340"
+
+# Export "Txn Status" -> callback ``transaction_status``
+STATUSES = {"SUCCESSFUL": "VALID", "PENDING_SETTLEMENT": "PENDING_SETTLEMENT", "PENDING": "PENDING",
+            "FAILED": "FAILED"}
+
+# Statuses the callback credits to the wallet, and the payment time it starts at
+CREDITED = ("VALID", "PENDING_SETTLEMENT")
+CALLBACK_CUTOFF = "2026-01-13 00:00:00"
+
+
+# ---------------------------------------------------------------------------
+# Transactions
+# ---------------------------------------------------------------------------
+
+def _amount(value):
+    try:
+        return float(str(value).replace(",", "").strip())
+    except ValueError:
+        return None
+
+
+def _transaction(row):
+    """Callback payload for one export row, or None when it cannot be replayed"""
+    transaction_id = (row.get("Ext. Txn Ref.") or "").strip() or (row.get("Int. Txn Ref.") or "").strip()
+    payer_code = (row.get("Payer Code") or "").strip()
+    amount = _amount(row.get("Paid Amount"))
+    if not transaction_id or not payer_code or amount is None:
+        return None
+    try:
+        paid_at = datetime.strptime(row.get("Txn Date", "").strip(), "%d/%m/%Y %H:%M:%S")
+    except ValueError:
+        return None
+    status = (row.get("Txn Status") or "").strip().upper()
+    return {
+        "transaction_id": transaction_id,
+        "transaction_status": STATUSES.get(status, status),
+        "amount": amount,
+        "payer_code": payer_code,
+        "payer_names": (row.get("Payer Names") or "").strip(),
+        "payment_channel_name": (row.get("Payment Channel") or "").strip() or None,
+        "slip_number": (row.get("Bank Slip") or "").strip() or None,
+        "payment_date_time": paid_at.strftime("%Y-%m-%d %H:%M:%S"),
+        "observation": (row.get("Observation") or "").strip(),
+    }
+
+
+def load_transactions(patterns):
+    """
+    Unique transactions from the Urubuto CSV exports, oldest first.
+
+    Exports overlap (a month file and its daily files), so a transaction
+    id seen in an earlier file is skipped.
+    """
+    transactions = {}
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)):
+            with open(path, newline="", encoding="utf-8-sig") as handle:
+                for row in csv.DictReader(handle):
+                    transaction = _transaction(row)
+                    if transaction is not None:
+                        transactions.setdefault(transaction["transaction_id"], transaction)
+    return sorted(transactions.values(), key=lambda t: t["payment_date_time"])
+
+
+def build_deliveries(transactions, duplicate_ratio, concurrent_duplicate_ratio, same_payer_ratio, seed):
+    """
+    Group the replayed callbacks into bursts; requests within a burst are
+    sent concurrently.
+
+    Returns:
+        list: Bursts, each a list of transactions
+    """
+    rng = random.Random(seed)
+    by_payer = defaultdict(list)
+    for transaction in transactions:
+        by_payer[transaction["payer_code"]].append(transaction)
+
+    bursts = []
+    for payer_transactions in by_payer.values():
+        if len(payer_transactions) > 1 and rng.random() < same_payer_ratio:
+            bursts.append(list(payer_transactions))
+        else:
+            bursts.extend([transaction] for transaction in payer_transactions)
+    rng.shuffle(bursts)
+
+    # Re-deliveries arrive later, after the gateway's retry delay
+    later = defaultdict(list)
+    for index, burst in enumerate(bursts):
+        for transaction in list(burst):
+            if rng.random() < concurrent_duplicate_ratio:
+                burst.append(transaction)
+            if rng.random() < duplicate_ratio:
+                later[rng.randint(index + 1, len(bursts))].append([transaction])
+    ordered = []
+    for index, burst in enumerate(bursts):
+        ordered.extend(later.pop(index, []))
+        ordered.append(burst)
+    ordered.extend(later.pop(len(bursts), []))
+    return ordered
+
+
+# ---------------------------------------------------------------------------
+# Target app
+# ---------------------------------------------------------------------------
+
+# Request threads per virtual gateway (client side, and so server side with keep-alive)
+THREADS_PER_GATEWAY = 4
+
+
+def serve_locally(database_url, transactions, wallet_ratio, seed, threads=64):
+    """
+    Seed a fake MIS database with the replayed payers and serve the app on
+    a free local port from a fixed pool of request threads.
+
+    Returns:
+        tuple: (base URL, server)
+    """
+    from werkzeug.serving import ThreadedWSGIServer
+
+    class PooledWSGIServer(ThreadedWSGIServer):
+        """Reuses request threads, so per-thread SQLite connections are not churned"""
+        executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="loadtest-app")
+
+        def process_request(self, request, client_address):
+            self.executor.submit(self.process_request_thread, request, client_address)
+
+    engine = create_engine(database_url)
+    seed_database(engine, Volumes(students=0), seed=seed)
+    payers = {t["payer_code"]: t["payer_names"] for t in transactions}
+    seed_payers(engine, payers, wallet_ratio=wallet_ratio, seed=seed)
+    engine.dispose()
+
+    app = benchmark_app(database_url)
+    create_gateway_client(app)
+    server = PooledWSGIServer("127.0.0.1", 0, app)
+    threading.Thread(target=server.serve_forever, name="loadtest-app", daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", server
+
+
+# ---------------------------------------------------------------------------
+# Load
+# ---------------------------------------------------------------------------
+
+class LoadTest:
+    """
+    Drives the bursts through ``concurrency`` virtual gateways.
+
+    Requests run in worker threads (``requests`` sessions, one per thread)
+    scheduled from an asyncio loop, so a burst's callbacks really overlap.
+    """
+
+    def __init__(self, base_url, concurrency=16, auth_every=50, rate=0.0, timeout=30,
+                 username=BENCH_CLIENT_USERNAME, password=BENCH_CLIENT_PASSWORD):
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = concurrency
+        self.auth_every = auth_every
+        self.rate = rate
+        self.timeout = timeout
+        self.username = username
+        self.password = password
+        self.results = {name: BenchmarkResult(name) for name in ("authentication", "validation", "callback")}
+        self.status_codes = {name: Counter() for name in self.results}
+        # transaction_id -> response messages of its callback deliveries
+        self.acknowledged = defaultdict(list)
+        self._local = threading.local()
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _post(self, endpoint, payload, token=None):
+        headers = {"Authorization": token} if token else {}
+        started = time.perf_counter()
+        try:
+            response = self._session().post(f"{self.base_url}{URUBUTO_PREFIX}/{endpoint}", json=payload,
+                                            headers=headers, timeout=self.timeout)
+            status, body = response.status_code, response.json() if response.content else {}
+        except (requests.RequestException, ValueError) as e:
+            status, body = "error", {"message": str(e)}
+        return endpoint, status, body, time.perf_counter() - started
+
+    def _record(self, outcome):
+        endpoint, status, body, seconds = outcome
+        ok = status == 200
+        self.results[endpoint].add(seconds, ok, error=None if ok else f"{status}: {body.get('message')}")
+        self.status_codes[endpoint][str(status)] += 1
+        return body
+
+    async def _authenticate(self):
+        body = self._record(await asyncio.to_thread(
+            self._post, "authentication", {"user_name": self.username, "password": self.password}))
+        token = (body.get("data") or {}).get("token")
+        if token and not token.startswith("Bearer "):
+            token = f"Bearer {token}"
+        return token
+
+    async def _deliver(self, transaction, token):
+        callback = {key: value for key, value in transaction.items() if key != "payer_names"}
+        outcome = await asyncio.to_thread(self._post, "callback", callback, token)
+        body = self._record(outcome)
+        if outcome[1] == 200:
+            self.acknowledged[transaction["transaction_id"]].append(body.get("message"))
+
+    async def _gateway(self, queue):
+        token, handled = None, 0
+        while True:
+            burst = await queue.get()
+            try:
+                if token is None or (self.auth_every and handled >= self.auth_every):
+                    token, handled = await self._authenticate(), 0
+                # Validation once per distinct transaction, then every delivery at once
+                for transaction in {t["transaction_id"]: t for t in burst}.values():
+                    self._record(await asyncio.to_thread(
+                        self._post, "validation", {"merchant_code": MERCHANT_CODE,
+                                                   "payer_code": transaction["payer_code"]}, token))
+                await asyncio.gather(*(self._deliver(transaction, token) for transaction in burst))
+                handled += len(burst)
+            finally:
+                queue.task_done()
+
+    async def _run(self, bursts):
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=self.concurrency * THREADS_PER_GATEWAY, thread_name_prefix="loadtest-client"))
+        queue = asyncio.Queue()
+        workers = [asyncio.create_task(self._gateway(queue)) for _ in range(self.concurrency)]
+        interval = 1.0 / self.rate if self.rate else 0
+        for burst in bursts:
+            await queue.put(burst)
+            if interval:
+                await asyncio.sleep(interval)
+        await queue.join()
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    def run(self, bursts):
+        """Send every burst; returns the wall-clock seconds taken"""
+        started = time.perf_counter()
+        asyncio.run(self._run(bursts))
+        return time.perf_counter() - started
+
+    def report(self, elapsed):
+        fields = ("ops", "errors", "error_rate", "p50_ms", "p95_ms", "p99_ms", "max_ms", "error_samples")
+        endpoints = {}
+        for name, result in self.results.items():
+            stats = {field: value for field, value in result.as_dict().items() if field in fields}
+            stats["throughput_per_s"] = round(result.ops / elapsed, 2) if elapsed else 0.0
+            stats["status_codes"] = dict(self.status_codes[name])
+            endpoints[name] = stats
+        total = sum(result.ops for result in self.results.values())
+        return {"seconds": round(elapsed, 3), "requests": total,
+                "throughput_per_s": round(total / elapsed, 2) if elapsed else 0.0, "endpoints": endpoints}
+
+
+# ---------------------------------------------------------------------------
+# Idempotency
+# ---------------------------------------------------------------------------
+
+def wallet_balances(engine):
+    """{reg_no: [balance, ...]} for every wallet"""
+    from application.models.mis_models import TblStudentWallet
+
+    wallets = TblStudentWallet.__table__
+    balances = defaultdict(list)
+    with engine.connect() as conn:
+        for reg_no, balance in conn.execute(select(wallets.c.reg_no, wallets.c.dept)):
+            balances[reg_no].append(float(balance or 0))
+    return balances
+
+
+def check_idempotency(engine, transactions, acknowledged, opening_balances):
+    """
+    Compare the database with what was replayed.
+
+    Returns:
+        dict: Violation counts plus up to ten examples of each
+    """
+    from application.models.mis_models import TblStudentWalletHistory, TblStudentWalletLedger
+
+    history = TblStudentWalletHistory.__table__
+    ledger = TblStudentWalletLedger.__table__
+    replayed = {t["transaction_id"]: t for t in transactions}
+    ids = list(replayed)
+
+    with engine.connect() as conn:
+        history_rows = Counter()
+        for start in range(0, len(ids), 500):
+            history_rows.update(dict(conn.execute(
+                select(history.c.external_transaction_id, func.count())
+                .where(history.c.external_transaction_id.in_(ids[start:start + 500]))
+                .group_by(history.c.external_transaction_id)).all()))
+        ledger_rows = Counter()
+        for start in range(0, len(ids), 500):
+            ledger_rows.update(dict(conn.execute(
+                select(ledger.c.trans_code, func.count())
+                .where(ledger.c.trans_code.in_(ids[start:start + 500]))
+                .group_by(ledger.c.trans_code)).all()))
+
+    balances = wallet_balances(engine)
+    credited = defaultdict(float)
+    for transaction_id, count in history_rows.items():
+        if count:
+            transaction = replayed[transaction_id]
+            credited[transaction["payer_code"]] += transaction["amount"]
+
+    violations = {
+        "duplicate_history": [tx for tx, count in history_rows.items() if count > 1],
+        "duplicate_ledger_credits": [tx for tx, count in ledger_rows.items() if count > 1],
+        "duplicate_wallets": [reg_no for reg_no, rows in balances.items() if len(rows) > 1],
+        "missing_credits": [
+            tx for tx in acknowledged
+            if replayed[tx]["transaction_status"] in CREDITED and not history_rows.get(tx)
+            and replayed[tx]["payment_date_time"] >= CALLBACK_CUTOFF
+        ],
+        "balance_mismatches": [
+            reg_no for reg_no, amount in credited.items()
+            if abs(sum(balances.get(reg_no, [0.0])) - opening_balances.get(reg_no, 0.0) - amount) > 0.01
+        ],
+    }
+    return {
+        "violations": sum(len(items) for items in violations.values()),
+        **{name: {"count": len(items), "examples": sorted(items)[:10]} for name, items in violations.items()},
+    }
+
+
+# ---------------------------------------------------------------------------
+# CLI
+# ---------------------------------------------------------------------------
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--exports", nargs="+", default=[DEFAULT_EXPORTS], help="CSV exports (globs) to replay")
+    parser.add_argument("--limit", type=int, default=0, help="Replay only the first N transactions")
+    parser.add_argument("--target", help="Base URL of a running app (default: serve one locally)")
+    parser.add_argument("--db", help="Database URL of the app (default: temporary SQLite file)")
+    parser.add_argument("--username", default=BENCH_CLIENT_USERNAME)
+    parser.add_argument("--password", default=BENCH_CLIENT_PASSWORD)
+    parser.add_argument("--concurrency", type=int, default=16, help="Virtual gateways")
+    parser.add_argument("--rate", type=float, default=0.0, help="Bursts per second (0: as fast as possible)")
+    parser.add_argument("--auth-every", type=int, default=50, help="Transactions between re-authentications")
+    parser.add_argument("--duplicate-ratio", type=float, default=0.1)
+    parser.add_argument("--concurrent-duplicate-ratio", type=float, default=0.05)
+    parser.add_argument("--same-payer-ratio", type=float, default=0.5)
+    parser.add_argument("--wallet-ratio", type=float, default=0.5, help="Seeded payers with an existing wallet")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Write the report as JSON")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Show application logs")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.verbose:
+        logging.basicConfig(level=logging.INFO)
+    else:
+        # Task modules imported by the app (some per request) reset the app logger to DEBUG
+        logging.disable(logging.CRITICAL)
+
+    transactions = load_transactions(args.exports)
+    if args.limit:
+        transactions = transactions[:args.limit]
+    if not transactions:
+        print("No transactions to replay")
+        return 1
+    bursts = build_deliveries(transactions, args.duplicate_ratio, args.concurrent_duplicate_ratio,
+                              args.same_payer_ratio, args.seed)
+
+    database_url, server = args.db, None
+    if not args.target and not database_url:
+        handle, path = tempfile.mkstemp(prefix="loadtest-", suffix=".db")
+        os.close(handle)
+        database_url = f"sqlite:///{path}"
+    if args.target:
+        base_url = args.target
+    else:
+        base_url, server = serve_locally(database_url, transactions, args.wallet_ratio, args.seed,
+                                         threads=args.concurrency * THREADS_PER_GATEWAY + 16)
+
+    engine = create_engine(database_url) if database_url else None
+    opening = {reg_no: sum(rows) for reg_no, rows in wallet_balances(engine).items()} if engine else {}
+
+    load = LoadTest(base_url, concurrency=args.concurrency, auth_every=args.auth_every, rate=args.rate,
+                    username=args.username, password=args.password)
+    try:
+        elapsed = load.run(bursts)
+    finally:
+        if server is not None:
+            server.shutdown()
+
+    deliveries = sum(len(burst) for burst in bursts)
+    report = {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "target": base_url,
+            "transactions": len(transactions),
+            "deliveries": deliveries,
+            "duplicate_deliveries": deliveries - len(transactions),
+            "concurrency": args.concurrency,
+            "seed": args.seed,
+        },
+        **load.report(elapsed),
+        "idempotency": check_idempotency(engine, transactions, load.acknowledged, opening) if engine else None,
+    }
+
+    columns = ("ops", "errors", "error_rate", "throughput_per_s", "p50_ms", "p95_ms", "p99_ms", "max_ms")
+    print(f"{'endpoint':<16}" + "".join(f"{column:>18}" for column in columns))
+    for name, stats in report["endpoints"].items():
+        print(f"{name:<16}" + "".join(f"{stats[column]:>18}" for column in columns))
+    print(f"{report['requests']} requests in {report['seconds']}s ({report['throughput_per_s']}/s), "
+          f"{report['meta']['duplicate_deliveries']} duplicate deliveries")
+    if report["idempotency"] is not None:
+        print("Idempotency violations: " + ", ".join(
+            f"{name}={value['count']}" for name, value in report["idempotency"].items() if name != "violations"))
+
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(report, handle, indent=2, default=str)
+        print(f"Report written to {args.output}")
+    return 1 if report["idempotency"] and report["idempotency"]["violations"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
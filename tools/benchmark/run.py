@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Run the sync, callback and reconciliation benchmarks
+
+Seeds a scratch database, starts the fake QuickBooks server and runs every
+benchmark (or ``--only`` some of them), printing a table and optionally
+writing JSON for regression comparison:
+
+    python tools/benchmark/run.py --students 2000 --output bench.json
+    python tools/benchmark/run.py --compare bench.json --tolerance 0.2
+
+With ``--compare`` the exit status is 1 when a benchmark's p95 latency or
+per-op query/API counts grew, or its throughput fell, by more than the
+tolerance, or its error rate rose.
+"""
+
+import argparse
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from sqlalchemy import create_engine  # noqa: E402
+
+from tools.benchmark import benchmarks  # noqa: E402
+from tools.benchmark.environment import (  # noqa: E402
+    benchmark_app, connect_quickbooks, create_gateway_client, preload_quickbooks,
+)
+from tools.benchmark.fake_quickbooks import FakeQuickBooksServer  # noqa: E402
+from tools.benchmark.seed import Volumes, seed_database  # noqa: E402
+
+BENCHMARKS = ("invoice_sync", "payment_sync", "sales_receipt_sync", "customer_sync",
+              "urubuto_callback", "reconciliation")
+
+# Compared metric -> True when higher is better
+COMPARED = {"p95_ms": False, "throughput_per_s": True, "db_queries_per_op": False, "qb_calls_per_op": False}
+
+# Latency differences under this many ms are noise, whatever the ratio
+MIN_LATENCY_DELTA_MS = 2.0
+
+# Error rate increase tolerated before it counts as a regression
+ERROR_RATE_SLACK = 0.01
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--db", help="Scratch database URL (default: temporary SQLite file)")
+    parser.add_argument("--students", type=int, default=Volumes.students)
+    parser.add_argument("--invoices-per-student", type=int, default=Volumes.invoices_per_student)
+    parser.add_argument("--wallet-ratio", type=float, default=Volumes.wallet_ratio)
+    parser.add_argument("--ops", type=int, default=200, help="Operations per benchmark")
+    parser.add_argument("--customer-batch-size", type=int, default=20)
+    parser.add_argument("--duplicate-ratio", type=float, default=0.1, help="Re-delivered callbacks")
+    parser.add_argument("--latency-ms", type=float, default=20)
+    parser.add_argument("--jitter-ms", type=float, default=5)
+    parser.add_argument("--rate-limit", type=int, default=0, help="QuickBooks requests per minute (0: none)")
+    parser.add_argument("--max-concurrent", type=int, default=0)
+    parser.add_argument("--error-429-rate", type=float, default=0.0)
+    parser.add_argument("--error-401-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, default=list(BENCHMARKS))
+    parser.add_argument("--output", help="Write the results as JSON")
+    parser.add_argument("--compare", help="Baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed relative regression")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Show application logs")
+    return parser.parse_args(argv)
+
+
+def _git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def run(args):
+    database_url = args.db
+    if not database_url:
+        handle, path = tempfile.mkstemp(prefix="bench-", suffix=".db")
+        os.close(handle)
+        database_url = f"sqlite:///{path}"
+
+    volumes = Volumes(students=args.students, invoices_per_student=args.invoices_per_student,
+                      wallet_ratio=args.wallet_ratio)
+    engine = create_engine(database_url)
+    counts = seed_database(engine, volumes, seed=args.seed)
+    engine.dispose()
+
+    quickbooks = FakeQuickBooksServer(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, rate_limit_per_minute=args.rate_limit,
+        max_concurrent=args.max_concurrent, error_429_rate=args.error_429_rate,
+        error_401_rate=args.error_401_rate, seed=args.seed,
+    )
+    results = {}
+    with quickbooks:
+        app = benchmark_app(database_url, quickbooks)
+        connect_quickbooks(app, quickbooks)
+        preload_quickbooks(app, quickbooks)
+        token = create_gateway_client(app)
+
+        with app.app_context():
+            runners = {
+                "invoice_sync": lambda: benchmarks.bench_invoice_sync(args.ops),
+                "payment_sync": lambda: benchmarks.bench_payment_sync(args.ops),
+                "sales_receipt_sync": lambda: benchmarks.bench_sales_receipt_sync(args.ops),
+                "customer_sync": lambda: benchmarks.bench_customer_sync(args.customer_batch_size),
+                "urubuto_callback": lambda: benchmarks.bench_urubuto_callback(
+                    app, token, args.ops, args.students, args.duplicate_ratio, args.seed),
+                "reconciliation": lambda: benchmarks.bench_reconciliation(),
+            }
+            for name in BENCHMARKS:
+                if name in args.only:
+                    results[name] = runners[name]().as_dict()
+
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "database": engine.dialect.name,
+            "volumes": volumes.as_dict(),
+            "rows": counts,
+            "quickbooks": {
+                "latency_ms": args.latency_ms, "jitter_ms": args.jitter_ms, "rate_limit_per_minute": args.rate_limit,
+                "max_concurrent": args.max_concurrent, "error_429_rate": args.error_429_rate,
+                "error_401_rate": args.error_401_rate,
+            },
+            "ops": args.ops,
+            "seed": args.seed,
+        },
+        "benchmarks": results,
+        "quickbooks_stats": dict(quickbooks.stats),
+    }
+
+
+def compare(current, baseline, tolerance):
+    """
+    Regressions of ``current`` against ``baseline``.
+
+    Returns:
+        list: Human readable regression lines (empty when none)
+    """
+    regressions = []
+    for name, before in baseline.get("benchmarks", {}).items():
+        after = current["benchmarks"].get(name)
+        if after is None:
+            continue
+        if after.get("error_rate", 0) > before.get("error_rate", 0) + ERROR_RATE_SLACK:
+            regressions.append(f"{name}.error_rate: {before.get('error_rate', 0)} -> {after['error_rate']}")
+        for metric, higher_is_better in COMPARED.items():
+            old, new = before.get(metric), after.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if metric.endswith("_ms") and abs(new - old) < MIN_LATENCY_DELTA_MS:
+                continue
+            if (change < -tolerance) if higher_is_better else (change > tolerance):
+                regressions.append(f"{name}.{metric}: {old} -> {new} ({change:+.0%})")
+    return regressions
+
+
+def print_table(report):
+    columns = ("ops", "errors", "throughput_per_s", "p50_ms", "p95_ms", "p99_ms", "db_queries_per_op",
+               "qb_calls_per_op")
+    print(f"{'benchmark':<20}" + "".join(f"{column:>18}" for column in columns))
+    for name, result in report["benchmarks"].items():
+        print(f"{name:<20}" + "".join(f"{result[column]:>18}" for column in columns))
+    print(f"QuickBooks: {report['quickbooks_stats']}")
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.verbose:
+        logging.basicConfig(level=logging.INFO)
+    else:
+        # Task modules imported by the app (some per request) reset the app logger to DEBUG
+        logging.disable(logging.CRITICAL)
+    report = run(args)
+    print_table(report)
+
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(report, handle, indent=2, default=str)
+        print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as handle:
+            regressions = compare(report, json.load(handle), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print(f"No regressions over {args.tolerance:.0%} against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
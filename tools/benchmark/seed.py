@@ -0,0 +1,271 @@
+"""
+Seeds a scratch MIS/central database with realistic volumes for benchmarks
+
+Creates the full schema (``db.metadata``) on the target engine and bulk
+inserts, deterministically from ``seed``:
+
+* campuses, banks and income categories already mapped to QuickBooks;
+* students (``TblPersonalUg``) with registrations, a share of them already
+  synced as QuickBooks customers;
+* invoices (``TblImvoice``) and payments (``Payment``) against them;
+* wallets, wallet ledger credits (sales receipts) and wallet history;
+* Urubuto integration logs for the reconciliation run.
+
+``seed_payers`` adds students for given payer codes (replayed exports).
+
+Works with SQLite (default) or a MySQL URL. The schema is created in the
+target database, so only point it at a scratch database.
+"""
+
+import json
+import random
+from dataclasses import dataclass, asdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer, Numeric, BigInteger, func, select
+from sqlalchemy.ext.compiler import compiles
+
+from application import db
+from application.models import central_models, mis_models  # noqa: F401 (registers the tables)
+from application.models.central_models import IntegrationLog
+from application.models.mis_models import (
+    Payment, TblBank, TblCampus, TblImvoice, TblIncomeCategory, TblPersonalUg, TblRegisterProgramUg,
+    TblStudentWallet, TblStudentWalletHistory, TblStudentWalletLedger,
+)
+
+INSERT_CHUNK = 1000
+
+# Urubuto callbacks before this date are ignored by the callback endpoint
+PAYMENT_PERIOD_START = datetime(2026, 2, 1)
+
+# Income category of wallet top-ups (``PREPAYMENT_ID``); the callback uses 128
+PREPAYMENT_CATEGORY_ID = 128
+
+
+@dataclass
+class Volumes:
+    students: int = 1000
+    invoices_per_student: int = 3
+    payment_ratio: float = 0.6          # share of invoices with a payment
+    synced_customer_ratio: float = 0.8  # share of students already in QuickBooks
+    wallet_ratio: float = 0.5           # share of students with a wallet
+    ledger_per_wallet: int = 2
+    campuses: int = 3
+    categories: int = 12
+    banks: int = 3
+
+    def as_dict(self):
+        return asdict(self)
+
+
+@compiles(BigInteger, "sqlite")
+def _sqlite_big_integer(type_, compiler, **kw):
+    """
+    SQLite only auto-increments ``INTEGER PRIMARY KEY`` columns; without
+    this the BIGINT ids of the wallet ledger and API access logs stay NULL.
+    """
+    return "INTEGER"
+
+
+def reg_no(index):
+    return f"EAUR/{2020 + index % 6}/{index:06d}"
+
+
+def _filler(column):
+    """Value for a NOT NULL column the generator does not set"""
+    kind = column.type
+    if isinstance(kind, Boolean):
+        return False
+    if isinstance(kind, (Integer, BigInteger)):
+        return 0
+    if isinstance(kind, (Float, Numeric)):
+        return 0
+    if isinstance(kind, DateTime):
+        return PAYMENT_PERIOD_START
+    if isinstance(kind, Date):
+        return PAYMENT_PERIOD_START.date()
+    length = getattr(kind, "length", None) or 10
+    return "-"[:length]
+
+
+def _complete(table, rows):
+    required = [
+        column for column in table.columns
+        if not column.nullable and column.default is None and column.server_default is None
+        and not (column.primary_key and column.autoincrement is not False and isinstance(column.type, (Integer, BigInteger)))
+    ]
+    for row in rows:
+        for column in required:
+            row.setdefault(column.name, _filler(column))
+    return rows
+
+
+def _insert(conn, model, rows):
+    table = model.__table__
+    rows = _complete(table, rows)
+    for start in range(0, len(rows), INSERT_CHUNK):
+        conn.execute(table.insert(), rows[start:start + INSERT_CHUNK])
+    return len(rows)
+
+
+def seed_database(engine, volumes=None, seed=42):
+    """
+    Create the schema and insert the generated rows.
+
+    Returns:
+        dict: Row counts per table plus the generated payer codes
+    """
+    volumes = volumes or Volumes()
+    rng = random.Random(seed)
+    db.metadata.create_all(engine)
+    counts = {}
+    now = datetime.now()
+
+    campuses = [{"camp_id": i, "camp_full_name": f"Campus {i}", "camp_short_name": f"C{i}", "camp_city": "Kigali",
+                 "camp_yor": now, "camp_active": 1, "camp_comments": "", "quickbooks_id": 100 + i}
+                for i in range(1, volumes.campuses + 1)]
+    categories = [{"id": i, "invTypeId": "1", "prg_type": "1", "name": f"Fee category {i}", "amount": 50000.0 * i,
+                   "description": "", "recorded_by": "seed", "status_Id": 1, "category": "Tuition",
+                   "QuickBk_ctgId": 500 + i, "income_account_qb": 400 + i, "Quickbk_Status": 1, "sync_token": 0}
+                  for i in range(1, volumes.categories + 1)]
+    categories.append({"id": PREPAYMENT_CATEGORY_ID, "invTypeId": "1", "prg_type": "1", "name": "Student prepayment",
+                       "amount": 0.0, "description": "", "recorded_by": "seed", "status_Id": 1,
+                       "category": "Prepayment", "QuickBk_ctgId": 500 + PREPAYMENT_CATEGORY_ID,
+                       "income_account_qb": 400, "Quickbk_Status": 1, "sync_token": 0})
+    banks = [{"bank_id": i, "bank_code": f"B{i}", "bank_name": f"Bank {i}", "bank_branch": "Main",
+              "currency": "RWF", "status": "Active", "qk_id": str(200 + i), "sync_token": 0}
+             for i in range(1, volumes.banks + 1)]
+
+    students, registrations, invoices, payments = [], [], [], []
+    wallets, ledger, history, logs = [], [], [], []
+    invoice_id = payment_id = wallet_id = ledger_id = 0
+
+    for s in range(1, volumes.students + 1):
+        code = reg_no(s)
+        synced = rng.random() < volumes.synced_customer_ratio
+        camp_id = rng.randint(1, volumes.campuses)
+        students.append({
+            "per_id_ug": s, "reg_no": code, "fname": f"First{s}", "lname": f"Last{s}", "sex": rng.choice("MF"),
+            "phone1": f"0788{s:06d}", "email1": f"student{s}@example.edu", "reg_date": now - timedelta(days=400),
+            "qk_id": str(10000 + s) if synced else None, "sync_token": "0" if synced else None,
+            "QuickBk_status": 1 if synced else 0,
+        })
+        registrations.append({
+            "reg_prg_id": s, "reg_no": code, "intake_id": 1, "prg_id": 1, "splz_id": 1, "level_id": 1,
+            "prg_mode_id": 1, "prg_type": "1", "camp_id": camp_id, "status_comment": "", "Availability": "Yes",
+            "reg_date": now - timedelta(days=400), "reg_active": 1,
+        })
+
+        for _ in range(volumes.invoices_per_student):
+            invoice_id += 1
+            amount = float(rng.choice([150000, 250000, 480000, 620000]))
+            invoice_date = PAYMENT_PERIOD_START + timedelta(days=rng.randint(0, 90))
+            invoices.append({
+                "id": invoice_id, "reg_no": code, "level_id": 1, "fee_category": rng.randint(1, volumes.categories),
+                "dept": amount, "credit": 0.0, "balance": amount, "invoice_date": invoice_date,
+                "date": invoice_date, "reference_number": f"INV{invoice_id:08d}", "comment": "", "user": "seed",
+                "intake_id": 1, "QuickBk_Status": 0,
+            })
+            if rng.random() < volumes.payment_ratio:
+                payment_id += 1
+                paid = round(amount * rng.choice([0.25, 0.5, 1.0]), 2)
+                payments.append({
+                    "id": payment_id, "trans_code": f"TX{payment_id:09d}", "reg_no": code, "level_id": 1,
+                    "bank_id": rng.randint(1, volumes.banks), "slip_no": f"SLIP{payment_id}", "user": "seed",
+                    "acad_cycle_id": "1", "date": (invoice_date + timedelta(days=3)).strftime("%Y-%m-%d"),
+                    "fee_category": invoices[-1]["fee_category"], "amount": paid, "description": "Tuition",
+                    "recorded_date": invoice_date + timedelta(days=3), "invoi_ref": invoices[-1]["reference_number"],
+                    "external_transaction_id": f"URB{payment_id:09d}", "payment_chanel": "MOMO", "QuickBk_Status": 0,
+                })
+
+        if rng.random() < volumes.wallet_ratio:
+            wallet_id += 1
+            balance = 0.0
+            for _ in range(volumes.ledger_per_wallet):
+                ledger_id += 1
+                amount = float(rng.choice([20000, 50000, 100000]))
+                created = PAYMENT_PERIOD_START + timedelta(days=rng.randint(0, 60), minutes=ledger_id)
+                tx = f"URW{ledger_id:09d}"
+                ledger.append({
+                    "id": ledger_id, "student_id": code, "direction": "credit", "original_amount": amount,
+                    "amount": amount, "trans_code": tx, "payment_chanel": "MOMO", "fee_category": PREPAYMENT_CATEGORY_ID, "bank_id": 2,
+                    "source": "sales_receipt", "slip_no": f"WS{ledger_id}", "created_at": created,
+                })
+                history.append({
+                    "wallet_id": wallet_id, "reg_no": code, "reference_number": f"W{wallet_id:08d}",
+                    "transaction_type": "TOPUP", "amount": amount, "balance_before": balance,
+                    "balance_after": balance + amount, "trans_code": tx, "external_transaction_id": tx,
+                    "payment_chanel": "MOMO", "bank_id": 2, "comment": "Wallet top-up", "created_by": "SYSTEM",
+                })
+                balance += amount
+                logs.append({
+                    "system_name": "UrubutoPay", "operation": "Wallet Payment", "status": "VALID",
+                    "external_transaction_id": tx, "payer_code": code,
+                    "response_data": json.dumps({"transaction_id": tx, "amount": amount, "payer_code": code,
+                                                 "payment_date_time": created.strftime("%Y-%m-%d %H:%M:%S")}),
+                    "started_at": created, "completed_at": created, "created_at": created, "updated_at": created,
+                })
+            wallets.append({
+                "id": wallet_id, "reg_prg_id": wallet_id, "reference_number": f"W{wallet_id:08d}", "reg_no": code,
+                "level_id": 1, "bank_id": 2, "slip_no": f"WS{wallet_id}", "trans_code": ledger[-1]["trans_code"],
+                "payment_chanel": "MOMO", "fee_category": PREPAYMENT_CATEGORY_ID, "dept": balance, "amount": balance,
+                "payment_date": PAYMENT_PERIOD_START.date(), "user": "seed", "date": now, "is_paid": "Yes",
+                "sync_status": 0,
+            })
+
+    with engine.begin() as conn:
+        counts["campuses"] = _insert(conn, TblCampus, campuses)
+        counts["income_categories"] = _insert(conn, TblIncomeCategory, categories)
+        counts["banks"] = _insert(conn, TblBank, banks)
+        counts["students"] = _insert(conn, TblPersonalUg, students)
+        counts["registrations"] = _insert(conn, TblRegisterProgramUg, registrations)
+        counts["invoices"] = _insert(conn, TblImvoice, invoices)
+        counts["payments"] = _insert(conn, Payment, payments)
+        counts["wallets"] = _insert(conn, TblStudentWallet, wallets)
+        counts["wallet_ledger"] = _insert(conn, TblStudentWalletLedger, ledger)
+        counts["wallet_history"] = _insert(conn, TblStudentWalletHistory, history)
+        counts["integration_logs"] = _insert(conn, IntegrationLog, logs)
+    return counts
+
+
+def seed_payers(engine, payers, wallet_ratio=0.5, seed=42):
+    """
+    Students for externally supplied payer codes, e.g. the payers of
+    replayed Urubuto exports, a share of them with an existing wallet.
+
+    Args:
+        payers (dict): reg_no -> payer names
+
+    Returns:
+        dict: Row counts per table
+    """
+    rng = random.Random(seed)
+    db.metadata.create_all(engine)
+    with engine.connect() as conn:
+        first_id = (conn.execute(select(func.max(TblPersonalUg.per_id_ug))).scalar() or 0) + 1
+        first_wallet = (conn.execute(select(func.max(TblStudentWallet.id))).scalar() or 0) + 1
+    now = datetime.now()
+
+    students, wallets = [], []
+    for offset, (code, names) in enumerate(sorted(payers.items())):
+        fname, _, lname = (names or "").partition(" ")
+        students.append({
+            "per_id_ug": first_id + offset, "reg_no": code, "fname": fname[:100] or code, "lname": lname[:100],
+            "reg_date": now - timedelta(days=400), "QuickBk_status": 0,
+        })
+        if rng.random() < wallet_ratio:
+            wallet_id = first_wallet + len(wallets)
+            balance = float(rng.choice([0, 5000, 20000]))
+            wallets.append({
+                "id": wallet_id, "reg_prg_id": first_id + offset, "reference_number": f"W{wallet_id:08d}",
+                "reg_no": code, "level_id": 1, "bank_id": 2, "slip_no": f"WS{wallet_id}", "trans_code": f"OPEN{wallet_id}",
+                "payment_chanel": "MOMO", "fee_category": PREPAYMENT_CATEGORY_ID, "dept": balance, "amount": balance,
+                "payment_date": PAYMENT_PERIOD_START.date(), "user": "seed", "date": now, "is_paid": "Yes",
+                "sync_status": 0,
+            })
+
+    with engine.begin() as conn:
+        return {
+            "students": _insert(conn, TblPersonalUg, students),
+            "wallets": _insert(conn, TblStudentWallet, wallets),
+        }